@@ -1,52 +1,180 @@
 import sys
 import os
-import sqlite3
-from PyQt5.QtWidgets import QApplication, QStackedWidget, QMessageBox, QFileDialog, QTableWidgetItem
-from PyQt5 import uic
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
-from datetime import datetime
+import html
+import tempfile
+import time
+from PyQt5.QtWidgets import (QApplication, QStackedWidget, QMessageBox, QFileDialog, QWidget, QListWidgetItem,
+                             QShortcut, QFrame, QVBoxLayout, QLabel, QPushButton, QTableWidgetItem, QHeaderView)
+from PyQt5.QtCore import Qt, QTimer, QUrl, pyqtSignal
+from PyQt5.QtGui import QIcon, QKeySequence, QDesktopServices
+from controllers.enrollment_c import read_email_list, ENROLLED, ALREADY_ENROLLED
+from controllers.submission_c import parse_grade
+from database import init_db
+from service import LMSService, ApiClient, ServiceError, Unauthorized
+from utils.db_helper import close_all_pools
+from utils.activity import MATERIAL_OPEN, SUBMISSION, ENROLLMENT
+from utils.pdf_artifacts import ArtifactCache
+from utils.scheduler import Scheduler
+from utils.sql_table_model import KeysetTableModel
+from utils.tasks import TaskRunner
+from utils.ui_loader import load_page, pixmap
 
 DB_FILENAME = "database.db"
+# Base URL of a shared API server (python -m service.server); when unset
+# the app works on DB_FILENAME directly
+API_URL = os.environ.get("LEARNUP_API")
+
+# Grade column of the submissions table
+GRADE_COLUMN = 3
+
+# How often the student course pages ask whether anything changed; the
+# answer costs one PRAGMA unless something did
+FEED_POLL_MS = 3000
+COURSE_GRID_COLUMNS = 3
+
+# Student deadline reminders: how many days ahead they are loaded, and how
+# long before an assignment's due time each one goes off
+REMINDER_DAYS = 7
+REMINDER_LEADS = (24 * 3600, 3600)
+# Scheduler key of the entry that reloads the reminders as the window moves on
+RELOAD_REMINDERS = "reload"
+
+# Days of activity on the teacher dashboard, and its columns after the course
+ACTIVITY_DAYS = 7
+ACTIVITY_COLUMNS = [("Material opens", MATERIAL_OPEN), ("Submissions", SUBMISSION), ("Enrollments", ENROLLMENT)]
+# Grade analytics page: table columns, and the weight column teachers edit
+DISTRIBUTION_COLUMNS = ["Grade", "Students", ""]
+ASSIGNMENT_STAT_COLUMNS = ["Assignment", "Due", "Weight", "Submitted", "Graded", "Missing",
+                           "Mean", "Std", "Median", "Min", "Max"]
+STUDENT_STAT_COLUMNS = ["Student", "Email", "Final grade", "Graded", "Missing", "At risk"]
+WEIGHT_COLUMN = 2
+# Width in characters of the longest distribution bar
+DISTRIBUTION_BAR = 10
+# Where opened materials are saved before the system PDF viewer shows them
+MATERIALS_CACHE = os.path.join(tempfile.gettempdir(), "learnup-materials")
+
+COURSE_CARD_STYLE = """
+QFrame#courseCard {
+    background-color: #FAFDF3;
+    border: 2px solid #C4A484;
+    border-radius: 12px;
+}
+QLabel { color: #555; }
+QLabel#cardTitle { color: #8B7355; font-size: 18px; font-weight: bold; }
+QPushButton {
+    background-color: #C4A484;
+    color: white;
+    border: none;
+    border-radius: 8px;
+    padding: 6px 12px;
+    font-weight: bold;
+}
+"""
+
+# Save-dialog filter -> export format
+EXPORT_FILTERS = {
+    "CSV (*.csv)": "csv",
+    "JSON Lines (*.jsonl)": "jsonl",
+    "Excel Workbook (*.xlsx)": "xlsx",
+}
+
+# (ui/<name>.ui, setup method) for each stacked-widget index
+PAGES = [
+    ("page1", "setup_welcome_page"),       # index 0: Welcome
+    ("page2", "setup_register_page"),      # index 1: Register
+    ("page3", "setup_login_page"),         # index 2: Login
+    ("page4", "setup_teacher_dashboard"),  # index 3: Teacher Dashboard
+    ("page5", "setup_create_course"),      # index 4: Create Course
+    ("page6", "setup_course_management"),  # index 5: Course Management
+    ("page7", "setup_student_dashboard"),  # index 6: Student Dashboard
+    ("page8", "setup_student_courses"),    # index 7: Student Course List
+    ("page9", "setup_student_course"),     # index 8: Student Course Detail
+    ("page10", "setup_grade_analytics"),   # index 9: Teacher Grade Analytics
+]
 
 class MainWindow(QStackedWidget):
+    # Emitted from the reminder thread, so the slot runs on the GUI thread
+    reminder_due = pyqtSignal(object, object)  # scheduler key, assignment
+
     def __init__(self):
         super().__init__()
-        # Load UI files
-        self.page1 = uic.loadUi("ui/page1.ui")  # Welcome
-        self.page2 = uic.loadUi("ui/page2.ui")  # Register
-        self.page3 = uic.loadUi("ui/page3.ui")  # Login
-        self.page4 = uic.loadUi("ui/page4.ui")  # Teacher Dashboard
-        self.page5 = uic.loadUi("ui/page5.ui")  # Create Course
-        self.page6 = uic.loadUi("ui/page6.ui")  # Course Management
-        self.page7 = uic.loadUi("ui/page7.ui")  # Student Dashboard
-
-        # Add pages to stacked widget
-        self.addWidget(self.page1)  # index 0: Welcome
-        self.addWidget(self.page2)  # index 1: Register
-        self.addWidget(self.page3)  # index 2: Login
-        self.addWidget(self.page4)  # index 3: Teacher Dashboard
-        self.addWidget(self.page5)  # index 4: Create Course
-        self.addWidget(self.page6)  # index 5: Course Management
-        self.addWidget(self.page7)  # index 6: Student Dashboard
-
-        # Initialize current user
+        # Every read and write goes through the service, in process or over HTTP
+        self.service = ApiClient(API_URL) if API_URL else LMSService(DB_FILENAME)
+        self.tasks = TaskRunner(expected_errors=(ServiceError,), parent=self)
+        self.artifacts = ArtifactCache()
+
+        # Pages are built on first navigation; until then each index holds
+        # an empty placeholder so the stacked-widget indices stay fixed
+        self._pages = {}
+        for _ in PAGES:
+            self.addWidget(QWidget())
+
+        # Initialize current user; the role ids are resolved once at login
+        # and reused by every dashboard query for the rest of the session
+        self.token = None
         self.current_user = None
         self.current_role = None
-
-        # Setup all page connections
-        self.setup_welcome_page()
-        self.setup_register_page()
-        self.setup_login_page()
-        self.setup_teacher_dashboard()
-        self.setup_create_course()
-        self.setup_course_management()
-        self.setup_student_dashboard()
+        self.current_user_id = None
+        self.current_teacher_id = None
+        self.current_student_id = None
+
+        # Student course feed: the version last shown, when its upcoming
+        # assignments go stale, and the course open on the detail page
+        self.feed = []
+        self.feed_version = None
+        self.feed_expires = None
+        self.open_course_id = None
+        self.feed_timer = QTimer(self)
+        self.feed_timer.timeout.connect(self.poll_course_feed)
+
+        # Deadline reminders wait in a heap until they are due, see load_reminders
+        self.reminders = Scheduler(self.reminder_due.emit, name="reminders")
+        self.reminder_due.connect(self.on_reminder_due)
+
+        # SQL timing and slow-query log, see utils.db_helper.QueryStats
+        self.query_panel = None
+        QShortcut(QKeySequence("Ctrl+Shift+Q"), self, self.show_query_panel)
 
         # Set window properties
         self.setWindowTitle("Learn Up App")
         self.setCurrentIndex(0)
 
+    def page(self, index):
+        """Return the page at ``index``, building and wiring it on first use"""
+        page = self._pages.get(index)
+        if page is None:
+            name, setup = PAGES[index]
+            page = self._pages[index] = load_page(name)
+            placeholder = self.widget(index)
+            self.insertWidget(index, page)
+            self.removeWidget(placeholder)
+            placeholder.deleteLater()
+            getattr(self, setup)()
+        return page
+
+    page1 = property(lambda self: self.page(0))
+    page2 = property(lambda self: self.page(1))
+    page3 = property(lambda self: self.page(2))
+    page4 = property(lambda self: self.page(3))
+    page5 = property(lambda self: self.page(4))
+    page6 = property(lambda self: self.page(5))
+    page7 = property(lambda self: self.page(6))
+    page8 = property(lambda self: self.page(7))
+    page9 = property(lambda self: self.page(8))
+    page10 = property(lambda self: self.page(9))
+
+    def setCurrentIndex(self, index):
+        self.page(index)
+        super().setCurrentIndex(index)
+
+    def show_query_panel(self):
+        """Open the SQL statistics window (Ctrl+Shift+Q)"""
+        if self.query_panel is None:
+            from utils.query_panel import QueryStatsPanel
+            self.query_panel = QueryStatsPanel(self)
+        self.query_panel.show()
+        self.query_panel.raise_()
+
     def setup_welcome_page(self):
         """Setup connections for welcome page"""
         self.page1.btnRegister.clicked.connect(self.goto_register)
@@ -66,14 +194,23 @@ class MainWindow(QStackedWidget):
 
     def setup_teacher_dashboard(self):
         """Setup teacher dashboard page"""
-        pixmap = QPixmap("assets/profilTeacher.png")
-        self.page4.profilTeacher.setPixmap(pixmap)
+        self.page4.profilTeacher.setPixmap(pixmap("assets/profilTeacher.png"))
 
         self.page4.dashboardBtn.clicked.connect(self.show_teacher_dashboard)
         self.page4.createCourseBtn.clicked.connect(self.show_create_course)
         self.page4.managementBtn.clicked.connect(self.show_course_management)
+        self.page4.analyticsBtn.clicked.connect(self.show_grade_analytics)
         self.page4.logoutBtn.clicked.connect(self.logout_action)
 
+        self.page4.activityTitle.setText(f"Activity in the last {ACTIVITY_DAYS} days")
+        table = self.page4.activityTable
+        table.setColumnCount(2 + len(ACTIVITY_COLUMNS))
+        table.setHorizontalHeaderLabels(["Course", "Active students"] + [name for name, _ in ACTIVITY_COLUMNS])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        table.verticalHeader().hide()
+        table.setEditTriggers(table.NoEditTriggers)
+
     def setup_create_course(self):
         """Setup create course page"""
         self.page5.addCourseBtn.clicked.connect(self.add_course_action)
@@ -93,6 +230,7 @@ class MainWindow(QStackedWidget):
 
         # Enrollment
         self.page6.btnAddEnroll.clicked.connect(self.add_enrollment)
+        self.page6.btnImportEnroll.clicked.connect(self.import_enrollments)
 
         # Navigation
         self.page6.btnPrevious.clicked.connect(lambda: self.setCurrentIndex(3))
@@ -100,6 +238,41 @@ class MainWindow(QStackedWidget):
         # Course selection
         self.page6.comboSelectCourse.currentIndexChanged.connect(self.load_course_data)
 
+        # Search over the teacher's courses and their files
+        self.page6.listSearchResults.hide()
+        self.page6.lineSearch.textChanged.connect(self.search_courses)
+        self.page6.listSearchResults.itemClicked.connect(self.open_search_result)
+
+        # Tables page in rows as they scroll into view, sorted by SQL
+        self.enrollment_model = KeysetTableModel(
+            ["Username", "Email"],
+            lambda params, *page: self.service.roster_page(self.token, params[0], *page),
+            tasks=self.tasks, parent=self)
+        self.page6.tableEnrollment.setModel(self.enrollment_model)
+
+        self.submission_model = KeysetTableModel(
+            ["Nama", "Tugas", "Waktu", "Nilai"],
+            lambda params, *page: self.service.submissions_page(self.token, params[0], *page),
+            sort_column=2, descending=True,
+            editable={GRADE_COLUMN}, validate=parse_grade,
+            tasks=self.tasks, parent=self)
+        self.page6.tableSubmission.setModel(self.submission_model)
+        self.page6.tableSubmission.sortByColumn(2, Qt.DescendingOrder)
+        for table in (self.page6.tableEnrollment, self.page6.tableSubmission):
+            table.setSortingEnabled(True)
+
+        # Grades are edited in the table and saved together
+        self.saving_grades = False
+        self.submission_model.dirtyChanged.connect(self.on_grades_dirty)
+        self.on_grades_dirty(0)
+        self.page6.btnSaveGrades.clicked.connect(self.save_grades)
+        self.page6.btnDiscardGrades.clicked.connect(self.submission_model.clear_edits)
+        self.page6.btnExportGrades.clicked.connect(self.export_grades)
+        self.page6.btnImportGrades.clicked.connect(self.import_grades)
+        self.page6.btnExportRoster.clicked.connect(lambda: self.export_report("roster"))
+        self.page6.btnExportGradebook.clicked.connect(lambda: self.export_report("gradebook"))
+        self.page6.btnCheckSimilarity.clicked.connect(self.check_similarity)
+
     def select_content_file(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select PDF File", "", "PDF Files (*.pdf)")
         if path:
@@ -112,26 +285,22 @@ class MainWindow(QStackedWidget):
             return
         course_id = self.page6.comboSelectCourse.currentData()
         youtube_url = self.page6.lineYoutube.text().strip()
-
-        if not os.path.exists("materials"):
-            os.makedirs("materials")
-
-        pdf_filename = f"{course_id}_{int(datetime.now().timestamp())}_{os.path.basename(self.selected_content_file)}"
-        dest_path = os.path.join("materials", pdf_filename)
-
-        with open(self.selected_content_file, "rb") as src, open(dest_path, "wb") as dst:
-            dst.write(src.read())
-
-        conn = sqlite3.connect(DB_FILENAME)
-        cur = conn.cursor()
-        cur.execute("""
-                    INSERT INTO CourseMaterial (assignment_id)
-                    VALUES (?, ?, ?, datetime('now'))
-                    """, (course_id, pdf_filename, youtube_url))
-        conn.commit()
-        conn.close()
-
-        self.load_content_history(course_id)
+        src_path = self.selected_content_file
+
+        self.tasks.submit(self.store_content, course_id, src_path, youtube_url,
+                          key=("add_content", course_id, src_path),
+                          on_result=self.on_content_added, on_error=self.on_task_error)
+
+    def store_content(self, course_id, src_path, youtube_url):
+        """Worker: upload the material, reload history"""
+        with open(src_path, "rb") as f:
+            self.service.add_material(self.token, course_id, src_path, f, youtube_url)
+        return course_id, self.query_content_history(course_id)
+
+    def on_content_added(self, result):
+        course_id, rows = result
+        if course_id == self.page6.comboSelectCourse.currentData():
+            self.fill_content_history(rows)
         QMessageBox.information(self, "Success", "Content added successfully!")
 
     def select_assignment_file(self):
@@ -147,164 +316,394 @@ class MainWindow(QStackedWidget):
 
         course_id = self.page6.comboSelectCourse.currentData()
         deadline = self.page6.dateEdit.date().toString("yyyy-MM-dd")
-
-        if not os.path.exists("assignments"):
-            os.makedirs("assignments")
-
-        pdf_filename = f"{course_id}_{int(datetime.now().timestamp())}_{os.path.basename(self.selected_assignment_file)}"
-        dest_path = os.path.join("assignments", pdf_filename)
-
-        with open(self.selected_assignment_file, "rb") as src, open(dest_path, "wb") as dst:
-            dst.write(src.read())
-
-        conn = sqlite3.connect(DB_FILENAME)
-        cur = conn.cursor()
-        cur.execute("""
-                    INSERT INTO Assignment (course_id, pdf_file, due_date, created_at)
-                    VALUES (?, ?, ?, datetime('now'))
-                    """, (course_id, pdf_filename, deadline))
-        conn.commit()
-        conn.close()
-
-        self.load_assignment_history(course_id)
+        src_path = self.selected_assignment_file
+
+        self.tasks.submit(self.store_assignment, course_id, src_path, deadline,
+                          key=("add_assignment", course_id, src_path),
+                          on_result=self.on_assignment_added, on_error=self.on_task_error)
+
+    def store_assignment(self, course_id, src_path, deadline):
+        """Worker: upload the assignment, reload history"""
+        with open(src_path, "rb") as f:
+            self.service.add_assignment(self.token, course_id, src_path, f, deadline)
+        return course_id, self.query_assignment_history(course_id)
+
+    def on_assignment_added(self, result):
+        course_id, rows = result
+        if course_id == self.page6.comboSelectCourse.currentData():
+            self.fill_assignment_history(rows)
         QMessageBox.information(self, "Success", "Assignment added successfully!")
 
     def add_enrollment(self):
         course_id = self.page6.comboSelectCourse.currentData()
-        email = self.page6.lineEmail.text().strip()
+        text = self.page6.lineEmail.text().strip()
 
-        if not email:
+        if not text:
             QMessageBox.warning(self, "Error", "Please enter student email!")
             return
 
-        conn = sqlite3.connect(DB_FILENAME)
-        cur = conn.cursor()
-
-        # Check if email exists and is a student
-        cur.execute("""
-                    SELECT s.student_id
-                    FROM Student s
-                             JOIN User u ON s.user_id = u.user_id
-                    WHERE u.email = ?
-                    """, (email,))
-
-        result = cur.fetchone()
-        if not result:
-            QMessageBox.warning(self, "Error", "Email not found or not a student!")
-            conn.close()
-            return
-
-        student_id = result[0]
+        # A pasted list of emails goes through the same bulk path
+        emails = read_email_list(text) or [text]
+        self.tasks.submit(self.enroll_emails, course_id, emails,
+                          key=("add_enrollment", course_id, tuple(emails)),
+                          on_result=self.on_enrollment_added, on_error=self.on_task_error)
 
-        # Check if already enrolled
-        cur.execute("SELECT * FROM Enrollment WHERE course_id=? AND student_id=?",
-                    (course_id, student_id))
-        if cur.fetchone():
-            QMessageBox.warning(self, "Error", "Student already enrolled!")
-            conn.close()
+    def import_enrollments(self):
+        course_id = self.page6.comboSelectCourse.currentData()
+        path, _ = QFileDialog.getOpenFileName(self, "Select Student List", "",
+                                              "CSV or Text Files (*.csv *.txt)")
+        if not path or not course_id:
+            return
+        self.tasks.submit(self.enroll_from_file, course_id, path,
+                          key=("import_enrollments", course_id, path),
+                          on_result=self.on_enrollment_added, on_error=self.on_task_error)
+
+    def enroll_from_file(self, course_id, path):
+        """Worker: read an email list file and enroll it"""
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            emails = read_email_list(f.read())
+        return self.enroll_emails(course_id, emails)
+
+    def enroll_emails(self, course_id, emails):
+        """Worker: returns (course_id, per-email report, enrollment rows)"""
+        report = self.service.enroll(self.token, course_id, emails)
+        return course_id, report, self.enrollment_model.query_page((course_id,))
+
+    def on_enrollment_added(self, result):
+        course_id, report, rows = result
+        if course_id == self.page6.comboSelectCourse.currentData():
+            self.enrollment_model.set_rows((course_id,), rows)
+        if len(report) == 1:
+            email, status = report[0]
+            if status == ENROLLED:
+                QMessageBox.information(self, "Success", "Student enrolled successfully!")
+            elif status == ALREADY_ENROLLED:
+                QMessageBox.warning(self, "Error", "Student already enrolled!")
+            else:
+                QMessageBox.warning(self, "Error", "Email not found or not a student!")
             return
 
-        # Enroll student
-        cur.execute("""
-                    INSERT INTO Enrollment (course_id, student_id, enrolled_at)
-                    VALUES (?, ?, datetime('now'))
-                    """, (course_id, student_id))
-
-        conn.commit()
-        conn.close()
+        enrolled = sum(1 for _, status in report if status == ENROLLED)
+        box = QMessageBox(QMessageBox.Information, "Enrollment Report",
+                          f"{enrolled} of {len(report)} students enrolled.", parent=self)
+        box.setDetailedText("\n".join(f"{email}: {status}" for email, status in report))
+        box.exec_()
 
-        self.load_enrollments(course_id)
-        QMessageBox.information(self, "Success", "Student enrolled successfully!")
+    def on_task_error(self, error):
+        if isinstance(error, ServiceError):
+            QMessageBox.warning(self, "Error", str(error))
+            return
+        print(f"Database error: {error}")
+        QMessageBox.warning(self, "Error", f"Operation failed: {error}")
+
+    def load_course_list(self):
+        """Fill the course selector with the current teacher's courses"""
+        self.tasks.submit(self.service.list_courses, self.token,
+                          channel="course_list", key=("course_list", self.token),
+                          on_result=self.fill_course_list, on_error=self.on_task_error)
+
+    def fill_course_list(self, courses):
+        combo = self.page6.comboSelectCourse
+        selected = combo.currentData()
+        combo.blockSignals(True)
+        combo.clear()
+        for course in courses:
+            combo.addItem(course["title"], course["course_id"])
+        index = combo.findData(selected)
+        combo.setCurrentIndex(index if index >= 0 else 0)
+        combo.blockSignals(False)
+        self.load_course_data()
+
+    def search_courses(self, text):
+        # Each keystroke replaces the previous search
+        self.tasks.submit(self.service.search, self.token, text, channel="search",
+                          on_result=self.fill_search_results, on_error=self.on_task_error)
+
+    def fill_search_results(self, hits):
+        results = self.page6.listSearchResults
+        results.clear()
+        labels = {"course": "Course", "material": "Content", "assignment": "Assignment"}
+        for hit in hits:
+            text = f"{labels[hit['kind']]}: {hit['title']}"
+            if hit["snippet"]:
+                text += f"\n    {hit['snippet']}"
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, hit["course_id"])
+            results.addItem(item)
+        results.setVisible(bool(hits))
+
+    def open_search_result(self, item):
+        combo = self.page6.comboSelectCourse
+        index = combo.findData(item.data(Qt.UserRole))
+        if index >= 0:
+            combo.setCurrentIndex(index)
+        self.page6.listSearchResults.hide()
 
     def load_course_data(self):
-        course_id = self.page6.comboSelectCourse.currentData()
+        combo = self.page6.comboSelectCourse
+        course_id = combo.currentData()
+        shown = self.submission_model.params
+        edited = len(self.submission_model.edits())
+        if edited and shown and shown[0] != course_id:
+            reply = QMessageBox.question(self, 'Unsaved Grades',
+                                         f'Discard {edited} unsaved grade changes?',
+                                         QMessageBox.Yes | QMessageBox.No,
+                                         QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                combo.blockSignals(True)
+                combo.setCurrentIndex(combo.findData(shown[0]))
+                combo.blockSignals(False)
+                return
         if course_id:
-            self.load_content_history(course_id)
-            self.load_assignment_history(course_id)
-            self.load_enrollments(course_id)
-            self.load_submissions(course_id)
-
-    def load_content_history(self, course_id):
+            # Switching courses quickly cancels the load for the previous one
+            self.tasks.submit(self.query_course_data, course_id,
+                              channel="course_data", key=("course_data", course_id),
+                              on_result=self.fill_course_data, on_error=self.on_task_error)
+
+    def query_course_data(self, course_id):
+        """Worker: all four course management lists in one service call"""
+        overview = self.service.course_overview(
+            self.token, course_id,
+            roster_sort=(self.enrollment_model.sort_column, self.enrollment_model.descending),
+            submissions_sort=(self.submission_model.sort_column, self.submission_model.descending))
+        return (course_id,
+                self.with_thumbnails(overview["materials"]),
+                self.with_thumbnails(overview["assignments"]),
+                overview["roster"],
+                overview["submissions"])
+
+    def fill_course_data(self, result):
+        course_id, contents, assignments, enrollments, submissions = result
+        self.fill_content_history(contents)
+        self.fill_assignment_history(assignments)
+        self.enrollment_model.set_rows((course_id,), enrollments)
+        self.submission_model.set_rows((course_id,), submissions)
+
+    def query_content_history(self, course_id):
+        return self.with_thumbnails(self.service.list_materials(self.token, course_id))
+
+    def with_thumbnails(self, items):
+        """Worker: add each file's cached thumbnail path, if one was built on this machine"""
+        for item in items:
+            item["thumbnail"] = self.artifacts.thumbnail(item["file_hash"]) if item["file_hash"] else None
+        return items
+
+    def add_history_item(self, widget, text, thumbnail, data=None):
+        item = QListWidgetItem(text)
+        item.setData(Qt.UserRole, data)
+        if thumbnail:
+            item.setIcon(QIcon(thumbnail))
+        widget.addItem(item)
+
+    def fill_content_history(self, materials):
         self.page6.listContent.clear()
-        conn = sqlite3.connect(DB_FILENAME)
-        cur = conn.cursor()
-        cur.execute("""
-                    SELECT pdf_file, youtube_url, created_at
-                    FROM CourseMaterial
-                    WHERE course_id = ?
-                    ORDER BY created_at DESC
-                    """, (course_id,))
-        for row in cur.fetchall():
-            self.page6.listContent.addItem(f"PDF: {row[0]} | YouTube: {row[1]} | Added: {row[2]}")
-        conn.close()
-
-    def load_assignment_history(self, course_id):
-        self.page6.listAssignment.clear()
-        conn = sqlite3.connect(DB_FILENAME)
-        cur = conn.cursor()
-        cur.execute("""
-                    SELECT pdf_file, due_date, created_at
-                    FROM Assignment
-                    WHERE course_id = ?
-                    ORDER BY created_at DESC
-                    """, (course_id,))
-        for row in cur.fetchall():
-            self.page6.listAssignment.addItem(f"File: {row[0]} | Due: {row[1]} | Added: {row[2]}")
-        conn.close()
-
-    def load_submissions(self, course_id):
-        table = self.page6.tableSubmission
-        table.setRowCount(0)
-        conn = sqlite3.connect(DB_FILENAME)
-        cur = conn.cursor()
-        cur.execute("""
-                    SELECT u.username, a.pdf_file, s.submission_time, s.grade
-                    FROM AssignmentSubmission s
-                             JOIN Assignment a ON s.assignment_id = a.assignment_id
-                             JOIN Student st ON s.student_id = st.student_id
-                             JOIN User u ON st.user_id = u.user_id
-                    WHERE a.course_id = ?
-                    ORDER BY s.submission_time DESC
-                    """, (course_id,))
-        for row in cur.fetchall():
-            pos = table.rowCount()
-            table.insertRow(pos)
-            for i, val in enumerate(row):
-                item = QTableWidgetItem(str(val) if val is not None else "")
-                if i == 4:  # Grade column
-                    item.setFlags(item.flags() | Qt.ItemIsEditable)
-                table.setItem(pos, i, item)
-        conn.close()
-
-    def load_enrollments(self, course_id):
-        table = self.page6.tableEnrollment
-        table.setRowCount(0)
-        conn = sqlite3.connect(DB_FILENAME)
-        cur = conn.cursor()
-        cur.execute("""
-                    SELECT u.username, u.email
-                    FROM Enrollment e
-                             JOIN Student s ON e.student_id = s.student_id
-                             JOIN User u ON s.user_id = u.user_id
-                    WHERE e.course_id = ?
-                    """, (course_id,))
-        for row in cur.fetchall():
-            pos = table.rowCount()
-            table.insertRow(pos)
-            for i, val in enumerate(row):
-                table.setItem(pos, i, QTableWidgetItem(str(val)))
-        conn.close()
+        for m in materials:
+            self.add_history_item(self.page6.listContent,
+                                  f"PDF: {m['pdf_file']} | YouTube: {m['youtube_url'] or ''} | Added: {m['created_at']}",
+                                  m["thumbnail"])
 
+    def query_assignment_history(self, course_id):
+        return self.with_thumbnails(self.service.list_assignments(self.token, course_id))
+
+    def fill_assignment_history(self, assignments):
+        self.page6.listAssignment.clear()
+        for a in assignments:
+            self.add_history_item(self.page6.listAssignment,
+                                  f"File: {a['pdf_file']} | Due: {a['due_date']} | Added: {a['created_at']}",
+                                  a["thumbnail"], (a["assignment_id"], a["pdf_file"]))
+
+    def on_grades_dirty(self, count):
+        self.page6.btnSaveGrades.setText(f"Save Grades ({count})" if count else "Save Grades")
+        self.page6.btnSaveGrades.setEnabled(bool(count) and not self.saving_grades)
+        self.page6.btnDiscardGrades.setEnabled(bool(count))
+
+    def save_grades(self):
+        """Save every edited grade in one transaction"""
+        edits = self.submission_model.edits()
+        if not edits or self.saving_grades:
+            return
+        course_id = self.submission_model.params[0]
+        changes = [{"submission_id": row_id, "grade": value, "expected": original}
+                   for row_id, _, value, original in edits]
+        # Cells edited while the batch runs are not in it and must stay dirty
+        sent = {(row_id, column): value for row_id, column, value, _ in edits}
+        self.saving_grades = True
+        self.page6.btnSaveGrades.setEnabled(False)
+        self.tasks.submit(self.service.grade_batch, self.token, course_id, changes,
+                          key=("save_grades", course_id),
+                          on_result=lambda result: self.on_grades_saved(result, sent),
+                          on_error=self.on_grades_save_error)
+
+    def on_grades_saved(self, result, sent):
+        self.saving_grades = False
+        model = self.submission_model
+        if result["conflicts"]:
+            # Nothing was written; the next save overwrites the newer grades
+            model.rebase(GRADE_COLUMN, {c["submission_id"]: c["grade"] for c in result["conflicts"]})
+            self.on_grades_dirty(len(model.edits()))
+            QMessageBox.warning(self, "Grades Not Saved",
+                                f"{len(result['conflicts'])} of the grades you edited were changed by "
+                                f"someone else meanwhile, so nothing was saved. Save again to overwrite them.")
+        else:
+            model.saved_edits(sent)
+            QMessageBox.information(self, "Success", f"Grades saved ({result['saved']})!")
+        model.refresh()
+
+    def on_grades_save_error(self, error):
+        self.saving_grades = False
+        self.on_grades_dirty(len(self.submission_model.edits()))
+        self.on_task_error(error)
+
+    def selected_assignment(self):
+        item = self.page6.listAssignment.currentItem()
+        if item is None or item.data(Qt.UserRole) is None:
+            QMessageBox.warning(self, "Error", "Please select an assignment first!")
+            return None
+        return item.data(Qt.UserRole)
+
+    def export_grades(self):
+        selected = self.selected_assignment()
+        if selected is None:
+            return
+        assignment_id, pdf_file = selected
+        default = f"{os.path.splitext(pdf_file)[0]}_grades.csv"
+        path, _ = QFileDialog.getSaveFileName(self, "Export Grades", default, "CSV Files (*.csv)")
+        if path:
+            self.tasks.submit(self.store_grade_sheet, assignment_id, path,
+                              key=("export_grades", assignment_id, path),
+                              on_result=self.on_grades_exported, on_error=self.on_task_error)
+
+    def store_grade_sheet(self, assignment_id, path):
+        """Worker: write the assignment's grade sheet to ``path``"""
+        sheet = self.service.export_grades(self.token, assignment_id)
+        # With a BOM so spreadsheet programs read it as UTF-8
+        with open(path, "w", newline="", encoding="utf-8-sig") as f:
+            f.write(sheet)
+        return path
+
+    def on_grades_exported(self, path):
+        QMessageBox.information(self, "Success", f"Grades exported to {path}")
+
+    def import_grades(self):
+        selected = self.selected_assignment()
+        if selected is None:
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Select Grade Sheet", "", "CSV Files (*.csv)")
+        if path:
+            self.tasks.submit(self.apply_grade_sheet, selected[0], path,
+                              key=("import_grades", selected[0], path),
+                              on_result=self.on_grades_imported, on_error=self.on_task_error)
+
+    def apply_grade_sheet(self, assignment_id, path):
+        """Worker: import a grade sheet file"""
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return self.service.import_grades(self.token, assignment_id, f.read())
+
+    def on_grades_imported(self, result):
+        self.submission_model.refresh()
+        report = result["report"]
+        box = QMessageBox(QMessageBox.Information, "Grade Import Report",
+                          f"{result['saved']} of {len(report)} grades updated.", parent=self)
+        box.setDetailedText("\n".join(f"{student}: {status}" for student, status in report))
+        box.exec_()
+
+    def check_similarity(self):
+        selected = self.selected_assignment()
+        if selected is None:
+            return
+        self.tasks.submit(self.service.similar_submissions, self.token, selected[0],
+                          key=("similarity", selected[0]),
+                          on_result=self.on_similarity_checked, on_error=self.on_task_error)
+
+    def on_similarity_checked(self, report):
+        pairs = report["pairs"]
+        text = (f"{len(pairs)} similar pair(s) among {report['compared']} of "
+                f"{report['submissions']} submissions.")
+        if report["unreadable"]:
+            text += f"\n{report['unreadable']} file(s) could not be read."
+        box = QMessageBox(QMessageBox.Information, "Similar Submissions", text, parent=self)
+        if pairs:
+            box.setDetailedText("\n".join(
+                f"{pair['similarity']:.0%}  {pair['a']['username']} ~ {pair['b']['username']}"
+                + ("  (same file)" if pair["identical"] else "") for pair in pairs))
+        box.exec_()
+
+    def export_report(self, report):
+        """Save the roster or gradebook of the selected course, or of all courses"""
+        course_id = None
+        if not self.page6.chkAllCourses.isChecked():
+            course_id = self.page6.comboSelectCourse.currentData()
+            if course_id is None:
+                QMessageBox.warning(self, "Error", "Please select a course first!")
+                return
+        scope = "all_courses" if course_id is None else f"course{course_id}"
+        path, chosen = QFileDialog.getSaveFileName(self, f"Export {report.capitalize()}",
+                                                   f"{scope}_{report}", ";;".join(EXPORT_FILTERS))
+        if not path:
+            return
+        fmt = EXPORT_FILTERS.get(chosen, "csv")
+        if not path.lower().endswith("." + fmt):
+            path += "." + fmt
+        self.tasks.submit(self.store_report, report, fmt, course_id, path,
+                          key=("export", report, course_id, path),
+                          on_result=self.on_report_exported, on_error=self.on_task_error)
+
+    def store_report(self, report, fmt, course_id, path):
+        """Worker: stream a report to ``path``; a single course's gradebook is one row per student"""
+        if report == "roster":
+            export = self.service.export_roster(self.token, fmt, course_id)
+        else:
+            layout = "long" if course_id is None else "wide"
+            export = self.service.export_gradebook(self.token, fmt, course_id, layout)
+        export.save(path)
+        return path
+
+    def on_report_exported(self, path):
+        QMessageBox.information(self, "Success", f"Exported to {path}")
+
+    def setup_grade_analytics(self):
+        """Setup teacher grade analytics page"""
+        self.page10.previousBtn.clicked.connect(self.show_teacher_dashboard)
+        self.page10.comboSelectCourse.currentIndexChanged.connect(self.load_grade_analytics)
+        for table, columns in ((self.page10.distributionTable, DISTRIBUTION_COLUMNS),
+                               (self.page10.assignmentTable, ASSIGNMENT_STAT_COLUMNS),
+                               (self.page10.studentTable, STUDENT_STAT_COLUMNS)):
+            table.setColumnCount(len(columns))
+            table.setHorizontalHeaderLabels(columns)
+            table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+            table.horizontalHeader().setStretchLastSection(True)
+            table.verticalHeader().hide()
+            table.verticalHeader().setDefaultSectionSize(26)
+            table.setEditTriggers(table.NoEditTriggers)
+        # Only the weight cells are editable, see fill_grade_analytics
+        self.page10.assignmentTable.setEditTriggers(self.page10.assignmentTable.DoubleClicked)
+        self.page10.assignmentTable.itemChanged.connect(self.on_weight_edited)
 
     def setup_student_dashboard(self):
         """Setup student dashboard page"""
-        pixmap = QPixmap("assets/profilTeacher.png")
-        self.page7.profilTeacher.setPixmap(pixmap)
+        self.page7.profilTeacher.setPixmap(pixmap("assets/profilTeacher.png"))
 
         self.page7.dashboardBtn.clicked.connect(self.show_student_dashboard)
-        self.page7.myCourseBtn.clicked.connect(lambda: self.setCurrentIndex(6))
+        self.page7.myCourseBtn.clicked.connect(self.show_student_courses)
         self.page7.logoutBtn.clicked.connect(self.logout_action)
 
+    def setup_student_courses(self):
+        """Setup the student's course grid page"""
+        self.page8.btnPrevious.clicked.connect(self.show_student_dashboard)
+
+    def setup_student_course(self):
+        """Setup the student course detail page"""
+        self.page9.btnPrevious.clicked.connect(self.show_student_courses)
+        self.page9.btnSubmitAssignment.clicked.connect(self.submit_assignment)
+        self.page9.listContent.itemDoubleClicked.connect(self.open_material)
+        table = self.page9.tableWidget
+        table.setColumnCount(3)
+        table.setHorizontalHeaderLabels(["Upcoming", "Due", "Status"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        table.verticalHeader().hide()
+        table.setEditTriggers(table.NoEditTriggers)
+
     def goto_register(self):
         """Navigate to register page"""
         self.setCurrentIndex(1)
@@ -321,13 +720,179 @@ class MainWindow(QStackedWidget):
         """Show teacher dashboard"""
         self.setCurrentIndex(3)
         if self.current_user:
-            self.load_teacher_stats(self.current_user)
+            self.load_teacher_stats()
 
     def show_student_dashboard(self):
         """Show student dashboard"""
         self.setCurrentIndex(6)
         if self.current_user:
-            self.load_student_stats(self.current_user)
+            self.load_student_stats()
+
+    def show_student_courses(self):
+        """Show the enrolled courses, refreshed while a course page is open"""
+        self.setCurrentIndex(7)
+        if self.current_user:
+            self.poll_course_feed()
+            self.feed_timer.start(FEED_POLL_MS)
+
+    def show_student_course(self, course_id):
+        """Show one enrolled course with all its materials and assignments"""
+        self.open_course_id = course_id
+        self.setCurrentIndex(8)
+        self.fill_student_course_header()
+        self.load_student_course()
+
+    def poll_course_feed(self):
+        if self.currentIndex() not in (7, 8) or self.current_role != "student":
+            self.feed_timer.stop()
+            return
+        since = self.feed_version
+        # Upcoming assignments also change when one falls due, which no commit signals
+        if self.feed_expires is not None and time.time() >= self.feed_expires:
+            since = None
+        self.tasks.submit(self.service.course_feed, self.token, since,
+                          channel="feed", key=("feed", self.token, since),
+                          on_result=self.fill_course_feed, on_error=self.on_feed_error)
+
+    def fill_course_feed(self, result):
+        self.feed_version = result["version"]
+        if not result["changed"]:
+            return
+        self.feed = result["courses"]
+        due_times = [a["due_at"] for course in self.feed for a in course["assignments"]]
+        self.feed_expires = min(due_times) if due_times else None
+        self.load_reminders()  # assignments were added, handed in or fell due
+
+        grid = self.page8.courseGrid
+        while grid.count():
+            grid.takeAt(0).widget().deleteLater()
+        for i, course in enumerate(self.feed):
+            grid.addWidget(self.course_card(course), i // COURSE_GRID_COLUMNS, i % COURSE_GRID_COLUMNS)
+        if not self.feed:
+            grid.addWidget(QLabel("You are not enrolled in any course yet."), 0, 0)
+        grid.setRowStretch(grid.rowCount(), 1)
+
+        if self.currentIndex() == 8:
+            self.fill_student_course_header()
+            self.load_student_course()
+
+    def on_feed_error(self, error):
+        self.feed_timer.stop()
+        self.on_task_error(error)
+
+    def course_card(self, course):
+        card = QFrame()
+        card.setObjectName("courseCard")
+        card.setStyleSheet(COURSE_CARD_STYLE)
+        layout = QVBoxLayout(card)
+        title = QLabel(course["title"])
+        title.setObjectName("cardTitle")
+        title.setWordWrap(True)
+        layout.addWidget(title)
+        layout.addWidget(QLabel(f"Teacher: {course['teacher'] or '-'}"))
+
+        materials = [m["pdf_file"] for m in course["materials"]] or ["No materials yet"]
+        upcoming = [f"{a['pdf_file']} - due {a['due_date'][:16]}{' (submitted)' if a['submitted'] else ''}"
+                    for a in course["assignments"]] or ["Nothing due"]
+        items = QLabel("<br>".join(["<b>Latest materials</b>"] + [html.escape(line) for line in materials]
+                                   + ["<b>Upcoming assignments</b>"] + [html.escape(line) for line in upcoming]))
+        items.setWordWrap(True)
+        layout.addWidget(items)
+        layout.addStretch()
+
+        open_button = QPushButton("Open Course")
+        open_button.clicked.connect(lambda: self.show_student_course(course["course_id"]))
+        layout.addWidget(open_button)
+        return card
+
+    def fill_student_course_header(self):
+        course = next((c for c in self.feed if c["course_id"] == self.open_course_id), None)
+        if course is None:
+            # Unenrolled or deleted since the page was opened
+            self.show_student_courses()
+            return
+        self.page9.labelCourseName.setText(course["title"])
+        self.page9.labelCourseName.adjustSize()
+        self.page9.labelDescription.setText(course["description"] or "")
+        self.page9.labelDescription.adjustSize()
+        table = self.page9.tableWidget
+        table.setRowCount(len(course["assignments"]))
+        for row, a in enumerate(course["assignments"]):
+            status = "Submitted" if a["submitted"] else "Not submitted"
+            for column, text in enumerate((a["pdf_file"], a["due_date"][:16], status)):
+                table.setItem(row, column, QTableWidgetItem(text))
+
+    def load_student_course(self):
+        course_id = self.open_course_id
+        self.tasks.submit(self.query_student_course, course_id,
+                          channel="student_course", key=("student_course", course_id, self.feed_version),
+                          on_result=self.fill_student_course, on_error=self.on_task_error)
+
+    def query_student_course(self, course_id):
+        """Worker: every material and assignment of an enrolled course"""
+        return (course_id,
+                self.with_thumbnails(self.service.list_materials(self.token, course_id)),
+                self.with_thumbnails(self.service.list_assignments(self.token, course_id)))
+
+    def fill_student_course(self, result):
+        course_id, materials, assignments = result
+        if course_id != self.open_course_id:
+            return
+        self.page9.listContent.clear()
+        for m in materials:
+            text = f"PDF: {m['pdf_file']} | Added: {m['created_at']}"
+            if m["youtube_url"]:
+                text += f" | YouTube: {m['youtube_url']}"
+            self.add_history_item(self.page9.listContent, text, m["thumbnail"], m["material_id"])
+        self.page9.listContent_2.clear()
+        for a in assignments:
+            self.add_history_item(self.page9.listContent_2, f"File: {a['pdf_file']} | Due: {a['due_date']}",
+                                  a["thumbnail"], (a["assignment_id"], a["pdf_file"]))
+
+    def open_material(self, item):
+        self.tasks.submit(self.fetch_material, item.data(Qt.UserRole),
+                          key=("material", item.data(Qt.UserRole)),
+                          on_result=self.on_material_fetched, on_error=self.on_task_error)
+
+    def fetch_material(self, material_id):
+        """Worker: download a material's PDF into MATERIALS_CACHE; returns its path"""
+        material = self.service.open_material(self.token, material_id)
+        os.makedirs(MATERIALS_CACHE, exist_ok=True)
+        path = os.path.join(MATERIALS_CACHE, f"{material_id}_{os.path.basename(material.filename)}")
+        material.save(path)
+        return path
+
+    def on_material_fetched(self, path):
+        if not QDesktopServices.openUrl(QUrl.fromLocalFile(path)):
+            QMessageBox.information(self, "Material", f"Saved to {path}")
+
+    def submit_assignment(self):
+        item = self.page9.listContent_2.currentItem()
+        if item is None:
+            QMessageBox.warning(self, "Error", "Please select an assignment first!")
+            return
+        assignment_id, pdf_file = item.data(Qt.UserRole)
+        path, _ = QFileDialog.getOpenFileName(self, f"Submit {pdf_file}", "", "PDF Files (*.pdf)")
+        if path:
+            self.page9.btnSubmitAssignment.setEnabled(False)
+            self.tasks.submit(self.store_submission, assignment_id, path,
+                              key=("submit", assignment_id, path),
+                              on_result=self.on_submitted, on_error=self.on_submit_error)
+
+    def store_submission(self, assignment_id, path):
+        """Worker: hand in the file at ``path``, streamed rather than read whole"""
+        with open(path, "rb") as f:
+            return self.service.submit(self.token, assignment_id, os.path.basename(path), f)
+
+    def on_submitted(self, submission):
+        self.page9.btnSubmitAssignment.setEnabled(True)
+        QMessageBox.information(self, "Success",
+                                f"{submission['pdf_file']} submitted at {submission['submission_time']}.")
+        self.poll_course_feed()
+
+    def on_submit_error(self, error):
+        self.page9.btnSubmitAssignment.setEnabled(True)
+        self.on_task_error(error)
 
     def show_create_course(self):
         """Show create course page"""
@@ -338,6 +903,8 @@ class MainWindow(QStackedWidget):
     def show_course_management(self):
         """Show course management page"""
         self.setCurrentIndex(5)
+        if self.current_user:
+            self.load_course_list()
 
     def logout_action(self):
         """Handle logout"""
@@ -346,98 +913,148 @@ class MainWindow(QStackedWidget):
                                      QMessageBox.Yes | QMessageBox.No,
                                      QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.current_user = None
-            self.current_role = None
+            self.tasks.submit(self.service.logout, self.token, on_error=None)
+            self.set_session(None)
             self.setCurrentIndex(0)
 
-    def load_student_stats(self, username):
+    def load_student_stats(self):
         """Load statistics for student dashboard"""
-        try:
-            conn = sqlite3.connect(DB_FILENAME)
-            cur = conn.cursor()
-
-            # Get student_id
-            cur.execute("""
-                        SELECT s.student_id
-                        FROM Student s
-                                 JOIN User u ON s.user_id = u.user_id
-                        WHERE u.username = ?
-                        """, (username,))
-            student_id = cur.fetchone()[0]
-
-            # Get total enrolled courses
-            cur.execute("""
-                        SELECT COUNT(*)
-                        FROM Enrollment
-                        WHERE student_id = ?
-                        """, (student_id,))
-            total_courses = cur.fetchone()[0]
-
-            # Get pending assignments
-            cur.execute("""
-                        SELECT COUNT(*)
-                        FROM Assignment a
-                                 JOIN Course c ON a.course_id = c.course_id
-                                 JOIN Enrollment e ON c.course_id = e.course_id
-                        WHERE e.student_id = ?
-                          AND a.due_date > datetime('now')
-                        """, (student_id,))
-            pending_assignments = cur.fetchone()[0]
-
-            conn.close()
-
-            # Update dashboard stats
-            self.page7.totalCoursesValue.setText(str(total_courses))
-            self.page7.pendingAssignmentValue.setText(str(pending_assignments))
-            self.page7.studentName.setText(self.current_user)
-
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            self.page7.totalCoursesValue.setText("0")
-            self.page7.pendingAssignmentValue.setText("0")
-
-    def load_teacher_stats(self, username):
+        self.page7.studentName.setText(self.current_user)
+        self.load_reminders()
+        self.tasks.submit(self.service.dashboard, self.token,
+                          channel="dashboard", key=("dashboard", self.token),
+                          on_result=self.fill_student_stats, on_error=self.on_student_stats_error)
+
+    def fill_student_stats(self, stats):
+        self.page7.totalCoursesValue.setText(str(stats["total_courses"]))
+        self.page7.pendingAssignmentValue.setText(str(stats["pending_assignments"]))
+
+    def on_student_stats_error(self, error):
+        print(f"Database error: {error}")
+        self.page7.totalCoursesValue.setText("0")
+        self.page7.pendingAssignmentValue.setText("0")
+
+    def load_teacher_stats(self):
         """Load statistics for teacher dashboard"""
-        try:
-            conn = sqlite3.connect(DB_FILENAME)
-            cur = conn.cursor()
-
-            # Get teacher_id
-            cur.execute("""
-                        SELECT t.teacher_id
-                        FROM Teacher t
-                                 JOIN User u ON t.user_id = u.user_id
-                        WHERE u.username = ?
-                        """, (username,))
-            teacher_id = cur.fetchone()[0]
-
-            # Get total courses
-            cur.execute("""
-                        SELECT COUNT(*)
-                        FROM Course
-                        WHERE teacher_id = ?
-                        """, (teacher_id,))
-            total_courses = cur.fetchone()[0]
-
-            # Get total students
-            cur.execute("""
-                        SELECT COUNT(DISTINCT student_id)
-                        FROM Enrollment
-                        WHERE course_id IN (SELECT course_id FROM Course WHERE teacher_id = ?)
-                        """, (teacher_id,))
-            total_students = cur.fetchone()[0]
-
-            conn.close()
-
-            # Update dashboard stats
-            self.page4.coursesValue.setText(str(total_courses))
-            self.page4.studentsValue.setText(str(total_students))
-            self.page4.teacherName.setText(self.current_user)
-
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            self.page4.coursesValue.setText("0")
-            self.page4.studentsValue.setText("0")
+        self.page4.teacherName.setText(self.current_user)
+        self.tasks.submit(self.service.dashboard, self.token,
+                          channel="dashboard", key=("dashboard", self.token),
+                          on_result=self.fill_teacher_stats, on_error=self.on_teacher_stats_error)
+        self.tasks.submit(self.service.activity_overview, self.token, ACTIVITY_DAYS,
+                          channel="activity", key=("activity", self.token),
+                          on_result=self.fill_teacher_activity, on_error=self.on_teacher_activity_error)
+
+    def fill_teacher_stats(self, stats):
+        self.page4.coursesValue.setText(str(stats["total_courses"]))
+        self.page4.studentsValue.setText(str(stats["total_students"]))
+
+    def fill_teacher_activity(self, courses):
+        table = self.page4.activityTable
+        table.setRowCount(len(courses))
+        for row, course in enumerate(courses):
+            values = [course["title"], course["active_students"]]
+            values += [course["events"].get(kind, 0) for _, kind in ACTIVITY_COLUMNS]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row, column, item)
+
+    def on_teacher_activity_error(self, error):
+        print(f"Database error: {error}")
+        self.page4.activityTable.setRowCount(0)
+
+    def on_teacher_stats_error(self, error):
+        print(f"Database error: {error}")
+        self.page4.coursesValue.setText("0")
+        self.page4.studentsValue.setText("0")
+
+    def show_grade_analytics(self):
+        """Show grade analytics page"""
+        self.setCurrentIndex(9)
+        self.tasks.submit(self.service.grade_overview, self.token,
+                          channel="grade_overview", key=("grade_overview", self.token),
+                          on_result=self.fill_grade_overview, on_error=self.on_task_error)
+
+    def fill_grade_overview(self, courses):
+        combo = self.page10.comboSelectCourse
+        selected = combo.currentData()
+        combo.blockSignals(True)
+        combo.clear()
+        for course in courses:
+            at_risk = f" ({course['at_risk']} at risk)" if course["at_risk"] else ""
+            combo.addItem(course["title"] + at_risk, course["course_id"])
+        index = combo.findData(selected)
+        combo.setCurrentIndex(index if index >= 0 else 0)
+        combo.blockSignals(False)
+        self.load_grade_analytics()
+
+    def load_grade_analytics(self):
+        course_id = self.page10.comboSelectCourse.currentData()
+        if course_id:
+            self.tasks.submit(self.service.grade_analytics, self.token, course_id,
+                              channel="grade_analytics", key=("grade_analytics", course_id),
+                              on_result=self.fill_grade_analytics, on_error=self.on_task_error)
+
+    def fill_grade_analytics(self, report):
+        def stat(value):
+            return "–" if value is None else f"{value:g}"
+
+        def fill_row(table, row, values, numeric):
+            for column, value in enumerate(values):
+                item = value if isinstance(value, QTableWidgetItem) else QTableWidgetItem(value)
+                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                if column in numeric:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row, column, item)
+
+        percentiles = "  ".join(f"{name.upper()} {stat(value)}" for name, value in report["percentiles"].items())
+        self.page10.summaryLabel.setText(
+            f"{report['students']} students, {report['assignments']} assignments, {report['graded']} grades. "
+            f"Mean final grade {stat(report['mean'])}; {report['at_risk']} students at risk.\n"
+            f"Final grade percentiles: {percentiles}")
+
+        table = self.page10.distributionTable
+        table.setRowCount(len(report["distribution"]))
+        largest = max((bin_["students"] for bin_ in report["distribution"]), default=0) or 1
+        for row, bin_ in enumerate(report["distribution"]):
+            bar = "█" * round(DISTRIBUTION_BAR * bin_["students"] / largest)
+            fill_row(table, row, [f"{bin_['from']}–{bin_['to']}", str(bin_["students"]), bar], (1,))
+
+        table = self.page10.assignmentTable
+        table.blockSignals(True)
+        table.setRowCount(len(report["by_assignment"]))
+        for row, a in enumerate(report["by_assignment"]):
+            fill_row(table, row, [a["pdf_file"] or "", a["due_date"] or "", stat(a["weight"]),
+                                  str(a["submitted"]), str(a["graded"]), str(a["missing"]),
+                                  stat(a["mean"]), stat(a["std"]), stat(a["median"]),
+                                  stat(a["min"]), stat(a["max"])], range(2, 11))
+            weight = table.item(row, WEIGHT_COLUMN)
+            weight.setFlags(weight.flags() | Qt.ItemIsEditable)
+            weight.setData(Qt.UserRole, (a["assignment_id"], a["weight"]))
+        table.blockSignals(False)
+
+        table = self.page10.studentTable
+        table.setRowCount(len(report["by_student"]))
+        for row, s in enumerate(report["by_student"]):
+            at_risk = QTableWidgetItem("Yes" if s["at_risk"] else "")
+            if s["at_risk"]:
+                at_risk.setForeground(Qt.red)
+            fill_row(table, row, [s["username"] or "", s["email"] or "", stat(s["final"]),
+                                  str(s["graded"]), f"{s['missing']} of {s['due']}", at_risk], range(2, 5))
+
+    def on_weight_edited(self, item):
+        if item.column() != WEIGHT_COLUMN:
+            return
+        assignment_id, weight = item.data(Qt.UserRole)
+        if item.text() == f"{weight:g}":
+            return
+        self.tasks.submit(self.service.set_assignment_weight, self.token, assignment_id, item.text(),
+                          on_result=lambda _: self.show_grade_analytics(), on_error=self.on_weight_error)
+
+    def on_weight_error(self, error):
+        self.on_task_error(error)
+        self.load_grade_analytics()  # puts the old weight back
 
     def register_action(self):
         """Handle user registration"""
@@ -454,29 +1071,23 @@ class MainWindow(QStackedWidget):
             QMessageBox.warning(self, "Register Failed", "Passwords do not match!")
             return
 
-        try:
-            conn = sqlite3.connect(DB_FILENAME)
-            cur = conn.cursor()
-            cur.execute(
-                "INSERT INTO User (username, email, password) VALUES (?, ?, ?)",
-                (username, email, password)
-            )
-            user_id = cur.lastrowid
-            if role == "student":
-                cur.execute("INSERT INTO Student (user_id) VALUES (?)", (user_id,))
-            elif role == "teacher":
-                cur.execute("INSERT INTO Teacher (user_id) VALUES (?)", (user_id,))
-            conn.commit()
-            conn.close()
-            QMessageBox.information(self, "Register Success", "Registration successful, please login!")
-            self.goto_login()
-        except sqlite3.IntegrityError as e:
-            if "username" in str(e):
-                QMessageBox.warning(self, "Register Failed", "Username already exists!")
-            elif "email" in str(e):
-                QMessageBox.warning(self, "Register Failed", "Email already exists!")
-            else:
-                QMessageBox.warning(self, "Register Failed", "Registration failed, please try again.")
+        # Hashing is deliberately slow, so it runs on a worker
+        self.page2.btnSignIn.setEnabled(False)
+        self.tasks.submit(self.service.register, username, email, password, role,
+                          key=("register", username),
+                          on_result=self.on_registered, on_error=self.on_register_error)
+
+    def on_registered(self, _):
+        self.page2.btnSignIn.setEnabled(True)
+        QMessageBox.information(self, "Register Success", "Registration successful, please login!")
+        self.goto_login()
+
+    def on_register_error(self, error):
+        self.page2.btnSignIn.setEnabled(True)
+        if isinstance(error, ServiceError):
+            QMessageBox.warning(self, "Register Failed", str(error))
+        else:
+            self.on_task_error(error)
 
     def login_action(self):
         """Handle user login"""
@@ -487,42 +1098,83 @@ class MainWindow(QStackedWidget):
             QMessageBox.warning(self, "Login Failed", "Username and password are required!")
             return
 
-        conn = sqlite3.connect(DB_FILENAME)
-        cur = conn.cursor()
-
-        cur.execute("""
-                    SELECT u.user_id,
-                           u.username,
-                           CASE
-                               WHEN t.teacher_id IS NOT NULL THEN 'teacher'
-                               WHEN s.student_id IS NOT NULL THEN 'student'
-                               END as role
-                    FROM User u
-                             LEFT JOIN Teacher t ON u.user_id = t.user_id
-                             LEFT JOIN Student s ON u.user_id = s.user_id
-                    WHERE u.username = ?
-                      AND u.password = ?
-                    """, (username, password))
-
-        user = cur.fetchone()
-        conn.close()
-
-        if user:
-            user_id, username, role = user
-            self.current_user = username
-            self.current_role = role
-            QMessageBox.information(self, "Login Success", f"Welcome, {username}!")
-
-            if role == 'teacher':
-                self.page4.teacherName.setText(username)
-                self.load_teacher_stats(username)
-                self.show_teacher_dashboard()
-            else:
-                self.page7.studentName.setText(username)
-                self.load_student_stats(username)
-                self.show_student_dashboard()
-        else:
+        self.page3.btnLogin.setEnabled(False)
+        self.tasks.submit(self.service.login, username, password,
+                          key=("login", username),
+                          on_result=self.on_login_result, on_error=self.on_login_error)
+
+    def on_login_error(self, error):
+        self.page3.btnLogin.setEnabled(True)
+        if isinstance(error, Unauthorized):
             QMessageBox.warning(self, "Login Failed", "Invalid username or password!")
+        else:
+            self.on_task_error(error)
+
+    def on_login_result(self, session):
+        self.page3.btnLogin.setEnabled(True)
+        self.set_session(session)
+        username, role = self.current_user, self.current_role
+        QMessageBox.information(self, "Login Success", f"Welcome, {username}!")
+
+        if role == 'teacher':
+            self.page4.teacherName.setText(username)
+            self.show_teacher_dashboard()
+        else:
+            self.page7.studentName.setText(username)
+            self.show_student_dashboard()
+
+    def set_session(self, session):
+        """Keep the session token and identity, or clear them when ``session`` is None"""
+        session = session or {}
+        self.token = session.get("token")
+        self.current_user_id = session.get("user_id")
+        self.current_user = session.get("username")
+        self.current_role = session.get("role")
+        self.current_teacher_id = session.get("teacher_id")
+        self.current_student_id = session.get("student_id")
+        self.feed = []
+        self.feed_version = None
+        self.feed_expires = None
+        self.open_course_id = None
+        self.reminders.clear()
+
+    def load_reminders(self):
+        """Schedule reminders for the student's unsubmitted work due within REMINDER_DAYS"""
+        self.tasks.submit(self.service.upcoming_deadlines, self.token, REMINDER_DAYS,
+                          channel="reminders", key=("reminders", self.token),
+                          on_result=self.schedule_reminders, on_error=self.on_reminders_error)
+
+    def schedule_reminders(self, deadlines):
+        if self.current_role != "student":
+            return
+        self.reminders.clear()
+        now = time.time()
+        for assignment in deadlines:
+            if assignment["submitted"]:
+                continue
+            for lead in REMINDER_LEADS:
+                if assignment["due_at"] - lead > now:
+                    self.reminders.schedule(assignment["due_at"] - lead,
+                                            (assignment["assignment_id"], lead), assignment)
+        # Work due after the window is picked up before its first reminder
+        self.reminders.schedule(now + REMINDER_DAYS * 24 * 3600 - max(REMINDER_LEADS), RELOAD_REMINDERS)
+
+    def on_reminders_error(self, error):
+        print(f"Could not load deadline reminders: {error}")
+
+    def on_reminder_due(self, key, assignment):
+        if self.current_role != "student":
+            return
+        if key == RELOAD_REMINDERS:
+            self.load_reminders()
+            return
+        hours = max(1, round((assignment["due_at"] - time.time()) / 3600))
+        box = QMessageBox(QMessageBox.Information, "Deadline Reminder",
+                          f"{assignment['pdf_file']} for {assignment['course']} is due in "
+                          f"{hours} hour{'s' if hours != 1 else ''} ({assignment['due_date'][:16]}).",
+                          parent=self)
+        box.setAttribute(Qt.WA_DeleteOnClose)
+        box.show()  # not modal, it may come up in the middle of typing
 
     def add_course_action(self):
         """Handle course creation"""
@@ -533,42 +1185,35 @@ class MainWindow(QStackedWidget):
             QMessageBox.warning(self, "Create Course Failed", "Title and description are required!")
             return
 
-        try:
-            conn = sqlite3.connect(DB_FILENAME)
-            cur = conn.cursor()
-
-            # Get current teacher_id
-            cur.execute("""
-                        SELECT t.teacher_id
-                        FROM Teacher t
-                                 JOIN User u ON t.user_id = u.user_id
-                        WHERE u.username = ?
-                        """, (self.current_user,))
-            teacher_id = cur.fetchone()[0]
-
-            # Insert new course
-            cur.execute("""
-                        INSERT INTO Course (title, description, teacher_id, created_at)
-                        VALUES (?, ?, ?, datetime('now'))
-                        """, (title, description, teacher_id))
+        self.page5.addCourseBtn.setEnabled(False)
+        self.tasks.submit(self.service.create_course, self.token, title, description,
+                          key=("create_course", title),
+                          on_result=self.on_course_created, on_error=self.on_create_course_error)
 
-            conn.commit()
-            conn.close()
+    def on_course_created(self, _):
+        self.page5.addCourseBtn.setEnabled(True)
+        QMessageBox.information(self, "Success", "Course created successfully!")
+        self.show_teacher_dashboard()
 
-            # Update dashboard stats
-            self.load_teacher_stats(self.current_user)
-
-            QMessageBox.information(self, "Success", "Course created successfully!")
-            self.show_teacher_dashboard()
-
-        except sqlite3.Error as e:
-            print(f"Database error: {e}")
+    def on_create_course_error(self, error):
+        self.page5.addCourseBtn.setEnabled(True)
+        if isinstance(error, ServiceError):
+            QMessageBox.warning(self, "Create Course Failed", str(error))
+        else:
+            print(f"Database error: {error}")
             QMessageBox.warning(self, "Create Course Failed", "Failed to create course. Please try again.")
 
 
 if __name__ == "__main__":
+    if not API_URL:
+        init_db(DB_FILENAME)  # creates tables and applies pending migrations
     app = QApplication(sys.argv)
     window = MainWindow()
+    # Let running tasks finish before their pooled connections are closed
+    app.aboutToQuit.connect(window.tasks.shutdown)
+    app.aboutToQuit.connect(window.reminders.close)
+    app.aboutToQuit.connect(window.service.close)
+    app.aboutToQuit.connect(close_all_pools)
     window.resize(1200, 800)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""Synthetic school dataset for load tests.
+
+    python -m benchmarks.datagen OUT.db [--teachers T] [--courses M] [--students K]
+                                        [--courses-per-student C] [--assignments A]
+                                        [--materials P] [--submit-rate R] [--seed S]
+
+Builds a fresh database with the app's schema (init_db) and bulk-loads it
+with executemany in one transaction. Course popularity is skewed (a few
+large courses, a long tail of small ones) and due dates straddle today,
+so both past and pending work exist. Every account's password is
+PASSWORD.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from controllers.assignment_c import due_timestamp
+from database import init_db
+from utils.password import hash_password
+
+PASSWORD = "password"
+# Course popularity falls off as 1 / rank ** ZIPF_EXPONENT
+ZIPF_EXPONENT = 0.8
+
+DEFAULTS = {
+    "teachers": 50,
+    "courses": 200,
+    "students": 5000,
+    "courses_per_student": 4,
+    "assignments": 8,
+    "materials": 6,
+    "submit_rate": 0.7,
+}
+
+TOPICS = ["algebra", "biology", "chemistry", "databases", "economics", "geometry", "history",
+          "literature", "networks", "physics", "statistics", "programming", "music", "art"]
+LEVELS = ["introduction to", "advanced", "applied", "foundations of", "topics in", "workshop:"]
+
+
+def _stamp(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def generate(path, teachers=50, courses=200, students=5000, courses_per_student=4,
+             assignments=8, materials=6, submit_rate=0.7, seed=0):
+    """Create ``path`` and fill it; returns the row count of every table loaded."""
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+    init_db(path)
+
+    # One hash shared by every account: hashing is deliberately slow
+    hashed = hash_password(PASSWORD)
+    teacher_names = [f"teacher{i:04d}" for i in range(1, teachers + 1)]
+    student_names = [f"student{i:06d}" for i in range(1, students + 1)]
+    users = [(i, name, f"{name}@school.test", hashed)
+             for i, name in enumerate(teacher_names + student_names, start=1)]
+
+    course_rows = []
+    for course_id in range(1, courses + 1):
+        topic = rng.choice(TOPICS)
+        title = f"{rng.choice(LEVELS).capitalize()} {topic} {course_id}"
+        description = f"A {rng.choice(['short', 'full', 'project-based'])} course on {topic}."
+        created = now - timedelta(days=rng.uniform(30, 365))
+        course_rows.append((course_id, title, description, rng.randint(1, teachers), _stamp(created)))
+
+    weights = [1 / (rank ** ZIPF_EXPONENT) for rank in range(1, courses + 1)]
+    course_ids = list(range(1, courses + 1))
+    rng.shuffle(course_ids)  # popularity is unrelated to id
+    per_student = min(courses_per_student, courses)
+    enrollments = []
+    for student_id in range(1, students + 1):
+        chosen = set()
+        while len(chosen) < per_student:
+            chosen.update(rng.choices(course_ids, weights, k=per_student - len(chosen)))
+        for course_id in sorted(chosen):
+            enrolled = now - timedelta(days=rng.uniform(0, 30))
+            enrollments.append((course_id, student_id, _stamp(enrolled)))
+
+    material_rows = []
+    assignment_rows = []
+    assignment_id = 0
+    by_course = {}
+    for course_id, *_ in course_rows:
+        for n in range(1, materials + 1):
+            created = now - timedelta(days=rng.uniform(0, 60))
+            url = f"https://youtu.be/{rng.getrandbits(40):010x}" if rng.random() < 0.5 else None
+            material_rows.append((course_id, f"course{course_id}_lecture{n}.pdf", url, _stamp(created)))
+        for n in range(1, assignments + 1):
+            assignment_id += 1
+            due = now + timedelta(days=rng.uniform(-60, 30))
+            created = due - timedelta(days=rng.uniform(7, 21))
+            assignment_rows.append((assignment_id, course_id, f"course{course_id}_task{n}.pdf",
+                                    _stamp(due), due_timestamp(_stamp(due)), _stamp(created)))
+            by_course.setdefault(course_id, []).append((assignment_id, due, created))
+
+    def submissions():
+        for course_id, student_id, _ in enrollments:
+            for assignment_id, due, created in by_course.get(course_id, ()):
+                if rng.random() >= submit_rate:
+                    continue
+                submitted = created + (due - created) * rng.uniform(0.2, 1.1)
+                if submitted > now:
+                    continue  # not handed in yet
+                grade = str(rng.randint(40, 100)) if rng.random() < 0.8 else None
+                yield (assignment_id, student_id, f"{assignment_id}_{student_id}.pdf",
+                       _stamp(submitted), grade)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")  # a lost benchmark database is regenerated
+    with conn:
+        conn.executemany("INSERT INTO User (user_id, username, email, password) VALUES (?, ?, ?, ?)", users)
+        conn.executemany("INSERT INTO Teacher (teacher_id, user_id) VALUES (?, ?)",
+                         ((i, i) for i in range(1, teachers + 1)))
+        conn.executemany("INSERT INTO Student (student_id, user_id) VALUES (?, ?)",
+                         ((i, teachers + i) for i in range(1, students + 1)))
+        conn.executemany("INSERT INTO Course (course_id, title, description, teacher_id, created_at) "
+                         "VALUES (?, ?, ?, ?, ?)", course_rows)
+        conn.executemany("INSERT INTO Enrollment (course_id, student_id, enrolled_at) VALUES (?, ?, ?)",
+                         enrollments)
+        conn.executemany("INSERT INTO CourseMaterial (course_id, pdf_file, youtube_url, created_at) "
+                         "VALUES (?, ?, ?, ?)", material_rows)
+        conn.executemany("INSERT INTO Assignment (assignment_id, course_id, pdf_file, due_date, due_at, created_at) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", assignment_rows)
+        conn.executemany("INSERT INTO Submission (assignment_id, student_id, pdf_file, submission_time, grade) "
+                         "VALUES (?, ?, ?, ?, ?)", submissions())
+    conn.execute("ANALYZE")
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("User", "Teacher", "Student", "Course", "Enrollment",
+                            "CourseMaterial", "Assignment", "Submission")}
+    conn.close()
+    return counts
+
+
+def add_arguments(parser):
+    parser.add_argument("--teachers", type=int, default=DEFAULTS["teachers"])
+    parser.add_argument("--courses", type=int, default=DEFAULTS["courses"])
+    parser.add_argument("--students", type=int, default=DEFAULTS["students"])
+    parser.add_argument("--courses-per-student", type=int, default=DEFAULTS["courses_per_student"])
+    parser.add_argument("--assignments", type=int, default=DEFAULTS["assignments"], help="per course")
+    parser.add_argument("--materials", type=int, default=DEFAULTS["materials"], help="per course")
+    parser.add_argument("--submit-rate", type=float, default=DEFAULTS["submit_rate"])
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def options(args):
+    return {name: getattr(args, name) for name in DEFAULTS}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out", help="database file to create; must not exist")
+    add_arguments(parser)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts = generate(args.out, seed=args.seed, **options(args))
+    print(json.dumps({"path": args.out, "seconds": round(time.perf_counter() - start, 2),
+                      "rows": counts}, indent=2))
@@ -0,0 +1,72 @@
+"""Time of the grade analytics over a whole school's gradebook.
+
+    python -m benchmarks.grades [--db PATH] [--repeat N] [datagen options]
+
+Reads every course's gradebook at once (GradeAnalyticsController.overview)
+and reports the best of ``--repeat`` runs for each step: the one query,
+building the Gradebook arrays and Gradebook.stats(). Without ``--db`` a
+dataset is generated into a temporary directory.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from benchmarks import datagen
+from controllers.analytics_c import GRADEBOOK_SQL, GradeAnalyticsController
+from utils import grade_stats
+from utils.db_helper import close_all_pools
+from utils.grade_stats import Gradebook
+
+# Enough students for about 110 000 submissions with the other datagen defaults
+SCHOOL_STUDENTS = 7000
+
+
+def run(db_path, repeat=5):
+    conn = sqlite3.connect(db_path)
+    course_ids = [row[0] for row in conn.execute("SELECT course_id FROM Course")]
+    submissions = conn.execute("SELECT COUNT(*) FROM Submission").fetchone()[0]
+    conn.close()
+
+    controller = GradeAnalyticsController(db_path)
+    now = time.time()
+    best = {"query": float("inf"), "arrays": float("inf"), "stats": float("inf"), "total": float("inf")}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with controller.db.reader() as conn:
+            rows = conn.execute(GRADEBOOK_SQL, {"courses": json.dumps(course_ids)}).fetchall()
+        fetched = time.perf_counter()
+        book = Gradebook(rows, course_ids)
+        built = time.perf_counter()
+        book.stats(now)
+        done = time.perf_counter()
+        controller.overview(course_ids, now)
+        total = time.perf_counter() - done
+        for step, seconds in (("query", fetched - start), ("arrays", built - fetched),
+                              ("stats", done - built), ("total", total)):
+            best[step] = min(best[step], seconds)
+    close_all_pools()
+    return {"courses": len(course_ids), "submissions": submissions, "rows": len(rows),
+            "cells": int(book.score.size), **{f"{step}_seconds": round(s, 4) for step, s in best.items()}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="existing database to measure; generated when omitted")
+    parser.add_argument("--repeat", type=int, default=5)
+    datagen.add_arguments(parser)
+    parser.set_defaults(students=SCHOOL_STUDENTS)
+    args = parser.parse_args()
+    if not grade_stats.available():
+        raise SystemExit("Install numpy to run the grade analytics: pip install numpy")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            db_path, dataset = args.db, {"path": args.db}
+        else:
+            db_path = os.path.join(tmp, "bench.db")
+            dataset = {"generated": datagen.options(args), "seed": args.seed,
+                       "rows": datagen.generate(db_path, seed=args.seed, **datagen.options(args))}
+        print(json.dumps({"dataset": dataset, **run(db_path, args.repeat)}, indent=2))
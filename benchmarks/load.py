@@ -0,0 +1,324 @@
+"""Latency and throughput of the controller methods and MainWindow's query paths.
+
+    python -m benchmarks.load [--db PATH [--writes]] [--seconds S] [--threads N] [--only TEXT]
+                              [--no-writes] [--sql-stats] [--output FILE] [--baseline FILE]
+                              [datagen options]
+
+Every case is called in a loop for ``--seconds`` from ``--threads``
+threads at once, with random ids drawn from the dataset, and reports
+p50/p90/p99/max latency in milliseconds and calls per second, and
+the read and write pools' contention counters over the case
+(utils.db_helper.ConnectionPool.metrics), for sizing them. The
+``main.*`` cases are the service calls MainWindow's workers make: login,
+the dashboard counters, the course list, ``load_course_data`` and
+friends.
+
+Without ``--db`` a dataset is generated into a temporary directory
+(benchmarks.datagen; its size options apply). Write cases change the
+database, so they are skipped with ``--db`` unless ``--writes`` is
+given. With ``--baseline`` (an earlier ``--output``) each case also
+reports its p50 and p99 relative to the baseline run. ``--sql-stats``
+adds the per-statement totals from utils.db_helper.query_stats.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from benchmarks import datagen
+from controllers.assignment_c import AssignmentController
+from controllers.course_c import CourseController
+from controllers.enrollment_c import EnrollmentController
+from controllers.material_c import MaterialController
+from controllers.search_c import SearchController
+from controllers.student_c import StudentController
+from controllers.submission_c import SubmissionController
+from controllers.teacher_c import TeacherController
+from controllers.user_c import UserController
+from service import LMSService
+from utils import grade_stats
+from utils.db_helper import close_all_pools, pool_stats, reset_pool_stats, query_stats, DEFAULT_POOL_SIZE
+
+# Logged-in sessions the main.* cases pick from, per role
+SESSIONS_PER_ROLE = 5
+# What main.submit hands in; written to ./submissions like the app's uploads
+SUBMISSION_BYTES = 64 * 1024
+
+
+class Case:
+    """One timed call; ``args(rng)`` picks its arguments outside the timing."""
+
+    def __init__(self, name, call, args=None, writes=False):
+        self.name = name
+        self.call = call
+        self.args = args or (lambda rng: ())
+        self.writes = writes
+
+
+class Dataset:
+    """Ids and names to draw arguments from, read once before timing."""
+
+    def __init__(self, db_path):
+        conn = sqlite3.connect(db_path)
+        column = lambda sql: [row[0] for row in conn.execute(sql)]
+        self.usernames = column("SELECT username FROM User")
+        self.teacher_ids = column("SELECT teacher_id FROM Teacher")
+        self.teacher_user_ids = column("SELECT user_id FROM Teacher")
+        self.student_user_ids = column("SELECT user_id FROM Student")
+        self.student_ids = column("SELECT student_id FROM Student")
+        self.student_emails = column("SELECT u.email FROM Student s JOIN User u ON u.user_id = s.user_id")
+        self.course_ids = column("SELECT course_id FROM Course")
+        self.material_ids = column("SELECT material_id FROM CourseMaterial")
+        self.assignment_ids = column("SELECT assignment_id FROM Assignment")
+        self.submission_ids = column("SELECT submission_id FROM Submission")
+        self.submission_pairs = conn.execute(
+            "SELECT student_id, assignment_id FROM Submission").fetchall()
+        self.teacher_logins = column(f"""
+            SELECT u.username FROM Teacher t JOIN User u ON u.user_id = t.user_id
+            WHERE EXISTS (SELECT 1 FROM Course c WHERE c.teacher_id = t.teacher_id)
+            ORDER BY t.teacher_id LIMIT {SESSIONS_PER_ROLE}""")
+        self.student_logins = column(f"""
+            SELECT u.username FROM Student s JOIN User u ON u.user_id = s.user_id
+            ORDER BY s.student_id LIMIT {SESSIONS_PER_ROLE}""")
+        conn.close()
+
+
+def controller_cases(db_path, data, names):
+    users = UserController(db_path)
+    teachers = TeacherController(db_path)
+    students = StudentController(db_path)
+    courses = CourseController(db_path)
+    enrollments = EnrollmentController(db_path)
+    materials = MaterialController(db_path)
+    assignments = AssignmentController(db_path)
+    submissions = SubmissionController(db_path)
+    searcher = SearchController(db_path)
+    pick = lambda values: lambda rng: (rng.choice(values),)
+
+    return [
+        Case("user.get_user_by_username", users.get_user_by_username, pick(data.usernames)),
+        Case("user.verify_user", users.verify_user,
+             lambda rng: (rng.choice(data.usernames), datagen.PASSWORD)),
+        Case("teacher.get_teacher_by_user_id", teachers.get_teacher_by_user_id, pick(data.teacher_user_ids)),
+        Case("student.get_student_by_user_id", students.get_student_by_user_id, pick(data.student_user_ids)),
+        Case("course.get_all_courses", courses.get_all_courses),
+        Case("course.get_course_by_id", courses.get_course_by_id, pick(data.course_ids)),
+        Case("course.get_courses_by_teacher", courses.get_courses_by_teacher,
+             pick(data.teacher_ids)),
+        Case("course.get_courses_by_student", courses.get_courses_by_student, pick(data.student_ids)),
+        Case("enrollment.get_courses_by_student", enrollments.get_courses_by_student, pick(data.student_ids)),
+        Case("enrollment.get_students_by_course", enrollments.get_students_by_course, pick(data.course_ids)),
+        Case("material.get_materials_by_course", materials.get_materials_by_course, pick(data.course_ids)),
+        Case("material.get_material_by_id", materials.get_material_by_id, pick(data.material_ids)),
+        Case("assignment.get_assignments_by_course", assignments.get_assignments_by_course,
+             pick(data.course_ids)),
+        Case("assignment.get_assignment_by_id", assignments.get_assignment_by_id, pick(data.assignment_ids)),
+        Case("submission.get_submissions_by_assignment", submissions.get_submissions_by_assignment,
+             pick(data.assignment_ids)),
+        Case("submission.get_submission_by_student_and_assignment",
+             submissions.get_submission_by_student_and_assignment, lambda rng: rng.choice(data.submission_pairs)),
+        Case("submission.get_submission_by_id", submissions.get_submission_by_id, pick(data.submission_ids)),
+        Case("search.search", searcher.search, lambda rng: (rng.choice(datagen.TOPICS)[:4],)),
+
+        Case("user.create_user", users.create_user,
+             lambda rng: (name := next(names), f"{name}@bench.test", datagen.PASSWORD), writes=True),
+        Case("course.create_course", courses.create_course,
+             lambda rng: (f"Bench course {next(names)}", "Created by the load test.",
+                          rng.choice(data.teacher_ids)), writes=True),
+        Case("course.update_course", courses.update_course,
+             lambda rng: (rng.choice(data.course_ids), None, f"Updated {next(names)}"), writes=True),
+        # The course to delete is created outside the timing
+        Case("course.delete_course", courses.delete_course,
+             lambda rng: (courses.create_course("Bench course to delete", "", data.teacher_ids[0]).course_id,),
+             writes=True),
+        Case("enrollment.enroll_student", enrollments.enroll_student,
+             lambda rng: (rng.choice(data.student_ids), rng.choice(data.course_ids)), writes=True),
+        Case("enrollment.enroll_by_emails", enrollments.enroll_by_emails,
+             lambda rng: (rng.choice(data.course_ids), rng.sample(data.student_emails, 20)), writes=True),
+        Case("material.create_material", materials.create_material,
+             lambda rng: (rng.choice(data.course_ids), "bench.pdf"), writes=True),
+        Case("assignment.create_assignment", assignments.create_assignment,
+             lambda rng: (rng.choice(data.course_ids), "bench.pdf", "2030-01-01"), writes=True),
+        Case("submission.submit_assignment", submissions.submit_assignment,
+             lambda rng: (rng.choice(data.assignment_ids), rng.choice(data.student_ids), "bench.pdf"),
+             writes=True),
+        Case("submission.grade_submission", submissions.grade_submission,
+             lambda rng: (rng.choice(data.submission_ids), str(rng.randint(0, 100))), writes=True),
+    ]
+
+
+def main_cases(service, data, names):
+    teacher_sessions = [service.login(name, datagen.PASSWORD) for name in data.teacher_logins]
+    student_sessions = [service.login(name, datagen.PASSWORD) for name in data.student_logins]
+    teacher_courses = {s["token"]: [c["course_id"] for c in service.list_courses(s["token"])]
+                       for s in teacher_sessions}
+
+    def teacher_course(rng):
+        token = rng.choice(teacher_sessions)["token"]
+        return token, rng.choice(teacher_courses[token])
+
+    def next_page(page):
+        # The page after the first one, as fetchMore asks for it while scrolling
+        def args(rng):
+            token, course_id = teacher_course(rng)
+            first = page(token, course_id)
+            return (token, course_id, tuple(first[-1][-2:]) if first else None)
+        return args
+
+    # Assignments still open to each student, for main.submit
+    open_assignments = {s["token"]: [a["assignment_id"] for course in service.course_feed(s["token"])["courses"]
+                                     for a in course["assignments"]]
+                        for s in student_sessions}
+    submitters = [token for token, ids in open_assignments.items() if ids]
+
+    def submission(rng):
+        token = rng.choice(submitters)
+        return token, rng.choice(open_assignments[token]), "bench.pdf", rng.randbytes(SUBMISSION_BYTES)
+
+    token = lambda sessions: lambda rng: (rng.choice(sessions)["token"],)
+    return [
+        Case("main.login", service.login, lambda rng: (rng.choice(data.usernames), datagen.PASSWORD)),
+        Case("main.teacher_dashboard", service.dashboard, token(teacher_sessions)),
+        Case("main.student_dashboard", service.dashboard, token(student_sessions)),
+        Case("main.course_list", service.list_courses, token(teacher_sessions)),
+        Case("main.load_course_data", service.course_overview, teacher_course),
+        Case("main.roster_next_page", service.roster_page, next_page(service.roster_page)),
+        Case("main.submissions_next_page", service.submissions_page, next_page(service.submissions_page)),
+        Case("main.search", service.search,
+             lambda rng: (rng.choice(teacher_sessions)["token"], rng.choice(datagen.TOPICS)[:4])),
+        Case("main.register", service.register,
+             lambda rng: (name := next(names), f"{name}@bench.test", datagen.PASSWORD, "student"), writes=True),
+    ] + ([Case("main.submit", service.submit, submission, writes=True)] if submitters else []) + ([
+        Case("main.grade_overview", service.grade_overview, token(teacher_sessions)),
+        Case("main.grade_analytics", service.grade_analytics, teacher_course),
+    ] if grade_stats.available() else [])
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def measure(case, seconds, threads, seed):
+    """Run ``case`` from ``threads`` threads for ``seconds``; latency stats in ms."""
+    samples = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(threads)
+
+    def worker(n):
+        rng = random.Random(seed * 1000 + n)
+        local = []
+        start_gate.wait()
+        deadline = time.perf_counter() + seconds
+        while not local or time.perf_counter() < deadline:
+            args = case.args(rng)
+            t0 = time.perf_counter()
+            case.call(*args)
+            local.append(time.perf_counter() - t0)
+        with lock:
+            samples.extend(local)
+
+    case.call(*case.args(random.Random(seed)))  # warm up connections and statements
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    wall = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    wall = time.perf_counter() - wall
+
+    samples.sort()
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "calls": len(samples),
+        "p50_ms": ms(percentile(samples, 50)),
+        "p90_ms": ms(percentile(samples, 90)),
+        "p99_ms": ms(percentile(samples, 99)),
+        "max_ms": ms(samples[-1]),
+        "mean_ms": ms(sum(samples) / len(samples)),
+        "throughput_per_sec": round(len(samples) / wall, 1),
+    }
+
+
+def compare(results, baseline):
+    """Add each case's p50/p99 as a ratio of the baseline run's (above 1 is slower)."""
+    for name, stats in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before:
+            for key in ("p50_ms", "p99_ms"):
+                if before[key]:
+                    stats[f"{key[:3]}_vs_baseline"] = round(stats[key] / before[key], 2)
+
+
+def run(db_path, seconds, threads, only=None, writes=True, seed=0):
+    data = Dataset(db_path)
+    # Read pool sized for the benchmark threads; the controllers share it
+    service = LMSService(db_path, pool_size=max(threads, DEFAULT_POOL_SIZE))
+    names = (f"bench{os.getpid()}_{i}" for i in itertools.count())
+    try:
+        cases = controller_cases(db_path, data, names) + main_cases(service, data, names)
+        results = {}
+        for case in cases:
+            if (only and only not in case.name) or (case.writes and not writes):
+                continue
+            reset_pool_stats()
+            results[case.name] = measure(case, seconds, threads, seed)
+            results[case.name]["pools"] = {m["mode"]: {k: v for k, v in m.items() if k not in ("db_path", "mode")}
+                                           for m in pool_stats() if m["db_path"] == db_path}
+    finally:
+        service.close()
+        close_all_pools()
+    return {
+        "sqlite_version": sqlite3.sqlite_version,
+        "cores": os.cpu_count(),
+        "threads": threads,
+        "seconds_per_case": seconds,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="existing database to measure; generated when omitted")
+    parser.add_argument("--seconds", type=float, default=1.0, help="measurement time per case")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--only", help="run the cases whose name contains this text")
+    parser.add_argument("--writes", action="store_true", help="run write cases against --db too")
+    parser.add_argument("--no-writes", action="store_true", help="skip the write cases")
+    parser.add_argument("--sql-stats", action="store_true", help="time every statement too")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--baseline", help="report from an earlier run to compare against")
+    datagen.add_arguments(parser)
+    args = parser.parse_args()
+    if args.sql_stats:
+        # Slow queries are in the statement totals; keep stderr quiet
+        query_stats.enable(float("inf"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            db_path, dataset = args.db, {"path": args.db}
+            writes = args.writes and not args.no_writes
+        else:
+            db_path = os.path.join(tmp, "bench.db")
+            dataset = {"generated": datagen.options(args), "seed": args.seed,
+                       "rows": datagen.generate(db_path, seed=args.seed, **datagen.options(args))}
+            writes = not args.no_writes
+        report = {"dataset": dataset,
+                  **run(db_path, args.seconds, args.threads, args.only, writes, args.seed)}
+        if args.sql_stats:
+            report["sql"] = query_stats.stats()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report["results"], json.load(f))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,88 @@
+"""Materialization speed and memory of the slotted model classes.
+
+    python -m benchmarks.models [--rows N]
+
+Compares the old ``__dict__`` classes built with ``Model(*row)`` against
+the slotted models built by ``Model.fetch_all`` (column names mapped once
+per cursor) for a SELECT * over Submission.
+"""
+import argparse
+import json
+import sqlite3
+import time
+import tracemalloc
+
+from models import Submission
+
+
+class DictSubmission:
+    def __init__(self, submission_id, assignment_id, student_id, pdf_file, submission_time, grade):
+        self.submission_id = submission_id
+        self.assignment_id = assignment_id
+        self.student_id = student_id
+        self.pdf_file = pdf_file
+        self.submission_time = submission_time
+        self.grade = grade
+
+
+def make_db(rows):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE Submission (
+            submission_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assignment_id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            pdf_file TEXT,
+            submission_time TEXT,
+            grade TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO Submission (assignment_id, student_id, pdf_file, submission_time, grade) VALUES (?, ?, ?, ?, ?)",
+        ((i % 50, i, f"{i}.pdf", "2025-01-01 10:00:00", str(i % 100)) for i in range(rows)))
+    return conn
+
+
+class Replay:
+    """Cursor stand-in over already-fetched rows, so only object building is measured."""
+
+    def __init__(self, cursor, rows):
+        self.description = cursor.description
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+
+def measure(conn, build):
+    cur = conn.execute("SELECT * FROM Submission")
+    rows = cur.fetchall()
+
+    start = time.perf_counter()
+    objects = build(Replay(cur, rows))
+    elapsed = time.perf_counter() - start
+    del objects
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = build(Replay(cur, rows))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return {"build_seconds": round(elapsed, 4), "bytes_per_object": round(allocated / len(objects), 1)}
+
+
+def run(rows):
+    conn = make_db(rows)
+    return {
+        "rows": rows,
+        "dict_positional": measure(conn, lambda cur: [DictSubmission(*row) for row in cur.fetchall()]),
+        "slots_fetch_all": measure(conn, Submission.fetch_all),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows), indent=2))
@@ -0,0 +1,70 @@
+"""Login cost and throughput of the password hashing settings.
+
+    python -m benchmarks.passwords [--seconds S] [--workers N]
+
+For each candidate setting reports the time of one verification and the
+logins per second per core, measured once on a single thread and once
+through a thread pool like the app's TaskRunner (hashlib releases the GIL
+while deriving keys, so the pool scales with cores).
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.password import PasswordHasher, SCRYPT, PBKDF2, default_hasher
+
+CANDIDATES = [
+    (SCRYPT, {"n": 2 ** 13, "r": 8, "p": 1}),
+    (SCRYPT, {"n": 2 ** 14, "r": 8, "p": 1}),
+    (SCRYPT, {"n": 2 ** 15, "r": 8, "p": 1}),
+    (PBKDF2, {"iterations": 310_000}),
+    (PBKDF2, {"iterations": 600_000}),
+]
+
+
+def logins_per_second(hasher, hashed, seconds, workers):
+    def verify_until(deadline):
+        count = 0
+        while time.perf_counter() < deadline:
+            hasher.verify("correct horse", hashed)
+            count += 1
+        return count
+
+    start = time.perf_counter()
+    deadline = start + seconds
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        total = sum(pool.map(verify_until, [deadline] * workers))
+    return total / (time.perf_counter() - start)
+
+
+def measure(scheme, params, seconds, workers):
+    hasher = PasswordHasher(scheme, **params)
+    hashed = hasher.hash("correct horse")
+    single = logins_per_second(hasher, hashed, seconds, 1)
+    pooled = logins_per_second(hasher, hashed, seconds, workers)
+    return {
+        "scheme": scheme,
+        "params": params,
+        "current": scheme == default_hasher.scheme and hasher.params == default_hasher.params,
+        "verify_ms": round(1000 / single, 1),
+        "logins_per_sec_per_core": round(single, 1),
+        "pool_workers": workers,
+        "pool_logins_per_sec": round(pooled, 1),
+    }
+
+
+def run(seconds, workers):
+    return {
+        "cores": os.cpu_count(),
+        "results": [measure(scheme, params, seconds, workers) for scheme, params in CANDIDATES],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="measurement time per setting and mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    print(json.dumps(run(args.seconds, args.workers), indent=2))
@@ -0,0 +1,92 @@
+"""Time and recall of the submission similarity check on synthetic texts.
+
+    python -m benchmarks.similarity [--documents N] [--words W] [--workers N] [--seed S]
+
+Generates ``--documents`` essays of ``--words`` random words, every tenth
+one a lightly edited copy of the one before, then reports the time to
+shingle and sign them all (on one core and through a process pool), the
+time of the LSH pass, how many candidate pairs it checked against all
+pairs, and how many of the planted copies it found.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import similarity
+from utils.similarity import MinHasher, shingles, candidate_pairs, similar_pairs
+
+VOCABULARY = 20_000
+# Share of a copy's words replaced; about 0.75 Jaccard similarity at 5-word shingles
+EDIT_RATE = 0.03
+
+
+def documents(count, words, seed):
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(VOCABULARY)]
+    texts, copies = [], []
+    for i in range(count):
+        if i % 10 == 9:
+            edited = texts[-1].split()
+            for _ in range(int(words * EDIT_RATE)):
+                edited[rng.randrange(words)] = rng.choice(vocabulary)
+            texts.append(" ".join(edited))
+            copies.append((i - 1, i))
+        else:
+            texts.append(" ".join(rng.choices(vocabulary, k=words)))
+    return texts, copies
+
+
+def _sign(text):
+    # Like similarity.sign_file, minus the PDF
+    if similarity._hasher is None:
+        similarity._hasher = MinHasher()
+    return similarity._hasher.signature(shingles(text))
+
+
+def run(count, words, workers, seed):
+    np = similarity.np
+    texts, copies = documents(count, words, seed)
+
+    start = time.perf_counter()
+    signatures = np.stack([_sign(text) for text in texts])
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pooled_signatures = np.stack(list(pool.map(_sign, texts, chunksize=64)))
+    pooled = time.perf_counter() - start
+    assert (pooled_signatures == signatures).all()
+
+    start = time.perf_counter()
+    candidates = candidate_pairs(signatures)
+    pairs = similar_pairs(signatures)
+    lsh = time.perf_counter() - start
+
+    found = {(i, j) for i, j, _ in pairs}
+    return {
+        "documents": count,
+        "words": words,
+        "workers": workers,
+        "sign_seconds": round(single, 3),
+        "sign_pool_seconds": round(pooled, 3),
+        "lsh_seconds": round(lsh, 4),
+        "candidate_pairs": len(candidates),
+        "all_pairs": count * (count - 1) // 2,
+        "similar_pairs": len(pairs),
+        "copies_found": f"{len(found & set(copies))}/{len(copies)}",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=1500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if similarity.np is None:
+        raise SystemExit("Install numpy to run the similarity check: pip install numpy")
+    print(json.dumps(run(args.documents, args.words, args.workers, args.seed), indent=2))
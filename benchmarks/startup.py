@@ -0,0 +1,67 @@
+"""Time-to-first-window for MainWindow.
+
+    python -m benchmarks.startup [--runs N]
+
+Every run starts a fresh interpreter. "before" parses all seven .ui files
+with loadUi up front, like the old eager constructor; "after" is the
+current lazy MainWindow using the precompiled pages when they are built
+(python -m utils.ui_loader).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+MODES = ("before", "after")
+
+
+def child(mode):
+    start = time.perf_counter()
+    from PyQt5.QtWidgets import QApplication
+    import Main
+    from utils import ui_loader
+
+    app = QApplication(sys.argv)
+    if mode == "before":
+        ui_loader.use_compiled = False
+    window = Main.MainWindow()
+    if mode == "before":
+        for index in range(len(Main.PAGES)):
+            window.page(index)
+    window.resize(1200, 800)
+    window.show()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"mode": mode, "seconds": elapsed}))
+
+
+def run(runs):
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    results = {}
+    for mode in MODES:
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--child", mode],
+                                 env=env, capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(out.strip().splitlines()[-1])["seconds"])
+        results[mode] = {
+            "runs": runs,
+            "median_ms": round(statistics.median(samples) * 1000, 2),
+            "min_ms": round(min(samples) * 1000, 2),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=MODES)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+    else:
+        print(json.dumps(run(args.runs), indent=2))
@@ -0,0 +1,72 @@
+import json
+
+from utils.activity import DAY
+from utils.db_helper import DBHelper
+
+
+class ActivityController:
+    """Reads of the CourseActivity / StudentActivity rollups; the raw
+    ActivityEvent log is never scanned here, see utils.activity.ActivityLog.
+
+    ``since`` is an epoch second; buckets that start at or after it count.
+    """
+
+    def __init__(self, db_path='database.db'):
+        self.db_path = db_path
+        self.db = DBHelper(db_path)
+
+    def course_totals(self, course_ids, since, period=DAY):
+        """``{course_id: {"events": {kind: count}, "active_students": n}}`` for each course."""
+        courses = json.dumps(list(course_ids))
+        totals = {course_id: {"events": {}, "active_students": 0} for course_id in course_ids}
+        with self.db.reader() as conn:
+            rows = conn.execute("""
+                                SELECT course_id, kind, SUM(events)
+                                FROM CourseActivity
+                                WHERE course_id IN (SELECT value FROM json_each(?))
+                                  AND period = ? AND bucket >= ?
+                                GROUP BY course_id, kind
+                                """, (courses, period, since)).fetchall()
+            for course_id, kind, events in rows:
+                totals[course_id]["events"][kind] = events
+            rows = conn.execute("""
+                                SELECT course_id, COUNT(DISTINCT student_id)
+                                FROM StudentActivity
+                                WHERE course_id IN (SELECT value FROM json_each(?))
+                                  AND period = ? AND bucket >= ?
+                                GROUP BY course_id
+                                """, (courses, period, since)).fetchall()
+            for course_id, students in rows:
+                totals[course_id]["active_students"] = students
+        return totals
+
+    def course_series(self, course_id, since, period=DAY):
+        """``[{"bucket", "kind", "events"}]`` for one course, oldest bucket first."""
+        with self.db.reader() as conn:
+            rows = conn.execute("""
+                                SELECT bucket, kind, events
+                                FROM CourseActivity
+                                WHERE course_id = ? AND period = ? AND bucket >= ?
+                                ORDER BY bucket, kind
+                                """, (course_id, period, since)).fetchall()
+        return [{"bucket": bucket, "kind": kind, "events": events} for bucket, kind, events in rows]
+
+    def student_totals(self, course_id, since, period=DAY):
+        """``[{"student_id", "username", "events": {kind: count}}]`` for the
+        students active in one course, most active first.
+        """
+        with self.db.reader() as conn:
+            rows = conn.execute("""
+                                SELECT a.student_id, u.username, a.kind, SUM(a.events)
+                                FROM StudentActivity a
+                                         JOIN Student s ON s.student_id = a.student_id
+                                         JOIN User u ON u.user_id = s.user_id
+                                WHERE a.course_id = ? AND a.period = ? AND a.bucket >= ?
+                                GROUP BY a.student_id, a.kind
+                                """, (course_id, period, since)).fetchall()
+        students = {}
+        for student_id, username, kind, events in rows:
+            student = students.setdefault(student_id, {"student_id": student_id, "username": username,
+                                                       "events": {}})
+            student["events"][kind] = events
+        return sorted(students.values(), key=lambda s: (-sum(s["events"].values()), s["username"]))
@@ -0,0 +1,97 @@
+import json
+
+from utils.db_helper import DBHelper
+from utils.grade_stats import Gradebook, plain, PERCENTILES, BIN_WIDTH, MAX_GRADE
+
+# Every row a set of courses' gradebooks need, numbers only so the lot
+# converts to one float array: (kind, ...) with kind as in utils.grade_stats
+GRADEBOOK_SQL = """
+    SELECT 0, a.assignment_id, a.course_id, a.due_at, a.weight
+    FROM Assignment a
+    WHERE a.course_id IN (SELECT value FROM json_each(:courses))
+    UNION ALL
+    SELECT 1, e.student_id, e.course_id, NULL, NULL
+    FROM Enrollment e
+    WHERE e.course_id IN (SELECT value FROM json_each(:courses))
+    UNION ALL
+    SELECT 2, s.student_id, s.assignment_id, s.submission_id, s.score
+    FROM Assignment a
+             JOIN Submission s ON s.assignment_id = a.assignment_id
+    WHERE a.course_id IN (SELECT value FROM json_each(:courses))
+"""
+
+
+def _summary(courses, i):
+    return {
+        "students": plain(courses["students"][i]),
+        "assignments": plain(courses["assignments"][i]),
+        "graded": plain(courses["graded"][i]),
+        "mean": plain(courses["mean"][i]),
+        "percentiles": {f"p{p}": plain(value) for p, value in zip(PERCENTILES, courses["percentiles"][i])},
+        "distribution": [{"from": low, "to": low + BIN_WIDTH, "students": plain(count)}
+                         for low, count in zip(range(0, MAX_GRADE, BIN_WIDTH), courses["distribution"][i])],
+        "at_risk": plain(courses["at_risk"][i]),
+    }
+
+
+class GradeAnalyticsController:
+    """Grade statistics over whole gradebooks, see utils.grade_stats.
+
+    Needs NumPy; check utils.grade_stats.available() first.
+    """
+
+    def __init__(self, db_path='database.db'):
+        self.db_path = db_path
+        self.db = DBHelper(db_path)
+
+    def gradebook(self, course_ids):
+        """The Gradebook of ``course_ids``, read in one query."""
+        with self.db.reader() as conn:
+            rows = conn.execute(GRADEBOOK_SQL, {"courses": json.dumps(list(course_ids))}).fetchall()
+        return Gradebook(rows, course_ids)
+
+    def overview(self, course_ids, now):
+        """``{course_id: summary}``: students, assignments, graded cells, mean
+        final grade, its percentiles and distribution, and at-risk students.
+        """
+        book = self.gradebook(course_ids)
+        courses = book.stats(now)["courses"]
+        return {int(course_id): _summary(courses, i) for i, course_id in enumerate(book.course_ids)}
+
+    def course_report(self, course_id, now):
+        """One course's summary plus a row per assignment and per student;
+        at-risk students come first, lowest final grade first.
+        """
+        with self.db.snapshot() as conn:
+            book = self.gradebook([course_id])
+            rows = conn.execute("SELECT assignment_id, pdf_file, due_date FROM Assignment WHERE course_id = ?",
+                                (course_id,)).fetchall()
+            assignments = {assignment_id: rest for assignment_id, *rest in rows}
+            rows = conn.execute("""
+                                SELECT e.student_id, u.username, u.email
+                                FROM Enrollment e
+                                         JOIN Student st ON st.student_id = e.student_id
+                                         JOIN User u ON u.user_id = st.user_id
+                                WHERE e.course_id = ?
+                                """, (course_id,)).fetchall()
+            students = {student_id: rest for student_id, *rest in rows}
+        stats = book.stats(now)
+
+        columns = stats["assignments"]
+        assignment_rows = []
+        for i, assignment_id in enumerate(book.assignment_ids.tolist()):
+            pdf_file, due_date = assignments.get(assignment_id, (None, None))
+            assignment_rows.append({"assignment_id": assignment_id, "pdf_file": pdf_file, "due_date": due_date,
+                                    "weight": plain(book.weight[i]),
+                                    **{name: plain(values[i]) for name, values in columns.items()}})
+
+        columns = stats["enrollments"]
+        student_rows = []
+        for i, student_id in enumerate(book.student_ids.tolist()):
+            username, email = students.get(student_id, (None, None))
+            student_rows.append({"student_id": student_id, "username": username, "email": email,
+                                 **{name: plain(values[i]) for name, values in columns.items()}})
+        student_rows.sort(key=lambda s: (not s["at_risk"], s["final"] is None,
+                                         s["final"] or 0, s["username"] or ""))
+        return {"course_id": course_id, **_summary(stats["courses"], 0),
+                "by_assignment": assignment_rows, "by_student": student_rows}
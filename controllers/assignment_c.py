@@ -1,36 +1,97 @@
-import sqlite3
+import calendar
+import time
+
 from models.assignment import Assignment
+from utils.db_helper import DBHelper
+
+# Assignments of a student's courses due in [start, end). Each course is a
+# range seek on the (course_id, due_at) index, so the cost follows what is
+# due in the window, not how many assignments the courses have piled up.
+STUDENT_DUE_SQL = """
+    SELECT a.assignment_id, a.course_id, c.title, a.pdf_file, a.due_date, a.due_at,
+           EXISTS (SELECT 1 FROM Submission s WHERE s.student_id = e.student_id AND s.assignment_id = a.assignment_id)
+    FROM Enrollment e
+             CROSS JOIN Assignment a ON a.course_id = e.course_id
+             JOIN Course c ON c.course_id = e.course_id
+    WHERE e.student_id = :student AND a.due_at >= :start AND a.due_at < :end
+      AND (:course IS NULL OR e.course_id = :course)
+    ORDER BY a.due_at, a.assignment_id
+"""
+
+COURSE_DUE_SQL = """
+    SELECT a.assignment_id, a.course_id, a.pdf_file, a.due_date, a.due_at,
+           (SELECT COUNT(*) FROM Submission s WHERE s.assignment_id = a.assignment_id)
+    FROM Assignment a
+    WHERE a.course_id = ? AND a.due_at >= ? AND a.due_at < ?
+    ORDER BY a.due_at, a.assignment_id
+"""
+
+
+def due_timestamp(due_date):
+    """The epoch second (UTC) at which ``due_date`` ends, as database.due_at_sql computes it.
+
+    Takes 'YYYY-MM-DD', lasting until the end of that day, or
+    'YYYY-MM-DD HH:MM[:SS]'; raises ValueError for anything else.
+    """
+    if len(due_date) == 10:
+        due_date += " 23:59:59"
+    elif len(due_date) == 16:
+        due_date += ":00"
+    return calendar.timegm(time.strptime(due_date, "%Y-%m-%d %H:%M:%S"))
+
 
 class AssignmentController:
     def __init__(self, db_path='database.db'):
         self.db_path = db_path
+        self.db = DBHelper(db_path)
 
-    def create_assignment(self, title, due_date, course_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO Assignment (title, due_date, course_id) VALUES (?, ?, ?)",
-            (title, due_date, course_id)
-        )
-        conn.commit()
-        assignment_id = cur.lastrowid
-        conn.close()
-        return Assignment(assignment_id, title, due_date, course_id)
+    def create_assignment(self, course_id, pdf_file, due_date, file_hash=None):
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO Assignment (course_id, pdf_file, due_date, due_at, created_at, file_hash) "
+                "VALUES (?, ?, ?, ?, datetime('now'), ?) RETURNING *",
+                (course_id, pdf_file, due_date, due_timestamp(due_date), file_hash)
+            )
+            return Assignment.fetch_one(cur)
 
     def get_assignments_by_course(self, course_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Assignment WHERE course_id = ?", (course_id,))
-        rows = cur.fetchall()
-        conn.close()
-        return [Assignment(*row) for row in rows]
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Assignment WHERE course_id = ? ORDER BY created_at DESC", (course_id,))
+            return Assignment.fetch_all(cur)
 
     def get_assignment_by_id(self, assignment_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Assignment WHERE assignment_id = ?", (assignment_id,))
-        row = cur.fetchone()
-        conn.close()
-        if row:
-            return Assignment(*row)
-        return None
\ No newline at end of file
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Assignment WHERE assignment_id = ?", (assignment_id,))
+            return Assignment.fetch_one(cur)
+
+    def set_weight(self, assignment_id, weight):
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("UPDATE Assignment SET weight = ? WHERE assignment_id = ? RETURNING *",
+                        (weight, assignment_id))
+            return Assignment.fetch_one(cur)
+
+    def get_due_for_student(self, student_id, start, end, course_id=None):
+        """Dicts for the assignments of the student's courses (or of one of
+        them) due from epoch second ``start`` up to ``end``, soonest first,
+        each with its ``course`` title and whether it was ``submitted``.
+        """
+        with self.db.reader() as conn:
+            rows = conn.execute(STUDENT_DUE_SQL, {"student": student_id, "start": start, "end": end,
+                                                  "course": course_id}).fetchall()
+        return [{"assignment_id": assignment_id, "course_id": course, "course": title, "pdf_file": pdf_file,
+                 "due_date": due_date, "due_at": due_at, "submitted": bool(submitted)}
+                for assignment_id, course, title, pdf_file, due_date, due_at, submitted in rows]
+
+    def get_due_for_course(self, course_id, start, end):
+        """Dicts for the course's assignments due from ``start`` up to ``end``,
+        soonest first, each with its number of ``submissions``.
+        """
+        with self.db.reader() as conn:
+            rows = conn.execute(COURSE_DUE_SQL, (course_id, start, end)).fetchall()
+        return [{"assignment_id": assignment_id, "course_id": course, "pdf_file": pdf_file,
+                 "due_date": due_date, "due_at": due_at, "submissions": submissions}
+                for assignment_id, course, pdf_file, due_date, due_at, submissions in rows]
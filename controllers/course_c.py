@@ -1,36 +1,147 @@
-import sqlite3
+import time
+
 from models.course import Course
+from utils.cache import cached_read
+from utils.db_helper import DBHelper
+
+# A student's courses with the newest materials and the next assignments of
+# each, as one row per item. Both lists are top-N per course over the
+# (course_id, created_at) and (course_id, due_at) indexes; CROSS JOIN keeps
+# the enrolled courses as the outer loop instead of a scan of every item.
+STUDENT_FEED_SQL = """
+    WITH enrolled AS (SELECT c.course_id, c.title, c.description, u.username AS teacher
+                      FROM Enrollment e
+                               JOIN Course c ON c.course_id = e.course_id
+                               LEFT JOIN Teacher t ON t.teacher_id = c.teacher_id
+                               LEFT JOIN User u ON u.user_id = t.user_id
+                      WHERE e.student_id = :student),
+         materials AS (SELECT m.course_id, m.material_id, m.pdf_file, m.youtube_url, m.created_at,
+                              ROW_NUMBER() OVER (PARTITION BY m.course_id ORDER BY m.created_at DESC) AS n
+                       FROM enrolled c
+                                CROSS JOIN CourseMaterial m ON m.course_id = c.course_id),
+         upcoming AS (SELECT a.course_id, a.assignment_id, a.pdf_file, a.due_date, a.due_at,
+                             ROW_NUMBER() OVER (PARTITION BY a.course_id ORDER BY a.due_at) AS n
+                      FROM enrolled c
+                               CROSS JOIN Assignment a ON a.course_id = c.course_id
+                      WHERE a.due_at > :now)
+    SELECT 'course', course_id, NULL, title, description, teacher, NULL
+    FROM enrolled
+    UNION ALL
+    SELECT 'material', course_id, material_id, pdf_file, youtube_url, created_at, NULL
+    FROM materials
+    WHERE n <= :materials
+    UNION ALL
+    SELECT 'assignment', u.course_id, u.assignment_id, u.pdf_file, u.due_date,
+           EXISTS (SELECT 1 FROM Submission s WHERE s.student_id = :student AND s.assignment_id = u.assignment_id),
+           u.due_at
+    FROM upcoming u
+    WHERE n <= :assignments
+"""
+
 
 class CourseController:
     def __init__(self, db_path='database.db'):
         self.db_path = db_path
+        self.db = DBHelper(db_path)
 
-    def create_course(self, name, deskripsi, teacher_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO Course (name, deskripsi, teacher_id) VALUES (?, ?, ?)",
-            (name, deskripsi, teacher_id)
-        )
-        conn.commit()
-        course_id = cur.lastrowid
-        conn.close()
-        return Course(course_id, name, deskripsi, teacher_id)
+    def create_course(self, title, description, teacher_id):
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO Course (title, description, teacher_id, created_at) "
+                "VALUES (?, ?, ?, datetime('now')) RETURNING *",
+                (title, description, teacher_id)
+            )
+            course = Course.fetch_one(cur)
+        CourseController.get_all_courses.invalidate(self)
+        CourseController.get_course_by_id.invalidate(self, course.course_id)
+        return course
 
+    @cached_read(maxsize=8, ttl=30.0)
     def get_all_courses(self):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Course")
-        rows = cur.fetchall()
-        conn.close()
-        return [Course(*row) for row in rows]
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Course")
+            return Course.fetch_all(cur)
 
+    @cached_read(maxsize=512, ttl=60.0)
     def get_course_by_id(self, course_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Course WHERE course_id = ?", (course_id,))
-        row = cur.fetchone()
-        conn.close()
-        if row:
-            return Course(*row)
-        return None
\ No newline at end of file
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Course WHERE course_id = ?", (course_id,))
+            return Course.fetch_one(cur)
+
+    def update_course(self, course_id, title=None, description=None):
+        """Change the given fields; returns the updated Course or None if it does not exist."""
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "UPDATE Course SET title = COALESCE(?, title), description = COALESCE(?, description) "
+                "WHERE course_id = ? RETURNING *",
+                (title, description, course_id)
+            )
+            course = Course.fetch_one(cur)
+        CourseController.get_all_courses.invalidate(self)
+        CourseController.get_course_by_id.invalidate(self, course_id)
+        return course
+
+    def delete_course(self, course_id):
+        """Delete a course with its enrollments, materials, assignments and submissions."""
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                        DELETE FROM Submission
+                        WHERE assignment_id IN (SELECT assignment_id FROM Assignment WHERE course_id = ?)
+                        """, (course_id,))
+            cur.execute("DELETE FROM Assignment WHERE course_id = ?", (course_id,))
+            cur.execute("DELETE FROM CourseMaterial WHERE course_id = ?", (course_id,))
+            cur.execute("DELETE FROM Enrollment WHERE course_id = ?", (course_id,))
+            cur.execute("DELETE FROM Course WHERE course_id = ?", (course_id,))
+            deleted = cur.rowcount == 1
+        CourseController.get_all_courses.invalidate(self)
+        CourseController.get_course_by_id.invalidate(self, course_id)
+        return deleted
+
+    def get_courses_by_teacher(self, teacher_id):
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Course WHERE teacher_id = ? ORDER BY created_at DESC", (teacher_id,))
+            return Course.fetch_all(cur)
+
+    def get_courses_by_student(self, student_id):
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                        SELECT c.*
+                        FROM Enrollment e
+                                 JOIN Course c ON c.course_id = e.course_id
+                        WHERE e.student_id = ?
+                        ORDER BY c.created_at DESC
+                        """, (student_id,))
+            return Course.fetch_all(cur)
+
+    def get_student_feed(self, student_id, materials=3, assignments=5):
+        """The student's courses by title, each a dict with its ``materials``
+        (newest first) and upcoming ``assignments`` (soonest first, with
+        ``submitted``), read in one query.
+        """
+        with self.db.reader() as conn:
+            rows = conn.execute(STUDENT_FEED_SQL, {"student": student_id, "materials": materials,
+                                                   "assignments": assignments, "now": int(time.time())}).fetchall()
+        courses = {}
+        for kind, course_id, item_id, a, b, c, due_at in rows:
+            if kind == "course":
+                courses[course_id] = {"course_id": course_id, "title": a, "description": b, "teacher": c,
+                                      "materials": [], "assignments": []}
+            elif kind == "material":
+                courses[course_id]["materials"].append(
+                    {"material_id": item_id, "pdf_file": a, "youtube_url": b, "created_at": c})
+            else:
+                courses[course_id]["assignments"].append(
+                    {"assignment_id": item_id, "pdf_file": a, "due_date": b, "due_at": due_at,
+                     "submitted": bool(c)})
+        feed = sorted(courses.values(), key=lambda course: course["title"].lower())
+        for course in feed:
+            course["materials"].sort(key=lambda m: m["created_at"], reverse=True)
+            course["assignments"].sort(key=lambda a: a["due_at"])
+        return feed
@@ -1,34 +1,117 @@
-import sqlite3
+import csv
+import io
+import json
+import re
 from models.enrollment import Enrollment
+from utils.activity import ENROLLMENT
+from utils.db_helper import DBHelper
+
+ENROLLED = "enrolled"
+ALREADY_ENROLLED = "already enrolled"
+NOT_A_STUDENT = "email not found or not a student"
+DUPLICATE = "duplicate in list"
+
+_EMAIL_RE = re.compile(r"[^@\s,;]+@[^@\s,;]+")
+
+
+def read_email_list(text):
+    """Emails from a CSV export or a pasted list, in order of appearance.
+
+    A CSV with an ``email`` header column uses that column only; anything
+    else is scanned for email-looking tokens.
+    """
+    rows = list(csv.reader(io.StringIO(text.strip())))
+    if rows:
+        header = [cell.strip().lower() for cell in rows[0]]
+        if "email" in header:
+            col = header.index("email")
+            return [row[col].strip() for row in rows[1:] if len(row) > col and row[col].strip()]
+    return _EMAIL_RE.findall(text)
+
 
 class EnrollmentController:
-    def __init__(self, db_path='database.db'):
+    def __init__(self, db_path='database.db', activity=None):
         self.db_path = db_path
+        self.db = DBHelper(db_path)
+        # utils.activity.ActivityLog that new enrollments are reported to, if any
+        self.activity = activity
+
+    def _record(self, pairs):
+        if self.activity is not None:
+            for course_id, student_id in pairs:
+                self.activity.record(ENROLLMENT, student_id=student_id, course_id=course_id)
 
     def enroll_student(self, student_id, course_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT OR IGNORE INTO Enrollment (student_id, course_id) VALUES (?, ?)",
-            (student_id, course_id)
-        )
-        conn.commit()
-        enrollment_id = cur.lastrowid
-        conn.close()
-        return Enrollment(enrollment_id, student_id, course_id)
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT OR IGNORE INTO Enrollment (student_id, course_id, enrolled_at) "
+                "VALUES (?, ?, datetime('now')) RETURNING *",
+                (student_id, course_id)
+            )
+            enrollment = Enrollment.fetch_one(cur)
+        if enrollment is not None:
+            self._record([(course_id, student_id)])
+        return enrollment
+
+    def enroll_by_emails(self, course_id, emails):
+        """Enroll every student in ``emails`` into ``course_id`` in one transaction.
+
+        Emails are resolved and checked with one set-based query each and
+        inserted with a single executemany. Returns ``(email, status)`` for
+        every input row, in input order.
+        """
+        emails = [email.strip() for email in emails]
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                        SELECT u.email, s.student_id
+                        FROM User u
+                                 JOIN Student s ON s.user_id = u.user_id
+                        WHERE u.email IN (SELECT value FROM json_each(?))
+                        """, (json.dumps(emails),))
+            student_ids = dict(cur.fetchall())
+
+            cur.execute("""
+                        SELECT student_id
+                        FROM Enrollment
+                        WHERE course_id = ?
+                          AND student_id IN (SELECT value FROM json_each(?))
+                        """, (course_id, json.dumps(list(student_ids.values()))))
+            enrolled = {row[0] for row in cur.fetchall()}
+
+            report = []
+            seen = set()
+            to_insert = []
+            for email in emails:
+                student_id = student_ids.get(email)
+                if email in seen:
+                    status = DUPLICATE
+                elif student_id is None:
+                    status = NOT_A_STUDENT
+                elif student_id in enrolled:
+                    status = ALREADY_ENROLLED
+                else:
+                    status = ENROLLED
+                    to_insert.append((course_id, student_id))
+                seen.add(email)
+                report.append((email, status))
+
+            cur.executemany("""
+                            INSERT OR IGNORE INTO Enrollment (course_id, student_id, enrolled_at)
+                            VALUES (?, ?, datetime('now'))
+                            """, to_insert)
+        self._record(to_insert)
+        return report
 
     def get_courses_by_student(self, student_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Enrollment WHERE student_id = ?", (student_id,))
-        rows = cur.fetchall()
-        conn.close()
-        return [Enrollment(*row) for row in rows]
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Enrollment WHERE student_id = ?", (student_id,))
+            return Enrollment.fetch_all(cur)
 
     def get_students_by_course(self, course_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Enrollment WHERE course_id = ?", (course_id,))
-        rows = cur.fetchall()
-        conn.close()
-        return [Enrollment(*row) for row in rows]
\ No newline at end of file
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Enrollment WHERE course_id = ?", (course_id,))
+            return Enrollment.fetch_all(cur)
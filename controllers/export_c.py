@@ -0,0 +1,134 @@
+import json
+from contextlib import contextmanager
+
+from utils.db_helper import DBHelper
+from utils.export import fetch_batches, BATCH_SIZE
+
+ROSTER_HEADER = ["course_id", "course", "username", "email", "enrolled_at"]
+GRADEBOOK_HEADER = ["course_id", "course", "assignment_id", "assignment", "due_date",
+                    "username", "email", "submission_time", "grade", "status"]
+
+GRADED = "graded"
+SUBMITTED = "submitted"
+MISSING = "missing"
+PENDING = "pending"
+
+# Enrollment and assignment order come from their (course_id, ...) indexes,
+# so rows stream out of the join without a sort over the whole result
+ROSTER_SQL = """
+    SELECT c.course_id, c.title, u.username, u.email, e.enrolled_at
+    FROM Course c
+             JOIN Enrollment e ON e.course_id = c.course_id
+             JOIN Student st ON st.student_id = e.student_id
+             JOIN User u ON u.user_id = st.user_id
+    WHERE c.course_id IN (SELECT value FROM json_each(?))
+    ORDER BY c.course_id, e.enrollment_id
+"""
+
+GRADEBOOK_SQL = """
+    SELECT c.course_id, c.title, a.assignment_id, a.pdf_file, a.due_date,
+           u.username, u.email, s.submission_time, s.grade,
+           CASE
+               WHEN s.submission_id IS NOT NULL AND s.grade IS NOT NULL THEN 'graded'
+               WHEN s.submission_id IS NOT NULL THEN 'submitted'
+               WHEN a.due_at < CAST(strftime('%s', 'now') AS INTEGER) THEN 'missing'
+               ELSE 'pending'
+               END,
+           e.enrollment_id
+    FROM Course c
+             JOIN Enrollment e ON e.course_id = c.course_id
+             JOIN Student st ON st.student_id = e.student_id
+             JOIN User u ON u.user_id = st.user_id
+             JOIN Assignment a ON a.course_id = c.course_id
+             -- A student's latest submission counts when there are several
+             LEFT JOIN Submission s ON s.submission_id = (SELECT MAX(s2.submission_id)
+                                                          FROM Submission s2
+                                                          WHERE s2.student_id = e.student_id
+                                                            AND s2.assignment_id = a.assignment_id)
+    WHERE c.course_id IN (SELECT value FROM json_each(?))
+    ORDER BY c.course_id, e.enrollment_id, a.due_at, a.assignment_id
+"""
+
+
+def as_number(grade):
+    """A stored grade as int or float, so spreadsheets can sum it."""
+    if grade is None:
+        return None
+    try:
+        return int(grade)
+    except ValueError:
+        try:
+            return float(grade)
+        except ValueError:
+            return grade
+
+
+class ExportController:
+    """Report rows read in batches from one read snapshot.
+
+    Each method is a generator: it yields the header first, then lists of
+    up to ``batch_size`` rows. It reads on a dedicated connection, not a
+    pooled one, since a stream may be consumed across several threads;
+    close the generator to end the read early.
+    """
+
+    def __init__(self, db_path='database.db'):
+        self.db_path = db_path
+        self.db = DBHelper(db_path)
+
+    @contextmanager
+    def _snapshot(self):
+        # A dedicated read-only connection: an export is read while it is
+        # sent, which can take longer than a pooled checkout should
+        conn = self.db.get_connection(read_only=True)
+        try:
+            conn.execute("BEGIN")  # every query in the export sees the same data
+            yield conn
+        finally:
+            conn.close()
+
+    def roster(self, course_ids, batch_size=BATCH_SIZE):
+        with self._snapshot() as conn:
+            yield ROSTER_HEADER
+            cur = conn.execute(ROSTER_SQL, (json.dumps(list(course_ids)),))
+            yield from fetch_batches(cur, batch_size)
+
+    def gradebook(self, course_ids, batch_size=BATCH_SIZE):
+        """One row per enrolled student and assignment, see GRADEBOOK_HEADER."""
+        with self._snapshot() as conn:
+            yield GRADEBOOK_HEADER
+            cur = conn.execute(GRADEBOOK_SQL, (json.dumps(list(course_ids)),))
+            for rows in fetch_batches(cur, batch_size):
+                yield [row[:8] + (as_number(row[8]), row[9]) for row in rows]
+
+    def gradebook_wide(self, course_id, batch_size=BATCH_SIZE):
+        """One row per student of ``course_id`` with a column per assignment.
+
+        A cell holds the grade, or the status when there is none yet.
+        """
+        with self._snapshot() as conn:
+            assignments = conn.execute(
+                "SELECT assignment_id, pdf_file, due_date FROM Assignment "
+                "WHERE course_id = ? ORDER BY due_at, assignment_id", (course_id,)).fetchall()
+            yield ["username", "email"] + [f"{pdf_file} (due {due_date})" for _, pdf_file, due_date in assignments]
+
+            columns = {assignment_id: i for i, (assignment_id, _, _) in enumerate(assignments)}
+            cur = conn.execute(GRADEBOOK_SQL, (json.dumps([course_id]),))
+            batch, student, current = [], None, None
+            for rows in fetch_batches(cur, batch_size):
+                for row in rows:
+                    if row[10] != student:
+                        if current is not None:
+                            batch.append(tuple(current))
+                        student = row[10]
+                        current = [row[5], row[6]] + [None] * len(assignments)
+                    status = row[9]
+                    current[2 + columns[row[2]]] = (as_number(row[8]) if status == GRADED
+                                                    else None if status == PENDING else status)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if current is not None:
+                batch.append(tuple(current))
+            if batch:
+                yield batch
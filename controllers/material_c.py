@@ -1,36 +1,29 @@
-import sqlite3
 from models.material import Material
+from utils.db_helper import DBHelper
 
 class MaterialController:
     def __init__(self, db_path='database.db'):
         self.db_path = db_path
+        self.db = DBHelper(db_path)
 
-    def create_material(self, title, file_url, course_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO Material (title, file_url, course_id) VALUES (?, ?, ?)",
-            (title, file_url, course_id)
-        )
-        conn.commit()
-        material_id = cur.lastrowid
-        conn.close()
-        return Material(material_id, title, file_url, course_id)
+    def create_material(self, course_id, pdf_file, youtube_url=None, file_hash=None):
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO CourseMaterial (course_id, pdf_file, youtube_url, created_at, file_hash) "
+                "VALUES (?, ?, ?, datetime('now'), ?) RETURNING *",
+                (course_id, pdf_file, youtube_url, file_hash)
+            )
+            return Material.fetch_one(cur)
 
     def get_materials_by_course(self, course_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Material WHERE course_id = ?", (course_id,))
-        rows = cur.fetchall()
-        conn.close()
-        return [Material(*row) for row in rows]
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM CourseMaterial WHERE course_id = ? ORDER BY created_at DESC", (course_id,))
+            return Material.fetch_all(cur)
 
     def get_material_by_id(self, material_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Material WHERE material_id = ?", (material_id,))
-        row = cur.fetchone()
-        conn.close()
-        if row:
-            return Material(*row)
-        return None
\ No newline at end of file
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM CourseMaterial WHERE material_id = ?", (material_id,))
+            return Material.fetch_one(cur)
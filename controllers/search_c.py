@@ -0,0 +1,123 @@
+import json
+import re
+from models.search_hit import SearchHit
+from utils.db_helper import DBHelper
+
+MATERIAL = "material"
+ASSIGNMENT = "assignment"
+COURSE = "course"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# One ranked list over every FTS table (see database.SEARCH_INDEXES). A
+# file matched by both its name and its text is reported once, with the
+# better rank. CROSS JOIN keeps each FTS table as the outer loop; left to
+# itself the planner may scan the content table and re-run MATCH per row.
+# Snippets are only built for the rows that make the cut.
+_IN_SCOPE = "(:courses IS NULL OR {} IN (SELECT value FROM json_each(:courses)))"
+
+SEARCH_SQL = f"""
+    WITH hits (kind, ref_id, course_id, title, doc_id, rank) AS (
+        SELECT 'course', c.course_id, c.course_id, c.title, NULL, bm25(CourseSearch, 10.0, 1.0)
+        FROM CourseSearch
+                 CROSS JOIN Course c ON c.course_id = CourseSearch.rowid
+        WHERE CourseSearch MATCH :query
+          AND {_IN_SCOPE.format("c.course_id")}
+        UNION ALL
+        SELECT 'material', m.material_id, m.course_id, m.pdf_file, NULL, bm25(MaterialSearch)
+        FROM MaterialSearch
+                 CROSS JOIN CourseMaterial m ON m.material_id = MaterialSearch.rowid
+        WHERE MaterialSearch MATCH :query
+          AND {_IN_SCOPE.format("m.course_id")}
+        UNION ALL
+        SELECT 'assignment', a.assignment_id, a.course_id, a.pdf_file, NULL, bm25(AssignmentSearch)
+        FROM AssignmentSearch
+                 CROSS JOIN Assignment a ON a.assignment_id = AssignmentSearch.rowid
+        WHERE AssignmentSearch MATCH :query
+          AND {_IN_SCOPE.format("a.course_id")}
+        UNION ALL
+        SELECT 'material', m.material_id, m.course_id, m.pdf_file, d.doc_id, bm25(DocumentSearch)
+        FROM DocumentSearch
+                 CROSS JOIN DocumentText d ON d.doc_id = DocumentSearch.rowid
+                 CROSS JOIN CourseMaterial m ON m.file_hash = d.sha256
+        WHERE DocumentSearch MATCH :query
+          AND d.store = 'materials'
+          AND {_IN_SCOPE.format("m.course_id")}
+        UNION ALL
+        SELECT 'assignment', a.assignment_id, a.course_id, a.pdf_file, d.doc_id, bm25(DocumentSearch)
+        FROM DocumentSearch
+                 CROSS JOIN DocumentText d ON d.doc_id = DocumentSearch.rowid
+                 CROSS JOIN Assignment a ON a.file_hash = d.sha256
+        WHERE DocumentSearch MATCH :query
+          AND d.store = 'assignments'
+          AND {_IN_SCOPE.format("a.course_id")}
+    ),
+    best AS (
+        SELECT kind, ref_id, course_id, title, doc_id, MIN(rank) AS rank
+        FROM hits
+        GROUP BY kind, ref_id
+        ORDER BY rank
+        LIMIT :limit
+    )
+    SELECT kind, ref_id, course_id, title,
+           CASE
+               WHEN kind = 'course' THEN
+                   (SELECT snippet(CourseSearch, 1, '[', ']', '...', 12)
+                    FROM CourseSearch WHERE CourseSearch MATCH :query AND rowid = ref_id)
+               WHEN doc_id IS NOT NULL THEN
+                   (SELECT snippet(DocumentSearch, 0, '[', ']', '...', 12)
+                    FROM DocumentSearch WHERE DocumentSearch MATCH :query AND rowid = doc_id)
+               END AS snippet,
+           rank
+    FROM best
+    ORDER BY rank
+"""
+
+def match_expression(text):
+    """FTS5 query for free text: every word must match, each as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in ``text`` are
+    searched for literally instead of being parsed. Returns None when
+    ``text`` has no words.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+class SearchController:
+    def __init__(self, db_path='database.db'):
+        self.db_path = db_path
+        self.db = DBHelper(db_path)
+
+    def search(self, text, course_ids=None, limit=20):
+        """Best matches for ``text``, optionally only within ``course_ids``."""
+        query = match_expression(text)
+        if query is None:
+            return []
+        courses = None if course_ids is None else json.dumps(list(course_ids))
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute(SEARCH_SQL, {"query": query, "courses": courses, "limit": limit})
+            return SearchHit.fetch_all(cur)
+
+    def index_document(self, store, sha256, text):
+        """Store the extracted text of a stored file so its contents are searchable."""
+        with self.db.connection() as conn:
+            conn.execute("""
+                         INSERT INTO DocumentText (store, sha256, text)
+                         VALUES (?, ?, ?)
+                         ON CONFLICT (store, sha256) DO UPDATE SET text = excluded.text
+                         """, (store, sha256, text))
+
+    def is_indexed(self, store, sha256):
+        with self.db.reader() as conn:
+            return conn.execute("SELECT 1 FROM DocumentText WHERE store = ? AND sha256 = ?",
+                                (store, sha256)).fetchone() is not None
+
+    def optimize(self):
+        """Merge the FTS b-trees; worth running after large imports."""
+        with self.db.connection() as conn:
+            for table in ("CourseSearch", "MaterialSearch", "AssignmentSearch", "DocumentSearch"):
+                conn.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
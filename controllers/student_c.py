@@ -1,28 +1,26 @@
-import sqlite3
 from models.student import Student
+from utils.cache import cached_read
+from utils.db_helper import DBHelper
 
 class StudentController:
     def __init__(self, db_path='database.db'):
         self.db_path = db_path
+        self.db = DBHelper(db_path)
 
-    def create_student(self, user_id, kelas, tahun):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO Student (user_id, kelas, tahun) VALUES (?, ?, ?)",
-            (user_id, kelas, tahun)
-        )
-        conn.commit()
-        student_id = cur.lastrowid
-        conn.close()
-        return Student(student_id, user_id, kelas, tahun)
+    def create_student(self, user_id):
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO Student (user_id) VALUES (?)",
+                (user_id,)
+            )
+            student_id = cur.lastrowid
+        StudentController.get_student_by_user_id.invalidate(self, user_id)
+        return Student(student_id, user_id)
 
+    @cached_read(maxsize=512, ttl=60.0)
     def get_student_by_user_id(self, user_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Student WHERE user_id = ?", (user_id,))
-        row = cur.fetchone()
-        conn.close()
-        if row:
-            return Student(*row)
-        return None
\ No newline at end of file
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Student WHERE user_id = ?", (user_id,))
+            return Student.fetch_one(cur)
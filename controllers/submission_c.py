@@ -1,36 +1,148 @@
-import sqlite3
+import csv
+import io
+import json
 from models.submission import Submission
+from utils.db_helper import DBHelper
+from utils.grade_stats import MAX_GRADE
+
+GRADE_COLUMNS = ["submission_id", "username", "email", "submission_time", "grade"]
+
+GRADED = "graded"
+UNCHANGED = "unchanged"
+NO_SUBMISSION = "no submission"
+NOT_IN_COURSE = "not in this course"
+INVALID_GRADE = "invalid grade"
+
+
+def parse_grade(value):
+    """A grade as stored: None for blank, else a number from 0 to MAX_GRADE as text.
+
+    Raises ValueError for anything else.
+    """
+    text = "" if value is None else str(value).strip()
+    if not text:
+        return None
+    number = float(text.replace(",", "."))
+    if not 0 <= number <= MAX_GRADE:
+        raise ValueError(f"grade must be between 0 and {MAX_GRADE}")
+    return str(int(number)) if number.is_integer() else str(round(number, 2))
+
+
+def write_grade_sheet(rows):
+    """CSV text with a GRADE_COLUMNS header, one line per row tuple."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(GRADE_COLUMNS)
+    writer.writerows(["" if value is None else value for value in row] for row in rows)
+    return out.getvalue()
+
+
+def read_grade_sheet(text):
+    """Dicts with the GRADE_COLUMNS a CSV grade sheet has; needs a grade column.
+
+    Header names are matched case-insensitively, so an exported sheet
+    edited in a spreadsheet reads back.
+    """
+    reader = csv.reader(io.StringIO(text.lstrip("\ufeff")))
+    header = [cell.strip().lower() for cell in next(reader, [])]
+    if "grade" not in header:
+        raise ValueError("the sheet needs a 'grade' column")
+    columns = [(name, header.index(name)) for name in GRADE_COLUMNS if name in header]
+    return [{name: row[i].strip() if i < len(row) else "" for name, i in columns}
+            for row in reader if any(cell.strip() for cell in row)]
+
 
 class SubmissionController:
     def __init__(self, db_path='database.db'):
         self.db_path = db_path
+        self.db = DBHelper(db_path)
+
+    def submit_assignment(self, assignment_id, student_id, pdf_file, grade=None, submission_time=None):
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO Submission (assignment_id, student_id, pdf_file, grade, submission_time) "
+                "VALUES (?, ?, ?, ?, COALESCE(?, datetime('now'))) RETURNING *",
+                (assignment_id, student_id, pdf_file, grade, submission_time)
+            )
+            return Submission.fetch_one(cur)
+
+    def open_for_submission(self, requests):
+        """For ``(assignment_id, epoch_second)`` pairs, whether each is by the due time.
+
+        Run it in the write transaction that records them, so the due
+        date checked is the one in force when they are saved.
+        """
+        with self.db.reader() as conn:
+            cur = conn.execute("""
+                               SELECT r.key, r.value ->> 1 <= a.due_at
+                               FROM json_each(?) r
+                                        LEFT JOIN Assignment a ON a.assignment_id = r.value ->> 0
+                               """, (json.dumps([list(request) for request in requests]),))
+            on_time = dict(cur.fetchall())
+        return [bool(on_time[i]) for i in range(len(requests))]
 
-    def submit_assignment(self, assignment_id, student_id, file_url, nilai=None, timestamp=None):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT OR REPLACE INTO Submission (assignment_id, student_id, file_url, nilai, timestamp) VALUES (?, ?, ?, ?, ?)",
-            (assignment_id, student_id, file_url, nilai, timestamp)
-        )
-        conn.commit()
-        submission_id = cur.lastrowid
-        conn.close()
-        return Submission(submission_id, assignment_id, student_id, file_url, nilai, timestamp)
+    def record_submissions(self, rows):
+        """Insert ``(assignment_id, student_id, pdf_file, file_hash, submission_time)`` rows
+        in one transaction; returns the Submissions in order.
+        """
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            saved = []
+            for row in rows:
+                cur.execute(
+                    "INSERT INTO Submission (assignment_id, student_id, pdf_file, file_hash, submission_time) "
+                    "VALUES (?, ?, ?, ?, ?) RETURNING *", row)
+                saved.append(Submission.fetch_one(cur))
+            return saved
 
     def get_submissions_by_assignment(self, assignment_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Submission WHERE assignment_id = ?", (assignment_id,))
-        rows = cur.fetchall()
-        conn.close()
-        return [Submission(*row) for row in rows]
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Submission WHERE assignment_id = ?", (assignment_id,))
+            return Submission.fetch_all(cur)
 
     def get_submission_by_student_and_assignment(self, student_id, assignment_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Submission WHERE student_id = ? AND assignment_id = ?", (student_id, assignment_id))
-        row = cur.fetchone()
-        conn.close()
-        if row:
-            return Submission(*row)
-        return None
\ No newline at end of file
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Submission WHERE student_id = ? AND assignment_id = ?", (student_id, assignment_id))
+            return Submission.fetch_one(cur)
+
+    def get_submission_by_id(self, submission_id):
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Submission WHERE submission_id = ?", (submission_id,))
+            return Submission.fetch_one(cur)
+
+    def grade_submissions(self, changes):
+        """Set many grades in one transaction, where each is still what the caller saw.
+
+        ``changes`` holds ``(submission_id, grade, expected_grade)`` triples.
+        If any submission no longer has its expected grade nothing is
+        written, and ``(submission_id, current_grade)`` is returned for each
+        of them; an empty list means every grade was saved.
+        """
+        changes = list(changes)
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                        SELECT submission_id, grade
+                        FROM Submission
+                        WHERE submission_id IN (SELECT value FROM json_each(?))
+                        """, (json.dumps([submission_id for submission_id, _, _ in changes]),))
+            current = dict(cur.fetchall())
+            conflicts = [(submission_id, current.get(submission_id))
+                         for submission_id, _, expected in changes
+                         if submission_id not in current or current[submission_id] != expected]
+            if conflicts:
+                return conflicts
+            cur.executemany("UPDATE Submission SET grade = ? WHERE submission_id = ?",
+                            [(grade, submission_id) for submission_id, grade, _ in changes])
+        return []
+
+    def grade_submission(self, submission_id, grade):
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("UPDATE Submission SET grade = ? WHERE submission_id = ? RETURNING *",
+                        (grade, submission_id))
+            return Submission.fetch_one(cur)
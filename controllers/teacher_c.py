@@ -1,28 +1,26 @@
-import sqlite3
 from models.teacher import Teacher
+from utils.cache import cached_read
+from utils.db_helper import DBHelper
 
 class TeacherController:
     def __init__(self, db_path='database.db'):
         self.db_path = db_path
+        self.db = DBHelper(db_path)
 
-    def create_teacher(self, user_id, departemen, spesialisasi):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO Teacher (user_id) VALUES (?, ?, ?)",
-            (user_id, departemen, spesialisasi)
-        )
-        conn.commit()
-        teacher_id = cur.lastrowid
-        conn.close()
-        return Teacher(teacher_id, user_id, departemen, spesialisasi)
+    def create_teacher(self, user_id):
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO Teacher (user_id) VALUES (?)",
+                (user_id,)
+            )
+            teacher_id = cur.lastrowid
+        TeacherController.get_teacher_by_user_id.invalidate(self, user_id)
+        return Teacher(teacher_id, user_id)
 
+    @cached_read(maxsize=512, ttl=60.0)
     def get_teacher_by_user_id(self, user_id):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM Teacher WHERE user_id = ?", (user_id,))
-        row = cur.fetchone()
-        conn.close()
-        if row:
-            return Teacher(*row)
-        return None
\ No newline at end of file
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM Teacher WHERE user_id = ?", (user_id,))
+            return Teacher.fetch_one(cur)
@@ -1,40 +1,73 @@
 import sqlite3
 from models.user import User
-from utils.password import hash_password, verify_password
+from utils.password import hash_password, verify_password, needs_rehash, burn_verify
+from utils.cache import cached_read
+from utils.db_helper import DBHelper
 
 class UserController:
     def __init__(self, db_path='database.db'):
         self.db_path = db_path
+        self.db = DBHelper(db_path)
 
     def create_user(self, username, email, password):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        hashed_password = hash_password(password)
+        return self.add_user(username, email, hash_password(password))
+
+    def add_user(self, username, email, hashed_password):
+        """Insert a user whose password is already hashed; None if the name or email is taken.
+
+        Hash first, outside any write transaction: the key derivation is
+        the slow part and the writer is shared.
+        """
         try:
-            cur.execute(
-                "INSERT INTO User (username, email, password) VALUES (?, ?, ?)",
-                (username, email, hashed_password)
-            )
-            conn.commit()
-            user_id = cur.lastrowid
-            return User(user_id, username, email, hashed_password)
+            with self.db.connection() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    "INSERT INTO User (username, email, password) VALUES (?, ?, ?)",
+                    (username, email, hashed_password)
+                )
+                user_id = cur.lastrowid
         except sqlite3.IntegrityError:
             return None
-        finally:
-            conn.close()
+        UserController.get_user_by_username.invalidate(self, username)
+        return User(user_id, username, email, hashed_password)
 
+    @cached_read(maxsize=512, ttl=60.0)
     def get_user_by_username(self, username):
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM User WHERE username = ?", (username,))
-        row = cur.fetchone()
-        conn.close()
-        if row:
-            return User(*row)
-        return None
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM User WHERE username = ?", (username,))
+            return User.fetch_one(cur)
 
     def verify_user(self, username, password):
-        user = self.get_user_by_username(username)
-        if user and verify_password(password, user.password):
-            return user
-        return None
\ No newline at end of file
+        """The matching User, or None; upgrades outdated hashes on success.
+
+        Runs a full key derivation, so call it from a worker thread.
+        """
+        # Read the hash directly; the cached lookup may predate a rehash
+        with self.db.reader() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT * FROM User WHERE username = ?", (username,))
+            user = User.fetch_one(cur)
+        if user is None:
+            return burn_verify(password) or None
+        if not verify_password(password, user.password):
+            return None
+        if needs_rehash(user.password):
+            self.update_password(user, hash_password(password), expected=user.password)
+        return user
+
+    def update_password(self, user, hashed_password, expected=None):
+        """Store a new hash; with ``expected``, only if the stored hash is unchanged."""
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            if expected is None:
+                cur.execute("UPDATE User SET password = ? WHERE user_id = ?",
+                            (hashed_password, user.user_id))
+            else:
+                cur.execute("UPDATE User SET password = ? WHERE user_id = ? AND password = ?",
+                            (hashed_password, user.user_id, expected))
+            updated = cur.rowcount == 1
+        if updated:
+            user.password = hashed_password
+            UserController.get_user_by_username.invalidate(self, user.username)
+        return updated
@@ -1,7 +1,18 @@
+import re
 import sqlite3
+import sys
 
-def init_db():
-    conn = sqlite3.connect('database.db')
+
+def init_db(db_path='database.db'):
+    conn = sqlite3.connect(db_path)
+    # Persistent; the read-only pool connections rely on it (utils.db_helper)
+    conn.execute("PRAGMA journal_mode=WAL")
+    create_tables(conn)
+    migrate(conn)
+    conn.close()
+
+
+def create_tables(conn):
     cur = conn.cursor()
 
     # User Table
@@ -96,8 +107,696 @@ def init_db():
     ''')
 
     conn.commit()
-    conn.close()
+
+
+# Dashboard counters kept current by the triggers in migration 2.
+# TeacherStudent counts how many of a teacher's courses each student is in,
+# so total_students can stay a distinct count without rescanning Enrollment.
+STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS TeacherStats (
+        teacher_id INTEGER PRIMARY KEY,
+        total_courses INTEGER NOT NULL DEFAULT 0,
+        total_students INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS StudentStats (
+        student_id INTEGER PRIMARY KEY,
+        total_courses INTEGER NOT NULL DEFAULT 0,
+        total_assignments INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS TeacherStudent (
+        teacher_id INTEGER NOT NULL,
+        student_id INTEGER NOT NULL,
+        courses INTEGER NOT NULL,
+        PRIMARY KEY (teacher_id, student_id)
+    ) WITHOUT ROWID
+    """,
+]
+
+STATS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_teacher_stats_init AFTER INSERT ON Teacher
+    BEGIN
+        INSERT OR IGNORE INTO TeacherStats (teacher_id) VALUES (NEW.teacher_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_student_stats_init AFTER INSERT ON Student
+    BEGIN
+        INSERT OR IGNORE INTO StudentStats (student_id) VALUES (NEW.student_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_course_insert AFTER INSERT ON Course
+    WHEN NEW.teacher_id IS NOT NULL
+    BEGIN
+        INSERT INTO TeacherStats (teacher_id, total_courses) VALUES (NEW.teacher_id, 1)
+        ON CONFLICT (teacher_id) DO UPDATE SET total_courses = total_courses + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_course_delete AFTER DELETE ON Course
+    BEGIN
+        UPDATE TeacherStats SET total_courses = total_courses - 1
+        WHERE teacher_id = OLD.teacher_id;
+        UPDATE StudentStats
+        SET total_courses = total_courses - 1,
+            total_assignments = total_assignments
+                - (SELECT COUNT(*) FROM Assignment WHERE course_id = OLD.course_id)
+        WHERE student_id IN (SELECT student_id FROM Enrollment WHERE course_id = OLD.course_id);
+        UPDATE TeacherStudent SET courses = courses - 1
+        WHERE teacher_id = OLD.teacher_id
+          AND student_id IN (SELECT student_id FROM Enrollment WHERE course_id = OLD.course_id);
+        UPDATE TeacherStats
+        SET total_students = total_students
+            - (SELECT COUNT(*) FROM TeacherStudent WHERE teacher_id = OLD.teacher_id AND courses = 0)
+        WHERE teacher_id = OLD.teacher_id;
+        DELETE FROM TeacherStudent WHERE teacher_id = OLD.teacher_id AND courses = 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_enrollment_insert AFTER INSERT ON Enrollment
+    BEGIN
+        INSERT INTO StudentStats (student_id, total_courses, total_assignments)
+        VALUES (NEW.student_id, 1, (SELECT COUNT(*) FROM Assignment WHERE course_id = NEW.course_id))
+        ON CONFLICT (student_id) DO UPDATE
+            SET total_courses = total_courses + 1,
+                total_assignments = total_assignments + excluded.total_assignments;
+        INSERT INTO TeacherStudent (teacher_id, student_id, courses)
+        SELECT teacher_id, NEW.student_id, 1 FROM Course
+        WHERE course_id = NEW.course_id AND teacher_id IS NOT NULL
+        ON CONFLICT (teacher_id, student_id) DO UPDATE SET courses = courses + 1;
+        UPDATE TeacherStats SET total_students = total_students + 1
+        WHERE teacher_id = (SELECT teacher_id FROM Course WHERE course_id = NEW.course_id)
+          AND (SELECT courses FROM TeacherStudent
+               WHERE teacher_id = TeacherStats.teacher_id AND student_id = NEW.student_id) = 1;
+    END
+    """,
+    # Enrollments and assignments left behind by a deleted course were
+    # already subtracted by trg_stats_course_delete.
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_enrollment_delete AFTER DELETE ON Enrollment
+    WHEN EXISTS (SELECT 1 FROM Course WHERE course_id = OLD.course_id)
+    BEGIN
+        UPDATE StudentStats
+        SET total_courses = total_courses - 1,
+            total_assignments = total_assignments
+                - (SELECT COUNT(*) FROM Assignment WHERE course_id = OLD.course_id)
+        WHERE student_id = OLD.student_id;
+        UPDATE TeacherStudent SET courses = courses - 1
+        WHERE teacher_id = (SELECT teacher_id FROM Course WHERE course_id = OLD.course_id)
+          AND student_id = OLD.student_id;
+        UPDATE TeacherStats SET total_students = total_students - 1
+        WHERE teacher_id = (SELECT teacher_id FROM Course WHERE course_id = OLD.course_id)
+          AND (SELECT courses FROM TeacherStudent
+               WHERE teacher_id = TeacherStats.teacher_id AND student_id = OLD.student_id) = 0;
+        DELETE FROM TeacherStudent
+        WHERE teacher_id = (SELECT teacher_id FROM Course WHERE course_id = OLD.course_id)
+          AND student_id = OLD.student_id AND courses = 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_assignment_insert AFTER INSERT ON Assignment
+    BEGIN
+        UPDATE StudentStats SET total_assignments = total_assignments + 1
+        WHERE student_id IN (SELECT student_id FROM Enrollment WHERE course_id = NEW.course_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_stats_assignment_delete AFTER DELETE ON Assignment
+    WHEN EXISTS (SELECT 1 FROM Course WHERE course_id = OLD.course_id)
+    BEGIN
+        UPDATE StudentStats SET total_assignments = total_assignments - 1
+        WHERE student_id IN (SELECT student_id FROM Enrollment WHERE course_id = OLD.course_id);
+    END
+    """,
+]
+
+
+def rebuild_stats(conn):
+    """Recompute the dashboard counters from scratch, e.g. to repair drift.
+
+    Runs inside the caller's transaction; does not commit.
+    """
+    conn.execute("DELETE FROM TeacherStudent")
+    conn.execute("DELETE FROM TeacherStats")
+    conn.execute("DELETE FROM StudentStats")
+    conn.execute("""
+        INSERT INTO TeacherStudent (teacher_id, student_id, courses)
+        SELECT c.teacher_id, e.student_id, COUNT(*)
+        FROM Enrollment e
+                 JOIN Course c ON e.course_id = c.course_id
+        WHERE c.teacher_id IS NOT NULL
+        GROUP BY c.teacher_id, e.student_id
+    """)
+    conn.execute("""
+        INSERT INTO TeacherStats (teacher_id, total_courses, total_students)
+        SELECT t.teacher_id,
+               (SELECT COUNT(*) FROM Course c WHERE c.teacher_id = t.teacher_id),
+               (SELECT COUNT(*) FROM TeacherStudent ts WHERE ts.teacher_id = t.teacher_id)
+        FROM Teacher t
+    """)
+    conn.execute("""
+        INSERT INTO StudentStats (student_id, total_courses, total_assignments)
+        SELECT s.student_id,
+               (SELECT COUNT(*)
+                FROM Enrollment e JOIN Course c ON e.course_id = c.course_id
+                WHERE e.student_id = s.student_id),
+               (SELECT COUNT(*)
+                FROM Enrollment e
+                         JOIN Course c ON e.course_id = c.course_id
+                         JOIN Assignment a ON a.course_id = c.course_id
+                WHERE e.student_id = s.student_id)
+        FROM Student s
+    """)
+
+
+# Content-addressed uploads (utils/file_store.py). Rows point at a file by
+# hash; these triggers keep StoredFile.ref_count in step with them.
+FILE_STORE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS StoredFile (
+        store TEXT NOT NULL,
+        sha256 TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        ref_count INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (store, sha256)
+    ) WITHOUT ROWID
+    """,
+    "ALTER TABLE CourseMaterial ADD COLUMN file_hash TEXT",
+    "ALTER TABLE Assignment ADD COLUMN file_hash TEXT",
+]
+
+
+def file_ref_triggers(table, store):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_file_ref AFTER INSERT ON {table}
+        WHEN NEW.file_hash IS NOT NULL
+        BEGIN
+            UPDATE StoredFile SET ref_count = ref_count + 1
+            WHERE store = '{store}' AND sha256 = NEW.file_hash;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_file_unref AFTER DELETE ON {table}
+        WHEN OLD.file_hash IS NOT NULL
+        BEGIN
+            UPDATE StoredFile SET ref_count = ref_count - 1
+            WHERE store = '{store}' AND sha256 = OLD.file_hash;
+        END
+        """,
+    ]
+
+
+# Full-text search (controllers/search_c.py). Each FTS5 table indexes the
+# columns of its content table without copying them; the triggers below
+# keep it in step with inserts, updates and deletes.
+SEARCH_TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+SEARCH_INDEXES = [
+    # (fts table, content table, key column, indexed columns)
+    ("CourseSearch", "Course", "course_id", ("title", "description")),
+    ("MaterialSearch", "CourseMaterial", "material_id", ("pdf_file",)),
+    ("AssignmentSearch", "Assignment", "assignment_id", ("pdf_file",)),
+    ("DocumentSearch", "DocumentText", "doc_id", ("text",)),
+]
+
+SEARCH_SCHEMA = [
+    # Text extracted from stored PDFs, one row per (store, content hash)
+    """
+    CREATE TABLE IF NOT EXISTS DocumentText (
+        doc_id INTEGER PRIMARY KEY,
+        store TEXT NOT NULL,
+        sha256 TEXT NOT NULL,
+        text TEXT NOT NULL,
+        UNIQUE (store, sha256)
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_storedfile_document_text AFTER DELETE ON StoredFile
+    BEGIN
+        DELETE FROM DocumentText WHERE store = OLD.store AND sha256 = OLD.sha256;
+    END
+    """,
+    # Text hits are mapped back to the rows that reference the file
+    "CREATE INDEX IF NOT EXISTS idx_material_file_hash ON CourseMaterial (file_hash)",
+    "CREATE INDEX IF NOT EXISTS idx_assignment_file_hash ON Assignment (file_hash)",
+]
+
+
+def due_at_sql(due_date):
+    """SQL for the epoch second (UTC) at which the TEXT due date ``due_date`` ends.
+
+    A date-only value, as the course page's date picker stores it, lasts
+    until the end of that day.
+    """
+    return (f"CAST(strftime('%s', CASE WHEN length({due_date}) = 10 THEN {due_date} || ' 23:59:59' "
+            f"ELSE {due_date} END) AS INTEGER)")
+
+
+# Assignment.due_at is the deadline as an integer, so range scans over the
+# (course_id, due_at) index compare numbers instead of reformatting text;
+# due_date stays as it was entered, for display
+DUE_AT_SCHEMA = [
+    "ALTER TABLE Assignment ADD COLUMN due_at INTEGER",
+    f"UPDATE Assignment SET due_at = {due_at_sql('due_date')}",
+    # Writers that only set due_date still get a due_at
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_assignment_due_at_insert AFTER INSERT ON Assignment
+    WHEN NEW.due_at IS NULL
+    BEGIN
+        UPDATE Assignment SET due_at = {due_at_sql('NEW.due_date')} WHERE assignment_id = NEW.assignment_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_assignment_due_at_update AFTER UPDATE OF due_date ON Assignment
+    BEGIN
+        UPDATE Assignment SET due_at = {due_at_sql('NEW.due_date')} WHERE assignment_id = NEW.assignment_id;
+    END
+    """,
+    "DROP INDEX IF EXISTS idx_assignment_course_due",
+    # Due in a time range, per course: pending counts and upcoming lists
+    "CREATE INDEX IF NOT EXISTS idx_assignment_course_due_at ON Assignment (course_id, due_at)",
+]
+
+
+# Learning activity written by utils.activity.ActivityLog: raw events, kept
+# for a while, and hourly/daily counts per course and per student in it,
+# kept for good. ``period`` is the bucket length in seconds and ``bucket``
+# the epoch second it starts at.
+ACTIVITY_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS ActivityEvent (
+        event_id INTEGER PRIMARY KEY,
+        at INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        user_id INTEGER,
+        student_id INTEGER,
+        course_id INTEGER,
+        item_id INTEGER
+    )
+    """,
+    # Retention deletes by age
+    "CREATE INDEX IF NOT EXISTS idx_activity_event_at ON ActivityEvent (at)",
+    """
+    CREATE TABLE IF NOT EXISTS CourseActivity (
+        course_id INTEGER NOT NULL,
+        period INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        events INTEGER NOT NULL,
+        PRIMARY KEY (course_id, period, bucket, kind)
+    ) WITHOUT ROWID
+    """,
+    # course_id 0 holds a student's activity outside any course
+    """
+    CREATE TABLE IF NOT EXISTS StudentActivity (
+        course_id INTEGER NOT NULL,
+        period INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        student_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        events INTEGER NOT NULL,
+        PRIMARY KEY (course_id, period, bucket, student_id, kind)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+
+def score_sql(grade):
+    """SQL for the TEXT grade ``grade`` as a number from 0 to 100, else NULL.
+
+    Besides plain numbers as parse_grade stores them, older grades may be
+    a percentage ('85%'), use a decimal comma ('85,5') or be points out of
+    some other maximum ('17/20'). The backfill and the triggers share
+    these rules, so a grade scores the same whenever it was written.
+    """
+    def number(text):
+        return f"({text} GLOB '[0-9]*' AND {text} NOT GLOB '*[^0-9.]*' AND {text} NOT GLOB '*.*.*')"
+
+    return f"""(
+        SELECT CASE WHEN value BETWEEN 0 AND 100 THEN value END
+        FROM (SELECT CASE
+                  WHEN slash = 0 AND {number('text')} THEN CAST(text AS REAL)
+                  WHEN slash > 0 AND {number('points')} AND {number('out_of')} AND CAST(out_of AS REAL) > 0
+                      THEN CAST(points AS REAL) / CAST(out_of AS REAL) * 100
+              END AS value
+              FROM (SELECT text, instr(text, '/') AS slash,
+                           TRIM(substr(text, 1, instr(text, '/') - 1)) AS points,
+                           TRIM(substr(text, instr(text, '/') + 1)) AS out_of
+                    FROM (SELECT REPLACE(TRIM(RTRIM(TRIM({grade}), '%')), ',', '.') AS text))))"""
+
+
+# Submission.score is the grade as a number from 0 to 100 (NULL while
+# ungraded or when the grade is not a number) and Assignment.weight its
+# share of the final grade, so grade analytics read numbers straight into
+# arrays; grade stays as it was entered, for display
+GRADE_SCORE_SCHEMA = [
+    "ALTER TABLE Submission ADD COLUMN score REAL",
+    "ALTER TABLE Assignment ADD COLUMN weight REAL NOT NULL DEFAULT 1",
+    f"UPDATE Submission SET score = {score_sql('Submission.grade')} WHERE grade IS NOT NULL",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_submission_score_insert AFTER INSERT ON Submission
+    WHEN NEW.grade IS NOT NULL AND NEW.score IS NULL
+    BEGIN
+        UPDATE Submission SET score = {score_sql('NEW.grade')} WHERE submission_id = NEW.submission_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_submission_score_update AFTER UPDATE OF grade ON Submission
+    BEGIN
+        UPDATE Submission SET score = {score_sql('NEW.grade')} WHERE submission_id = NEW.submission_id;
+    END
+    """,
+    # A course's gradebook comes from its assignments' submissions alone
+    "CREATE INDEX IF NOT EXISTS idx_submission_assignment_score ON Submission (assignment_id, student_id, score)",
+]
+
+# MinHash signatures of stored submissions' text (utils.similarity), kept
+# per content hash so a similarity check only signs files it has not seen;
+# scheme names the signing parameters, which must match to compare
+TEXT_SIGNATURE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS TextSignature (
+        sha256 TEXT NOT NULL,
+        scheme TEXT NOT NULL,
+        shingles INTEGER NOT NULL,
+        signature BLOB NOT NULL,
+        PRIMARY KEY (sha256, scheme)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_storedfile_text_signature AFTER DELETE ON StoredFile
+    WHEN OLD.store = 'submissions'
+    BEGIN
+        DELETE FROM TextSignature WHERE sha256 = OLD.sha256;
+    END
+    """,
+]
+
+def search_index(fts, table, key, columns):
+    cols = ", ".join(columns)
+    new = ", ".join(f"NEW.{col}" for col in columns)
+    old = ", ".join(f"OLD.{col}" for col in columns)
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts}
+        USING fts5({cols}, content = '{table}', content_rowid = '{key}', {SEARCH_TOKENIZE})
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts.lower()}_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.{key}, {new});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts.lower()}_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.{key}, {old});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts.lower()}_update AFTER UPDATE OF {cols} ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.{key}, {old});
+            INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.{key}, {new});
+        END
+        """,
+        # Index the rows that already exist
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+# Schema migrations, applied in order on top of the base tables above.
+# Each entry is (user_version, description, steps); a step is either an SQL
+# string or a callable taking the connection. Never edit a shipped entry,
+# append a new one instead.
+MIGRATIONS = [
+    (1, "secondary indexes for foreign-key lookups", [
+        # Login / stats joins resolve a user to its role row
+        "CREATE INDEX IF NOT EXISTS idx_student_user ON Student (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_teacher_user ON Teacher (user_id)",
+        # Teacher dashboard counts and course lists
+        "CREATE INDEX IF NOT EXISTS idx_course_teacher ON Course (teacher_id)",
+        # Student dashboard: courses per student (course_id-first is the UNIQUE index)
+        "CREATE INDEX IF NOT EXISTS idx_enrollment_student ON Enrollment (student_id, course_id)",
+        # Course management history lists, newest first, without a table lookup
+        "CREATE INDEX IF NOT EXISTS idx_material_course_created "
+        "ON CourseMaterial (course_id, created_at, pdf_file, youtube_url)",
+        "CREATE INDEX IF NOT EXISTS idx_assignment_course_created "
+        "ON Assignment (course_id, created_at, pdf_file, due_date)",
+        # Pending-assignment count filters by course and due date
+        "CREATE INDEX IF NOT EXISTS idx_assignment_course_due ON Assignment (course_id, due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_submission_assignment ON Submission (assignment_id, submission_time)",
+        "CREATE INDEX IF NOT EXISTS idx_submission_student ON Submission (student_id, assignment_id)",
+    ]),
+    (2, "trigger-maintained dashboard counters", STATS_TABLES + STATS_TRIGGERS + [rebuild_stats]),
+    (3, "content-addressed file store", FILE_STORE_SCHEMA
+        + file_ref_triggers("CourseMaterial", "materials")
+        + file_ref_triggers("Assignment", "assignments")),
+    (4, "enrollment keyset pagination", [
+        # Course rosters page in enrollment_id order
+        "CREATE INDEX IF NOT EXISTS idx_enrollment_course ON Enrollment (course_id, enrollment_id)",
+    ]),
+    (5, "full-text search", SEARCH_SCHEMA
+        + [step for index in SEARCH_INDEXES for step in search_index(*index)]),
+    (6, "submission file store", [
+        # Rows from before keep file_hash NULL and their file name in submissions/
+        "ALTER TABLE Submission ADD COLUMN file_hash TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_submission_file_hash ON Submission (file_hash)",
+    ] + file_ref_triggers("Submission", "submissions")),
+    (7, "integer due timestamps", DUE_AT_SCHEMA),
+    (8, "learning activity log", ACTIVITY_SCHEMA),
+    (9, "numeric grades and assignment weights", GRADE_SCORE_SCHEMA),
+    (10, "submission text signatures", TEXT_SIGNATURE_SCHEMA),
+]
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending MIGRATIONS, one transaction each, then refresh statistics."""
+    version = get_schema_version(conn)
+    applied = []
+    for target, description, steps in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+        applied.append(description)
+    if applied:
+        conn.execute("ANALYZE")
+        conn.commit()
+    return applied
+
+
+# Representative shapes of the hot queries in Main.py and the controllers,
+# checked by `python database.py --check-plans`; tests/test_query_plans.py
+# checks the statements the controllers actually run.
+PLAN_CHECKS = [
+    ("login role lookup", """
+        SELECT u.user_id, t.teacher_id, s.student_id
+        FROM User u
+                 LEFT JOIN Teacher t ON u.user_id = t.user_id
+                 LEFT JOIN Student s ON u.user_id = s.user_id
+        WHERE u.username = ?
+     """, ("x",)),
+    ("teacher id by username", """
+        SELECT t.teacher_id FROM Teacher t JOIN User u ON t.user_id = u.user_id WHERE u.username = ?
+     """, ("x",)),
+    ("student id by username", """
+        SELECT s.student_id FROM Student s JOIN User u ON s.user_id = u.user_id WHERE u.username = ?
+     """, ("x",)),
+    ("student by email", """
+        SELECT s.student_id FROM Student s JOIN User u ON s.user_id = u.user_id WHERE u.email = ?
+     """, ("x",)),
+    ("teacher dashboard stats", """
+        SELECT ts.total_courses, ts.total_students
+        FROM User u
+                 JOIN Teacher t ON t.user_id = u.user_id
+                 JOIN TeacherStats ts ON ts.teacher_id = t.teacher_id
+        WHERE u.username = ?
+     """, ("x",)),
+    ("student dashboard stats", """
+        SELECT ss.total_courses, ss.total_assignments
+        FROM User u
+                 JOIN Student s ON s.user_id = u.user_id
+                 JOIN StudentStats ss ON ss.student_id = s.student_id
+        WHERE u.username = ?
+     """, ("x",)),
+    ("teacher course count", "SELECT COUNT(*) FROM Course WHERE teacher_id = ?", (1,)),
+    ("teacher student count", """
+        SELECT COUNT(DISTINCT student_id)
+        FROM Enrollment
+        WHERE course_id IN (SELECT course_id FROM Course WHERE teacher_id = ?)
+     """, (1,)),
+    ("student course count", "SELECT COUNT(*) FROM Enrollment WHERE student_id = ?", (1,)),
+    ("student pending assignments", """
+        SELECT COUNT(*)
+        FROM Assignment a
+                 JOIN Course c ON a.course_id = c.course_id
+                 JOIN Enrollment e ON c.course_id = e.course_id
+        WHERE e.student_id = ? AND a.due_at > ?
+     """, (1, 0)),
+    ("student deadlines in range", """
+        SELECT a.assignment_id, a.due_at
+        FROM Enrollment e
+                 CROSS JOIN Assignment a ON a.course_id = e.course_id
+        WHERE e.student_id = ? AND a.due_at >= ? AND a.due_at < ?
+     """, (1, 0, 1)),
+    ("course deadlines in range", """
+        SELECT assignment_id, due_at FROM Assignment
+        WHERE course_id = ? AND due_at >= ? AND due_at < ? ORDER BY due_at
+     """, (1, 0, 1)),
+    ("enrollment exists", "SELECT * FROM Enrollment WHERE course_id = ? AND student_id = ?", (1, 1)),
+    ("material history", """
+        SELECT pdf_file, youtube_url, created_at FROM CourseMaterial
+        WHERE course_id = ? ORDER BY created_at DESC
+     """, (1,)),
+    ("assignment history", """
+        SELECT pdf_file, due_date, created_at FROM Assignment
+        WHERE course_id = ? ORDER BY created_at DESC
+     """, (1,)),
+    ("course enrollments", """
+        SELECT u.username, u.email
+        FROM Enrollment e
+                 JOIN Student s ON e.student_id = s.student_id
+                 JOIN User u ON s.user_id = u.user_id
+        WHERE e.course_id = ?
+     """, (1,)),
+    ("course enrollments page", """
+        SELECT u.username, u.email
+        FROM Enrollment e
+                 JOIN Student s ON e.student_id = s.student_id
+                 JOIN User u ON s.user_id = u.user_id
+        WHERE e.course_id = ? AND e.enrollment_id > ?
+        ORDER BY e.enrollment_id LIMIT 100
+     """, (1, 0)),
+    ("course submissions", """
+        SELECT u.username, a.pdf_file, s.submission_time, s.grade
+        FROM Submission s
+                 JOIN Assignment a ON s.assignment_id = a.assignment_id
+                 JOIN Student st ON s.student_id = st.student_id
+                 JOIN User u ON st.user_id = u.user_id
+        WHERE a.course_id = ?
+     """, (1,)),
+    ("user by username", "SELECT * FROM User WHERE username = ?", ("x",)),
+    ("course by id", "SELECT * FROM Course WHERE course_id = ?", (1,)),
+    ("assignments by course", "SELECT * FROM Assignment WHERE course_id = ?", (1,)),
+    ("assignment by id", "SELECT * FROM Assignment WHERE assignment_id = ?", (1,)),
+    ("enrollments by student", "SELECT * FROM Enrollment WHERE student_id = ?", (1,)),
+    ("enrollments by course", "SELECT * FROM Enrollment WHERE course_id = ?", (1,)),
+    ("materials by course", "SELECT * FROM CourseMaterial WHERE course_id = ?", (1,)),
+    ("student by user", "SELECT * FROM Student WHERE user_id = ?", (1,)),
+    ("teacher by user", "SELECT * FROM Teacher WHERE user_id = ?", (1,)),
+    ("submissions by assignment", "SELECT * FROM Submission WHERE assignment_id = ?", (1,)),
+    ("materials by file hash", "SELECT * FROM CourseMaterial WHERE file_hash = ?", ("x",)),
+    ("assignments by file hash", "SELECT * FROM Assignment WHERE file_hash = ?", ("x",)),
+    ("submissions by file hash", "SELECT * FROM Submission WHERE file_hash = ?", ("x",)),
+    ("course activity", """
+        SELECT bucket, kind, events FROM CourseActivity
+        WHERE course_id = ? AND period = ? AND bucket >= ?
+     """, (1, 86400, 0)),
+    ("course activity by student", """
+        SELECT student_id, SUM(events) FROM StudentActivity
+        WHERE course_id = ? AND period = ? AND bucket >= ?
+        GROUP BY student_id
+     """, (1, 86400, 0)),
+    ("submission by student and assignment",
+     "SELECT * FROM Submission WHERE student_id = ? AND assignment_id = ?", (1, 1)),
+    ("course gradebook scores", """
+        SELECT s.student_id, s.assignment_id, s.submission_id, s.score
+        FROM Assignment a
+                 JOIN Submission s ON s.assignment_id = a.assignment_id
+        WHERE a.course_id IN (SELECT value FROM json_each(?))
+     """, ("[1]",)),
+    ("cached text signatures", """
+        SELECT sha256, shingles, signature FROM TextSignature
+        WHERE scheme = ? AND sha256 IN (SELECT value FROM json_each(?))
+     """, ("x", '["x"]')),
+]
+
+
+def explain(conn, query, params=()):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+
+
+# Plan steps that read every row without that being a problem
+ALLOWED_SCANS = ("SCAN CONSTANT ROW",)
+
+# A virtual table whose xBestIndex used a constraint: json_each reading the
+# list it was given, an FTS5 MATCH. "INDEX 0:" is a constraint-free scan.
+_VIRTUAL_INDEX_RE = re.compile(r"VIRTUAL TABLE INDEX (\d+):(.*)$")
+
+
+def full_scans(plan, allowed=ALLOWED_SCANS):
+    """The steps of ``plan`` that scan a table or an index from end to end.
+
+    Only SEARCH steps look rows up; "SCAN ... USING COVERING INDEX" still
+    reads the whole index, so it counts as a scan unless ``allowed`` lists it.
+    """
+    scans = []
+    for step in plan:
+        if not step.startswith("SCAN") or step.startswith(allowed):
+            continue
+        virtual = _VIRTUAL_INDEX_RE.search(step)
+        if virtual and (virtual[1] != "0" or virtual[2]):
+            continue
+        scans.append(step)
+    return scans
+
+
+def check_query_plans(conn, checks=PLAN_CHECKS):
+    """Return (name, plan) for every check whose plan full-scans a table."""
+    failures = []
+    for name, query, params in checks:
+        plan = explain(conn, query, params)
+        if full_scans(plan):
+            failures.append((name, plan))
+    return failures
+
 
 if __name__ == '__main__':
-    init_db()
-    print("Database and tables created successfully.")
\ No newline at end of file
+    db_path = 'database.db'
+    init_db(db_path)
+    if '--rebuild-stats' in sys.argv:
+        conn = sqlite3.connect(db_path)
+        with conn:
+            rebuild_stats(conn)
+        conn.close()
+        print("Dashboard stats rebuilt.")
+    elif '--check-plans' in sys.argv:
+        # Planned against an empty copy of the schema so the result depends
+        # on the available indexes, not on how much data is loaded.
+        conn = sqlite3.connect(':memory:')
+        create_tables(conn)
+        migrate(conn)
+        failures = check_query_plans(conn)
+        conn.close()
+        for name, plan in failures:
+            print(f"FULL SCAN in {name}: {' / '.join(plan)}")
+        if failures:
+            sys.exit(1)
+        print(f"All {len(PLAN_CHECKS)} query plans use an index.")
+    else:
+        print("Database and tables created successfully.")
\ No newline at end of file
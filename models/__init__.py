@@ -1,3 +1,4 @@
+from .base import Model
 from .user import User
 from .student import Student
 from .teacher import Teacher
@@ -5,4 +6,5 @@ from .course import Course
 from .enrollment import Enrollment
 from .assignment import Assignment
 from .submission import Submission
-from .material import Material
\ No newline at end of file
+from .material import Material
+from .search_hit import SearchHit
\ No newline at end of file
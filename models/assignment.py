@@ -1,9 +1,18 @@
-class Assignment:
-    def __init__(self, assignment_id, title, due_date, course_id):
+from .base import Model
+
+class Assignment(Model):
+    __slots__ = ("assignment_id", "course_id", "pdf_file", "due_date", "created_at", "file_hash", "due_at", "weight")
+
+    def __init__(self, assignment_id, course_id, pdf_file, due_date, created_at=None, file_hash=None, due_at=None,
+                 weight=1.0):
         self.assignment_id = assignment_id
-        self.title = title
-        self.due_date = due_date
         self.course_id = course_id
+        self.pdf_file = pdf_file
+        self.due_date = due_date
+        self.created_at = created_at
+        self.file_hash = file_hash
+        self.due_at = due_at
+        self.weight = weight
 
     def __repr__(self):
-        return f"<Assignment {self.assignment_id} {self.title}>"
\ No newline at end of file
+        return f"<Assignment {self.assignment_id} {self.pdf_file}>"
@@ -0,0 +1,52 @@
+from operator import itemgetter
+
+
+class Model:
+    """Base for the slotted row classes.
+
+    ``__slots__`` lists the fields in constructor order; rows are mapped
+    onto them by column name, so ``SELECT *`` and narrower selects both
+    work and column order does not matter.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def _mapping(cls, cursor):
+        """(getter, fields) for a cursor; getter is None when rows already match."""
+        names = [col[0] for col in cursor.description]
+        fields = [f for f in cls.__slots__ if f in names]
+        indices = [names.index(f) for f in fields]
+        if indices == list(range(len(names))):
+            return None, fields
+        if len(indices) == 1:
+            index = indices[0]
+            return (lambda row: (row[index],)), fields
+        return itemgetter(*indices), fields
+
+    @classmethod
+    def _positional(cls, fields):
+        return fields == list(cls.__slots__[:len(fields)])
+
+    @classmethod
+    def fetch_all(cls, cursor):
+        rows = cursor.fetchall()
+        getter, fields = cls._mapping(cursor)
+        if not cls._positional(fields):
+            return [cls(**dict(zip(fields, getter(row)))) for row in rows]
+        if getter is None:
+            return [cls(*row) for row in rows]
+        return [cls(*getter(row)) for row in rows]
+
+    @classmethod
+    def fetch_one(cls, cursor):
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        getter, fields = cls._mapping(cursor)
+        values = row if getter is None else getter(row)
+        if cls._positional(fields):
+            return cls(*values)
+        return cls(**dict(zip(fields, values)))
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
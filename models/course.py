@@ -1,9 +1,14 @@
-class Course:
-    def __init__(self, course_id, name, deskripsi, teacher_id):
+from .base import Model
+
+class Course(Model):
+    __slots__ = ("course_id", "title", "description", "teacher_id", "created_at")
+
+    def __init__(self, course_id, title, description=None, teacher_id=None, created_at=None):
         self.course_id = course_id
-        self.name = name
-        self.deskripsi = deskripsi
+        self.title = title
+        self.description = description
         self.teacher_id = teacher_id
+        self.created_at = created_at
 
     def __repr__(self):
-        return f"<Course {self.course_id} {self.name}>"
\ No newline at end of file
+        return f"<Course {self.course_id} {self.title}>"
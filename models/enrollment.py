@@ -1,8 +1,13 @@
-class Enrollment:
-    def __init__(self, enrollment_id, student_id, course_id):
+from .base import Model
+
+class Enrollment(Model):
+    __slots__ = ("enrollment_id", "course_id", "student_id", "enrolled_at")
+
+    def __init__(self, enrollment_id, course_id, student_id, enrolled_at=None):
         self.enrollment_id = enrollment_id
-        self.student_id = student_id
         self.course_id = course_id
+        self.student_id = student_id
+        self.enrolled_at = enrolled_at
 
     def __repr__(self):
-        return f"<Enrollment {self.enrollment_id} student:{self.student_id} course:{self.course_id}>"
\ No newline at end of file
+        return f"<Enrollment {self.enrollment_id} student:{self.student_id} course:{self.course_id}>"
@@ -1,9 +1,15 @@
-class Material:
-    def __init__(self, material_id, title, file_url, course_id):
+from .base import Model
+
+class Material(Model):
+    __slots__ = ("material_id", "course_id", "pdf_file", "youtube_url", "created_at", "file_hash")
+
+    def __init__(self, material_id, course_id, pdf_file, youtube_url=None, created_at=None, file_hash=None):
         self.material_id = material_id
-        self.title = title
-        self.file_url = file_url
         self.course_id = course_id
+        self.pdf_file = pdf_file
+        self.youtube_url = youtube_url
+        self.created_at = created_at
+        self.file_hash = file_hash
 
     def __repr__(self):
-        return f"<Material {self.material_id} {self.title}>"
\ No newline at end of file
+        return f"<Material {self.material_id} {self.pdf_file}>"
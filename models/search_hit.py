@@ -0,0 +1,15 @@
+from .base import Model
+
+class SearchHit(Model):
+    __slots__ = ("kind", "ref_id", "course_id", "title", "snippet", "rank")
+
+    def __init__(self, kind, ref_id, course_id, title, snippet=None, rank=0.0):
+        self.kind = kind          # "course", "material" or "assignment"
+        self.ref_id = ref_id      # primary key in the table named by kind
+        self.course_id = course_id
+        self.title = title
+        self.snippet = snippet
+        self.rank = rank          # bm25; lower is better
+
+    def __repr__(self):
+        return f"<SearchHit {self.kind} {self.ref_id} {self.title}>"
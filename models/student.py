@@ -1,7 +1,11 @@
-class Student:
-    def __init__(self, student_id, user_id, kelas, tahun):
+from .base import Model
+
+class Student(Model):
+    __slots__ = ("student_id", "user_id")
+
+    def __init__(self, student_id, user_id):
         self.student_id = student_id
         self.user_id = user_id
 
     def __repr__(self):
-        return f"<Student {self.student_id} user:{self.user_id}>"
\ No newline at end of file
+        return f"<Student {self.student_id} user:{self.user_id}>"
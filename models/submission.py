@@ -1,11 +1,19 @@
-class Submission:
-    def __init__(self, submission_id, assignment_id, student_id, file_url, nilai, timestamp):
+from .base import Model
+
+class Submission(Model):
+    __slots__ = ("submission_id", "assignment_id", "student_id", "pdf_file", "submission_time", "grade", "file_hash",
+                 "score")
+
+    def __init__(self, submission_id, assignment_id, student_id, pdf_file=None, submission_time=None, grade=None,
+                 file_hash=None, score=None):
         self.submission_id = submission_id
         self.assignment_id = assignment_id
         self.student_id = student_id
-        self.file_url = file_url
-        self.nilai = nilai
-        self.timestamp = timestamp
+        self.pdf_file = pdf_file
+        self.submission_time = submission_time
+        self.grade = grade
+        self.file_hash = file_hash
+        self.score = score
 
     def __repr__(self):
-        return f"<Submission {self.submission_id} assignment:{self.assignment_id} student:{self.student_id}>"
\ No newline at end of file
+        return f"<Submission {self.submission_id} assignment:{self.assignment_id} student:{self.student_id}>"
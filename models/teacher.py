@@ -1,7 +1,11 @@
-class Teacher:
-    def __init__(self, teacher_id, user_id, departemen, spesialisasi):
+from .base import Model
+
+class Teacher(Model):
+    __slots__ = ("teacher_id", "user_id")
+
+    def __init__(self, teacher_id, user_id):
         self.teacher_id = teacher_id
         self.user_id = user_id
 
     def __repr__(self):
-        return f"<Teacher {self.teacher_id} user:{self.user_id}>"
\ No newline at end of file
+        return f"<Teacher {self.teacher_id} user:{self.user_id}>"
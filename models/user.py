@@ -1,9 +1,13 @@
-class User:
-    def __init__(self, user_id, username, email, password):
+from .base import Model
+
+class User(Model):
+    __slots__ = ("user_id", "username", "email", "password")
+
+    def __init__(self, user_id, username, email, password=None):
         self.user_id = user_id
         self.username = username
         self.email = email
         self.password = password
 
     def __repr__(self):
-        return f"<User {self.user_id} {self.username}>"
\ No newline at end of file
+        return f"<User {self.user_id} {self.username}>"
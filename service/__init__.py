@@ -0,0 +1,3 @@
+from .errors import ServiceError, BadRequest, Unauthorized, Forbidden, NotFound, Conflict, Unavailable
+from .lms import LMSService
+from .client import ApiClient
@@ -0,0 +1,340 @@
+import base64
+import http.client
+import io
+import json
+import re
+import threading
+import time
+from urllib.parse import urlsplit, urlencode, unquote
+
+from service.errors import error_for_status
+from utils.export import Export, CSV
+
+# Reconnect rather than reuse a connection idle this long; the server
+# drops idle keep-alive connections after 15 seconds
+IDLE_RECONNECT = 10.0
+IDEMPOTENT = ("GET", "PUT", "DELETE")
+STREAM_CHUNK = 64 * 1024
+# Files larger than one chunk are submitted as a resumable upload
+UPLOAD_CHUNK = 1024 * 1024
+UPLOAD_ATTEMPTS = 5
+
+
+def _filename(disposition):
+    """The file name of a Content-Disposition value, preferring the UTF-8 ``filename*``."""
+    # The last one: the quoted fallback can hold text that looks like a parameter
+    extended = re.findall(r"filename\*=UTF-8''([^;\s]+)", disposition, re.IGNORECASE)
+    if extended:
+        return unquote(extended[-1])
+    plain = re.search(r'filename="([^"]*)"', disposition)
+    return plain.group(1) if plain else ""
+
+
+def _read(content):
+    return content if isinstance(content, (bytes, bytearray)) else content.read()
+
+
+class ApiClient:
+    """LMSService over HTTP, for clients that share a server (service/server.py).
+
+    Methods have the same signatures and results as LMSService and raise
+    the same ServiceError subclasses, so MainWindow can use either. Each
+    thread keeps its own keep-alive connection; close() closes them all.
+    """
+
+    def __init__(self, base_url, timeout=30.0):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.https = url.scheme == "https"
+        self.prefix = url.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()  # every thread's, so close() can reach them
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        with self._lock:
+            closed = conn is not None and conn not in self._connections
+        if closed:
+            conn = None  # close() was called since this thread's last request
+        elif conn is not None and time.monotonic() - self._local.last_used > IDLE_RECONNECT:
+            self._drop(conn)
+            conn = None
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=self.timeout)
+            with self._lock:
+                self._connections.add(conn)
+        return conn
+
+    def _drop(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+        conn.close()
+
+    def _target(self, path, query):
+        target = self.prefix + path
+        if query:
+            target += "?" + urlencode({k: v for k, v in query.items() if v is not None})
+        return target
+
+    @staticmethod
+    def _headers(token):
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+
+    @staticmethod
+    def _raise_for(response, data):
+        result = json.loads(data) if data else None
+        if response.status >= 400:
+            message = result.get("error") if isinstance(result, dict) else response.reason
+            raise error_for_status(response.status, message)
+        return result
+
+    def _call(self, method, path, token=None, body=None, query=None):
+        target = self._target(path, query)
+        headers = self._headers(token)
+        payload = None if body is None else json.dumps(body).encode("utf-8")
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request(method, target, body=payload, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                self._local.last_used = time.monotonic()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                self._drop(conn)
+                self._local.conn = None
+                # Requests that are safe to repeat get one retry on a new connection
+                if attempt == 2 or method not in IDEMPOTENT:
+                    raise
+        return self._raise_for(response, data)
+
+    def _stream(self, path, token, query):
+        """An Export read from a GET response as it arrives.
+
+        The download gets a connection of its own, so the thread's
+        keep-alive connection stays free while the file is being saved.
+        """
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request("GET", self._target(path, query), headers=self._headers(token))
+            response = conn.getresponse()
+            if response.status >= 400:
+                self._raise_for(response, response.read())
+        except BaseException:
+            conn.close()
+            raise
+        filename = _filename(response.getheader("Content-Disposition", ""))
+
+        def chunks():
+            try:
+                while True:
+                    chunk = response.read(STREAM_CHUNK)
+                    if not chunk:
+                        return
+                    yield chunk
+            finally:
+                conn.close()
+
+        return Export(filename or path.rsplit("/", 1)[-1],
+                      response.getheader("Content-Type", ""), chunks())
+
+    @staticmethod
+    def _page_query(after, sort_column, descending, limit):
+        return {"after": json.dumps(list(after)) if after is not None else None,
+                "sort": sort_column, "desc": "1" if descending else "0", "limit": limit}
+
+    @staticmethod
+    def _sort_query(sort_column, descending):
+        # "<column>:<asc|desc>", with an empty column for the default order
+        return f"{'' if sort_column is None else sort_column}:{'desc' if descending else 'asc'}"
+
+    @staticmethod
+    def _file_body(filename, content, **extra):
+        return {"filename": filename, "content": base64.b64encode(_read(content)).decode("ascii"), **extra}
+
+    def close(self):
+        """Close the keep-alive connection of every thread; later calls open new ones."""
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+        self._local.conn = None
+
+    # Accounts
+
+    def register(self, username, email, password, role):
+        return self._call("POST", "/register", body={
+            "username": username, "email": email, "password": password, "role": role})
+
+    def login(self, username, password):
+        return self._call("POST", "/login", body={"username": username, "password": password})
+
+    def logout(self, token):
+        return self._call("POST", "/logout", token)
+
+    def dashboard(self, token):
+        return self._call("GET", "/dashboard", token)
+
+    # Courses
+
+    def list_courses(self, token):
+        return self._call("GET", "/courses", token)
+
+    def course_feed(self, token, since=None, materials=None, assignments=None):
+        return self._call("GET", "/feed", token,
+                          query={"since": since, "materials": materials, "assignments": assignments})
+
+    def get_course(self, token, course_id):
+        return self._call("GET", f"/courses/{course_id}", token)
+
+    def create_course(self, token, title, description):
+        return self._call("POST", "/courses", token, {"title": title, "description": description})
+
+    def update_course(self, token, course_id, title=None, description=None):
+        return self._call("PATCH", f"/courses/{course_id}", token, {"title": title, "description": description})
+
+    def delete_course(self, token, course_id):
+        return self._call("DELETE", f"/courses/{course_id}", token)
+
+    def course_overview(self, token, course_id, roster_sort=(None, False), submissions_sort=(2, True)):
+        return self._call("GET", f"/courses/{course_id}/overview", token, query={
+            "roster_sort": self._sort_query(*roster_sort),
+            "submissions_sort": self._sort_query(*submissions_sort)})
+
+    # Enrollment
+
+    def enroll(self, token, course_id, emails):
+        return self._call("POST", f"/courses/{course_id}/enrollments", token, {"emails": list(emails)})
+
+    def roster_page(self, token, course_id, after=None, sort_column=None, descending=False, limit=None):
+        return self._call("GET", f"/courses/{course_id}/roster", token,
+                          query=self._page_query(after, sort_column, descending, limit))
+
+    # Materials and assignments
+
+    def list_materials(self, token, course_id):
+        return self._call("GET", f"/courses/{course_id}/materials", token)
+
+    def add_material(self, token, course_id, filename, content, youtube_url=None):
+        return self._call("POST", f"/courses/{course_id}/materials", token,
+                          self._file_body(filename, content, youtube_url=youtube_url))
+
+    def open_material(self, token, material_id):
+        return self._stream(f"/materials/{material_id}/file", token, None)
+
+    def list_assignments(self, token, course_id):
+        return self._call("GET", f"/courses/{course_id}/assignments", token)
+
+    def add_assignment(self, token, course_id, filename, content, due_date):
+        return self._call("POST", f"/courses/{course_id}/assignments", token,
+                          self._file_body(filename, content, due_date=due_date))
+
+    # Deadlines
+
+    def upcoming_deadlines(self, token, days=None):
+        return self._call("GET", "/deadlines", token, query={"days": days})
+
+    def course_deadlines(self, token, course_id, days=None):
+        return self._call("GET", f"/courses/{course_id}/deadlines", token, query={"days": days})
+
+    # Submissions and grading
+
+    def submit(self, token, assignment_id, filename, content):
+        """One request for a small file, a resumable upload (LMSService.start_upload) for a larger one.
+
+        At most two chunks of the file are held in memory.
+        """
+        src = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+        chunk, following = src.read(UPLOAD_CHUNK), src.read(UPLOAD_CHUNK)
+        if not following:
+            return self._call("POST", f"/assignments/{assignment_id}/submissions", token,
+                              self._file_body(filename, chunk))
+        upload_id = self._call("POST", f"/assignments/{assignment_id}/uploads", token,
+                               {"filename": filename})["upload_id"]
+        offset = 0
+        while chunk:
+            offset = self._send_chunk(token, upload_id, offset, chunk)
+            chunk, following = following, src.read(UPLOAD_CHUNK)
+        return self._call("POST", f"/uploads/{upload_id}/finish", token)
+
+    def _send_chunk(self, token, upload_id, offset, chunk):
+        """Send ``chunk`` of an upload from ``offset``; after a dropped
+        connection, ask the server how much arrived and send the rest.
+        """
+        end = offset + len(chunk)
+        start = offset
+        for attempt in range(1, UPLOAD_ATTEMPTS + 1):
+            try:
+                start = self._call("PUT", f"/uploads/{upload_id}", token,
+                                   {"content": base64.b64encode(chunk[start - offset:]).decode("ascii")},
+                                   query={"offset": start})["offset"]
+            except (http.client.HTTPException, OSError):
+                if attempt == UPLOAD_ATTEMPTS:
+                    raise
+                time.sleep(0.5 * attempt)
+                start = self._call("GET", f"/uploads/{upload_id}", token)["offset"]
+            if start == end:
+                return end
+            if not offset <= start < end:
+                raise ConnectionError(f"upload {upload_id} is at byte {start}, expected {offset} to {end}")
+        raise ConnectionError(f"upload {upload_id} stalled at byte {start}")
+
+    def submissions_page(self, token, course_id, after=None, sort_column=2, descending=True, limit=None):
+        return self._call("GET", f"/courses/{course_id}/submissions", token,
+                          query=self._page_query(after, sort_column, descending, limit))
+
+    def grade(self, token, submission_id, grade):
+        return self._call("PUT", f"/submissions/{submission_id}/grade", token, {"grade": grade})
+
+    def grade_batch(self, token, course_id, changes):
+        return self._call("POST", f"/courses/{course_id}/grades", token, {"changes": list(changes)})
+
+    def export_grades(self, token, assignment_id):
+        return self._call("GET", f"/assignments/{assignment_id}/grades", token)
+
+    def import_grades(self, token, assignment_id, sheet):
+        return self._call("POST", f"/assignments/{assignment_id}/grades", token, {"csv": sheet})
+
+    # Exports
+
+    def export_roster(self, token, fmt=CSV, course_id=None):
+        return self._stream("/exports/roster", token, {"format": fmt, "course": course_id})
+
+    def export_gradebook(self, token, fmt=CSV, course_id=None, layout="long"):
+        return self._stream("/exports/gradebook", token,
+                            {"format": fmt, "course": course_id, "layout": layout})
+
+    # Activity
+
+    def activity_overview(self, token, days=None):
+        return self._call("GET", "/activity", token, query={"days": days})
+
+    def course_activity(self, token, course_id, period=None, days=None):
+        return self._call("GET", f"/courses/{course_id}/activity", token, query={"period": period, "days": days})
+
+    # Grade analytics
+
+    def grade_overview(self, token):
+        return self._call("GET", "/analytics", token)
+
+    def grade_analytics(self, token, course_id):
+        return self._call("GET", f"/courses/{course_id}/analytics", token)
+
+    def set_assignment_weight(self, token, assignment_id, weight):
+        return self._call("PUT", f"/assignments/{assignment_id}/weight", token, {"weight": weight})
+
+    def similar_submissions(self, token, assignment_id, threshold=None):
+        return self._call("GET", f"/assignments/{assignment_id}/similar", token, query={"threshold": threshold})
+
+    # Search
+
+    def search(self, token, text, limit=20):
+        return self._call("GET", "/search", token, query={"q": text, "limit": limit})
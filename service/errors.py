@@ -0,0 +1,43 @@
+class ServiceError(Exception):
+    """A request the service refused; ``status`` is the matching HTTP status."""
+    status = 400
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        if status is not None:
+            self.status = status
+
+
+class BadRequest(ServiceError):
+    status = 400
+
+
+class Unauthorized(ServiceError):
+    status = 401
+
+
+class Forbidden(ServiceError):
+    status = 403
+
+
+class NotFound(ServiceError):
+    status = 404
+
+
+class Conflict(ServiceError):
+    status = 409
+
+
+class Unavailable(ServiceError):
+    """The server lacks something optional the request needs."""
+    status = 503
+
+
+_BY_STATUS = {cls.status: cls for cls in (BadRequest, Unauthorized, Forbidden, NotFound, Conflict,
+                                              Unavailable)}
+
+
+def error_for_status(status, message):
+    """Rebuild the ServiceError subclass for an HTTP error response."""
+    cls = _BY_STATUS.get(status)
+    return cls(message) if cls else ServiceError(message, status)
@@ -0,0 +1,764 @@
+import io
+import json
+import os
+import re
+import secrets
+import time
+
+from controllers.activity_c import ActivityController
+from controllers.analytics_c import GradeAnalyticsController
+from controllers.assignment_c import AssignmentController, due_timestamp
+from controllers.course_c import CourseController
+from controllers.enrollment_c import EnrollmentController
+from controllers.export_c import ExportController
+from controllers.material_c import MaterialController
+from controllers.search_c import SearchController
+from controllers.student_c import StudentController
+from controllers.submission_c import (SubmissionController, parse_grade, read_grade_sheet, write_grade_sheet,
+                                      GRADED, UNCHANGED, NO_SUBMISSION, NOT_IN_COURSE, INVALID_GRADE)
+from controllers.teacher_c import TeacherController
+from controllers.user_c import UserController
+from service.errors import BadRequest, Unauthorized, Forbidden, NotFound, Conflict, Unavailable
+from utils.cache import LRUCache
+from utils.db_helper import DBHelper, ChangeCounter
+from utils.export import Export, export, FORMATS, CSV
+from utils.activity import ActivityLog, LOGIN, MATERIAL_OPEN, SUBMISSION, HOUR, DAY
+from utils.batch_writer import BatchWriter
+from utils import grade_stats, similarity
+from utils.file_store import FileStore, MATERIALS_STORE, ASSIGNMENTS_STORE, SUBMISSIONS_STORE, UPLOAD_TTL
+from utils.keyset import KeysetQuery, PAGE_SIZE
+from utils.password import hash_password
+from utils.pdf_artifacts import PdfPipeline
+from utils.similarity import SimilarityDetector, THRESHOLD
+
+SESSION_TTL = 12 * 3600
+MAX_SESSIONS = 100_000
+# Resumable uploads in progress; each is forgotten after UPLOAD_TTL
+MAX_UPLOADS = 10_000
+
+TEACHER = "teacher"
+STUDENT = "student"
+
+ROSTER = KeysetQuery(
+    columns=["u.username", "u.email"],
+    from_where="""
+        FROM Enrollment e
+                 JOIN Student s ON e.student_id = s.student_id
+                 JOIN User u ON s.user_id = u.user_id
+        WHERE e.course_id = ?
+    """,
+    sort_keys=["u.username", "u.email"],
+    tiebreak="e.enrollment_id")
+
+SUBMISSIONS = KeysetQuery(
+    columns=["u.username", "a.pdf_file", "s.submission_time", "s.grade"],
+    from_where="""
+        FROM Submission s
+                 JOIN Assignment a ON s.assignment_id = a.assignment_id
+                 JOIN Student st ON s.student_id = st.student_id
+                 JOIN User u ON st.user_id = u.user_id
+        WHERE a.course_id = ?
+    """,
+    sort_keys=["u.username", "a.pdf_file", "COALESCE(s.submission_time, '')", "COALESCE(s.grade, '')"],
+    tiebreak="s.submission_id")
+
+# Items per course in the student course feed
+FEED_MATERIALS = 3
+FEED_ASSIGNMENTS = 5
+
+# Default and longest window of the deadline lists, in days
+UPCOMING_DAYS = 7
+MAX_UPCOMING_DAYS = 366
+
+# Activity reports: default window in days, and rollup period by name
+ACTIVITY_DAYS = 7
+PERIODS = {"hour": HOUR, "day": DAY}
+
+# Largest weight an assignment can have in a final grade
+MAX_WEIGHT = 100
+
+LONG = "long"
+WIDE = "wide"
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}( \d{2}:\d{2}(:\d{2})?)?$")
+
+
+def _as_file(content):
+    return io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+
+
+def _read(content):
+    return content if isinstance(content, (bytes, bytearray)) else content.read()
+
+
+def _timestamp(epoch):
+    # The same clock and format as SQLite's datetime('now')
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch))
+
+
+def _dicts(models):
+    return [model.to_dict() for model in models]
+
+
+def _grade(value):
+    try:
+        return parse_grade(value)
+    except ValueError:
+        raise BadRequest(f"Invalid grade: {value!r}. Use a number from 0 to 100.")
+
+
+class LMSService:
+    """The app's operations without any UI: what MainWindow and the HTTP API call.
+
+    Every method takes and returns plain JSON-compatible values (file
+    contents are bytes or a binary file object). Calls after login take
+    the session ``token`` first; permission checks happen here, so a
+    client can only see and change its own courses. Failures raise
+    service.errors.ServiceError subclasses.
+    """
+
+    def __init__(self, db_path='database.db', pool_size=None):
+        self.db_path = db_path
+        self.db = DBHelper(db_path, pool_size)
+        # Learning activity is buffered and written in batches, see utils.activity
+        self.activity = ActivityLog(db_path)
+        self.users = UserController(db_path)
+        self.teachers = TeacherController(db_path)
+        self.students = StudentController(db_path)
+        self.courses = CourseController(db_path)
+        self.enrollments = EnrollmentController(db_path, activity=self.activity)
+        self.materials = MaterialController(db_path)
+        self.assignments = AssignmentController(db_path)
+        self.submissions = SubmissionController(db_path)
+        self.searcher = SearchController(db_path)
+        self.exports = ExportController(db_path)
+        self.activity_reports = ActivityController(db_path)
+        self.grade_reports = GradeAnalyticsController(db_path)
+        self.similarity = SimilarityDetector(db_path)
+        self.material_store = FileStore(MATERIALS_STORE, db_path=db_path)
+        self.assignment_store = FileStore(ASSIGNMENTS_STORE, db_path=db_path)
+        self.submission_store = FileStore(SUBMISSIONS_STORE, db_path=db_path)
+        # Submissions arriving together are saved together, see _write_submissions
+        self.submission_writer = BatchWriter(self._write_submissions, name="submission-writer")
+        self._uploads = LRUCache(MAX_UPLOADS, UPLOAD_TTL)
+        self.pdf_pipeline = PdfPipeline(db_path)
+        self._sessions = LRUCache(MAX_SESSIONS, SESSION_TTL)
+        self.changes = ChangeCounter(db_path)
+
+    def close(self):
+        self.submission_writer.close()
+        self.activity.close()
+        self.pdf_pipeline.shutdown()
+        self.changes.close()
+
+    # Sessions and permissions
+
+    def _session(self, token, role=None):
+        session = self._sessions.get(token) if token else None
+        if session is None:
+            raise Unauthorized("Please log in again.")
+        if role is not None and session["role"] != role:
+            raise Forbidden(f"Only a {role} can do this.")
+        return session
+
+    def _course(self, session, course_id, manage=False):
+        """The course if ``session`` may see it (or manage it, for teachers)."""
+        course = self.courses.get_course_by_id(course_id)
+        if course is None:
+            raise NotFound("Course not found.")
+        if session["role"] == TEACHER:
+            if course.teacher_id != session["teacher_id"]:
+                raise Forbidden("This is not your course.")
+        elif manage:
+            raise Forbidden("Only the course teacher can do this.")
+        elif not self._is_enrolled(session["student_id"], course_id):
+            raise Forbidden("You are not enrolled in this course.")
+        return course
+
+    def _is_enrolled(self, student_id, course_id):
+        with self.db.reader() as conn:
+            return conn.execute("SELECT 1 FROM Enrollment WHERE course_id = ? AND student_id = ?",
+                                (course_id, student_id)).fetchone() is not None
+
+    def _course_ids(self, session):
+        if session["role"] == TEACHER:
+            courses = self.courses.get_courses_by_teacher(session["teacher_id"])
+        else:
+            courses = self.courses.get_courses_by_student(session["student_id"])
+        return [course.course_id for course in courses]
+
+    # Accounts
+
+    def register(self, username, email, password, role):
+        if not username or not email or not password or role not in (TEACHER, STUDENT):
+            raise BadRequest("All fields and role must be filled!")
+        # Hashed before taking the writer, so other writes do not queue behind the KDF
+        hashed_password = hash_password(password)
+        with self.db.connection() as conn:
+            user = self.users.add_user(username, email, hashed_password)
+            if user is None:
+                taken = conn.execute("SELECT 1 FROM User WHERE username = ?", (username,)).fetchone()
+                raise Conflict("Username already exists!" if taken else "Email already exists!")
+            if role == TEACHER:
+                self.teachers.create_teacher(user.user_id)
+            else:
+                self.students.create_student(user.user_id)
+        return {"user_id": user.user_id, "username": username, "role": role}
+
+    def login(self, username, password):
+        """A new session for valid credentials; runs a full password hash."""
+        user = self.users.verify_user(username, password)
+        if user is None:
+            raise Unauthorized("Invalid username or password!")
+        teacher = self.teachers.get_teacher_by_user_id(user.user_id)
+        student = None if teacher else self.students.get_student_by_user_id(user.user_id)
+        session = {
+            "token": secrets.token_urlsafe(32),
+            "user_id": user.user_id,
+            "username": user.username,
+            "role": TEACHER if teacher else STUDENT,
+            "teacher_id": teacher.teacher_id if teacher else None,
+            "student_id": student.student_id if student else None,
+        }
+        self._sessions.set(session["token"], session)
+        self.activity.record(LOGIN, user_id=user.user_id, student_id=session["student_id"])
+        return session
+
+    def logout(self, token):
+        self._sessions.pop(token)
+
+    def dashboard(self, token):
+        session = self._session(token)
+        with self.db.reader() as conn:
+            if session["role"] == TEACHER:
+                # Counters are kept current by triggers, see database.STATS_TRIGGERS
+                row = conn.execute("SELECT total_courses, total_students FROM TeacherStats "
+                                   "WHERE teacher_id = ?", (session["teacher_id"],)).fetchone()
+                total_courses, total_students = row or (0, 0)
+                return {"total_courses": total_courses, "total_students": total_students}
+            # Pending depends on the clock so it is counted here, skipped
+            # when there is nothing to count
+            row = conn.execute("""
+                               SELECT ss.total_courses,
+                                      CASE
+                                          WHEN ss.total_assignments = 0 THEN 0
+                                          ELSE (SELECT COUNT(*)
+                                                FROM Enrollment e
+                                                         JOIN Assignment a ON a.course_id = e.course_id
+                                                WHERE e.student_id = ss.student_id
+                                                  AND a.due_at > ?)
+                                          END
+                               FROM StudentStats ss
+                               WHERE ss.student_id = ?
+                               """, (int(time.time()), session["student_id"])).fetchone()
+            total_courses, pending = row or (0, 0)
+            return {"total_courses": total_courses, "pending_assignments": pending}
+
+    # Courses
+
+    def list_courses(self, token):
+        session = self._session(token)
+        if session["role"] == TEACHER:
+            return _dicts(self.courses.get_courses_by_teacher(session["teacher_id"]))
+        return _dicts(self.courses.get_courses_by_student(session["student_id"]))
+
+    def course_feed(self, token, since=None, materials=FEED_MATERIALS, assignments=FEED_ASSIGNMENTS):
+        """The student's courses with their latest materials and upcoming assignments.
+
+        ``version`` moves whenever the database changes. Pass the last
+        one seen as ``since``: while nothing has changed the reply is only
+        ``{"version": since, "changed": False}`` and no query runs.
+        """
+        session = self._session(token, STUDENT)
+        version = self.changes.poll()  # before the read, so a later commit is never missed
+        if since == version:
+            return {"version": version, "changed": False}
+        return {"version": version, "changed": True,
+                "courses": self.courses.get_student_feed(session["student_id"], materials, assignments)}
+
+    def get_course(self, token, course_id):
+        return self._course(self._session(token), course_id).to_dict()
+
+    def create_course(self, token, title, description):
+        session = self._session(token, TEACHER)
+        if not title or not description:
+            raise BadRequest("Title and description are required!")
+        return self.courses.create_course(title, description, session["teacher_id"]).to_dict()
+
+    def update_course(self, token, course_id, title=None, description=None):
+        self._course(self._session(token, TEACHER), course_id, manage=True)
+        return self.courses.update_course(course_id, title or None, description or None).to_dict()
+
+    def delete_course(self, token, course_id):
+        self._course(self._session(token, TEACHER), course_id, manage=True)
+        self.courses.delete_course(course_id)
+
+    def course_overview(self, token, course_id, roster_sort=(None, False), submissions_sort=(2, True)):
+        """Everything the course management page shows, read in one snapshot.
+
+        The sorts are ``(sort_column, descending)`` for the first roster and
+        submissions pages, which only teachers get.
+        """
+        session = self._session(token)
+        with self.db.snapshot() as conn:
+            self._course(session, course_id)
+            overview = {
+                "course_id": course_id,
+                "materials": _dicts(self.materials.get_materials_by_course(course_id)),
+                "assignments": _dicts(self.assignments.get_assignments_by_course(course_id)),
+            }
+            if session["role"] == TEACHER:
+                overview["roster"] = ROSTER.page(conn, (course_id,), None, *roster_sort)
+                overview["submissions"] = SUBMISSIONS.page(conn, (course_id,), None, *submissions_sort)
+            return overview
+
+    # Enrollment
+
+    def enroll(self, token, course_id, emails):
+        """``[email, status]`` for each email, see EnrollmentController.enroll_by_emails."""
+        self._course(self._session(token, TEACHER), course_id, manage=True)
+        return [list(entry) for entry in self.enrollments.enroll_by_emails(course_id, emails)]
+
+    def roster_page(self, token, course_id, after=None, sort_column=None, descending=False, limit=PAGE_SIZE):
+        session = self._session(token, TEACHER)
+        with self.db.snapshot() as conn:
+            self._course(session, course_id, manage=True)
+            return ROSTER.page(conn, (course_id,), after, sort_column, descending, min(limit, PAGE_SIZE))
+
+    # Materials and assignments
+
+    def list_materials(self, token, course_id):
+        self._course(self._session(token), course_id)
+        return _dicts(self.materials.get_materials_by_course(course_id))
+
+    def add_material(self, token, course_id, filename, content, youtube_url=None):
+        self._course(self._session(token, TEACHER), course_id, manage=True)
+        # Stored once per content hash; pdf_file keeps the name for display
+        file_hash, _ = self.material_store.ingest(_as_file(content))
+        material = self.materials.create_material(course_id, os.path.basename(filename),
+                                                  youtube_url or None, file_hash)
+        # Text and thumbnail are built in the background, once per content hash
+        self.pdf_pipeline.enqueue(MATERIALS_STORE, file_hash)
+        return material.to_dict()
+
+    def open_material(self, token, material_id):
+        """The material's PDF as an Export; opening one counts as student activity."""
+        session = self._session(token)
+        material = self.materials.get_material_by_id(material_id)
+        if material is None:
+            raise NotFound("Material not found.")
+        self._course(session, material.course_id)
+        path = self.material_store.resolve(material.pdf_file, material.file_hash)
+        if not os.path.exists(path):
+            raise NotFound("The material's file is missing.")
+        if session["role"] == STUDENT:
+            self.activity.record(MATERIAL_OPEN, user_id=session["user_id"], student_id=session["student_id"],
+                                 course_id=material.course_id, item_id=material_id)
+        return Export(material.pdf_file, "application/pdf", self.material_store.chunks(path))
+
+    def list_assignments(self, token, course_id):
+        self._course(self._session(token), course_id)
+        return _dicts(self.assignments.get_assignments_by_course(course_id))
+
+    def add_assignment(self, token, course_id, filename, content, due_date):
+        self._course(self._session(token, TEACHER), course_id, manage=True)
+        try:
+            if not _DATE_RE.match(due_date or ""):
+                raise ValueError(due_date)
+            due_timestamp(due_date)  # also refuses dates like 2025-02-30
+        except ValueError:
+            raise BadRequest("Due date must look like YYYY-MM-DD.")
+        file_hash, _ = self.assignment_store.ingest(_as_file(content))
+        assignment = self.assignments.create_assignment(course_id, os.path.basename(filename),
+                                                        due_date, file_hash)
+        self.pdf_pipeline.enqueue(ASSIGNMENTS_STORE, file_hash)
+        return assignment.to_dict()
+
+    # Deadlines
+
+    def _window(self, days):
+        """``(start, end)`` epoch seconds from now to ``days`` days ahead."""
+        if not 0 < days <= MAX_UPCOMING_DAYS:
+            raise BadRequest(f"Days must be between 1 and {MAX_UPCOMING_DAYS}.")
+        start = int(time.time())
+        return start, start + days * 24 * 3600
+
+    def upcoming_deadlines(self, token, days=UPCOMING_DAYS):
+        """The student's assignments due within ``days`` days, soonest first, see
+        AssignmentController.get_due_for_student.
+        """
+        session = self._session(token, STUDENT)
+        return self.assignments.get_due_for_student(session["student_id"], *self._window(days))
+
+    def course_deadlines(self, token, course_id, days=UPCOMING_DAYS):
+        """A course's assignments due within ``days`` days, soonest first.
+
+        Students get their own ``submitted`` flag, the course's teacher the
+        number of ``submissions`` so far.
+        """
+        session = self._session(token)
+        window = self._window(days)
+        self._course(session, course_id)
+        if session["role"] == TEACHER:
+            return self.assignments.get_due_for_course(course_id, *window)
+        return self.assignments.get_due_for_student(session["student_id"], *window, course_id=course_id)
+
+    # Submissions and grading
+
+    def _submittable(self, token, assignment_id):
+        """The student's session and the assignment, if they may still hand it in."""
+        session = self._session(token, STUDENT)
+        assignment = self.assignments.get_assignment_by_id(assignment_id)
+        if assignment is None:
+            raise NotFound("Assignment not found.")
+        self._course(session, assignment.course_id)
+        if assignment.due_at is None or time.time() > assignment.due_at:
+            raise Forbidden("The due date for this assignment has passed.")
+        return session, assignment
+
+    def submit(self, token, assignment_id, filename, content):
+        """Hand in a file; refused once the assignment's due date has passed.
+
+        The file is streamed into the submissions store; the row is saved
+        by the submission writer together with any other submissions
+        that arrive at the same moment.
+        """
+        session, assignment = self._submittable(token, assignment_id)
+        staged = self.submission_store.stage(_as_file(content))
+        return self._save_submission(session, assignment, filename, staged)
+
+    def _save_submission(self, session, assignment, filename, staged):
+        row = (assignment.assignment_id, session["student_id"], os.path.basename(filename), staged, int(time.time()))
+        try:
+            submission = self.submission_writer.write(row)
+        finally:
+            self.submission_store.discard([staged])  # a no-op once published
+        self.activity.record(SUBMISSION, user_id=session["user_id"], student_id=session["student_id"],
+                             course_id=assignment.course_id, item_id=submission.submission_id)
+        return submission.to_dict()
+
+    def _write_submissions(self, rows):
+        """Writer thread: a burst of submissions in one short transaction.
+
+        The files are made durable first, with a single directory sync,
+        so the transaction only checks the due dates and inserts the rows.
+        Files of refused submissions, or of a transaction that failed, are
+        left to FileStore.collect_garbage.
+        """
+        self.submission_store.publish([row[3] for row in rows])
+        with self.db.connection():
+            on_time = self.submissions.open_for_submission([(row[0], row[4]) for row in rows])
+            accepted = [row for row, ok in zip(rows, on_time) if ok]
+            self.submission_store.record([row[3] for row in accepted])
+            saved = iter(self.submissions.record_submissions(
+                [(assignment_id, student_id, filename, staged[1], _timestamp(submitted_at))
+                 for assignment_id, student_id, filename, staged, submitted_at in accepted]))
+        return [next(saved) if ok else Forbidden("The due date for this assignment has passed.")
+                for ok in on_time]
+
+    # Resumable uploads: start_upload, then upload_chunk until the file is
+    # sent (after a dropped connection, upload_status says where to go on),
+    # then finish_upload submits it
+
+    def _upload(self, token, upload_id):
+        session = self._session(token, STUDENT)
+        upload = self._uploads.get(upload_id)
+        if upload is None or upload["user_id"] != session["user_id"]:
+            raise NotFound("Upload not found; please start it again.")
+        return upload
+
+    def start_upload(self, token, assignment_id, filename):
+        session, _ = self._submittable(token, assignment_id)
+        upload_id = secrets.token_urlsafe(16)
+        self._uploads.set(upload_id, {"user_id": session["user_id"], "assignment_id": assignment_id,
+                                      "filename": os.path.basename(filename)})
+        return {"upload_id": upload_id, "offset": 0}
+
+    def upload_chunk(self, token, upload_id, offset, content):
+        """Append ``content`` at ``offset``; returns the offset to send from next.
+
+        A chunk that does not start at the current end is not written, so
+        resending one is harmless.
+        """
+        self._upload(token, upload_id)
+        return {"upload_id": upload_id,
+                "offset": self.submission_store.append(upload_id, offset, _read(content))}
+
+    def upload_status(self, token, upload_id):
+        self._upload(token, upload_id)
+        return {"upload_id": upload_id, "offset": self.submission_store.size_of(upload_id)}
+
+    def finish_upload(self, token, upload_id):
+        upload = self._upload(token, upload_id)
+        session, assignment = self._submittable(token, upload["assignment_id"])
+        if not self.submission_store.size_of(upload_id):
+            raise BadRequest("Nothing has been uploaded yet.")
+        self._uploads.pop(upload_id)
+        staged = self.submission_store.stage_upload(upload_id)
+        return self._save_submission(session, assignment, upload["filename"], staged)
+
+    def submissions_page(self, token, course_id, after=None, sort_column=2, descending=True, limit=PAGE_SIZE):
+        session = self._session(token, TEACHER)
+        with self.db.snapshot() as conn:
+            self._course(session, course_id, manage=True)
+            return SUBMISSIONS.page(conn, (course_id,), after, sort_column, descending, min(limit, PAGE_SIZE))
+
+    def grade(self, token, submission_id, grade):
+        session = self._session(token, TEACHER)
+        submission = self.submissions.get_submission_by_id(submission_id)
+        if submission is None:
+            raise NotFound("Submission not found.")
+        self._assignment(session, submission.assignment_id)
+        return self.submissions.grade_submission(submission_id, _grade(grade)).to_dict()
+
+    def grade_batch(self, token, course_id, changes):
+        """Save many grades at once, all or none.
+
+        ``changes`` are ``{"submission_id", "grade", "expected"}`` dicts, with
+        ``expected`` the grade the teacher last saw. When another grader
+        changed any of them meanwhile nothing is saved and ``conflicts``
+        lists their current grades.
+        """
+        session = self._session(token, TEACHER)
+        try:
+            changes = [(int(c["submission_id"]), _grade(c.get("grade")), c.get("expected")) for c in changes]
+        except (KeyError, TypeError, ValueError):
+            raise BadRequest("Each change needs a submission_id, grade and expected grade.")
+        with self.db.connection() as conn:
+            self._course(session, course_id, manage=True)
+            ids = [submission_id for submission_id, _, _ in changes]
+            (in_course,), = conn.execute("""
+                SELECT COUNT(*)
+                FROM Submission s
+                         JOIN Assignment a ON s.assignment_id = a.assignment_id
+                WHERE a.course_id = ?
+                  AND s.submission_id IN (SELECT value FROM json_each(?))
+            """, (course_id, json.dumps(ids))).fetchall()
+            if in_course != len(set(ids)):
+                raise Forbidden("Some submissions are not in this course.")
+            conflicts = self.submissions.grade_submissions(changes)
+        return {
+            "saved": 0 if conflicts else len(changes),
+            "conflicts": [{"submission_id": submission_id, "grade": grade} for submission_id, grade in conflicts],
+        }
+
+    def _assignment(self, session, assignment_id):
+        assignment = self.assignments.get_assignment_by_id(assignment_id)
+        if assignment is None:
+            raise NotFound("Assignment not found.")
+        self._course(session, assignment.course_id, manage=True)
+        return assignment
+
+    def _grade_rows(self, conn, assignment):
+        """Every enrolled student with their latest submission, if any, in GRADE_COLUMNS order.
+
+        Only the latest one counts, as in the gradebook and the analytics.
+        """
+        return conn.execute("""
+            SELECT s.submission_id, u.username, u.email, s.submission_time, s.grade
+            FROM Enrollment e
+                     JOIN Student st ON e.student_id = st.student_id
+                     JOIN User u ON st.user_id = u.user_id
+                     LEFT JOIN Submission s ON s.submission_id = (
+                         SELECT MAX(submission_id)
+                         FROM Submission
+                         WHERE student_id = e.student_id
+                           AND assignment_id = ?)
+            WHERE e.course_id = ?
+            ORDER BY u.username
+        """, (assignment.assignment_id, assignment.course_id)).fetchall()
+
+    def export_grades(self, token, assignment_id):
+        """The assignment's grade sheet as CSV text, see read_grade_sheet."""
+        session = self._session(token, TEACHER)
+        with self.db.snapshot() as conn:
+            assignment = self._assignment(session, assignment_id)
+            return write_grade_sheet(self._grade_rows(conn, assignment))
+
+    def import_grades(self, token, assignment_id, sheet):
+        """Apply a CSV grade sheet to one assignment in a single transaction.
+
+        Rows are matched by submission_id, else email, else username.
+        Returns ``saved`` and a ``[student, status]`` report per row.
+        """
+        session = self._session(token, TEACHER)
+        try:
+            rows = read_grade_sheet(sheet)
+        except ValueError as e:
+            raise BadRequest(f"Cannot read the grade sheet: {e}")
+        grades = []
+        for row in rows:
+            try:
+                grades.append(parse_grade(row["grade"]))
+            except ValueError:
+                grades.append(INVALID_GRADE)
+        with self.db.connection() as conn:
+            assignment = self._assignment(session, assignment_id)
+            known = self._grade_rows(conn, assignment)
+            by_key = {}
+            for submission_id, username, email, _, grade in known:
+                for key in (("submission_id", str(submission_id)), ("email", email.lower()),
+                            ("username", username.lower())):
+                    by_key[key] = (submission_id, grade)
+
+            report, changes = [], {}
+            for row, grade in zip(rows, grades):
+                student = row.get("email") or row.get("username") or row.get("submission_id", "")
+                # A stale or unknown submission_id falls through to the email, then the username
+                match = None
+                for name in ("submission_id", "email", "username"):
+                    if row.get(name):
+                        match = by_key.get((name, row[name].lower()))
+                        if match is not None:
+                            break
+                if grade is INVALID_GRADE:
+                    report.append([student, INVALID_GRADE])
+                elif match is None:
+                    report.append([student, NOT_IN_COURSE])
+                elif match[0] is None:
+                    report.append([student, NO_SUBMISSION])
+                elif grade == match[1]:
+                    report.append([student, UNCHANGED])
+                else:
+                    changes[match[0]] = (match[0], grade, match[1])
+                    report.append([student, GRADED])
+            self.submissions.grade_submissions(changes.values())
+        return {"saved": len(changes), "report": report}
+
+    # Exports
+
+    def _export_scope(self, token, fmt, course_id):
+        """The course ids and file name stem of an export, checked before any row is read."""
+        session = self._session(token, TEACHER)
+        if fmt not in FORMATS:
+            raise BadRequest(f"Unknown export format {fmt!r}. Use one of: {', '.join(FORMATS)}.")
+        if course_id is None:
+            return self._course_ids(session), re.sub(r"[^\w.-]", "_", session["username"])
+        self._course(session, course_id, manage=True)
+        return [course_id], f"course{course_id}"
+
+    def export_roster(self, token, fmt=CSV, course_id=None):
+        """Enrolled students of one course, or of all the teacher's courses.
+
+        Returns a utils.export.Export; rows are read while it is consumed.
+        """
+        course_ids, stem = self._export_scope(token, fmt, course_id)
+        return export(fmt, f"{stem}_roster", self.exports.roster(course_ids))
+
+    def export_gradebook(self, token, fmt=CSV, course_id=None, layout=LONG):
+        """Every enrolled student's grade or status on every assignment.
+
+        ``layout`` is LONG (a row per student and assignment) or, for a
+        single course, WIDE (a row per student, a column per assignment).
+        """
+        course_ids, stem = self._export_scope(token, fmt, course_id)
+        if layout == WIDE:
+            if course_id is None:
+                raise BadRequest("A wide gradebook covers one course; choose a course.")
+            rows = self.exports.gradebook_wide(course_id)
+        elif layout == LONG:
+            rows = self.exports.gradebook(course_ids)
+        else:
+            raise BadRequest(f"Unknown gradebook layout {layout!r}. Use {LONG} or {WIDE}.")
+        return export(fmt, f"{stem}_gradebook", rows)
+
+    # Activity
+
+    def _activity_window(self, period, days):
+        if period not in PERIODS:
+            raise BadRequest(f"Unknown period {period!r}. Use {' or '.join(PERIODS)}.")
+        if not 0 < days <= MAX_UPCOMING_DAYS:
+            raise BadRequest(f"Days must be between 1 and {MAX_UPCOMING_DAYS}.")
+        # Whole buckets: today's (or this hour's) and the ones before it
+        now = int(time.time())
+        return PERIODS[period], now - now % DAY - (days - 1) * DAY
+
+    def activity_overview(self, token, days=ACTIVITY_DAYS):
+        """Each of the teacher's courses with its event counts by kind and its
+        number of active students over the last ``days`` days.
+
+        Read from the daily rollups, which trail the newest events by up
+        to utils.activity.FLUSH_INTERVAL.
+        """
+        session = self._session(token, TEACHER)
+        period, since = self._activity_window("day", days)
+        with self.db.snapshot():
+            courses = self.courses.get_courses_by_teacher(session["teacher_id"])
+            totals = self.activity_reports.course_totals([course.course_id for course in courses], since, period)
+        return [{"course_id": course.course_id, "title": course.title, **totals[course.course_id]}
+                for course in courses]
+
+    def course_activity(self, token, course_id, period="day", days=ACTIVITY_DAYS):
+        """One course's activity per ``period`` ("hour" or "day") over the last
+        ``days`` days, and each active student's totals.
+        """
+        session = self._session(token, TEACHER)
+        self._course(session, course_id)
+        period, since = self._activity_window(period, days)
+        with self.db.snapshot():
+            return {"course_id": course_id, "period": period,
+                    "series": self.activity_reports.course_series(course_id, since, period),
+                    "students": self.activity_reports.student_totals(course_id, since, period)}
+
+    # Grade analytics
+
+    def _analytics_session(self, token):
+        session = self._session(token, TEACHER)
+        if not grade_stats.available():
+            raise Unavailable("Grade analytics need NumPy on the server: pip install numpy")
+        return session
+
+    def grade_overview(self, token):
+        """Grade statistics for each of the teacher's courses, from one read of
+        all their gradebooks; see GradeAnalyticsController.overview.
+        """
+        session = self._analytics_session(token)
+        with self.db.snapshot():
+            courses = self.courses.get_courses_by_teacher(session["teacher_id"])
+            summaries = self.grade_reports.overview([course.course_id for course in courses], time.time())
+        return [{"course_id": course.course_id, "title": course.title, **summaries[course.course_id]}
+                for course in courses]
+
+    def grade_analytics(self, token, course_id):
+        """One course's grade statistics with a row per assignment and per
+        student, see GradeAnalyticsController.course_report.
+        """
+        session = self._analytics_session(token)
+        self._course(session, course_id)
+        return self.grade_reports.course_report(course_id, time.time())
+
+    def set_assignment_weight(self, token, assignment_id, weight):
+        """Set how much an assignment counts in final grades; 0 leaves it out."""
+        session = self._session(token, TEACHER)
+        self._assignment(session, assignment_id)
+        try:
+            weight = float(weight)
+        except (TypeError, ValueError):
+            weight = None
+        if weight is None or not 0 <= weight <= MAX_WEIGHT:
+            raise BadRequest(f"Weight must be a number from 0 to {MAX_WEIGHT}.")
+        return self.assignments.set_weight(assignment_id, weight).to_dict()
+
+    def similar_submissions(self, token, assignment_id, threshold=None):
+        """Pairs of students whose latest submissions to an assignment read
+        alike, most similar first; see utils.similarity.
+
+        Only files not seen before are read, so repeated checks are cheap.
+        """
+        session = self._session(token, TEACHER)
+        self._assignment(session, assignment_id)
+        if not similarity.available():
+            raise Unavailable("Similarity checks need NumPy and PyMuPDF (or pypdf) on the server.")
+        try:
+            threshold = THRESHOLD if threshold is None else float(threshold)
+        except (TypeError, ValueError):
+            threshold = None
+        if threshold is None or not 0 < threshold <= 1:
+            raise BadRequest("Threshold must be a number above 0 and at most 1.")
+        return self.similarity.find(assignment_id, threshold)
+
+    # Search
+
+    def search(self, token, text, limit=20):
+        session = self._session(token)
+        return _dicts(self.searcher.search(text, self._course_ids(session), limit))
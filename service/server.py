@@ -0,0 +1,339 @@
+"""HTTP/JSON API over LMSService, on asyncio streams from the standard library.
+
+    python -m service.server [--host H] [--port P] [--db PATH] [--workers N]
+
+Requests and responses are JSON; file uploads carry their bytes base64
+encoded in a ``content`` field. After ``POST /login`` send the returned
+token as ``Authorization: Bearer <token>``. Errors come back as
+``{"error": message}`` with the status of the matching ServiceError.
+Exports (``/exports/...``) and material files (``/materials/N/file``)
+are the exception: they stream the file itself with chunked transfer
+encoding. Large submissions can go in pieces and resume after a dropped
+connection: ``POST /assignments/N/uploads``, then ``PUT /uploads/ID?offset=N``
+per piece and ``POST /uploads/ID/finish``.
+
+The event loop only parses and writes HTTP; every service call runs on a
+worker thread, and there are as many pooled database connections as
+workers.
+"""
+import argparse
+import asyncio
+import base64
+import functools
+import json
+import re
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs, quote
+
+from service.errors import ServiceError, BadRequest, NotFound
+from service.lms import LMSService, LONG, UPCOMING_DAYS, ACTIVITY_DAYS
+from utils.export import Export, CSV
+
+DEFAULT_WORKERS = 8
+MAX_BODY = 64 * 1024 * 1024
+MAX_HEADERS = 100
+KEEP_ALIVE_TIMEOUT = 15.0
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"expected an integer, got {value!r}")
+
+
+def _page_args(query):
+    after = query.get("after")
+    return {
+        "after": json.loads(after) if after else None,
+        "sort_column": _int(query["sort"]) if "sort" in query else None,
+        "descending": query.get("desc") in ("1", "true"),
+        **({"limit": _int(query["limit"])} if "limit" in query else {}),
+    }
+
+
+def _sort_arg(query, name, column, descending):
+    if name not in query:
+        return column, descending
+    column, _, order = query[name].partition(":")
+    return (_int(column) if column else None), order == "desc"
+
+
+def _file(body):
+    try:
+        return body["filename"], base64.b64decode(body["content"], validate=True)
+    except (KeyError, ValueError):
+        raise BadRequest("filename and base64 content are required")
+
+
+def _content(body):
+    try:
+        return base64.b64decode(body["content"], validate=True)
+    except (KeyError, ValueError):
+        raise BadRequest("base64 content is required")
+
+
+# (method, path pattern, handler(service, token, path args, query, body))
+ROUTES = [
+    ("POST", r"/register", lambda s, t, a, q, b: s.register(
+        b.get("username"), b.get("email"), b.get("password"), b.get("role"))),
+    ("POST", r"/login", lambda s, t, a, q, b: s.login(b.get("username", ""), b.get("password", ""))),
+    ("POST", r"/logout", lambda s, t, a, q, b: s.logout(t)),
+    ("GET", r"/dashboard", lambda s, t, a, q, b: s.dashboard(t)),
+    ("GET", r"/search", lambda s, t, a, q, b: s.search(t, q.get("q", ""), _int(q.get("limit", 20)))),
+    ("GET", r"/courses", lambda s, t, a, q, b: s.list_courses(t)),
+    ("GET", r"/feed", lambda s, t, a, q, b: s.course_feed(
+        t, _int(q["since"]) if "since" in q else None,
+        **{name: _int(q[name]) for name in ("materials", "assignments") if name in q})),
+    ("GET", r"/deadlines", lambda s, t, a, q, b: s.upcoming_deadlines(t, _int(q.get("days", UPCOMING_DAYS)))),
+    ("POST", r"/courses", lambda s, t, a, q, b: s.create_course(
+        t, b.get("title"), b.get("description"))),
+    ("GET", r"/courses/(\d+)", lambda s, t, a, q, b: s.get_course(t, _int(a[0]))),
+    ("PATCH", r"/courses/(\d+)", lambda s, t, a, q, b: s.update_course(
+        t, _int(a[0]), b.get("title"), b.get("description"))),
+    ("DELETE", r"/courses/(\d+)", lambda s, t, a, q, b: s.delete_course(t, _int(a[0]))),
+    ("GET", r"/courses/(\d+)/overview", lambda s, t, a, q, b: s.course_overview(
+        t, _int(a[0]), _sort_arg(q, "roster_sort", None, False), _sort_arg(q, "submissions_sort", 2, True))),
+    ("POST", r"/courses/(\d+)/enrollments", lambda s, t, a, q, b: s.enroll(
+        t, _int(a[0]), b.get("emails") or [])),
+    ("GET", r"/courses/(\d+)/roster", lambda s, t, a, q, b: s.roster_page(
+        t, _int(a[0]), **_page_args(q))),
+    ("GET", r"/courses/(\d+)/materials", lambda s, t, a, q, b: s.list_materials(t, _int(a[0]))),
+    ("POST", r"/courses/(\d+)/materials", lambda s, t, a, q, b: s.add_material(
+        t, _int(a[0]), *_file(b), b.get("youtube_url"))),
+    ("GET", r"/materials/(\d+)/file", lambda s, t, a, q, b: s.open_material(t, _int(a[0]))),
+    ("GET", r"/courses/(\d+)/assignments", lambda s, t, a, q, b: s.list_assignments(t, _int(a[0]))),
+    ("GET", r"/courses/(\d+)/deadlines", lambda s, t, a, q, b: s.course_deadlines(
+        t, _int(a[0]), _int(q.get("days", UPCOMING_DAYS)))),
+    ("POST", r"/courses/(\d+)/assignments", lambda s, t, a, q, b: s.add_assignment(
+        t, _int(a[0]), *_file(b), b.get("due_date"))),
+    ("GET", r"/courses/(\d+)/submissions", lambda s, t, a, q, b: s.submissions_page(
+        t, _int(a[0]), **_page_args(q))),
+    ("POST", r"/assignments/(\d+)/submissions", lambda s, t, a, q, b: s.submit(t, _int(a[0]), *_file(b))),
+    ("POST", r"/assignments/(\d+)/uploads", lambda s, t, a, q, b: s.start_upload(
+        t, _int(a[0]), b.get("filename") or "")),
+    ("GET", r"/uploads/([\w-]+)", lambda s, t, a, q, b: s.upload_status(t, a[0])),
+    ("PUT", r"/uploads/([\w-]+)", lambda s, t, a, q, b: s.upload_chunk(
+        t, a[0], _int(q.get("offset")), _content(b))),
+    ("POST", r"/uploads/([\w-]+)/finish", lambda s, t, a, q, b: s.finish_upload(t, a[0])),
+    ("PUT", r"/assignments/(\d+)/weight", lambda s, t, a, q, b: s.set_assignment_weight(
+        t, _int(a[0]), b.get("weight"))),
+    ("GET", r"/assignments/(\d+)/similar", lambda s, t, a, q, b: s.similar_submissions(
+        t, _int(a[0]), q.get("threshold"))),
+    ("PUT", r"/submissions/(\d+)/grade", lambda s, t, a, q, b: s.grade(t, _int(a[0]), b.get("grade"))),
+    ("POST", r"/courses/(\d+)/grades", lambda s, t, a, q, b: s.grade_batch(t, _int(a[0]), b.get("changes") or [])),
+    ("GET", r"/assignments/(\d+)/grades", lambda s, t, a, q, b: s.export_grades(t, _int(a[0]))),
+    ("POST", r"/assignments/(\d+)/grades", lambda s, t, a, q, b: s.import_grades(t, _int(a[0]), b.get("csv", ""))),
+    ("GET", r"/exports/roster", lambda s, t, a, q, b: s.export_roster(
+        t, q.get("format", CSV), _int(q["course"]) if "course" in q else None)),
+    ("GET", r"/exports/gradebook", lambda s, t, a, q, b: s.export_gradebook(
+        t, q.get("format", CSV), _int(q["course"]) if "course" in q else None, q.get("layout", LONG))),
+    ("GET", r"/activity", lambda s, t, a, q, b: s.activity_overview(t, _int(q.get("days", ACTIVITY_DAYS)))),
+    ("GET", r"/courses/(\d+)/activity", lambda s, t, a, q, b: s.course_activity(
+        t, _int(a[0]), q.get("period", "day"), _int(q.get("days", ACTIVITY_DAYS)))),
+    ("GET", r"/analytics", lambda s, t, a, q, b: s.grade_overview(t)),
+    ("GET", r"/courses/(\d+)/analytics", lambda s, t, a, q, b: s.grade_analytics(t, _int(a[0]))),
+]
+_ROUTES = [(method, re.compile(pattern + "$"), handler) for method, pattern, handler in ROUTES]
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader):
+    """``(method, target, headers, body)``, or None when the client closed the connection."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length") or "0"
+    # Plain digits only: int() would also take "-1", "+1" and "1_000"
+    if not (length.isascii() and length.isdigit()):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "malformed Content-Length")
+    length = int(length)
+    if length > MAX_BODY:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def encode_response(status, payload, keep_alive):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    status = HTTPStatus(status)
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+def content_disposition(filename):
+    """An attachment header value for any file name (RFC 6266).
+
+    Control characters, quotes and backslashes are dropped; ``filename``
+    is an ASCII fallback and ``filename*`` carries the name in UTF-8.
+    """
+    name = "".join(c for c in filename if c.isprintable() and c not in '"\\') or "download"
+    fallback = "".join(c if c.isascii() else "_" for c in name)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+
+def encode_stream_head(export, keep_alive):
+    head = (f"HTTP/1.1 200 OK\r\n"
+            f"Content-Type: {export.content_type}\r\n"
+            f"Content-Disposition: {content_disposition(export.filename)}\r\n"
+            f"Transfer-Encoding: chunked\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1")
+
+
+class ApiServer:
+    def __init__(self, service, workers=DEFAULT_WORKERS):
+        self.service = service
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="learnup-api")
+
+    def route(self, method, path):
+        allowed = False
+        for route_method, pattern, handler in _ROUTES:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return handler, match.groups()
+                allowed = True
+        if allowed:
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+        raise NotFound(f"no such endpoint: {path}")
+
+    async def dispatch(self, method, target, headers, body):
+        """``(status, payload)`` for one request."""
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        auth = headers.get("authorization", "")
+        token = auth[7:] if auth.lower().startswith("bearer ") else None
+        try:
+            handler, args = self.route(method, url.path.rstrip("/") or "/")
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                raise BadRequest("request body is not valid JSON")
+            if not isinstance(data, dict):
+                raise BadRequest("request body must be a JSON object")
+            call = functools.partial(handler, self.service, token, args, query, data)
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, call)
+            return (HTTPStatus.NO_CONTENT if result is None else HTTPStatus.OK), result
+        except ServiceError as e:
+            return e.status, {"error": str(e)}
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except Exception:
+            traceback.print_exc()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal server error"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except HttpError as e:
+                    writer.write(encode_response(e.status, {"error": str(e)}, False))
+                    break
+                if request is None:
+                    break
+                keep_alive = request[2].get("connection", "").lower() != "close"
+                status, payload = await self.dispatch(*request)
+                if isinstance(payload, Export):
+                    await self.stream(writer, payload, keep_alive)
+                else:
+                    writer.write(encode_response(status, payload, keep_alive))
+                    await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, writer, export, keep_alive):
+        """Send an Export as chunks, producing each one on a worker thread.
+
+        The status line is already out when the rows are read, so a failure
+        part way drops the connection instead of sending an error.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = iter(export.chunks)
+        writer.write(encode_stream_head(export, keep_alive))
+        try:
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+                if chunk is None:
+                    break
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                await writer.drain()  # waits for a slow client instead of buffering the report
+        except Exception as e:
+            if not isinstance(e, ConnectionError):
+                traceback.print_exc()
+            raise ConnectionError("export aborted") from e
+        finally:
+            await loop.run_in_executor(self.executor, export.chunks.close)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.service.close()
+
+
+def main(argv=None):
+    from database import init_db
+    from utils.db_helper import close_all_pools, pool_report, query_stats
+
+    parser = argparse.ArgumentParser(description="Serve the LearnUp API over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default="database.db")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--sql-stats", type=float, metavar="SLOW_MS",
+                        help="time every statement, log those slower than SLOW_MS, report on exit")
+    args = parser.parse_args(argv)
+    if args.sql_stats is not None:
+        query_stats.enable(args.sql_stats)
+
+    init_db(args.db)
+    server = ApiServer(LMSService(args.db, pool_size=args.workers), args.workers)
+    print(f"Serving {args.db} on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(pool_report())
+        close_all_pools()
+        if query_stats.enabled:
+            print(query_stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from database import init_db
+from utils import password
+from utils.db_helper import close_all_pools, query_stats, DEFAULT_SLOW_MS
+
+# The cheapest scrypt cost that still goes through the real code path
+TEST_COST = {"n": 2 ** 4, "r": 8, "p": 1}
+
+
+@pytest.fixture(autouse=True)
+def cheap_passwords():
+    password.configure(password.SCRYPT, **TEST_COST)
+    yield
+    password.configure()
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """The one QApplication of the test run, without a display."""
+    QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A migrated database in a fresh directory, which is also the working
+    directory, so the file stores (materials/, submissions/, ...) land there.
+    """
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "test.db")
+    init_db(path)
+    yield path
+    close_all_pools()
+    query_stats.disable()
+    query_stats.reset()
+    query_stats.slow_ms = DEFAULT_SLOW_MS
+
+
+@pytest.fixture
+def service(db_path):
+    from service.lms import LMSService
+    lms = LMSService(db_path)
+    yield lms
+    lms.close()
+
+
+@pytest.fixture
+def school(service):
+    """A teacher with one course, two enrolled students and an assignment due next week."""
+    service.register("teacher", "teacher@example.com", "secret", "teacher")
+    service.register("alice", "alice@example.com", "secret", "student")
+    service.register("bob", "bob@example.com", "secret", "student")
+    teacher = service.login("teacher", "secret")
+    alice = service.login("alice", "secret")
+    bob = service.login("bob", "secret")
+    course = service.create_course(teacher["token"], "Algebra", "Linear equations")
+    service.enroll(teacher["token"], course["course_id"], ["alice@example.com", "bob@example.com"])
+    due = time.strftime("%Y-%m-%d", time.gmtime(time.time() + 7 * 24 * 3600))
+    assignment = service.add_assignment(teacher["token"], course["course_id"], "task.pdf",
+                                        b"%PDF-1.4 task", due)
+    return SimpleNamespace(service=service, teacher=teacher, alice=alice, bob=bob,
+                           course_id=course["course_id"], assignment_id=assignment["assignment_id"])
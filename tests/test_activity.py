@@ -0,0 +1,145 @@
+import sqlite3
+import time
+
+import pytest
+
+from controllers.activity_c import ActivityController
+from utils.activity import ActivityLog, LOGIN, MATERIAL_OPEN, SUBMISSION, HOUR, DAY
+
+T0 = 1_700_000_000 - 1_700_000_000 % DAY  # midnight UTC
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock(T0 + 10 * HOUR)
+
+
+@pytest.fixture
+def log(db_path, clock):
+    # flush_interval is long so only explicit flushes run
+    log = ActivityLog(db_path, ring_size=10, flush_interval=3600, flush_at=1000, clock=clock)
+    yield log
+    log.close()
+
+
+def rollup(db_path, table, **where):
+    conn = sqlite3.connect(db_path)
+    clause = " AND ".join(f"{name} = ?" for name in where)
+    rows = conn.execute(f"SELECT bucket, kind, SUM(events) FROM {table} WHERE {clause} "
+                        f"GROUP BY bucket, kind ORDER BY bucket, kind", tuple(where.values())).fetchall()
+    conn.close()
+    return rows
+
+
+def test_flush_writes_events_and_hourly_and_daily_rollups(log, db_path, clock):
+    log.record(MATERIAL_OPEN, user_id=1, student_id=1, course_id=7, item_id=3)
+    log.record(MATERIAL_OPEN, user_id=2, student_id=2, course_id=7, item_id=3)
+    clock.now += HOUR
+    log.record(SUBMISSION, user_id=1, student_id=1, course_id=7, item_id=9)
+    log.record(LOGIN, user_id=1, student_id=1)
+    assert log.flush() == 4
+
+    assert rollup(db_path, "CourseActivity", course_id=7, period=HOUR) == [
+        (T0 + 10 * HOUR, MATERIAL_OPEN, 2), (T0 + 11 * HOUR, SUBMISSION, 1)]
+    assert rollup(db_path, "CourseActivity", course_id=7, period=DAY) == [
+        (T0, MATERIAL_OPEN, 2), (T0, SUBMISSION, 1)]
+    # Logins belong to no course and are kept per student under course 0
+    assert rollup(db_path, "StudentActivity", course_id=0, period=DAY, student_id=1) == [(T0, LOGIN, 1)]
+
+
+def test_rollups_grow_incrementally(log, db_path):
+    log.record(MATERIAL_OPEN, student_id=1, course_id=7)
+    log.flush()
+    log.record(MATERIAL_OPEN, student_id=1, course_id=7)
+    log.record(MATERIAL_OPEN, student_id=2, course_id=7)
+    log.flush()
+    assert rollup(db_path, "CourseActivity", course_id=7, period=DAY) == [(T0, MATERIAL_OPEN, 3)]
+    assert log.flushes == 2 and log.written == 3
+
+
+def test_full_buffer_drops_the_oldest(log):
+    for i in range(12):
+        log.record(LOGIN, user_id=i)
+    assert log.dropped == 2
+    assert [event[2] for event in log._buffer] == list(range(2, 12))
+
+
+def test_failed_flush_keeps_its_events(log, db_path, monkeypatch):
+    for i in range(3):
+        log.record(LOGIN, user_id=i, student_id=i)
+
+    def fail(events):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(log, "_write", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        log.flush()
+    log.record(LOGIN, user_id=3, student_id=3)
+    assert [event[2] for event in log._buffer] == [0, 1, 2, 3]
+    assert log.dropped == 0
+
+    monkeypatch.undo()
+    assert log.flush() == 4
+    assert log.written == 4
+
+
+def test_failed_flush_counts_what_no_longer_fits(log):
+    for i in range(6):
+        log.record(LOGIN, user_id=i)
+    events = list(log._buffer)
+    log._buffer.clear()
+    for i in range(6, 13):
+        log.record(LOGIN, user_id=i)
+    log._requeue(events)
+    assert log.dropped == 3
+    assert [event[2] for event in log._buffer] == [3, 4, 5] + list(range(6, 13))
+
+
+def test_prune_keeps_the_rollups(log, db_path, clock):
+    log.record(MATERIAL_OPEN, student_id=1, course_id=7)
+    log.flush()
+    log.prune(clock.now + 1)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM ActivityEvent").fetchone() == (0,)
+    conn.close()
+    assert rollup(db_path, "CourseActivity", course_id=7, period=DAY) == [(T0, MATERIAL_OPEN, 1)]
+
+
+def test_background_flush_once_enough_events_wait(db_path):
+    log = ActivityLog(db_path, flush_interval=3600, flush_at=2)
+    try:
+        log.record(LOGIN, user_id=1)
+        log.record(LOGIN, user_id=2)
+        for _ in range(200):
+            if log.written == 2:
+                break
+            time.sleep(0.01)
+        assert log.written == 2
+    finally:
+        log.close()
+
+
+def test_reports_read_the_rollups(log, db_path, clock):
+    from controllers.student_c import StudentController
+    from controllers.user_c import UserController
+    user = UserController(db_path).create_user("ana", "ana@example.com", "secret")
+    student = StudentController(db_path).create_student(user.user_id)
+    log.record(MATERIAL_OPEN, student_id=student.student_id, course_id=7)
+    log.record(SUBMISSION, student_id=student.student_id, course_id=7)
+    log.flush()
+
+    reports = ActivityController(db_path)
+    totals = reports.course_totals([7, 8], T0)
+    assert totals[7] == {"events": {MATERIAL_OPEN: 1, SUBMISSION: 1}, "active_students": 1}
+    assert totals[8] == {"events": {}, "active_students": 0}
+    assert reports.student_totals(7, T0) == [{"student_id": student.student_id, "username": "ana",
+                                              "events": {MATERIAL_OPEN: 1, SUBMISSION: 1}}]
+    assert [row["bucket"] for row in reports.course_series(7, T0, HOUR)] == [T0 + 10 * HOUR] * 2
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from utils.batch_writer import BatchWriter
+
+
+def test_concurrent_writes_share_batches():
+    batches = []
+    gate = threading.Event()
+
+    def write_batch(items):
+        gate.wait()
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    writer = BatchWriter(write_batch, max_batch=8, max_wait=0.05)
+    futures = [writer.submit(i) for i in range(20)]
+    gate.set()
+    assert [future.result(5) for future in futures] == [i * 2 for i in range(20)]
+    writer.close()
+    assert sorted(item for batch in batches for item in batch) == list(range(20))
+    assert max(len(batch) for batch in batches) <= 8
+    assert writer.batches == len(batches) < 20 and writer.items == 20
+
+
+def test_an_item_can_fail_alone():
+    def write_batch(items):
+        return [ValueError(item) if item < 0 else item for item in items]
+
+    writer = BatchWriter(write_batch, max_wait=0.05)
+    good, bad = writer.submit(1), writer.submit(-1)
+    assert good.result(5) == 1
+    with pytest.raises(ValueError):
+        bad.result(5)
+    writer.close()
+
+
+def test_a_failed_batch_fails_every_caller_and_the_writer_goes_on():
+    calls = []
+
+    def write_batch(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError("disk full")
+        return items
+
+    writer = BatchWriter(write_batch, max_wait=0.05)
+    first = [writer.submit(i) for i in range(3)]
+    for future in first:
+        with pytest.raises(RuntimeError):
+            future.result(5)
+    assert writer.write("next") == "next"
+    writer.close()
+    assert writer.batches == 1
+
+
+def test_close_finishes_the_queued_writes():
+    done = []
+    writer = BatchWriter(lambda items: done.extend(items) or items, max_batch=2)
+    futures = [writer.submit(i) for i in range(5)]
+    writer.close()
+    assert all(future.done() for future in futures) and done == list(range(5))
+    assert writer.write("again") == "again"  # a new thread starts on demand
+    writer.close()
@@ -0,0 +1,55 @@
+import sqlite3
+import time
+
+import pytest
+
+from benchmarks import datagen, load
+from utils.db_helper import close_all_pools
+
+SMALL = dict(teachers=3, courses=6, students=40, courses_per_student=2, assignments=3, materials=2)
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "school.db")
+    counts = datagen.generate(path, seed=1, **SMALL)
+    yield path, counts
+    close_all_pools()
+
+
+def test_generate_fills_every_table(dataset, tmp_path):
+    path, counts = dataset
+    assert counts["User"] == 43 and counts["Course"] == 6 and counts["Enrollment"] == 80
+    assert counts["Assignment"] == 18 and counts["CourseMaterial"] == 12 and counts["Submission"] > 0
+    conn = sqlite3.connect(path)
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    assert conn.execute("SELECT COUNT(*) FROM Submission WHERE submission_time > ?", (now,)).fetchone() == (0,)
+    assert conn.execute("SELECT MIN(n), MAX(n) FROM (SELECT COUNT(*) AS n FROM Enrollment GROUP BY student_id)"
+                        ).fetchone() == (2, 2)
+    # The triggers kept the dashboard counters in step with the bulk load
+    assert conn.execute("SELECT SUM(total_courses) FROM TeacherStats").fetchone() == (6,)
+    conn.close()
+
+    with pytest.raises(FileExistsError):
+        datagen.generate(path, **SMALL)
+    again = str(tmp_path / "again.db")
+    assert datagen.generate(again, seed=1, **SMALL) == counts
+
+
+def test_load_runs_every_case(dataset):
+    path, _ = dataset
+    report = load.run(path, seconds=0.01, threads=2)
+    assert report["threads"] == 2 and report["results"]
+    for name, stats in report["results"].items():
+        assert stats["calls"] >= 2, name
+        assert stats["p50_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+        assert "write" in stats["pools"]
+
+
+def test_percentile_and_baseline_ratio():
+    assert [load.percentile([1, 2, 3, 4], q) for q in (0, 25, 50, 99, 100)] == [1, 1, 2, 4, 4]
+    results = {"a": {"p50_ms": 2.0, "p99_ms": 6.0}, "b": {"p50_ms": 1.0, "p99_ms": 1.0}}
+    load.compare(results, {"results": {"a": {"p50_ms": 1.0, "p99_ms": 3.0}}})
+    assert results["a"]["p50_vs_baseline"] == 2.0 and results["a"]["p99_vs_baseline"] == 2.0
+    assert "p50_vs_baseline" not in results["b"]
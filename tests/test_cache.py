@@ -0,0 +1,80 @@
+import pytest
+
+from controllers.course_c import CourseController
+from controllers.teacher_c import TeacherController
+from controllers.user_c import UserController
+from service.errors import NotFound
+from utils import cache as cache_module
+from utils.cache import LRUCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_entries_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    cache = LRUCache(ttl=10)
+    cache.set("a", None)
+    assert cache.get("a", "missing") is None  # a cached None is still a hit
+    clock.now += 10
+    assert cache.get("a", "missing") == "missing" and len(cache) == 0
+
+
+def test_reads_are_shared_per_database_and_invalidated_by_writes(db_path):
+    courses, other = CourseController(db_path), CourseController(db_path)
+    course = courses.create_course("Algebra", "Linear", None)
+    assert courses.get_course_by_id(course.course_id) is other.get_course_by_id(course.course_id)
+    assert [c.title for c in other.get_all_courses()] == ["Algebra"]
+
+    courses.update_course(course.course_id, title="Algebra I")
+    assert other.get_course_by_id(course.course_id).title == "Algebra I"
+    assert [c.title for c in other.get_all_courses()] == ["Algebra I"]
+    courses.delete_course(course.course_id)
+    assert other.get_course_by_id(course.course_id) is None
+    assert other.get_all_courses() == []
+
+
+def test_a_cached_miss_is_forgotten_when_the_row_appears(db_path):
+    users, teachers = UserController(db_path), TeacherController(db_path)
+    assert users.get_user_by_username("ana") is None
+    user = users.create_user("ana", "ana@example.com", "secret")
+    assert users.get_user_by_username("ana").user_id == user.user_id
+    assert teachers.get_teacher_by_user_id(user.user_id) is None
+    teachers.create_teacher(user.user_id)
+    assert teachers.get_teacher_by_user_id(user.user_id) is not None
+
+
+def test_controllers_on_other_databases_do_not_share_entries(db_path, tmp_path):
+    from database import init_db
+    second = str(tmp_path / "second.db")
+    init_db(second)
+    UserController(db_path).create_user("ana", "ana@example.com", "secret")
+    assert UserController(db_path).get_user_by_username("ana") is not None
+    assert UserController(second).get_user_by_username("ana") is None
+
+
+def test_service_sees_its_own_course_updates(school):
+    service, teacher = school.service, school.teacher["token"]
+    assert service.get_course(teacher, school.course_id)["title"] == "Algebra"
+    service.update_course(teacher, school.course_id, title="Algebra I")
+    assert service.get_course(school.alice["token"], school.course_id)["title"] == "Algebra I"
+    service.delete_course(teacher, school.course_id)
+    with pytest.raises(NotFound):
+        service.get_course(teacher, school.course_id)
@@ -0,0 +1,53 @@
+import sqlite3
+import time
+
+from utils.db_helper import ChangeCounter
+
+
+def day(offset):
+    return time.strftime("%Y-%m-%d", time.gmtime(time.time() + offset * 24 * 3600))
+
+
+def test_feed_lists_latest_materials_and_upcoming_work(school):
+    service, teacher, alice = school.service, school.teacher["token"], school.alice["token"]
+    for i in range(4):
+        service.add_material(teacher, school.course_id, f"m{i}.pdf", f"%PDF-1.4 m{i}".encode())
+    service.add_assignment(teacher, school.course_id, "past.pdf", b"%PDF-1.4 past", day(-2))
+    soon = service.add_assignment(teacher, school.course_id, "soon.pdf", b"%PDF-1.4 soon", day(2))
+    service.submit(alice, soon["assignment_id"], "s.pdf", b"%PDF-1.4 s")
+    other = service.create_course(teacher, "Biology", "Cells")["course_id"]
+    service.enroll(teacher, other, ["alice@example.com"])
+
+    feed = service.course_feed(alice, materials=3)
+    assert [course["title"] for course in feed["courses"]] == ["Algebra", "Biology"]
+    algebra = feed["courses"][0]
+    assert len(algebra["materials"]) == 3
+    assert [(a["pdf_file"], a["submitted"]) for a in algebra["assignments"]] == [
+        ("soon.pdf", True), ("task.pdf", False)]
+    assert feed["courses"][1]["materials"] == feed["courses"][1]["assignments"] == []
+    assert service.course_feed(school.bob["token"])["courses"][0]["assignments"][0]["submitted"] is False
+
+
+def test_feed_is_only_sent_again_after_a_change(school):
+    service, alice = school.service, school.alice["token"]
+    first = service.course_feed(alice)
+    assert first["changed"]
+    assert service.course_feed(alice, since=first["version"]) == {"version": first["version"], "changed": False}
+    service.add_material(school.teacher["token"], school.course_id, "new.pdf", b"%PDF-1.4 new")
+    second = service.course_feed(alice, since=first["version"])
+    assert second["changed"] and second["version"] != first["version"]
+    assert second["courses"][0]["materials"][0]["pdf_file"] == "new.pdf"
+
+
+def test_change_counter(db_path):
+    counter = ChangeCounter(db_path)
+    start = counter.poll()
+    assert counter.poll() == start
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("INSERT INTO User (username, email, password) VALUES ('ana', 'ana@example.com', 'x')")
+    conn.close()
+    assert counter.poll() == start + 1 == counter.poll()
+    counter.close()
+    assert counter.poll() > start + 1  # commits made while closed were not seen
+    counter.close()
@@ -0,0 +1,39 @@
+import datetime
+
+from database import rebuild_stats
+
+
+def counters(service):
+    with service.db.reader() as conn:
+        return (conn.execute("SELECT * FROM TeacherStats ORDER BY teacher_id").fetchall(),
+                conn.execute("SELECT * FROM StudentStats ORDER BY student_id").fetchall(),
+                conn.execute("SELECT * FROM TeacherStudent ORDER BY teacher_id, student_id").fetchall())
+
+
+def test_dashboards_read_the_counters(school):
+    service = school.service
+    assert service.dashboard(school.teacher["token"]) == {"total_courses": 1, "total_students": 2}
+    assert service.dashboard(school.alice["token"]) == {"total_courses": 1, "pending_assignments": 1}
+
+    past = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    service.add_assignment(school.teacher["token"], school.course_id, "old.pdf", b"%PDF-1.4 old", past)
+    assert service.dashboard(school.alice["token"]) == {"total_courses": 1, "pending_assignments": 1}
+
+
+def test_triggers_match_a_rebuild(school):
+    service, teacher = school.service, school.teacher["token"]
+    # A second course shares alice, so she counts once for the teacher
+    second = service.create_course(teacher, "Geometry", "Angles")["course_id"]
+    service.enroll(teacher, second, ["alice@example.com"])
+    service.add_assignment(teacher, second, "g.pdf", b"%PDF-1.4 g", datetime.date.today().isoformat())
+    service.register("carol", "carol@example.com", "secret", "student")
+    assert service.dashboard(teacher) == {"total_courses": 2, "total_students": 2}
+
+    service.delete_course(teacher, school.course_id)
+    assert service.dashboard(teacher) == {"total_courses": 1, "total_students": 1}
+    assert service.dashboard(school.bob["token"])["total_courses"] == 0
+
+    incremental = counters(service)
+    with service.db.connection() as conn:
+        rebuild_stats(conn)
+    assert counters(service) == incremental
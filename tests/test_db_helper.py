@@ -0,0 +1,189 @@
+import sqlite3
+import threading
+
+import pytest
+
+from utils.db_helper import (DBHelper, ConnectionPool, PoolTimeout, TimedConnection, get_pool, pool_stats,
+                             query_stats)
+
+
+@pytest.fixture
+def db(db_path):
+    db = DBHelper(db_path)
+    with db.connection() as conn:
+        conn.execute("CREATE TABLE Note (note_id INTEGER PRIMARY KEY, body TEXT)")
+    return db
+
+
+def count(db):
+    with db.reader() as conn:
+        return conn.execute("SELECT COUNT(*) FROM Note").fetchone()[0]
+
+
+def test_pools_are_shared_per_path(db, db_path):
+    assert DBHelper(db_path).pool is db.pool is get_pool(db_path)
+    assert db.readers is get_pool(db_path, read_only=True)
+    assert db.pool.size == 1
+
+
+def test_nested_checkouts_reuse_one_connection_and_commit_once(db):
+    with db.connection() as outer:
+        assert outer.in_transaction  # the write lock is taken on checkout
+        outer.execute("INSERT INTO Note (body) VALUES ('a')")
+        with db.connection() as inner:
+            assert inner is outer
+            inner.execute("INSERT INTO Note (body) VALUES ('b')")
+        assert outer.in_transaction
+        assert count(db) == 2  # reader() inside the writer sees its own changes
+        with db.snapshot():
+            pass
+        assert outer.in_transaction
+    assert count(db) == 2
+    assert not db.pool.held()
+
+
+def test_error_rolls_back_the_whole_checkout(db):
+    with pytest.raises(RuntimeError):
+        with db.connection() as conn:
+            conn.execute("INSERT INTO Note (body) VALUES ('a')")
+            with db.connection() as inner:
+                inner.execute("INSERT INTO Note (body) VALUES ('b')")
+            raise RuntimeError
+    assert count(db) == 0
+
+
+def test_nested_commit_leaves_the_callers_transaction_open(db):
+    with pytest.raises(RuntimeError):
+        with db.connection():
+            db.execute("INSERT INTO Note (body) VALUES ('a')", commit=True)
+            db.executemany("INSERT INTO Note (body) VALUES (?)", [("b",), ("c",)], commit=True)
+            raise RuntimeError
+    assert count(db) == 0
+    db.execute("INSERT INTO Note (body) VALUES ('a')", commit=True)
+    assert count(db) == 1
+
+
+def test_execute_sends_queries_to_the_readers(db):
+    db.execute("INSERT INTO Note (body) VALUES ('a')")
+    before = db.pool.metrics()["checkouts"], db.readers.metrics()["checkouts"]
+    assert db.execute("SELECT body FROM Note", fetchall=True) == [("a",)]
+    assert db.execute("WITH n AS (SELECT 1) SELECT COUNT(*) FROM n", fetchone=True) == (1,)
+    assert db.execute("INSERT INTO Note (body) VALUES ('b') RETURNING note_id", fetchone=True) == (2,)
+    after = db.pool.metrics()["checkouts"], db.readers.metrics()["checkouts"]
+    assert (after[0] - before[0], after[1] - before[1]) == (1, 2)
+
+
+def test_readers_cannot_write(db):
+    with pytest.raises(sqlite3.OperationalError):
+        with db.reader() as conn:
+            conn.execute("INSERT INTO Note (body) VALUES ('a')")
+
+
+def test_snapshot_sees_one_commit(db):
+    db.execute("INSERT INTO Note (body) VALUES ('a')")
+    with db.snapshot() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM Note").fetchone() == (1,)
+        db.execute("INSERT INTO Note (body) VALUES ('b')")  # other thread's view: the writer is free
+        assert conn.execute("SELECT COUNT(*) FROM Note").fetchone() == (1,)
+    assert count(db) == 2
+
+
+def test_writers_queue_for_the_single_connection(db):
+    started, inside = threading.Event(), []
+
+    def write(i):
+        started.wait()
+        with db.connection() as conn:
+            inside.append(i)
+            assert len(inside) == 1
+            conn.execute("INSERT INTO Note (body) VALUES (?)", (str(i),))
+            inside.remove(i)
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+    assert count(db) == 8
+    metrics = next(m for m in pool_stats() if m["mode"] == "write")
+    assert metrics["peak_in_use"] == 1
+
+
+def test_busy_writer_retries_until_another_process_lets_go(db, db_path):
+    other = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    timer = threading.Timer(0.2, other.execute, ("COMMIT",))
+    timer.start()
+    db.pool.reset_metrics()
+    with db.connection() as conn:
+        conn.execute("INSERT INTO Note (body) VALUES ('a')")
+    timer.join()
+    other.close()
+    metrics = db.pool.metrics()
+    assert metrics["busy"] == 1 and metrics["retries"] >= 1 and metrics["busy_failures"] == 0
+    assert count(db) == 1
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted(db_path):
+    pool = ConnectionPool(db_path, size=1, timeout=0.1, read_only=True)
+    held = threading.Event()
+    done = threading.Event()
+
+    def hold():
+        conn = pool.acquire()
+        held.set()
+        done.wait()
+        pool.release(conn)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    done.set()
+    thread.join()
+    assert pool.metrics()["timeouts"] == 1
+    pool.release(pool.acquire())
+    pool.close_all()
+
+
+def test_failed_final_commit_raises_and_drops_the_connection(db, monkeypatch):
+    query_stats.enable()
+    with db.connection() as conn:
+        pass
+
+    def fail(self):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(TimedConnection, "commit", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        with db.connection() as conn:
+            conn.execute("INSERT INTO Note (body) VALUES ('a')")
+    monkeypatch.undo()
+    with db.connection() as again:
+        assert again is not conn
+    assert count(db) == 0
+
+
+def test_idle_connections_are_reused_and_replaced_when_stats_toggle(db):
+    with db.reader() as first:
+        pass
+    with db.reader() as second:
+        assert second is first  # the warmest connection comes back
+    query_stats.enable()
+    with db.reader() as timed:
+        assert isinstance(timed, TimedConnection) and timed is not first
+    query_stats.disable()
+    with db.reader() as plain:
+        assert not isinstance(plain, TimedConnection)
+
+
+def test_unhealthy_idle_connection_is_replaced(db, monkeypatch):
+    with db.reader() as conn:
+        pass
+    monkeypatch.setattr("utils.db_helper.HEALTH_CHECK_INTERVAL", 0.0)
+    conn.close()
+    with db.reader() as fresh:
+        assert fresh is not conn
+        assert fresh.execute("SELECT COUNT(*) FROM Note").fetchone() == (0,)
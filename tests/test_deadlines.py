@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from controllers.assignment_c import due_timestamp
+from database import due_at_sql
+from service.errors import BadRequest
+from utils.scheduler import Scheduler
+
+
+@pytest.mark.parametrize("due_date", ["2024-02-29", "2024-02-29 08:30", "2024-02-29 08:30:15"])
+def test_due_timestamp_matches_the_sql(due_date):
+    conn = sqlite3.connect(":memory:")
+    assert due_timestamp(due_date) == conn.execute(f"SELECT {due_at_sql(':due')}", {"due": due_date}).fetchone()[0]
+    conn.close()
+
+
+def test_due_timestamp_refuses_other_formats():
+    with pytest.raises(ValueError):
+        due_timestamp("29/02/2024")
+
+
+def day(offset):
+    return time.strftime("%Y-%m-%d", time.gmtime(time.time() + offset * 24 * 3600))
+
+
+def test_deadlines_in_a_window(school):
+    service, teacher, alice = school.service, school.teacher["token"], school.alice["token"]
+    service.add_assignment(teacher, school.course_id, "soon.pdf", b"%PDF-1.4 soon", day(1))
+    service.add_assignment(teacher, school.course_id, "past.pdf", b"%PDF-1.4 past", day(-1))
+    service.add_assignment(teacher, school.course_id, "later.pdf", b"%PDF-1.4 later", day(30))
+    service.submit(alice, school.assignment_id, "a.pdf", b"%PDF-1.4 a")
+
+    upcoming = service.upcoming_deadlines(alice, days=14)
+    assert [(a["pdf_file"], a["course"], a["submitted"]) for a in upcoming] == [
+        ("soon.pdf", "Algebra", False), ("task.pdf", "Algebra", True)]
+    assert [a["pdf_file"] for a in service.upcoming_deadlines(alice, days=60)][-1] == "later.pdf"
+    teacher_view = service.course_deadlines(teacher, school.course_id, days=14)
+    assert [(a["pdf_file"], a["submissions"]) for a in teacher_view] == [("soon.pdf", 0), ("task.pdf", 1)]
+    assert [a["pdf_file"] for a in service.course_deadlines(school.bob["token"], school.course_id, 14)] == [
+        "soon.pdf", "task.pdf"]
+    with pytest.raises(BadRequest):
+        service.upcoming_deadlines(alice, days=0)
+
+
+class Collector:
+    def __init__(self, expected):
+        self.calls = []
+        self.expected = expected
+        self.done = threading.Event()
+
+    def __call__(self, key, payload):
+        self.calls.append((key, payload))
+        if len(self.calls) == self.expected:
+            self.done.set()
+
+
+def test_scheduler_fires_in_time_order():
+    collector = Collector(3)
+    scheduler = Scheduler(collector)
+    now = time.time()
+    try:
+        scheduler.schedule(now + 0.15, "c", 3)
+        scheduler.schedule(now + 0.05, "b", 2)
+        scheduler.schedule(now - 10, "a", 1)  # already past: fires at once
+        scheduler.schedule(now + 0.10, "x")
+        assert scheduler.cancel("x") and not scheduler.cancel("x")
+        assert collector.done.wait(5)
+        assert collector.calls == [("a", 1), ("b", 2), ("c", 3)]
+        assert len(scheduler) == 0 and scheduler.next_time() is None
+    finally:
+        scheduler.close()
+
+
+def test_rescheduling_a_key_replaces_its_entry():
+    collector = Collector(1)
+    scheduler = Scheduler(collector)
+    try:
+        scheduler.schedule(time.time() + 3600, "reminder", "old")
+        scheduler.schedule(time.time() + 0.02, "reminder", "new")
+        assert len(scheduler) == 1
+        assert collector.done.wait(5)
+        time.sleep(0.05)
+        assert collector.calls == [("reminder", "new")]
+    finally:
+        scheduler.close()
+
+
+def test_closed_scheduler_refuses_entries():
+    scheduler = Scheduler(lambda key, payload: None)
+    scheduler.schedule(time.time() + 3600, "a")
+    scheduler.close()
+    assert len(scheduler) == 0
+    with pytest.raises(RuntimeError):
+        scheduler.schedule(time.time(), "b")
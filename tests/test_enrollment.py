@@ -0,0 +1,53 @@
+import pytest
+
+from controllers.enrollment_c import (EnrollmentController, read_email_list, ENROLLED, ALREADY_ENROLLED,
+                                      NOT_A_STUDENT, DUPLICATE)
+from utils.activity import ENROLLMENT
+
+
+def test_read_email_list():
+    assert read_email_list("name,Email\nAna,ana@example.com\nBo,\nCy, cy@example.com \n") == [
+        "ana@example.com", "cy@example.com"]
+    assert read_email_list("ana@example.com; bo@example.com\n cy@example.com,dee") == [
+        "ana@example.com", "bo@example.com", "cy@example.com"]
+    assert read_email_list("") == []
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def record(self, kind, **fields):
+        self.events.append((kind, fields))
+
+
+def test_enroll_by_emails_reports_every_row(school):
+    service = school.service
+    service.register("carol", "carol@example.com", "secret", "student")
+    activity = Recorder()
+    enrollments = EnrollmentController(service.db_path, activity=activity)
+    second = service.create_course(school.teacher["token"], "Geometry", "Angles")["course_id"]
+    enrollments.enroll_by_emails(second, ["bob@example.com"])
+    activity.events.clear()
+
+    report = enrollments.enroll_by_emails(second, [
+        " alice@example.com", "bob@example.com", "teacher@example.com", "nobody@example.com",
+        "carol@example.com", "alice@example.com"])
+    assert report == [
+        ("alice@example.com", ENROLLED), ("bob@example.com", ALREADY_ENROLLED),
+        ("teacher@example.com", NOT_A_STUDENT), ("nobody@example.com", NOT_A_STUDENT),
+        ("carol@example.com", ENROLLED), ("alice@example.com", DUPLICATE)]
+    roster = {e.student_id for e in enrollments.get_students_by_course(second)}
+    assert len(roster) == 3
+    assert [(kind, fields["course_id"]) for kind, fields in activity.events] == [(ENROLLMENT, second)] * 2
+
+
+def test_enrollments_roll_back_with_the_callers_transaction(school):
+    service = school.service
+    enrollments = EnrollmentController(service.db_path)
+    second = service.create_course(school.teacher["token"], "Geometry", "Angles")["course_id"]
+    with pytest.raises(RuntimeError):
+        with service.db.connection():
+            enrollments.enroll_by_emails(second, ["alice@example.com", "bob@example.com"])
+            raise RuntimeError
+    assert enrollments.get_students_by_course(second) == []
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+import pytest
+
+from controllers.export_c import ExportController, ROSTER_HEADER, GRADED, SUBMITTED, MISSING, PENDING
+from service.errors import BadRequest
+from service.lms import LONG, WIDE
+from utils.export import export, CSV, JSONL, XLSX
+
+NS = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def rows():
+    yield ["name", "score"]
+    yield [("ana", 90), ("bo, jr", None)]
+    yield [("c\x01y", 7.5)]
+
+
+def test_csv_and_jsonl():
+    out = export(CSV, "report", rows())
+    assert out.filename == "report.csv" and out.content_type.startswith("text/csv")
+    text = b"".join(out.chunks).decode("utf-8")
+    assert text.startswith("\ufeff")
+    assert list(csv.reader(io.StringIO(text[1:]))) == [["name", "score"], ["ana", "90"], ["bo, jr", ""],
+                                                       ["c\x01y", "7.5"]]
+    lines = b"".join(export(JSONL, "report", rows()).chunks).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [{"name": "ana", "score": 90}, {"name": "bo, jr", "score": None},
+                                                    {"name": "c\x01y", "score": 7.5}]
+    with pytest.raises(ValueError):
+        export("pdf", "report", rows())
+
+
+def test_xlsx_is_a_readable_workbook(tmp_path):
+    path = tmp_path / "report.xlsx"
+    export(XLSX, "report", rows()).save(path)
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        sheet = ET.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+    cells = [[c.findtext("s:v", namespaces=NS) or c.findtext("s:is/s:t", namespaces=NS) for c in row]
+             for row in sheet.iterfind("s:sheetData/s:row", NS)]
+    assert cells == [["name", "score"], ["ana", "90"], ["bo, jr", None], ["cy", "7.5"]]
+
+
+def test_closing_an_export_early_closes_its_source():
+    closed = []
+
+    def source():
+        try:
+            yield ["n"]
+            for i in range(100):
+                yield [(i,)]
+        finally:
+            closed.append(True)
+
+    chunks = export(CSV, "report", source()).chunks
+    next(chunks)
+    chunks.close()
+    assert closed == [True]
+
+
+def read_csv(export):
+    return list(csv.reader(io.StringIO(b"".join(export.chunks).decode("utf-8-sig"))))
+
+
+def test_gradebooks(school):
+    service, teacher = school.service, school.teacher["token"]
+    past = time.strftime("%Y-%m-%d", time.gmtime(time.time() - 3 * 24 * 3600))
+    service.add_assignment(teacher, school.course_id, "old.pdf", b"%PDF-1.4 old", past)
+    first = service.submit(school.alice["token"], school.assignment_id, "a.pdf", b"%PDF-1.4 a")
+    service.grade(teacher, first["submission_id"], "60")
+    service.submit(school.alice["token"], school.assignment_id, "a2.pdf", b"%PDF-1.4 a2")  # latest counts
+    graded = service.submit(school.bob["token"], school.assignment_id, "b.pdf", b"%PDF-1.4 b")
+    service.grade(teacher, graded["submission_id"], "88")
+
+    long = read_csv(service.export_gradebook(teacher, CSV, school.course_id, LONG))
+    assert [(row[3], row[5], row[8], row[9]) for row in long[1:]] == [
+        ("old.pdf", "alice", "", MISSING), ("task.pdf", "alice", "", SUBMITTED),
+        ("old.pdf", "bob", "", MISSING), ("task.pdf", "bob", "88", GRADED)]
+    wide = read_csv(service.export_gradebook(teacher, CSV, school.course_id, WIDE))
+    assert wide[0][:3] == ["username", "email", f"old.pdf (due {past})"]
+    assert [row[:1] + row[2:] for row in wide[1:]] == [["alice", MISSING, SUBMITTED], ["bob", MISSING, "88"]]
+
+    with pytest.raises(BadRequest):
+        service.export_gradebook(teacher, CSV, None, WIDE)
+    with pytest.raises(BadRequest):
+        service.export_roster(teacher, "pdf")
+
+
+def test_pending_work_is_not_missing(school):
+    service, teacher = school.service, school.teacher["token"]
+    long = read_csv(service.export_gradebook(teacher, CSV, school.course_id))
+    assert {row[9] for row in long[1:]} == {PENDING}
+
+
+def test_an_export_reads_one_snapshot(school):
+    service = school.service
+    rows = ExportController(service.db_path).roster([school.course_id], batch_size=1)
+    assert next(rows) == ROSTER_HEADER
+    assert [row[2] for row in next(rows)] == ["alice"]
+    service.register("carol", "carol@example.com", "secret", "student")
+    service.enroll(school.teacher["token"], school.course_id, ["carol@example.com"])
+    assert [row[2] for batch in rows for row in batch] == ["bob"]
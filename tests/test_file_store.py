@@ -0,0 +1,191 @@
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+
+from controllers.course_c import CourseController
+from controllers.material_c import MaterialController
+from service.errors import Forbidden
+from utils.file_store import FileStore, MATERIALS_STORE
+
+
+@pytest.fixture
+def store(db_path):
+    return FileStore(MATERIALS_STORE, db_path=db_path, chunk_size=4)
+
+
+def row_of(store, file_hash):
+    with store.db.reader() as conn:
+        return conn.execute("SELECT size, ref_count FROM StoredFile WHERE store = ? AND sha256 = ?",
+                            (store.name, file_hash)).fetchone()
+
+
+def stored_files(store):
+    return sorted(name for name in os.listdir(store.root) if not name.endswith(".part") and name != "uploads")
+
+
+def test_ingest_streams_hashes_and_dedups(store, tmp_path):
+    content = b"%PDF-1.4 same bytes"
+    src = tmp_path / "in.pdf"
+    src.write_bytes(content)
+    file_hash, size = store.ingest(str(src))
+    assert (file_hash, size) == (hashlib.sha256(content).hexdigest(), len(content))
+    assert store.ingest(io.BytesIO(content)) == (file_hash, size)
+    assert stored_files(store) == [file_hash + ".pdf"]
+    assert b"".join(store.chunks(store.path_for(file_hash))) == content
+    assert row_of(store, file_hash) == (size, 0)
+
+
+def test_rows_pointing_at_a_file_count_its_references(store, db_path):
+    file_hash, _ = store.ingest(io.BytesIO(b"notes"))
+    course = CourseController(db_path).create_course("Algebra", "Linear", 1)
+    materials = MaterialController(db_path)
+    materials.create_material(course.course_id, "a.pdf", file_hash=file_hash)
+    materials.create_material(course.course_id, "b.pdf", file_hash=file_hash)
+    assert row_of(store, file_hash)[1] == 2
+    CourseController(db_path).delete_course(course.course_id)
+    assert row_of(store, file_hash)[1] == 0
+
+
+def test_garbage_collection_keeps_referenced_and_recent_files(store, db_path):
+    used, _ = store.ingest(io.BytesIO(b"used"))
+    unused, _ = store.ingest(io.BytesIO(b"unused"))
+    course = CourseController(db_path).create_course("Algebra", "Linear", 1)
+    MaterialController(db_path).create_material(course.course_id, "a.pdf", file_hash=used)
+
+    assert store.collect_garbage() == 0  # both are within the grace period
+    assert store.collect_garbage(grace=0) == 1
+    assert stored_files(store) == [used + ".pdf"]
+    assert row_of(store, unused) is None
+    assert row_of(store, used) == (4, 1)
+
+
+def test_published_but_unrecorded_files_are_collected(store):
+    staged = store.stage(io.BytesIO(b"orphan"))
+    store.publish([staged])
+    assert os.path.exists(store.path_for(staged[1]))
+    assert row_of(store, staged[1]) is None
+    assert store.collect_garbage() == 0
+    assert store.collect_garbage(grace=0) == 1
+    assert stored_files(store) == []
+
+
+def test_unreferenced_rows_without_a_file_are_dropped(store):
+    file_hash, _ = store.ingest(io.BytesIO(b"gone"))
+    os.remove(store.path_for(file_hash))
+    store.collect_garbage(grace=0)
+    assert row_of(store, file_hash) is None
+
+
+def test_abandoned_uploads_and_staged_copies_are_removed(store):
+    store.append("abc", 0, b"part")
+    staged = store.stage(io.BytesIO(b"staged"))
+    store.collect_garbage(upload_ttl=3600)
+    assert store.size_of("abc") == 4 and os.path.exists(staged[0])
+    store.collect_garbage(upload_ttl=-1)
+    assert store.size_of("abc") == 0 and not os.path.exists(staged[0])
+
+
+def test_resumable_upload(store):
+    assert store.append("up", 0, b"%PDF") == 4
+    assert store.append("up", 0, b"%PDF") == 4  # a resent chunk is ignored
+    assert store.append("up", 10, b"gap") == 4  # so is one past the end
+    assert store.append("up", 4, b"-1.4") == 8
+    tmp_path, file_hash, size = store.stage_upload("up")
+    assert (file_hash, size) == (hashlib.sha256(b"%PDF-1.4").hexdigest(), 8)
+    store.publish([(tmp_path, file_hash, size)])
+    store.record([(tmp_path, file_hash, size)])
+    assert open(store.path_for(file_hash), "rb").read() == b"%PDF-1.4"
+    assert store.size_of("up") == 0
+
+
+def test_failed_submission_transaction_leaves_no_row_and_a_collectable_file(school, monkeypatch):
+    service = school.service
+
+    def fail(rows):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(service.submissions, "record_submissions", fail)
+    with pytest.raises(RuntimeError):
+        service.submit(school.alice["token"], school.assignment_id, "a.pdf", b"%PDF-1.4 lost")
+    store = service.submission_store
+    file_hash = hashlib.sha256(b"%PDF-1.4 lost").hexdigest()
+    assert row_of(store, file_hash) is None
+    assert os.path.exists(store.path_for(file_hash))
+    assert store.collect_garbage(grace=0) == 1
+
+
+def test_burst_of_submissions_shares_transactions(school):
+    service = school.service
+    errors = []
+
+    def submit(token, i):
+        try:
+            service.submit(token, school.assignment_id, f"{i}.pdf", b"%PDF-1.4 " + bytes([i]))
+        except Exception as e:
+            errors.append(e)
+
+    tokens = [school.alice["token"], school.bob["token"]]
+    threads = [threading.Thread(target=submit, args=(tokens[i % 2], i)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    writer = service.submission_writer
+    assert writer.items == 40 and writer.batches < 40
+    with service.db.reader() as conn:
+        assert conn.execute("SELECT COUNT(*), COUNT(DISTINCT file_hash) FROM Submission").fetchone() == (40, 40)
+        assert conn.execute("SELECT COUNT(*) FROM StoredFile WHERE store = 'submissions' AND ref_count = 1"
+                            ).fetchone() == (40,)
+
+
+def test_submissions_after_the_due_date_are_refused(school):
+    service = school.service
+    with service.db.connection() as conn:
+        conn.execute("UPDATE Assignment SET due_date = '2000-01-01' WHERE assignment_id = ?",
+                     (school.assignment_id,))
+    with pytest.raises(Forbidden):
+        service.submit(school.alice["token"], school.assignment_id, "late.pdf", b"%PDF-1.4 late")
+
+
+class FailingSource(io.RawIOBase):
+    def __init__(self, fail_after):
+        self.left = fail_after
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        if self.left <= 0:
+            raise OSError("connection reset")
+        n = min(len(buf), self.left, 3)
+        buf[:n] = b"x" * n
+        self.left -= n
+        return n
+
+
+def test_a_failed_copy_leaves_nothing_behind(store):
+    with pytest.raises(OSError):
+        store.stage(FailingSource(10))
+    assert os.listdir(store.root) == []
+
+
+def test_large_files_are_copied_a_chunk_at_a_time(store):
+    content = os.urandom(4 * 1000 + 3)  # chunk_size is 4
+    file_hash, size = store.ingest(io.BufferedReader(io.BytesIO(content), buffer_size=4))
+    assert (file_hash, size) == (hashlib.sha256(content).hexdigest(), len(content))
+    assert open(store.path_for(file_hash), "rb").read() == content
+    assert all(len(chunk) <= 4 for chunk in store.chunks(store.path_for(file_hash)))
+
+
+def test_publishing_a_known_file_drops_the_copy(store):
+    first = store.stage(io.BytesIO(b"same"))
+    second = store.stage(io.BytesIO(b"same"))
+    store.publish([first, second])
+    assert stored_files(store) == [first[1] + ".pdf"]
+    assert not os.path.exists(second[0])
+    assert store.resolve("old_name.pdf") == os.path.join(store.root, "old_name.pdf")
+    assert store.resolve("old_name.pdf", first[1]) == store.path_for(first[1])
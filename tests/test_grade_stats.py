@@ -0,0 +1,148 @@
+import sqlite3
+
+import pytest
+
+from database import MIGRATIONS, create_tables, migrate, score_sql
+from utils.grade_stats import ASSIGNMENT, ENROLLMENT, SUBMISSION
+
+np = pytest.importorskip("numpy")
+
+from utils.grade_stats import Gradebook, PERCENTILES  # noqa: E402
+
+GRADES = [
+    ("85", 85.0), ("85%", 85.0), (" 72,5 ", 72.5), ("17/20", 85.0), ("17 / 20", 85.0), ("0", 0.0),
+    ("100", 100.0), ("101", None), ("-1", None), ("A+", None), ("3/0", None), ("1.2.3", None),
+    ("", None), (None, None),
+]
+
+
+@pytest.mark.parametrize("grade, value", GRADES)
+def test_score_sql(grade, value):
+    conn = sqlite3.connect(":memory:")
+    assert conn.execute(f"SELECT {score_sql('?')}", (grade,)).fetchone() == (value,)
+
+
+def brute_force(rows, now):
+    """Final grades per (course, student), computed one student at a time."""
+    assignments = {r[1]: (r[2], r[3], r[4]) for r in rows if r[0] == ASSIGNMENT}
+    enrollments = [(r[2], r[1]) for r in rows if r[0] == ENROLLMENT]
+    latest = {}
+    for _, student, assignment, submission, score in sorted(r for r in rows if r[0] == SUBMISSION):
+        latest[student, assignment] = score
+    finals = {}
+    for course, student in enrollments:
+        points = weights = 0.0
+        for assignment, (a_course, due_at, weight) in assignments.items():
+            if a_course != course:
+                continue
+            if (student, assignment) in latest:
+                score = latest[student, assignment]
+                if score is not None:
+                    points += weight * score
+                    weights += weight
+            elif due_at <= now:
+                weights += weight
+        finals[course, student] = points / weights if weights else None
+    return finals
+
+
+def random_gradebook(seed, courses=3, students=40, assignments=6):
+    rng = np.random.default_rng(seed)
+    rows, submission_id = [], 0
+    for course in range(1, courses + 1):
+        ids = [course * 100 + i for i in range(assignments)]
+        for assignment in ids:
+            rows.append((ASSIGNMENT, assignment, course, float(rng.integers(0, 200)), float(rng.integers(0, 4))))
+        for student in rng.choice(students, size=students // 2, replace=False):
+            rows.append((ENROLLMENT, int(student), course, None, None))
+            for assignment in ids:
+                for _ in range(int(rng.integers(0, 3))):
+                    submission_id += 1
+                    score = None if rng.random() < 0.2 else float(rng.integers(0, 101))
+                    rows.append((SUBMISSION, int(student), assignment, submission_id, score))
+    rows.append((SUBMISSION, 999, 101, 0, 50.0))  # not enrolled: ignored
+    return rows
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_final_grades_match_a_per_student_loop(seed):
+    rows = random_gradebook(seed)
+    book = Gradebook(rows, [1, 2, 3, 4])
+    stats = book.stats(now=100)
+    expected = brute_force(rows, now=100)
+    finals = stats["enrollments"]["final"]
+    for i, (student, course) in enumerate(zip(book.student_ids, book.course_ids[book.enrollment_course])):
+        want = expected[int(course), int(student)]
+        if want is None:
+            assert np.isnan(finals[i])
+        else:
+            assert finals[i] == pytest.approx(want)
+
+    courses = stats["courses"]
+    assert courses["students"].tolist() == [20, 20, 20, 0]
+    for c, course_id in enumerate(book.course_ids):
+        grades = [v for (course, _), v in expected.items() if course == course_id and v is not None]
+        if grades:
+            assert courses["mean"][c] == pytest.approx(np.mean(grades))
+            assert courses["percentiles"][c] == pytest.approx(np.percentile(grades, PERCENTILES))
+            assert courses["distribution"][c].sum() == len(grades)
+        else:
+            assert np.isnan(courses["mean"][c]) and np.isnan(courses["percentiles"][c]).all()
+
+
+def test_assignment_stats_use_the_latest_graded_submission():
+    rows = [
+        (ASSIGNMENT, 10, 1, 0.0, 1.0),
+        (ENROLLMENT, 1, 1, None, None),
+        (ENROLLMENT, 2, 1, None, None),
+        (ENROLLMENT, 3, 1, None, None),
+        (SUBMISSION, 1, 10, 1, 40.0),
+        (SUBMISSION, 1, 10, 5, 80.0),  # resubmitted
+        (SUBMISSION, 2, 10, 2, 60.0),
+    ]
+    stats = Gradebook(rows, [1]).stats(now=50)
+    assignments = stats["assignments"]
+    assert assignments["graded"].tolist() == [2]
+    assert assignments["missing"].tolist() == [1]
+    assert assignments["mean"][0] == pytest.approx(70)
+    assert assignments["std"][0] == pytest.approx(10)
+    assert (assignments["min"][0], assignments["median"][0], assignments["max"][0]) == (60, 70, 80)
+    enrollments = stats["enrollments"]
+    assert enrollments["final"].tolist() == [80, 60, 0]
+    assert enrollments["at_risk"].tolist() == [False, False, True]
+
+
+def test_migration_backfill_and_triggers_score_alike():
+    conn = sqlite3.connect(":memory:")
+    create_tables(conn)
+    before = max(version for version, description, _ in MIGRATIONS if "numeric grades" in description) - 1
+    conn.execute(f"PRAGMA user_version = {before}")
+    for _, _, steps in MIGRATIONS[:before]:
+        for step in steps:
+            step(conn) if callable(step) else conn.execute(step)
+    conn.executemany("INSERT INTO Submission (assignment_id, student_id, pdf_file, grade) VALUES (1, 1, 'a', ?)",
+                     [(grade,) for grade, _ in GRADES])
+    conn.commit()
+    migrate(conn)
+    backfilled = conn.execute("SELECT score FROM Submission ORDER BY submission_id").fetchall()
+    assert backfilled == [(value,) for _, value in GRADES]
+
+    # Rewriting every grade goes through the update trigger
+    conn.execute("UPDATE Submission SET score = -1")
+    conn.execute("UPDATE Submission SET grade = grade")
+    assert conn.execute("SELECT score FROM Submission ORDER BY submission_id").fetchall() == backfilled
+    conn.execute("INSERT INTO Submission (assignment_id, student_id, pdf_file, grade) VALUES (1, 1, 'a', '9,5/10')")
+    assert conn.execute("SELECT score FROM Submission ORDER BY submission_id DESC").fetchone() == (95.0,)
+
+
+def test_course_report(school):
+    service, teacher = school.service, school.teacher["token"]
+    submission = service.submit(school.alice["token"], school.assignment_id, "a.pdf", b"%PDF-1.4 a")
+    service.grade(teacher, submission["submission_id"], "90")
+    report = service.grade_analytics(teacher, school.course_id)
+    assert report["students"] == 2 and report["graded"] == 1
+    assert report["by_assignment"][0]["mean"] == 90
+    # bob's work is not due yet, so he has no final grade
+    assert [(s["username"], s["final"]) for s in report["by_student"]] == [("alice", 90), ("bob", None)]
+    overview = service.grade_overview(teacher)
+    assert overview[0]["course_id"] == school.course_id and overview[0]["mean"] == 90
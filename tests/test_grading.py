@@ -0,0 +1,106 @@
+import pytest
+
+from controllers.submission_c import (parse_grade, read_grade_sheet, write_grade_sheet, GRADED, UNCHANGED,
+                                      NO_SUBMISSION, NOT_IN_COURSE, INVALID_GRADE)
+from service.errors import BadRequest, Forbidden
+
+
+@pytest.mark.parametrize("value, stored", [
+    ("85", "85"), (" 72,50 ", "72.5"), (90.0, "90"), ("0", "0"), ("", None), (None, None), ("66.666", "66.67"),
+])
+def test_parse_grade(value, stored):
+    assert parse_grade(value) == stored
+
+
+@pytest.mark.parametrize("value", ["101", "-5", "A", "17/20"])
+def test_parse_grade_refuses(value):
+    with pytest.raises(ValueError):
+        parse_grade(value)
+
+
+def test_grade_sheet_round_trip():
+    sheet = write_grade_sheet([(1, "ana", "ana@example.com", "2024-01-01 10:00:00", "90"),
+                               (None, "bo", "bo@example.com", None, None)])
+    assert read_grade_sheet("\ufeff" + sheet.replace("grade", "Grade")) == [
+        {"submission_id": "1", "username": "ana", "email": "ana@example.com",
+         "submission_time": "2024-01-01 10:00:00", "grade": "90"},
+        {"submission_id": "", "username": "bo", "email": "bo@example.com", "submission_time": "", "grade": ""}]
+    with pytest.raises(ValueError):
+        read_grade_sheet("email,score\nana@example.com,90\n")
+
+
+@pytest.fixture
+def graded(school):
+    service = school.service
+    alice = service.submit(school.alice["token"], school.assignment_id, "a.pdf", b"%PDF-1.4 a")
+    bob = service.submit(school.bob["token"], school.assignment_id, "b.pdf", b"%PDF-1.4 b")
+    return school, alice["submission_id"], bob["submission_id"]
+
+
+def grades(service):
+    with service.db.reader() as conn:
+        return dict(conn.execute("SELECT submission_id, grade FROM Submission").fetchall())
+
+
+def test_batch_saves_all_or_reports_conflicts(graded):
+    school, alice, bob = graded
+    service, teacher = school.service, school.teacher["token"]
+    saved = service.grade_batch(teacher, school.course_id, [
+        {"submission_id": alice, "grade": "80", "expected": None},
+        {"submission_id": bob, "grade": "70,5", "expected": None}])
+    assert saved == {"saved": 2, "conflicts": []}
+    assert grades(service) == {alice: "80", bob: "70.5"}
+
+    # Another grader saw 80 for alice; their batch must not overwrite bob either
+    result = service.grade_batch(teacher, school.course_id, [
+        {"submission_id": alice, "grade": "85", "expected": "80"},
+        {"submission_id": bob, "grade": "60", "expected": None}])
+    assert result == {"saved": 0, "conflicts": [{"submission_id": bob, "grade": "70.5"}]}
+    assert grades(service) == {alice: "80", bob: "70.5"}
+
+    with pytest.raises(BadRequest):
+        service.grade_batch(teacher, school.course_id, [{"submission_id": alice, "grade": "200"}])
+    other = service.create_course(teacher, "Geometry", "Angles")["course_id"]
+    with pytest.raises(Forbidden):
+        service.grade_batch(teacher, other, [{"submission_id": alice, "grade": "90", "expected": "80"}])
+
+
+def test_import_grades_reports_every_row(graded):
+    school, alice, bob = graded
+    service, teacher = school.service, school.teacher["token"]
+    service.register("carol", "carol@example.com", "secret", "student")
+    service.enroll(teacher, school.course_id, ["carol@example.com"])
+    service.grade(teacher, bob, "70")
+
+    sheet = service.export_grades(teacher, school.assignment_id)
+    assert [row["username"] for row in read_grade_sheet(sheet)] == ["alice", "bob", "carol"]
+    result = service.import_grades(teacher, school.assignment_id, (
+        "email,username,grade\n"
+        "ALICE@example.com,,95\n"
+        ",bob,70\n"
+        "carol@example.com,,50\n"
+        "dan@example.com,,40\n"
+        ",alice,lots\n"))
+    assert result == {"saved": 1, "report": [
+        ["ALICE@example.com", GRADED], ["bob", UNCHANGED], ["carol@example.com", NO_SUBMISSION],
+        ["dan@example.com", NOT_IN_COURSE], ["alice", INVALID_GRADE]]}
+    assert grades(service) == {alice: "95", bob: "70"}
+    with pytest.raises(BadRequest):
+        service.import_grades(teacher, school.assignment_id, "email\nana@example.com\n")
+
+
+def test_import_grades_the_latest_submission(graded):
+    school, alice, bob = graded
+    service, teacher = school.service, school.teacher["token"]
+    again = service.submit(school.alice["token"], school.assignment_id, "a2.pdf", b"%PDF-1.4 a2")["submission_id"]
+
+    sheet = read_grade_sheet(service.export_grades(teacher, school.assignment_id))
+    assert [(row["username"], row["submission_id"]) for row in sheet] == [("alice", str(again)), ("bob", str(bob))]
+    result = service.import_grades(teacher, school.assignment_id, (
+        "submission_id,email,username,grade\n"
+        f"{alice},,alice,90\n"  # a stale id falls through to the username
+        ",bob@example.com,,60\n"))
+    assert result == {"saved": 2, "report": [["alice", GRADED], ["bob@example.com", GRADED]]}
+    assert grades(service) == {alice: None, bob: "60", again: "90"}
+    report = service.grade_analytics(teacher, school.course_id)
+    assert report["graded"] == 2
@@ -0,0 +1,111 @@
+import random
+import sqlite3
+
+import pytest
+
+from utils.keyset import KeysetQuery
+
+ROSTER = KeysetQuery(
+    ["name", "score"],
+    "FROM Student WHERE course_id = ?",
+    ["name", "COALESCE(score, -1)"],
+    "student_id",
+)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE Student (student_id INTEGER PRIMARY KEY, course_id INTEGER, name TEXT, score REAL)")
+    rng = random.Random(7)
+    conn.executemany("INSERT INTO Student (course_id, name, score) VALUES (?, ?, ?)",
+                     [(rng.choice([1, 2]), rng.choice("abcde"), rng.choice([None, 1.0, 2.0, 3.0]))
+                      for _ in range(250)])
+    yield conn
+    conn.close()
+
+
+def read_all(conn, sort_column, descending, limit):
+    rows, after = [], None
+    while True:
+        page = ROSTER.page(conn, (1,), after, sort_column, descending, limit)
+        rows.extend(page)
+        if len(page) < limit:
+            return rows
+        after = page[-1][-2:]
+
+
+@pytest.mark.parametrize("sort_column", [None, 0, 1])
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [1, 7, 100])
+def test_pages_add_up_to_the_sorted_query(conn, sort_column, descending, limit):
+    key = ROSTER.sort_key(sort_column)
+    direction = "DESC" if descending else "ASC"
+    expected = conn.execute(f"SELECT name, score, {key}, student_id FROM Student WHERE course_id = 1 "
+                            f"ORDER BY {key} {direction}, student_id {direction}").fetchall()
+    assert read_all(conn, sort_column, descending, limit) == expected
+
+
+def test_unsortable_columns_fall_back_to_the_tiebreak():
+    query = KeysetQuery(["a", "b"], "FROM t WHERE 1", ["a", None], "id")
+    assert query.sortable == [True, False]
+    assert query.sort_key(1) == query.sort_key(None) == "id"
+
+
+def test_table_model_pages_sorts_and_keeps_edits(conn, qapp):
+    from PyQt5.QtCore import Qt
+    from utils.sql_table_model import KeysetTableModel
+
+    def fetch(params, after, sort_column, descending, limit):
+        return ROSTER.page(conn, params, after, sort_column, descending, limit)
+
+    model = KeysetTableModel(["Name", "Score"], fetch, sortable=ROSTER.sortable, page_size=10,
+                             editable=[1], validate=float)
+    model.set_rows((1,), model.query_page((1,)))
+    assert model.rowCount() == 10 and model.canFetchMore()
+    while model.canFetchMore():
+        model.fetchMore()
+    total = conn.execute("SELECT COUNT(*) FROM Student WHERE course_id = 1").fetchone()[0]
+    assert model.rowCount() == total
+
+    dirty = []
+    model.dirtyChanged.connect(dirty.append)
+    index = model.index(3, 1)
+    row_id = model._rows[3][-1]
+    assert not model.setData(index, "not a number")
+    assert model.setData(index, "99")
+    assert dirty == [1]
+    model.sort(0, Qt.DescendingOrder)
+    while model.canFetchMore():
+        model.fetchMore()
+    row = next(i for i, r in enumerate(model._rows) if r[-1] == row_id)
+    assert model.data(model.index(row, 1)) == "99.0"
+    assert model.data(model.index(row, 1), Qt.BackgroundRole) is not None
+    assert [edit[:3] for edit in model.edits()] == [(row_id, 1, 99.0)]
+
+    model.set_rows((2,), model.query_page((2,)))
+    assert model.edits() == [] and dirty[-1] == 0
+
+
+def test_saved_edits_keep_cells_edited_during_the_save(conn, qapp):
+    from utils.sql_table_model import KeysetTableModel
+
+    def fetch(params, after, sort_column, descending, limit):
+        return ROSTER.page(conn, params, after, sort_column, descending, limit)
+
+    model = KeysetTableModel(["Name", "Score"], fetch, page_size=10, editable=[1], validate=float)
+    model.set_rows((1,), model.query_page((1,)))
+    first, second, third = (model._rows[i][-1] for i in range(3))
+    model.setData(model.index(0, 1), "10")
+    model.setData(model.index(1, 1), "20")
+    sent = {(row_id, column): value for row_id, column, value, _ in model.edits()}
+
+    # Edited while the batch was being saved
+    model.setData(model.index(1, 1), "25")
+    model.setData(model.index(2, 1), "30")
+    dirty = []
+    model.dirtyChanged.connect(dirty.append)
+    model.saved_edits(sent)
+    assert sorted(model.edits()) == [(second, 1, 25.0, 20.0), (third, 1, 30.0, model._rows[2][1])]
+    assert first not in [edit[0] for edit in model.edits()]
+    assert dirty == [2]
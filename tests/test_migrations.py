@@ -0,0 +1,64 @@
+import sqlite3
+
+import pytest
+
+from database import (MIGRATIONS, create_tables, migrate, get_schema_version, check_query_plans, explain,
+                      full_scans)
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    create_tables(conn)
+    yield conn
+    conn.close()
+
+
+def test_migrate_applies_every_step_once(conn):
+    applied = migrate(conn)
+    assert applied == [description for _, description, _ in MIGRATIONS]
+    assert get_schema_version(conn) == MIGRATIONS[-1][0]
+    assert migrate(conn) == []
+
+
+def test_migrate_resumes_from_the_stored_version(conn):
+    first, second = MIGRATIONS[0], MIGRATIONS[1]
+    conn.execute(f"PRAGMA user_version = {first[0]}")
+    for step in first[2]:
+        conn.execute(step)
+    assert migrate(conn)[0] == second[1]
+
+
+def test_failed_migration_rolls_back(conn, monkeypatch):
+    def broken(conn):
+        raise sqlite3.OperationalError("boom")
+
+    version, description, steps = MIGRATIONS[0]
+    monkeypatch.setattr("database.MIGRATIONS", [(version, description, steps + [broken])] + MIGRATIONS[1:])
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(conn)
+    assert get_schema_version(conn) == 0
+    indexes = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'").fetchall()
+    assert indexes == []
+
+
+def test_migration_keeps_existing_rows(conn):
+    conn.execute("INSERT INTO User (username, email, password) VALUES ('t', 't@x', '0000')")
+    conn.execute("INSERT INTO Teacher (user_id) VALUES (1)")
+    conn.execute("INSERT INTO Course (title, description, teacher_id) VALUES ('A', 'B', 1)")
+    conn.commit()
+    migrate(conn)
+    assert conn.execute("SELECT total_courses FROM TeacherStats WHERE teacher_id = 1").fetchone() == (1,)
+
+
+def test_plan_checks_use_indexes(conn):
+    migrate(conn)
+    assert check_query_plans(conn) == []
+
+
+def test_covering_index_scan_is_a_full_scan(conn):
+    migrate(conn)
+    plan = explain(conn, "SELECT COUNT(*) FROM Enrollment")
+    assert full_scans(plan) == plan
+    plan = explain(conn, "SELECT * FROM Enrollment WHERE course_id = ?", (1,))
+    assert full_scans(plan) == []
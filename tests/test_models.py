@@ -0,0 +1,45 @@
+import sqlite3
+
+import pytest
+
+from models import Course, User
+
+
+@pytest.fixture
+def cur():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE Course (course_id INTEGER PRIMARY KEY, title TEXT, description TEXT, "
+                 "teacher_id INTEGER, created_at TEXT)")
+    conn.executemany("INSERT INTO Course VALUES (?, ?, ?, ?, ?)",
+                     [(1, "Algebra", "Linear", 7, "2024-01-01"), (2, "Geometry", None, 8, "2024-02-01")])
+    yield conn.cursor()
+    conn.close()
+
+
+@pytest.mark.parametrize("select", [
+    "SELECT * FROM Course",                                   # rows already in field order
+    "SELECT created_at, title, course_id, teacher_id, description, 1 AS extra FROM Course",
+])
+def test_rows_are_mapped_by_column_name(cur, select):
+    cur.execute(select + " ORDER BY course_id")
+    courses = Course.fetch_all(cur)
+    assert [c.to_dict() for c in courses] == [
+        {"course_id": 1, "title": "Algebra", "description": "Linear", "teacher_id": 7, "created_at": "2024-01-01"},
+        {"course_id": 2, "title": "Geometry", "description": None, "teacher_id": 8, "created_at": "2024-02-01"}]
+
+
+def test_narrow_selects_fill_the_defaults(cur):
+    cur.execute("SELECT title, course_id FROM Course WHERE course_id = 2")
+    course = Course.fetch_one(cur)
+    assert (course.course_id, course.title, course.teacher_id) == (2, "Geometry", None)
+    cur.execute("SELECT title AS course_id, course_id AS title FROM Course WHERE course_id = 1")
+    assert Course.fetch_one(cur).course_id == "Algebra"
+    cur.execute("SELECT * FROM Course WHERE course_id = 99")
+    assert Course.fetch_one(cur) is None
+
+
+def test_models_have_no_instance_dict():
+    user = User(1, "ana", "ana@example.com", "x")
+    assert not hasattr(user, "__dict__")
+    with pytest.raises(AttributeError):
+        user.nickname = "a"
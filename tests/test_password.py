@@ -0,0 +1,87 @@
+import hashlib
+
+import pytest
+
+from controllers.user_c import UserController
+from utils import password
+from utils.password import PasswordHasher, SCRYPT, PBKDF2
+
+
+@pytest.fixture
+def hasher():
+    return PasswordHasher(SCRYPT, n=2 ** 4)
+
+
+def test_hash_carries_its_parameters(hasher):
+    hashed = hasher.hash("secret")
+    assert hashed.startswith("scrypt$n=16,p=1,r=8$")
+    assert hasher.verify("secret", hashed)
+    assert not hasher.verify("Secret", hashed)
+    assert hasher.hash("secret") != hashed  # salted
+
+
+def test_verifies_hashes_made_with_other_parameters(hasher):
+    pbkdf2 = PasswordHasher(PBKDF2, iterations=10).hash("secret")
+    assert hasher.verify("secret", pbkdf2)
+    assert hasher.needs_rehash(pbkdf2)
+    assert hasher.needs_rehash(PasswordHasher(SCRYPT, n=2 ** 5).hash("secret"))
+    assert not hasher.needs_rehash(hasher.hash("secret"))
+
+
+def test_malformed_hash_is_rejected(hasher):
+    assert not hasher.verify("secret", "scrypt$n=oops$AAAA$AAAA")
+    assert not hasher.verify("secret", "scrypt$n=16$AAAA$AAAA")  # r and p missing
+
+
+def test_legacy_plaintext_is_accepted(hasher):
+    assert hasher.verify("0000", "0000")
+    assert not hasher.verify("0001", "0000")
+    assert hasher.needs_rehash("0000")
+
+
+def test_legacy_digest_needs_the_password_not_the_digest(hasher):
+    digest = hashlib.sha256(b"secret").hexdigest()
+    assert hasher.verify("secret", digest)
+    assert hasher.verify("secret", digest.upper())
+    assert not hasher.verify(digest, digest)
+
+
+@pytest.fixture
+def users(db_path):
+    return UserController(db_path)
+
+
+def store_password(users, username, stored):
+    with users.db.connection() as conn:
+        conn.execute("UPDATE User SET password = ? WHERE username = ?", (stored, username))
+    UserController.get_user_by_username.invalidate(users, username)
+
+
+def test_login_upgrades_a_legacy_digest(users):
+    users.create_user("ana", "ana@example.com", "secret")
+    digest = hashlib.sha256(b"secret").hexdigest()
+    store_password(users, "ana", digest)
+
+    assert users.verify_user("ana", digest) is None
+    assert users.get_user_by_username("ana").password == digest
+
+    user = users.verify_user("ana", "secret")
+    assert user is not None and user.password.startswith("scrypt$")
+    assert users.get_user_by_username("ana").password == user.password
+    assert users.verify_user("ana", "secret") is not None
+
+
+def test_login_rehashes_when_the_cost_changes(users):
+    users.create_user("ana", "ana@example.com", "secret")
+    before = users.get_user_by_username("ana").password
+    password.configure(SCRYPT, n=2 ** 5)
+    user = users.verify_user("ana", "secret")
+    assert user.password != before
+    assert user.password.startswith("scrypt$n=32,")
+    assert not password.needs_rehash(users.get_user_by_username("ana").password)
+
+
+def test_unknown_user_and_wrong_password(users):
+    users.create_user("ana", "ana@example.com", "secret")
+    assert users.verify_user("nobody", "secret") is None
+    assert users.verify_user("ana", "wrong") is None
@@ -0,0 +1,108 @@
+import io
+import os
+
+import pytest
+
+from controllers.search_c import SearchController
+from utils import pdf_artifacts
+from utils.file_store import FileStore, MATERIALS_STORE, ASSIGNMENTS_STORE
+from utils.pdf_artifacts import ArtifactCache, PdfPipeline
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "artifacts"))
+    assert not cache.has("ab" * 32) and cache.text("ab" * 32) is None
+    cache.put("ab" * 32, "héllo", b"\x89PNG")
+    assert cache.has("ab" * 32) and cache.text("ab" * 32) == "héllo"
+    assert open(cache.thumbnail("ab" * 32), "rb").read() == b"\x89PNG"
+    cache.put("cd" * 32, "text only")
+    assert cache.thumbnail("cd" * 32) is None
+
+
+def test_cache_evicts_the_least_recently_read(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "artifacts"), max_bytes=250)
+    hashes = [f"{i:064x}" for i in range(3)]
+    for age, file_hash in enumerate(hashes):
+        cache.put(file_hash, "x" * 100)
+        os.utime(cache.path_for(file_hash, "txt"), (1000 + age, 1000 + age))
+    # Only two fit: the oldest goes, unless it was read since
+    assert [cache.has(file_hash) for file_hash in hashes] == [False, True, True]
+    cache.text(hashes[1])
+    cache.put(hashes[0], "x" * 100)
+    assert [cache.has(file_hash) for file_hash in hashes] == [True, True, False]
+
+
+@pytest.fixture
+def pipeline(db_path, monkeypatch):
+    def fake_extract(path, thumbnail_width=None):
+        data = open(path, "rb").read()
+        if not data.startswith(b"%PDF"):
+            raise ValueError("not a PDF")
+        return data.decode()[9:], b"png"
+
+    monkeypatch.setattr(pdf_artifacts, "extract", fake_extract)
+    monkeypatch.setattr(pdf_artifacts, "can_extract", lambda: True)
+    pipeline = PdfPipeline(db_path)
+    yield pipeline
+    pipeline.shutdown()
+
+
+def add_material(db_path, content):
+    from controllers.course_c import CourseController
+    from controllers.material_c import MaterialController
+    file_hash, _ = FileStore(MATERIALS_STORE, db_path=db_path).ingest(io.BytesIO(content))
+    course = CourseController(db_path).create_course("Algebra", "Linear", None)
+    MaterialController(db_path).create_material(course.course_id, "notes.pdf", file_hash=file_hash)
+    return file_hash
+
+
+def test_enqueued_files_are_cached_and_indexed(pipeline, db_path):
+    file_hash = add_material(db_path, b"%PDF-1.4 eigenvalues and eigenvectors")
+    future = pipeline.enqueue(MATERIALS_STORE, file_hash)
+    future.result(5)
+    assert pipeline.cache.text(file_hash) == "eigenvalues and eigenvectors"
+    assert open(pipeline.cache.thumbnail(file_hash), "rb").read() == b"png"
+    assert [hit.title for hit in SearchController(db_path).search("eigenvalues")] == ["notes.pdf"]
+    assert pipeline.enqueue(MATERIALS_STORE, file_hash) is None  # already cached
+
+
+def test_backlog_processes_what_is_missing_and_skips_bad_files(pipeline, db_path):
+    good = add_material(db_path, b"%PDF-1.4 determinants")
+    bad = add_material(db_path, b"not a pdf at all")
+    assert sorted(pipeline.missing()) == sorted([(MATERIALS_STORE, good), (MATERIALS_STORE, bad)])
+    assert pipeline.process_backlog() == 1
+    assert pipeline.missing() == [(MATERIALS_STORE, bad)]
+
+
+def test_extract_reads_a_real_pdf(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Quadratic equations")
+    path = str(tmp_path / "q.pdf")
+    doc.save(path)
+    text, png = pdf_artifacts.extract(path, thumbnail_width=60)
+    assert "Quadratic equations" in text and png.startswith(b"\x89PNG")
+
+
+def test_a_file_cached_from_another_store_is_indexed_for_this_one(pipeline, db_path):
+    file_hash = add_material(db_path, b"%PDF-1.4 orthogonal projections")
+    pipeline.enqueue(MATERIALS_STORE, file_hash).result(5)
+    search = SearchController(db_path)
+    assert not search.is_indexed(ASSIGNMENTS_STORE, file_hash)
+
+    # The same PDF, now uploaded as an assignment
+    FileStore(ASSIGNMENTS_STORE, db_path=db_path).ingest(io.BytesIO(b"%PDF-1.4 orthogonal projections"))
+    assert pipeline.missing() == [(ASSIGNMENTS_STORE, file_hash)]
+    pipeline.enqueue(ASSIGNMENTS_STORE, file_hash).result(5)
+    assert search.is_indexed(ASSIGNMENTS_STORE, file_hash)
+    assert pipeline.enqueue(ASSIGNMENTS_STORE, file_hash) is None
+    assert pipeline.missing() == []
+
+
+def test_backlog_indexes_cached_files_without_extracting(pipeline, db_path, monkeypatch):
+    file_hash = add_material(db_path, b"%PDF-1.4 eigenvalues")
+    pipeline.cache.put(file_hash, "cached eigenvalues")
+    monkeypatch.setattr(pdf_artifacts, "can_extract", lambda: False)
+    assert pipeline.process_backlog() == 1
+    assert SearchController(db_path).is_indexed(MATERIALS_STORE, file_hash)
+    assert pipeline.missing() == []
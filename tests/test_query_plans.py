@@ -0,0 +1,96 @@
+"""Every statement the controllers and the service run looks rows up through an index.
+
+Query stats with a 0 ms slow threshold plan each statement the first time
+it runs, with its real parameters, so what is checked is the SQL that
+shipped rather than a copy of it.
+"""
+import pytest
+
+from database import full_scans, ALLOWED_SCANS
+from utils.db_helper import query_stats
+
+# Scans of a statement's own CTEs and subqueries, whose rows come from
+# indexed searches already; by how the statement starts
+ALLOWED = {
+    # course feed: the student's courses, then their materials and assignments
+    "WITH enrolled AS": ("SCAN enrolled", "SCAN c", "SCAN (subquery-", "SCAN materials", "SCAN u"),
+    # search: hits from each FTS index, then the best per item
+    "WITH hits": ("SCAN hits", "SCAN best"),
+}
+
+
+def allowed_for(sql):
+    return next((steps for start, steps in ALLOWED.items() if sql.startswith(start)), ())
+
+
+@pytest.fixture
+def planned(db_path, monkeypatch, capsys):
+    query_stats.reset()
+    query_stats.enable(0.0)
+    yield query_stats
+    query_stats.disable()
+    capsys.readouterr()  # every statement is "slow" here
+
+
+def run_workload(school):
+    service, teacher, alice = school.service, school.teacher["token"], school.alice["token"]
+    course_id, assignment_id = school.course_id, school.assignment_id
+
+    service.dashboard(teacher)
+    service.dashboard(alice)
+    service.list_courses(teacher)
+    service.list_courses(alice)
+    service.course_feed(alice)
+    service.course_overview(teacher, course_id)
+    service.course_overview(alice, course_id)
+    first = service.roster_page(teacher, course_id, limit=1)
+    service.roster_page(teacher, course_id, after=first[-1][-2:], limit=1)
+    first = service.roster_page(teacher, course_id, sort_column=0, limit=1)
+    service.roster_page(teacher, course_id, after=first[-1][-2:], sort_column=0, limit=1)
+    material = service.add_material(teacher, course_id, "notes.pdf", b"%PDF-1.4 notes")
+    service.list_materials(alice, course_id)
+    service.open_material(alice, material["material_id"])
+    service.list_assignments(alice, course_id)
+    service.upcoming_deadlines(alice)
+    service.course_deadlines(alice, course_id)
+    service.course_deadlines(teacher, course_id)
+
+    submission = service.submit(alice, assignment_id, "answer.pdf", b"%PDF-1.4 answer")
+    upload = service.start_upload(school.bob["token"], assignment_id, "big.pdf")
+    service.upload_chunk(school.bob["token"], upload["upload_id"], 0, b"%PDF-1.4 big")
+    service.upload_status(school.bob["token"], upload["upload_id"])
+    service.finish_upload(school.bob["token"], upload["upload_id"])
+    service.submissions_page(teacher, course_id)
+    service.submissions_page(teacher, course_id, sort_column=0, descending=False)
+    service.grade(teacher, submission["submission_id"], "80")
+    service.grade_batch(teacher, course_id, [
+        {"submission_id": submission["submission_id"], "grade": "85", "expected": "80"}])
+    sheet = service.export_grades(teacher, assignment_id)
+    service.import_grades(teacher, assignment_id, sheet.replace("85", "90"))
+    service.set_assignment_weight(teacher, assignment_id, 2)
+    for fmt in ("csv", "jsonl"):
+        b"".join(service.export_roster(teacher, fmt).chunks)
+        b"".join(service.export_gradebook(teacher, fmt).chunks)
+    b"".join(service.export_gradebook(teacher, "csv", course_id, layout="wide").chunks)
+
+    service.activity.flush()
+    service.activity_overview(teacher)
+    service.course_activity(teacher, course_id)
+    service.course_activity(teacher, course_id, period="hour")
+    service.grade_overview(teacher)
+    service.grade_analytics(teacher, course_id)
+    service.search(alice, "algebra")
+    service.search(teacher, "notes")
+    service.update_course(teacher, course_id, title="Algebra I")
+    service.submission_store.collect_garbage()
+
+
+def test_controller_statements_use_indexes(school, planned):
+    pytest.importorskip("numpy")
+    run_workload(school)
+
+    plans = planned.plans()
+    assert len(plans) > 40
+    scans = {sql: steps for sql, plan in plans.items()
+             if (steps := full_scans(plan, ALLOWED_SCANS + allowed_for(sql)))}
+    assert not scans, "\n".join(f"{sql}\n    {' / '.join(steps)}" for sql, steps in scans.items())
@@ -0,0 +1,55 @@
+import pytest
+
+from utils.db_helper import DBHelper, TimedConnection, normalize_sql, query_stats
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT *  FROM t\n WHERE a = 'x''y' AND b = 3.5") == "SELECT * FROM t WHERE a = ? AND b = ?"
+    assert normalize_sql("SELECT 1 FROM t WHERE id IN (?, ?, ?)") == "SELECT ? FROM t WHERE id IN (?, ...)"
+    assert normalize_sql("SELECT col2 FROM t2") == "SELECT col2 FROM t2"
+
+
+@pytest.fixture
+def db(db_path):
+    db = DBHelper(db_path)
+    with db.connection() as conn:
+        conn.execute("CREATE TABLE Note (note_id INTEGER PRIMARY KEY, body TEXT)")
+    return db
+
+
+def test_disabled_stats_leave_connections_plain(db):
+    with db.reader() as conn:
+        assert not isinstance(conn, TimedConnection)
+        conn.execute("SELECT COUNT(*) FROM Note").fetchone()
+    assert query_stats.stats() == []
+
+
+def test_statements_are_counted_by_shape(db, monkeypatch):
+    monkeypatch.setattr(query_stats, "slow_ms", 1e9)
+    query_stats.enable()
+    with db.connection() as conn:
+        conn.executemany("INSERT INTO Note (body) VALUES (?)", [("a",), ("b",), ("c",)])
+    for note_id in (1, 2, 3):
+        with db.reader() as conn:
+            conn.execute(f"SELECT body FROM Note WHERE note_id = {note_id}").fetchall()
+    stats = {row["sql"]: row for row in query_stats.stats()}
+    select = stats["SELECT body FROM Note WHERE note_id = ?"]
+    assert (select["calls"], select["rows"]) == (3, 3)
+    assert stats["INSERT INTO Note (body) VALUES (?)"]["rows"] == 3
+    assert query_stats.slow_queries() == []
+    assert "SELECT body FROM Note" in query_stats.report()
+
+
+def test_slow_statements_are_logged_with_their_plan(db, capsys, monkeypatch):
+    monkeypatch.setattr(query_stats, "slow_ms", 0.0)
+    query_stats.enable()
+    with db.reader() as conn:
+        conn.execute("SELECT body FROM Note WHERE note_id = ?", (1,)).fetchone()
+        conn.execute("SELECT body FROM Note WHERE body = ?", ("a",)).fetchone()
+    slow = {entry["sql"]: entry for entry in query_stats.slow_queries()}
+    assert slow["SELECT body FROM Note WHERE note_id = ?"]["plan"] == ["SEARCH Note USING INTEGER PRIMARY KEY (rowid=?)"]
+    assert slow["SELECT body FROM Note WHERE body = ?"]["plan"] == ["SCAN Note"]
+    assert query_stats.plans()["SELECT body FROM Note WHERE body = ?"] == ["SCAN Note"]
+    assert "Slow query" in capsys.readouterr().err
+    query_stats.reset()
+    assert query_stats.stats() == [] and query_stats.slow_queries() == []
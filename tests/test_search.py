@@ -0,0 +1,64 @@
+import pytest
+
+from controllers.assignment_c import AssignmentController
+from controllers.course_c import CourseController
+from controllers.material_c import MaterialController
+from controllers.search_c import SearchController, match_expression, COURSE, MATERIAL, ASSIGNMENT
+from utils.file_store import MATERIALS_STORE
+
+
+def test_match_expression_quotes_every_word():
+    assert match_expression("linear alg") == '"linear"* "alg"*'
+    assert match_expression('NOT "x" OR y*') == '"NOT"* "x"* "OR"* "y"*'
+    assert match_expression(" -- ") is None
+
+
+@pytest.fixture
+def catalog(db_path):
+    courses = CourseController(db_path)
+    algebra = courses.create_course("Linear Algebra", "Vectors and matrices", None).course_id
+    geometry = courses.create_course("Geometry", "Angles, triangles and proofs", None).course_id
+    MaterialController(db_path).create_material(algebra, "matrix_notes.pdf", file_hash="a" * 64)
+    AssignmentController(db_path).create_assignment(geometry, "triangle_homework.pdf", "2030-01-01")
+    return SearchController(db_path), courses, algebra, geometry
+
+
+def hits(searcher, text, course_ids=None):
+    return [(hit.kind, hit.title) for hit in searcher.search(text, course_ids)]
+
+
+def test_search_ranks_every_kind(catalog):
+    searcher, _, algebra, geometry = catalog
+    assert hits(searcher, "matri") == [(COURSE, "Linear Algebra"), (MATERIAL, "matrix_notes.pdf")]
+    assert set(hits(searcher, "triangle")) == {(COURSE, "Geometry"), (ASSIGNMENT, "triangle_homework.pdf")}
+    course = searcher.search("vectors")[0]
+    assert course.snippet == "[Vectors] and matrices"
+    assert hits(searcher, "proofs angles") == [(COURSE, "Geometry")]
+    assert hits(searcher, "AND OR") == []
+
+
+def test_search_stays_within_the_given_courses(catalog):
+    searcher, _, algebra, geometry = catalog
+    assert hits(searcher, "triangle", [algebra]) == []
+    assert hits(searcher, "matrix", []) == []
+    assert len(hits(searcher, "triangle", [geometry])) == 2
+
+
+def test_index_follows_updates_and_deletes(catalog):
+    searcher, courses, algebra, _ = catalog
+    courses.update_course(algebra, title="Matrix Theory")
+    assert hits(searcher, "linear") == []
+    assert (COURSE, "Matrix Theory") in hits(searcher, "theory")
+    courses.delete_course(algebra)
+    assert hits(searcher, "matrix") == []
+
+
+def test_document_text_is_searched_once_per_file(catalog):
+    searcher, _, algebra, _ = catalog
+    searcher.index_document(MATERIALS_STORE, "a" * 64, "Gaussian elimination reduces a matrix to echelon form")
+    assert [(hit.kind, hit.snippet) for hit in searcher.search("echelon")] == [
+        (MATERIAL, "Gaussian elimination reduces a matrix to [echelon] form")]
+    # Matched by both its name and its text, the material is listed once
+    assert hits(searcher, "matrix") == [(MATERIAL, "matrix_notes.pdf")]
+    searcher.optimize()
+    assert hits(searcher, "gaussian") == [(MATERIAL, "matrix_notes.pdf")]
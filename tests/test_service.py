@@ -0,0 +1,220 @@
+import asyncio
+import http.client
+import socket
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from controllers.enrollment_c import ENROLLED, NOT_A_STUDENT
+from service.client import ApiClient
+from service.errors import BadRequest, Unauthorized, Forbidden, NotFound, Conflict
+from service.lms import LMSService
+from service.server import ApiServer
+
+
+def test_register_and_login(service):
+    user = service.register("ana", "ana@example.com", "secret", "student")
+    assert user["role"] == "student"
+    session = service.login("ana", "secret")
+    assert session["student_id"] is not None and session["teacher_id"] is None
+    assert service.dashboard(session["token"]) == {"total_courses": 0, "pending_assignments": 0}
+    service.logout(session["token"])
+    with pytest.raises(Unauthorized):
+        service.dashboard(session["token"])
+
+
+def test_register_refuses_taken_names_and_leaves_no_user(service):
+    service.register("ana", "ana@example.com", "secret", "teacher")
+    with pytest.raises(Conflict, match="Username"):
+        service.register("ana", "other@example.com", "secret", "teacher")
+    with pytest.raises(Conflict, match="Email"):
+        service.register("bea", "ana@example.com", "secret", "teacher")
+    with pytest.raises(BadRequest):
+        service.register("bea", "bea@example.com", "secret", "admin")
+    with service.db.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM User").fetchone() == (1,)
+        assert conn.execute("SELECT COUNT(*) FROM Teacher").fetchone() == (1,)
+
+
+def test_wrong_password(service):
+    service.register("ana", "ana@example.com", "secret", "student")
+    with pytest.raises(Unauthorized):
+        service.login("ana", "wrong")
+    with pytest.raises(Unauthorized):
+        service.login("nobody", "secret")
+
+
+def test_register_hashes_before_taking_the_writer(service, monkeypatch):
+    from service import lms
+    service.register("teacher", "teacher@example.com", "secret", "teacher")
+    token = service.login("teacher", "secret")["token"]
+
+    hashing = threading.Event()
+
+    def slow_hash(password):
+        hashing.set()
+        time.sleep(0.5)
+        return "slow$" + password
+
+    monkeypatch.setattr(lms, "hash_password", slow_hash)
+    registering = threading.Thread(target=service.register, args=("ana", "ana@example.com", "x", "student"))
+    registering.start()
+    assert hashing.wait(5)
+    start = time.perf_counter()
+    service.create_course(token, "Algebra", "Linear equations")
+    elapsed = time.perf_counter() - start
+    registering.join()
+    assert elapsed < 0.25
+
+
+def test_permissions(school):
+    service = school.service
+    service.register("other", "other@example.com", "secret", "teacher")
+    service.register("carol", "carol@example.com", "secret", "student")
+    other = service.login("other", "secret")["token"]
+    carol = service.login("carol", "secret")["token"]
+
+    with pytest.raises(Forbidden):
+        service.create_course(school.alice["token"], "Mine", "Not allowed")
+    with pytest.raises(Forbidden):
+        service.get_course(other, school.course_id)
+    with pytest.raises(Forbidden):
+        service.get_course(carol, school.course_id)
+    with pytest.raises(Forbidden):
+        service.update_course(school.alice["token"], school.course_id, title="Hacked")
+    with pytest.raises(NotFound):
+        service.get_course(school.teacher["token"], 999)
+    assert service.get_course(school.alice["token"], school.course_id)["title"] == "Algebra"
+
+
+def test_grading_a_submission_of_a_deleted_assignment(school, db_path):
+    service = school.service
+    submission = service.submit(school.alice["token"], school.assignment_id, "a.pdf", b"%PDF-1.4 a")
+    conn = sqlite3.connect(db_path)  # foreign keys are off on a plain connection
+    with conn:
+        conn.execute("DELETE FROM Assignment WHERE assignment_id = ?", (school.assignment_id,))
+    conn.close()
+    with pytest.raises(NotFound):
+        service.grade(school.teacher["token"], submission["submission_id"], "90")
+
+
+def test_course_overview(school):
+    overview = school.service.course_overview(school.teacher["token"], school.course_id)
+    assert [row[0] for row in overview["roster"]] == ["alice", "bob"]
+    assert [a["assignment_id"] for a in overview["assignments"]] == [school.assignment_id]
+    assert "roster" not in school.service.course_overview(school.alice["token"], school.course_id)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def api(db_path):
+    server = ApiServer(LMSService(db_path), workers=4)
+    port = free_port()
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(server.serve("127.0.0.1", port))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            break
+        except OSError:
+            assert time.monotonic() < deadline, "server did not start"
+            time.sleep(0.02)
+    client = ApiClient(f"http://127.0.0.1:{port}")
+    yield client
+    client.close()
+
+    async def stop():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+    server.close()
+
+
+def test_http_api_round_trip(api):
+    api.register("teacher", "teacher@example.com", "secret", "teacher")
+    api.register("ana", "ana@example.com", "secret", "student")
+    teacher = api.login("teacher", "secret")["token"]
+    course = api.create_course(teacher, "Algebra", "Linear equations")
+    assert api.enroll(teacher, course["course_id"], ["ana@example.com", "nobody@example.com"]) == [
+        ["ana@example.com", ENROLLED], ["nobody@example.com", NOT_A_STUDENT]]
+    assert api.list_courses(teacher) == [course]
+
+    ana = api.login("ana", "secret")["token"]
+    assert [c["course_id"] for c in api.list_courses(ana)] == [course["course_id"]]
+    with pytest.raises(Forbidden):
+        api.create_course(ana, "Mine", "Not allowed")
+    with pytest.raises(Unauthorized):
+        api.dashboard("not-a-token")
+
+    export = api.export_roster(teacher, "csv", course["course_id"])
+    rows = b"".join(export.chunks).decode().splitlines()
+    assert len(rows) == 2 and rows[1].startswith(f"{course['course_id']},Algebra,ana,ana@example.com,")
+
+
+def test_client_close_closes_every_threads_connection(api):
+    api.register("ana", "ana@example.com", "secret", "student")
+
+    def login():
+        api.login("ana", "secret")
+
+    threads = [threading.Thread(target=login) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    connections = list(api._connections)
+    assert len(connections) == 4
+    api.close()
+    assert all(conn.sock is None for conn in connections)
+    assert api.login("ana", "secret")["token"]  # a new connection after close()
+
+
+@pytest.mark.parametrize("filename, served", [
+    ("Übung – 1.pdf", "Übung – 1.pdf"),
+    ('notes"\r\nSet-Cookie: session=evil.pdf', "notesSet-Cookie: session=evil.pdf"),
+])
+def test_material_download_names(api, filename, served):
+    api.register("teacher", "teacher@example.com", "secret", "teacher")
+    teacher = api.login("teacher", "secret")["token"]
+    course = api.create_course(teacher, "Algebra", "Linear equations")
+    material = api.add_material(teacher, course["course_id"], filename, b"%PDF-1.4 notes")
+    conn = http.client.HTTPConnection(api.host, api.port, timeout=5)
+    try:
+        conn.request("GET", f"/materials/{material['material_id']}/file",
+                     headers={"Authorization": f"Bearer {teacher}"})
+        response = conn.getresponse()
+        assert response.status == 200
+        assert response.getheader("Set-Cookie") is None
+        disposition = response.getheader("Content-Disposition")
+        assert disposition.isascii() and "\r" not in disposition and "\n" not in disposition
+        assert response.read() == b"%PDF-1.4 notes"
+    finally:
+        conn.close()
+    export = api.open_material(teacher, material["material_id"])
+    assert export.filename == served
+    assert b"".join(export.chunks) == b"%PDF-1.4 notes"
+
+
+@pytest.mark.parametrize("length, status", [("abc", 400), ("-5", 400), ("1_0", 400), (str(2 ** 40), 413)])
+def test_bad_content_length_is_refused(api, length, status):
+    with socket.create_connection((api.host, api.port), timeout=5) as s:
+        s.sendall(f"POST /login HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n".encode())
+        response = b""
+        while chunk := s.recv(4096):
+            response += chunk
+    assert response.startswith(f"HTTP/1.1 {status} ".encode())
+    assert b"Connection: close" in response
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from service.errors import BadRequest  # noqa: E402
+from utils import similarity  # noqa: E402
+from utils.similarity import MinHasher, candidate_pairs, shingles, similar_pairs, BANDS  # noqa: E402
+
+WORDS = [f"w{i}" for i in range(2000)]
+
+
+def essay(rng, length=300):
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def edit(rng, text, fraction):
+    words = text.split()
+    for i in rng.sample(range(len(words)), int(len(words) * fraction)):
+        words[i] = rng.choice(WORDS)
+    return " ".join(words)
+
+
+def jaccard(a, b):
+    a, b = set(a.tolist()), set(b.tolist())
+    return len(a & b) / len(a | b)
+
+
+def test_shingles_ignore_case_and_punctuation():
+    assert np.array_equal(shingles("The quick, brown fox jumps!"), shingles("the QUICK brown fox -- jumps"))
+    assert shingles("one two three four five six").size == 2
+    assert shingles("too short").size == 1
+    assert shingles(" ... ").size == 0
+
+
+def test_signatures_estimate_jaccard_similarity():
+    rng = random.Random(3)
+    hasher = MinHasher()
+    base = essay(rng)
+    for fraction in (0.0, 0.05, 0.2, 0.5):
+        a, b = shingles(base), shingles(edit(rng, base, fraction))
+        estimate = (hasher.signature(a) == hasher.signature(b)).mean()
+        assert abs(estimate - jaccard(a, b)) < 0.15
+    assert (hasher.signature(np.empty(0, dtype=np.uint64)) == np.uint32(0xFFFFFFFF)).all()
+
+
+def test_candidates_are_the_pairs_sharing_a_band():
+    rng = np.random.default_rng(5)
+    signatures = rng.integers(0, 1 << 32, size=(30, 16), dtype=np.uint64).astype(np.uint32)
+    rows = 16 // 8
+    for i, j, band in [(2, 9, 0), (9, 14, 7), (20, 21, 3), (20, 21, 4), (5, 5, 1)]:
+        signatures[j, band * rows:(band + 1) * rows] = signatures[i, band * rows:(band + 1) * rows]
+    assert candidate_pairs(signatures, bands=8).tolist() == [[2, 9], [9, 14], [20, 21]]
+    assert candidate_pairs(signatures[:1], bands=8).shape == (0, 2)
+
+
+def test_similar_pairs_finds_the_planted_copies():
+    rng = random.Random(11)
+    hasher = MinHasher()
+    texts = [essay(rng) for _ in range(40)]
+    texts[7] = edit(rng, texts[3], 0.02)
+    texts[25] = edit(rng, texts[12], 0.03)
+    matrix = np.stack([hasher.signature(shingles(text)) for text in texts])
+    pairs = similar_pairs(matrix, threshold=0.6, bands=BANDS)
+    assert [(i, j) for i, j, _ in pairs] == [(3, 7), (12, 25)]
+    assert pairs[0][2] >= pairs[1][2] >= 0.6
+
+
+@pytest.fixture
+def texts(monkeypatch):
+    """Submissions whose "PDF" bytes are their text, so no PDF library is needed."""
+    def fake_extract(path, thumbnail_width=None):
+        data = open(path, "rb").read()
+        if data.startswith(b"corrupt"):
+            raise ValueError("cannot parse")
+        return data.decode(), None
+
+    monkeypatch.setattr(similarity, "extract", fake_extract)
+    monkeypatch.setattr(similarity, "can_extract", lambda: True)
+
+
+def test_service_reports_similar_students(school, texts):
+    service, teacher = school.service, school.teacher["token"]
+    for name in ("carol", "dan"):
+        service.register(name, f"{name}@example.com", "secret", "student")
+    service.enroll(teacher, school.course_id, ["carol@example.com", "dan@example.com"])
+    rng = random.Random(2)
+    original = essay(rng)
+    submissions = {"alice": original, "bob": edit(rng, original, 0.03), "carol": essay(rng), "dan": "corrupt"}
+    for name, text in submissions.items():
+        token = service.login(name, "secret")["token"]
+        service.submit(token, school.assignment_id, f"{name}.pdf", text.encode())
+
+    report = service.similar_submissions(teacher, school.assignment_id)
+    assert (report["submissions"], report["compared"], report["unreadable"], report["signed"]) == (4, 3, 1, 3)
+    assert [(pair["a"]["username"], pair["b"]["username"], pair["identical"]) for pair in report["pairs"]] == [
+        ("alice", "bob", False)]
+    again = service.similar_submissions(teacher, school.assignment_id, threshold="0.5")
+    assert (again["signed"], again["unreadable"]) == (0, 1)  # only the unreadable file was read again
+    assert again["pairs"][0]["similarity"] == report["pairs"][0]["similarity"]
+    with pytest.raises(BadRequest):
+        service.similar_submissions(teacher, school.assignment_id, threshold=2)
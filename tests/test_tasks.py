@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+QtCore = pytest.importorskip("PyQt5.QtCore")
+
+from utils.tasks import TaskRunner  # noqa: E402
+
+
+@pytest.fixture
+def app(qapp):
+    return qapp
+
+
+@pytest.fixture
+def runner(app):
+    runner = TaskRunner(max_workers=2, expected_errors=(KeyError,))
+    yield runner
+    runner.shutdown()
+
+
+def wait_for(app, predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        app.processEvents()
+        time.sleep(0.005)
+
+
+def test_results_and_errors_arrive_on_the_gui_thread(app, runner):
+    results, errors, threads = [], [], []
+
+    def on_result(value):
+        threads.append(threading.current_thread())
+        results.append(value)
+
+    runner.submit(lambda a, b: a + b, 1, 2, on_result=on_result)
+    runner.submit({}.__getitem__, "missing", on_error=errors.append)
+    wait_for(app, lambda: results and errors)
+    assert results == [3] and isinstance(errors[0], KeyError)
+    assert threads == [threading.main_thread()]
+
+
+def test_a_new_task_on_a_channel_cancels_the_previous_one(app, runner):
+    gate = threading.Event()
+    results = []
+    first = runner.submit(gate.wait, on_result=lambda _: results.append("first"), channel="page")
+    runner.submit(lambda: "second", on_result=results.append, channel="page")
+    gate.set()
+    wait_for(app, lambda: results)
+    wait_for(app, lambda: first.future.done())
+    app.processEvents()
+    assert results == ["second"] and first.cancelled
+
+
+def test_the_same_key_joins_the_task_in_flight(app, runner):
+    gate = threading.Event()
+    calls, results = [], []
+
+    def load():
+        calls.append(1)
+        gate.wait()
+        return "rows"
+
+    a = runner.submit(load, key="roster", on_result=results.append)
+    b = runner.submit(load, key="roster", on_result=results.append)
+    assert a is b
+    gate.set()
+    wait_for(app, lambda: len(results) == 2)
+    assert calls == [1] and results == ["rows", "rows"]
+    assert runner.submit(lambda: None, key="roster") is not a  # finished tasks are not joined
@@ -0,0 +1,58 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+pytest.importorskip("PyQt5.QtWidgets")
+
+from PyQt5 import QtWidgets, uic  # noqa: E402
+
+from utils import ui_loader  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch, qapp):
+    """A copy of ui/ and assets/ as the working directory, importable as ``ui.compiled``."""
+    shutil.copytree(os.path.join(ROOT, "ui"), tmp_path / "ui", ignore=shutil.ignore_patterns("compiled"))
+    shutil.copytree(os.path.join(ROOT, "assets"), tmp_path / "assets")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in [name for name in sys.modules if name == "ui" or name.startswith("ui.")]:
+        monkeypatch.delitem(sys.modules, name)
+    yield tmp_path
+    for name in [name for name in sys.modules if name == "ui" or name.startswith("ui.")]:
+        del sys.modules[name]
+
+
+def children(widget):
+    return sorted((type(child).__name__, child.objectName()) for child in widget.findChildren(QtWidgets.QWidget))
+
+
+def test_compiled_pages_match_the_ui_files(project):
+    names = ui_loader.compile_pages()
+    assert names == sorted(name[:-3] for name in os.listdir("ui") if name.endswith(".ui"))
+    for name in ("page1", "page2"):
+        page = ui_loader.load_page(name)
+        assert isinstance(page, ui_loader._compiled_module(name).UI_CLASS)
+        assert children(page) == children(uic.loadUi(os.path.join("ui", name + ".ui")))
+
+
+def test_stale_compiled_page_falls_back_to_the_ui_file(project):
+    ui_loader.compile_pages()
+    ui_path = os.path.join("ui", "page1.ui")
+    compiled = os.path.getmtime(os.path.join("ui", "compiled", "page1.py"))
+    os.utime(ui_path, (compiled + 10, compiled + 10))
+    assert ui_loader._compiled_module("page1") is None
+    assert ui_loader.load_page("page1").objectName() == "WelcomePage"
+
+
+def test_pixmaps_are_decoded_once(project):
+    ui_loader.compile_pages()
+    page = ui_loader.load_page("page2")
+    assert "assets/icon_user.png" in ui_loader._pixmaps
+    assert not ui_loader._pixmaps["assets/icon_user.png"].isNull()
+    assert ui_loader.pixmap("assets/icon_user.png") is ui_loader.pixmap("assets/icon_user.png")
+    assert any(label.pixmap() for label in page.findChildren(QtWidgets.QLabel))
@@ -1,2 +1,3 @@
 from .db_helper import DBHelper
-from .password import hash_password, verify_password
\ No newline at end of file
+from .password import hash_password, verify_password, needs_rehash
+from .file_store import FileStore
\ No newline at end of file
@@ -0,0 +1,166 @@
+import sys
+import threading
+import time
+from collections import deque
+
+from utils.db_helper import DBHelper
+
+LOGIN = "login"
+MATERIAL_OPEN = "material_open"
+SUBMISSION = "submission"
+ENROLLMENT = "enrollment"
+
+HOUR = 3600
+DAY = 24 * HOUR
+# Rollup bucket lengths, in seconds
+PERIODS = (HOUR, DAY)
+
+# Events held in memory between flushes; past this the oldest are dropped
+RING_SIZE = 50_000
+# A flush runs this often, or sooner once FLUSH_AT events are waiting
+FLUSH_INTERVAL = 2.0
+FLUSH_AT = 1000
+# Raw events are kept this long; the rollups are kept for good
+EVENT_RETENTION = 30 * DAY
+PRUNE_INTERVAL = HOUR
+
+# Rollups grow from the events one flush added (event_id > :after), one
+# set-based upsert per table and period, so they never rescan the log.
+# StudentActivity uses course_id 0 for events outside any course (logins).
+COURSE_ROLLUP_SQL = """
+    INSERT INTO CourseActivity (course_id, period, bucket, kind, events)
+    SELECT course_id, :period, at - at % :period, kind, COUNT(*)
+    FROM ActivityEvent
+    WHERE event_id > :after AND course_id IS NOT NULL
+    GROUP BY course_id, at - at % :period, kind
+    ON CONFLICT (course_id, period, bucket, kind) DO UPDATE SET events = events + excluded.events
+"""
+
+STUDENT_ROLLUP_SQL = """
+    INSERT INTO StudentActivity (course_id, period, bucket, student_id, kind, events)
+    SELECT COALESCE(course_id, 0), :period, at - at % :period, student_id, kind, COUNT(*)
+    FROM ActivityEvent
+    WHERE event_id > :after AND student_id IS NOT NULL
+    GROUP BY COALESCE(course_id, 0), at - at % :period, student_id, kind
+    ON CONFLICT (course_id, period, bucket, student_id, kind) DO UPDATE SET events = events + excluded.events
+"""
+
+
+class ActivityLog:
+    """Learning-activity events, buffered in memory and written in batches.
+
+    record() only appends to a ring buffer, so the action being tracked
+    never waits on the database. A background thread drains the buffer
+    every ``flush_interval`` seconds (or once ``flush_at`` events wait)
+    and writes the lot in one transaction, together with the hourly and
+    daily CourseActivity / StudentActivity rollups dashboards read. A
+    failed flush puts its events back for the next one. If the database
+    falls behind, the oldest unwritten events are dropped and counted in
+    ``dropped``.
+    """
+
+    def __init__(self, db_path='database.db', ring_size=RING_SIZE, flush_interval=FLUSH_INTERVAL,
+                 flush_at=FLUSH_AT, retention=EVENT_RETENTION, clock=time.time):
+        self.db = DBHelper(db_path)
+        self.flush_interval = flush_interval
+        self.flush_at = flush_at
+        self.retention = retention
+        self.clock = clock
+        self.flushes = 0
+        self.written = 0
+        self.dropped = 0
+        self._buffer = deque(maxlen=ring_size)
+        self._wake = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._pruned_at = 0
+
+    def record(self, kind, user_id=None, student_id=None, course_id=None, item_id=None):
+        """Queue one event; ``item_id`` is the material, assignment or submission it concerns."""
+        if self._closed:
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((int(self.clock()), kind, user_id, student_id, course_id, item_id))
+        if self._thread is None:
+            self._start()
+        if len(self._buffer) >= self.flush_at:
+            self._wake.set()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="activity-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # flush() kept the events for the next try; the app must not stop over tracking
+                print(f"Activity flush failed: {e}", file=sys.stderr)
+
+    def flush(self):
+        """Write every buffered event and update the rollups; returns how many were written."""
+        with self._flush_lock:
+            events = []
+            while True:
+                try:
+                    events.append(self._buffer.popleft())
+                except IndexError:
+                    break
+            if events:
+                try:
+                    self._write(events)
+                except BaseException:
+                    self._requeue(events)
+                    raise
+                self.flushes += 1
+                self.written += len(events)
+            now = self.clock()
+            if now - self._pruned_at >= PRUNE_INTERVAL:
+                self._pruned_at = now
+                self.prune(now - self.retention)
+            return len(events)
+
+    def _write(self, events):
+        with self.db.connection() as conn:
+            after = conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM ActivityEvent").fetchone()[0]
+            conn.executemany("""
+                             INSERT INTO ActivityEvent (at, kind, user_id, student_id, course_id, item_id)
+                             VALUES (?, ?, ?, ?, ?, ?)
+                             """, events)
+            for period in PERIODS:
+                conn.execute(COURSE_ROLLUP_SQL, {"period": period, "after": after})
+                conn.execute(STUDENT_ROLLUP_SQL, {"period": period, "after": after})
+
+    def _requeue(self, events):
+        """Put events a flush could not write back in front of the buffer.
+
+        Events recorded meanwhile keep their place; if the buffer has no
+        room for all of them, the oldest are dropped and counted.
+        """
+        room = max(self._buffer.maxlen - len(self._buffer), 0)
+        kept = events[max(len(events) - room, 0):]
+        self.dropped += len(events) - len(kept)
+        self._buffer.extendleft(reversed(kept))
+
+    def prune(self, before):
+        """Delete raw events older than epoch second ``before``; the rollups keep their counts."""
+        with self.db.connection() as conn:
+            conn.execute("DELETE FROM ActivityEvent WHERE at < ?", (int(before),))
+
+    def close(self):
+        """Stop the flush thread after writing what is still buffered."""
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        self.flush()
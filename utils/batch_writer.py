@@ -0,0 +1,91 @@
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty
+
+DEFAULT_MAX_BATCH = 64
+# How long the writer waits for more work after the first item of a batch
+DEFAULT_MAX_WAIT = 0.005
+
+
+class BatchWriter:
+    """Group commit: writes submitted from many threads, done a batch at a time on one thread.
+
+    ``write_batch(items)`` gets up to ``max_batch`` items, those that
+    arrived within ``max_wait`` seconds of the first, and returns one result per
+    item, in order; an item's result may be an exception instance, which
+    is raised to that item's caller alone. Under a burst, many callers
+    share one short transaction instead of queueing for SQLite's write
+    lock one by one; a lone call waits at most ``max_wait`` extra.
+    """
+
+    def __init__(self, write_batch, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT, name="batch-writer"):
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self.batches = 0
+        self.items = 0
+        self._queue = Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        """A Future for ``item``'s result."""
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            self._queue.put((item, future))
+        return future
+
+    def write(self, item):
+        """Submit ``item`` and wait for its result."""
+        return self.submit(item).result()
+
+    def _take(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except Empty:
+                break
+            if entry is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            futures = [future for _, future in batch]
+            try:
+                results = self.write_batch([item for item, _ in batch])
+            except BaseException as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for future, result in zip(futures, results):
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def close(self):
+        """Finish the queued writes and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
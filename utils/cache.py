@@ -0,0 +1,76 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU mapping whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=256, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def cached_read(maxsize=256, ttl=60.0):
+    """Cache a controller read method per database and arguments.
+
+    Results, including "not found", are shared by every controller on the
+    same ``db_path``, so callers must treat returned models as read-only.
+    The wrapper exposes ``invalidate(controller, *args)`` and
+    ``cache_clear()`` for the write methods that change what it returns.
+    """
+    def decorator(method):
+        cache = LRUCache(maxsize, ttl)
+
+        @functools.wraps(method)
+        def wrapper(self, *args):
+            key = (self.db_path, args)
+            value = cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = method(self, *args)
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        wrapper.invalidate = lambda controller, *args: cache.pop((controller.db_path, args))
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
@@ -1,30 +1,656 @@
+import functools
+import os
+import pathlib
+import re
 import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from queue import LifoQueue, Empty
+
+DEFAULT_POOL_SIZE = 5  # read connections; writes share a single one
+WRITER_POOL_SIZE = 1
+DEFAULT_TIMEOUT = 5.0
+HEALTH_CHECK_INTERVAL = 30.0
+
+# Applied once, when a pooled connection is opened.
+DEFAULT_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -8000),             # ~8 MB page cache per connection
+    ("mmap_size", 64 * 1024 * 1024),
+    ("busy_timeout", 5000),
+)
+
+# The writer takes the write lock when a checkout starts (BEGIN IMMEDIATE).
+# While another process holds it, each retry waits twice as long as the
+# one before, from BUSY_TIMEOUT_MS, until the pool's timeout runs out.
+BUSY_TIMEOUT_MS = 50
+MAX_BUSY_TIMEOUT_MS = 1000
+WRITE_PRAGMAS = DEFAULT_PRAGMAS[:-1] + (("busy_timeout", BUSY_TIMEOUT_MS),)
+
+# Read connections open the file with mode=ro; under WAL they never block
+# the writer or each other. journal_mode is the writer's to set.
+READ_PRAGMAS = (
+    ("query_only", "ON"),
+    ("cache_size", -8000),
+    ("mmap_size", 64 * 1024 * 1024),
+    ("busy_timeout", 5000),
+)
+# Taking the write lock slower than this counts as a busy wait
+BUSY_WAIT_MS = 1.0
+
+
+DEFAULT_SLOW_MS = 50.0
+SLOW_LOG_SIZE = 200
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection frees up within the timeout."""
+
+
+# Statements DBHelper.execute may send to a read-only connection
+_READ_ONLY_SQL = re.compile(r"\s*(?:SELECT|WITH|VALUES|EXPLAIN)\b", re.IGNORECASE)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """``sql`` with literals turned into ``?`` and whitespace collapsed, as a stats key."""
+    sql = _LITERALS.sub("?", sql)
+    sql = _PLACEHOLDER_LISTS.sub("(?, ...)", sql)
+    return " ".join(sql.split())
+
+
+class QueryStats:
+    """Per-statement timing for pooled connections, off unless enabled.
+
+    While enabled, newly checked-out connections time every execute and
+    fetch and aggregate the results by normalize_sql(). Statements slower
+    than ``slow_ms`` go to a bounded slow log with their EXPLAIN QUERY PLAN
+    and are printed to stderr. While disabled, connections are plain
+    sqlite3 connections and the only cost is one check per checkout.
+
+    Set LEARNUP_SQL_STATS=<slow ms> to enable it at startup.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = DEFAULT_SLOW_MS
+        self._lock = threading.Lock()
+        self._stats = {}  # normalized sql -> [calls, total s, max s, rows]
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._plans = {}
+
+    def enable(self, slow_ms=None):
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+            self._plans.clear()
+
+    def record(self, cursor, sql, params, elapsed, calls=1, rows=0):
+        key = normalize_sql(sql)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = [0, 0.0, 0.0, 0]
+            entry[0] += calls
+            entry[1] += elapsed
+            entry[3] += rows
+            cursor._elapsed += elapsed
+            if cursor._elapsed > entry[2]:
+                entry[2] = cursor._elapsed
+            slow = not cursor._logged and cursor._elapsed * 1000 >= self.slow_ms
+            if slow:
+                cursor._logged = True
+        if slow:
+            self._log_slow(cursor.connection, key, sql, params, cursor._elapsed)
+
+    def _log_slow(self, conn, key, sql, params, elapsed):
+        plan = self._plans.get(key)
+        if plan is None and params is not None:
+            try:
+                # A plain cursor, so planning is not itself recorded
+                rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+                plan = self._plans[key] = [row[3] for row in rows]
+            except sqlite3.Error:
+                plan = []
+        entry = {
+            "sql": key,
+            "ms": round(elapsed * 1000, 3),
+            "params": repr(params)[:200],
+            "plan": plan or [],
+            "thread": threading.current_thread().name,
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._slow.append(entry)
+        print(f"Slow query ({entry['ms']} ms): {key} | plan: {' / '.join(entry['plan'])}", file=sys.stderr)
+
+    def stats(self):
+        """One dict per distinct statement, by total time spent, highest first."""
+        with self._lock:
+            items = [(key, list(entry)) for key, entry in self._stats.items()]
+        rows = [{
+            "sql": key,
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "mean_ms": round(total * 1000 / calls, 3) if calls else 0.0,
+            "max_ms": round(worst * 1000, 3),
+            "rows": rows,
+        } for key, (calls, total, worst, rows) in items]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def slow_queries(self):
+        with self._lock:
+            return list(self._slow)
+
+    def plans(self):
+        """``{sql: plan steps}`` of every statement that has been logged as slow."""
+        with self._lock:
+            return dict(self._plans)
+
+    def report(self, limit=20):
+        """The top statements and the latest slow queries as text."""
+        lines = [f"{'calls':>8} {'total ms':>10} {'mean ms':>9} {'max ms':>9}  sql"]
+        for row in self.stats()[:limit]:
+            lines.append(f"{row['calls']:>8} {row['total_ms']:>10.1f} {row['mean_ms']:>9.3f} "
+                         f"{row['max_ms']:>9.3f}  {row['sql']}")
+        slow = self.slow_queries()
+        if slow:
+            lines.append(f"\nSlow queries (>= {self.slow_ms} ms), latest last:")
+            for entry in slow[-limit:]:
+                lines.append(f"{entry['at']} {entry['ms']:>9.3f} ms  {entry['sql']}")
+                lines.extend(f"    {step}" for step in entry["plan"])
+        return "\n".join(lines)
+
+
+query_stats = QueryStats()
+if os.environ.get("LEARNUP_SQL_STATS"):
+    query_stats.enable(float(os.environ["LEARNUP_SQL_STATS"] or DEFAULT_SLOW_MS))
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports execute and fetch times to query_stats."""
+
+    _sql = None
+    _params = None
+    _elapsed = 0.0
+    _logged = False
+
+    def execute(self, sql, parameters=()):
+        self._sql, self._params, self._elapsed, self._logged = sql, parameters, 0.0, False
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            query_stats.record(self, sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        # The parameters may be a generator, so none are kept for planning
+        self._sql, self._params, self._elapsed, self._logged = sql, None, 0.0, False
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            query_stats.record(self, sql, None, time.perf_counter() - start, rows=max(self.rowcount, 0))
+
+    def _fetched(self, start, rows):
+        if self._sql is not None:
+            query_stats.record(self, self._sql, self._params, time.perf_counter() - start, calls=0, rows=rows)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the execute shortcuts', are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by every DBHelper on a path.
+
+    A thread that already holds a connection gets the same one back on
+    nested checkouts, so a screen refresh made of several queries runs on
+    a single connection and page cache.
+
+    A read-only pool opens its connections with mode=ro and query_only.
+    Otherwise each outermost checkout starts with BEGIN IMMEDIATE, so a
+    writer never fails halfway through for want of the lock; busy
+    retries happen there, before any work is done. Callers need no BEGIN
+    of their own, and should hash, parse and touch files before checking
+    out the writer, since the lock is held from the first line.
+
+    Waits for a free connection and for the write lock are counted, see
+    metrics(), to tell whether a pool is too small.
+    """
+
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE, pragmas=None, timeout=DEFAULT_TIMEOUT, read_only=False):
+        self.db_path = db_path
+        self.size = size
+        self.read_only = read_only
+        self.pragmas = pragmas or (READ_PRAGMAS if read_only else WRITE_PRAGMAS)
+        self.timeout = timeout
+        self._idle = LifoQueue()  # (conn, last_used); LIFO keeps warm connections in use
+        self._slots = threading.BoundedSemaphore(size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened = []
+        self._in_use = 0
+        self.reset_metrics()
+
+    def connect(self, pragmas=None):
+        factory = TimedConnection if query_stats.enabled else sqlite3.Connection
+        if self.read_only:
+            uri = pathlib.Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False, factory=factory)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False, factory=factory)
+        for name, value in pragmas or self.pragmas:
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _checkout(self):
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except Empty:
+                break
+            # Connections opened before query stats were switched on or off are replaced
+            if isinstance(conn, TimedConnection) != query_stats.enabled:
+                self._discard(conn)
+                continue
+            if time.monotonic() - last_used < HEALTH_CHECK_INTERVAL or self.is_healthy(conn):
+                return conn
+            self._discard(conn)
+        conn = self.connect()
+        with self._lock:
+            self._opened.append(conn)
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            if conn in self._opened:
+                self._opened.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _take_slot(self):
+        waited = 0.0
+        if not self._slots.acquire(blocking=False):
+            start = time.perf_counter()
+            acquired = self._slots.acquire(timeout=self.timeout)
+            waited = time.perf_counter() - start
+            if not acquired:
+                with self._lock:
+                    self._waits += 1
+                    self._wait_seconds += waited
+                    self._timeouts += 1
+                raise PoolTimeout(f"no free connection for {self.db_path} after {self.timeout}s")
+        with self._lock:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._wait_seconds += waited
+                self._max_wait = max(self._max_wait, waited)
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+    def _free_slot(self):
+        with self._lock:
+            self._in_use -= 1
+        self._slots.release()
+
+    def _begin(self, conn):
+        """BEGIN IMMEDIATE, retrying with a longer busy_timeout while another process writes."""
+        busy_ms = BUSY_TIMEOUT_MS
+        retries = 0
+        failed = False
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    return
+                except sqlite3.OperationalError as e:
+                    if e.sqlite_errorcode & 0xFF != sqlite3.SQLITE_BUSY:
+                        raise
+                    if time.perf_counter() - start >= self.timeout:
+                        failed = True
+                        raise
+                retries += 1
+                busy_ms = min(busy_ms * 2, MAX_BUSY_TIMEOUT_MS)
+                conn.execute(f"PRAGMA busy_timeout={busy_ms}")
+        finally:
+            if retries:
+                conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            waited = time.perf_counter() - start
+            if retries or failed or waited * 1000 >= BUSY_WAIT_MS:
+                with self._lock:
+                    self._busy += 1
+                    self._busy_seconds += waited
+                    self._max_busy = max(self._max_busy, waited)
+                    self._retries += retries
+                    self._busy_failures += failed
+
+    def held(self):
+        """Whether the calling thread has a connection of this pool checked out."""
+        return getattr(self._local, "conn", None) is not None
+
+    def acquire(self):
+        local = self._local
+        if getattr(local, "conn", None) is not None:
+            local.depth += 1
+            return local.conn
+        self._take_slot()
+        try:
+            conn = self._checkout()
+        except BaseException:
+            self._free_slot()
+            raise
+        if not self.read_only and not conn.in_transaction:
+            try:
+                self._begin(conn)
+            except BaseException:
+                self._idle.put((conn, 0.0))
+                self._free_slot()
+                raise
+        local.conn = conn
+        local.depth = 1
+        return conn
+
+    def release(self, conn, failed=False):
+        """Return ``conn``; commits or rolls back when the outermost checkout ends."""
+        local = self._local
+        local.depth -= 1
+        if local.depth:
+            return
+        local.conn = None
+        try:
+            if conn.in_transaction:
+                if failed:
+                    conn.rollback()
+                else:
+                    conn.commit()
+        except sqlite3.Error:
+            self._discard(conn)
+            if not failed:
+                raise  # the caller's writes did not land
+        else:
+            # A failed checkout gets re-checked before anyone reuses it.
+            self._idle.put((conn, 0.0 if failed else time.monotonic()))
+        finally:
+            self._free_slot()
+
+    def reset_metrics(self):
+        with self._lock:
+            self._checkouts = self._waits = self._timeouts = 0
+            self._wait_seconds = self._max_wait = 0.0
+            self._peak_in_use = self._in_use
+            self._busy = self._retries = self._busy_failures = 0
+            self._busy_seconds = self._max_busy = 0.0
+
+    def metrics(self):
+        """Contention counters since the pool opened or reset_metrics().
+
+        ``waits`` are checkouts that found every connection in use; if
+        they are frequent the pool is too small (or, for the writer,
+        writes are too long). ``busy`` are writer checkouts that waited
+        for the write lock held by another process, ``retries`` the
+        times they gave up on a busy_timeout and tried again.
+        """
+        with self._lock:
+            metrics = {
+                "db_path": self.db_path,
+                "mode": "read" if self.read_only else "write",
+                "size": self.size,
+                "in_use": self._in_use,
+                "peak_in_use": self._peak_in_use,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_ms": round(self._wait_seconds * 1000, 3),
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+                "timeouts": self._timeouts,
+            }
+            if not self.read_only:
+                metrics.update({
+                    "busy": self._busy,
+                    "busy_ms": round(self._busy_seconds * 1000, 3),
+                    "max_busy_ms": round(self._max_busy * 1000, 3),
+                    "retries": self._retries,
+                    "busy_failures": self._busy_failures,
+                })
+        return metrics
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait()
+            except Empty:
+                break
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for conn in opened:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, size=None, read_only=False):
+    """Return the shared read or write pool for ``db_path``.
+
+    The first caller picks the read pool's size; there is one writer.
+    """
+    with _pools_lock:
+        pool = _pools.get((db_path, read_only))
+        if pool is None:
+            size = (size or DEFAULT_POOL_SIZE) if read_only else WRITER_POOL_SIZE
+            pool = _pools[db_path, read_only] = ConnectionPool(db_path, size, read_only=read_only)
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+def pool_stats():
+    """metrics() of every open pool, writers first."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return sorted((pool.metrics() for pool in pools), key=lambda m: (m["db_path"], m["mode"] == "read"))
+
+
+def reset_pool_stats():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.reset_metrics()
+
+
+def pool_report():
+    """pool_stats() as text, a line per pool."""
+    lines = []
+    for m in pool_stats():
+        line = (f"{m['mode']:>5} pool {m['db_path']}: {m['checkouts']} checkouts, peak {m['peak_in_use']}/{m['size']} "
+                f"in use, {m['waits']} waits ({m['wait_ms']:.1f} ms, max {m['max_wait_ms']:.1f}), "
+                f"{m['timeouts']} timeouts")
+        if m["mode"] == "write":
+            line += (f"; {m['busy']} busy ({m['busy_ms']:.1f} ms, max {m['max_busy_ms']:.1f}), "
+                     f"{m['retries']} retries, {m['busy_failures']} failed")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class ChangeCounter:
+    """A number that goes up when the database changes, without reading any table.
+
+    PRAGMA data_version only moves for commits made by *other*
+    connections and only compares meaningfully on one connection, so the
+    counter keeps a connection of its own that never writes. It starts
+    from the clock, so numbers handed out before a restart are not
+    mistaken for current ones.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.value = time.time_ns() // 1000
+        self._conn = None
+        self._seen = None
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """The current value; one PRAGMA, safe from any thread."""
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._seen is not None and version != self._seen:
+                self.value += 1
+            self._seen = version
+            return self.value
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self._seen = None
+                self.value += 1  # commits made while closed go unseen
+
 
 class DBHelper:
-    def __init__(self, db_path='database.db'):
+    """Routes reads and writes to the shared pools of ``db_path``.
+
+    connection() is the writer: one connection per process, so writes are
+    serialized here instead of contending for SQLite's lock. reader() and
+    snapshot() check out read-only connections, which under WAL run next
+    to the writer without blocking it or being blocked by it.
+    """
+
+    def __init__(self, db_path='database.db', pool_size=None):
         self.db_path = db_path
+        self.pool = get_pool(db_path)
+        self.readers = get_pool(db_path, pool_size, read_only=True)
+
+    def get_connection(self, read_only=False):
+        """Open a dedicated, unpooled connection with the pool's pragmas.
+
+        A writing one has no BEGIN IMMEDIATE retries, so it keeps the
+        full busy_timeout of DEFAULT_PRAGMAS instead.
+        """
+        if read_only:
+            return self.readers.connect()
+        return self.pool.connect(DEFAULT_PRAGMAS)
 
-    def get_connection(self):
-        return sqlite3.connect(self.db_path)
+    @contextmanager
+    def _checked_out(self, pool):
+        conn = pool.acquire()
+        failed = False
+        try:
+            yield conn
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            pool.release(conn, failed)
+
+    def connection(self):
+        """Check out the writer, already holding the write lock; commits on success, rolls back on error."""
+        return self._checked_out(self.pool)
+
+    def reader(self):
+        """Check out a read-only connection; each statement sees the latest commit.
+
+        Inside connection() on the same thread this is the writer, so a
+        transaction reads its own changes.
+        """
+        return self._checked_out(self.pool if self.pool.held() else self.readers)
+
+    @contextmanager
+    def snapshot(self):
+        """Like reader(), but every query in the block sees the same commit."""
+        with self.reader() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            yield conn
 
     def execute(self, query, params=(), fetchone=False, fetchall=False, commit=False):
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.execute(query, params)
-        result = None
-        if fetchone:
-            result = cur.fetchone()
-        elif fetchall:
-            result = cur.fetchall()
-        if commit:
-            conn.commit()
-        conn.close()
+        """Run one statement; queries go to reader(), anything else to the writer.
+
+        ``commit`` ends the transaction early only when this is the
+        outermost checkout; inside a caller's connection() block it is
+        that caller's to commit.
+        """
+        read_only = not commit and _READ_ONLY_SQL.match(query) is not None
+        nested = self.pool.held()
+        with (self.reader() if read_only else self.connection()) as conn:
+            cur = conn.cursor()
+            cur.execute(query, params)
+            result = None
+            if fetchone:
+                result = cur.fetchone()
+            elif fetchall:
+                result = cur.fetchall()
+            if commit and not nested:
+                conn.commit()
         return result
 
     def executemany(self, query, seq_of_params, commit=False):
-        conn = self.get_connection()
-        cur = conn.cursor()
-        cur.executemany(query, seq_of_params)
-        if commit:
-            conn.commit()
-        conn.close()
\ No newline at end of file
+        nested = self.pool.held()
+        with self.connection() as conn:
+            conn.executemany(query, seq_of_params)
+            if commit and not nested:
+                conn.commit()
@@ -0,0 +1,186 @@
+"""Streaming CSV, JSON Lines and XLSX output for reports of any size.
+
+Rows come from a cursor in fetchmany batches and leave as byte chunks, a
+batch at a time, so memory use does not grow with the report. XLSX is
+written with zipfile onto an unseekable sink (one inline-string sheet),
+so no spreadsheet library is needed.
+"""
+import csv
+import io
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+BATCH_SIZE = 500
+
+CSV = "csv"
+JSONL = "jsonl"
+XLSX = "xlsx"
+
+
+class Export:
+    """A report on its way out: ``chunks`` yields bytes and is read once."""
+
+    def __init__(self, filename, content_type, chunks):
+        self.filename = filename
+        self.content_type = content_type
+        self.chunks = chunks
+
+    def save(self, path):
+        """Write every chunk to ``path``; returns the number of bytes written."""
+        size = 0
+        with open(path, "wb") as f:
+            for chunk in self.chunks:
+                f.write(chunk)
+                size += len(chunk)
+        return size
+
+
+def fetch_batches(cursor, size=BATCH_SIZE):
+    """Lists of at most ``size`` rows from an executed cursor."""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+def csv_chunks(header, batches):
+    # A BOM so spreadsheet programs open the file as UTF-8
+    out = io.StringIO()
+    out.write("\ufeff")
+    writer = csv.writer(out)
+    writer.writerow(header)
+    for rows in batches:
+        writer.writerows(rows)
+        yield out.getvalue().encode("utf-8")
+        out.seek(0)
+        out.truncate()
+    yield out.getvalue().encode("utf-8")
+
+
+def jsonl_chunks(header, batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(header, row)), ensure_ascii=False) + "\n"
+                      for row in rows).encode("utf-8")
+
+
+# Characters XML 1.0 does not allow, even escaped
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'),
+}
+
+
+def _xlsx_workbook(sheet):
+    return ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet[:31], {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>')
+
+
+def _xlsx_row(row):
+    cells = []
+    for value in row:
+        if value is None:
+            cells.append("<c/>")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f"<c><v>{value}</v></c>")
+        else:
+            text = escape(_XML_ILLEGAL.sub("", str(value)))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f"<row>{''.join(cells)}</row>"
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, unseekable buffer that hands its contents out with take()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def xlsx_chunks(header, batches, sheet="Sheet1"):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, xml in _XLSX_PARTS.items():
+            zf.writestr(name, xml)
+        zf.writestr("xl/workbook.xml", _xlsx_workbook(sheet))
+        with zf.open("xl/worksheets/sheet1.xml", "w") as ws:
+            ws.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                     b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                     b'<sheetData>')
+            ws.write(_xlsx_row(header).encode("utf-8"))
+            for rows in batches:
+                ws.write("".join(_xlsx_row(row) for row in rows).encode("utf-8"))
+                yield sink.take()
+            ws.write(b"</sheetData></worksheet>")
+    yield sink.take()
+
+
+FORMATS = {
+    CSV: (csv_chunks, "text/csv; charset=utf-8"),
+    JSONL: (jsonl_chunks, "application/x-ndjson"),
+    XLSX: (xlsx_chunks, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def _chunks(chunker, rows):
+    try:
+        header = next(rows, None)
+        if header is None:
+            return
+        for chunk in chunker(header, rows):
+            if chunk:
+                yield chunk
+    finally:
+        rows.close()  # lets the source release its connection when a download stops early
+
+
+def export(fmt, name, rows):
+    """An Export of ``rows`` as ``name.<fmt>``.
+
+    ``rows`` is a generator that yields the header, then lists of row
+    tuples; nothing is read from it until the first chunk is asked for.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}; use one of {', '.join(FORMATS)}")
+    chunker, content_type = FORMATS[fmt]
+    return Export(f"{name}.{fmt}", content_type, _chunks(chunker, rows))
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from contextlib import nullcontext
+
+from utils.db_helper import DBHelper
+
+CHUNK_SIZE = 1024 * 1024
+
+MATERIALS_STORE = "materials"
+ASSIGNMENTS_STORE = "assignments"
+SUBMISSIONS_STORE = "submissions"
+UPLOADS_DIR = "uploads"
+# Unfinished uploads are abandoned after this long
+UPLOAD_TTL = 24 * 3600
+# A published file gets this long to be recorded before collect_garbage
+# may take it for the leftover of a failed transaction
+PUBLISH_GRACE = 3600
+
+_STORED_NAME_RE = re.compile(r"([0-9a-f]{64})(\..*)?$")
+
+
+def _fsync_dir(path):
+    # Makes renames into ``path`` durable; directories cannot be opened on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FileStore:
+    """Content-addressed store for uploaded files.
+
+    Files are kept once per SHA-256 under ``root`` as ``<sha256><suffix>``.
+    Reference counts live in the StoredFile table and are maintained by
+    triggers on the rows that point at a hash (see database.py).
+
+    Writing is three steps so bursts can share the expensive parts, none
+    of them inside a write transaction: stage() copies into a temporary
+    file, publish() fsyncs a whole list of staged files, moves them into
+    place and syncs the directory once, and record() adds their rows in
+    the caller's transaction. A file published but never recorded, say
+    because that transaction failed, is removed by collect_garbage().
+    """
+
+    def __init__(self, name, root=None, db_path='database.db', suffix=".pdf", chunk_size=CHUNK_SIZE):
+        self.name = name
+        self.root = root or name
+        self.suffix = suffix
+        self.chunk_size = chunk_size
+        self.db = DBHelper(db_path)
+
+    def path_for(self, file_hash):
+        return os.path.join(self.root, file_hash + self.suffix)
+
+    def resolve(self, pdf_file, file_hash=None):
+        """Path of a stored row; rows from before the store keep their own file name."""
+        if file_hash:
+            return self.path_for(file_hash)
+        return os.path.join(self.root, pdf_file)
+
+    def chunks(self, path):
+        """The bytes of a stored file in ``chunk_size`` pieces, for streaming it out."""
+        with open(path, "rb") as f:
+            while chunk := f.read(self.chunk_size):
+                yield chunk
+
+    def _copy_and_hash(self, src, dst):
+        # Hashing needs the bytes in user space, so this is a single
+        # read/hash/write pass over a reused buffer rather than sendfile
+        # followed by a second read to hash.
+        digest = hashlib.sha256()
+        size = 0
+        buf = bytearray(self.chunk_size)
+        view = memoryview(buf)
+        with open(src, "rb") if isinstance(src, (str, os.PathLike)) else nullcontext(src) as f:
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                chunk = view[:n]
+                digest.update(chunk)
+                dst.write(chunk)
+                size += n
+        return digest.hexdigest(), size
+
+    def stage(self, src):
+        """Copy ``src`` (a path or binary file) to a temporary file in the store.
+
+        Returns ``(tmp_path, file_hash, size)`` for publish(); the copy is
+        not durable and not visible under its hash until then.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as dst:
+                file_hash, size = self._copy_and_hash(src, dst)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return tmp_path, file_hash, size
+
+    def publish(self, staged):
+        """Make staged files durable under their hash; one directory sync for the lot.
+
+        Each file is fsynced before its rename, so a crash never leaves a
+        hash name over partial content. Call it before the transaction
+        that records the files: the fsyncs must not hold the write lock.
+        """
+        if not staged:
+            return
+        for tmp_path, file_hash, _ in staged:
+            final_path = self.path_for(file_hash)
+            if os.path.exists(final_path):
+                os.remove(tmp_path)
+                # Fresh again, so collect_garbage leaves it until it is recorded
+                os.utime(final_path)
+                continue
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, final_path)
+        _fsync_dir(self.root)
+
+    def record(self, staged):
+        """Add the StoredFile rows of published files; joins the caller's transaction."""
+        if not staged:
+            return
+        with self.db.connection() as conn:
+            conn.executemany("""
+                             INSERT OR IGNORE INTO StoredFile (store, sha256, size, created_at)
+                             VALUES (?, ?, ?, datetime('now'))
+                             """, [(self.name, file_hash, size) for _, file_hash, size in staged])
+
+    def discard(self, staged):
+        for tmp_path, _, _ in staged:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def ingest(self, src):
+        """Copy ``src`` (a path or binary file) into the store; returns ``(file_hash, size)``.
+
+        A file whose content is already stored is not written again.
+        """
+        staged = self.stage(src)
+        try:
+            self.publish([staged])
+        except BaseException:
+            self.discard([staged])
+            raise
+        self.record([staged])
+        return staged[1], staged[2]
+
+    # Resumable uploads: the bytes received so far sit in uploads/<id>.part
+    # and a client that lost its connection continues from size_of(id)
+
+    def upload_path(self, upload_id):
+        return os.path.join(self.root, UPLOADS_DIR, upload_id + ".part")
+
+    def append(self, upload_id, offset, data):
+        """Write ``data`` at ``offset`` of an upload; returns the upload's new size.
+
+        Only the current end is accepted, so a resent chunk is ignored
+        and a gap is refused; either way the caller learns where to go on.
+        """
+        path = self.upload_path(upload_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            size = f.tell()
+            if offset == size:
+                f.write(data)
+                size += len(data)
+        return size
+
+    def size_of(self, upload_id):
+        try:
+            return os.path.getsize(self.upload_path(upload_id))
+        except FileNotFoundError:
+            return 0
+
+    def stage_upload(self, upload_id):
+        """Hash a finished upload and move it to a staged file, ready for publish()."""
+        path = self.upload_path(upload_id)
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as f:
+            while chunk := f.read(self.chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        os.close(fd)
+        os.replace(path, tmp_path)
+        return tmp_path, digest.hexdigest(), size
+
+    def _stored_files(self):
+        """``(file_hash, mtime)`` of every file in the store named after its hash."""
+        if not os.path.isdir(self.root):
+            return []
+        files = []
+        for entry in os.scandir(self.root):
+            match = _STORED_NAME_RE.match(entry.name)
+            if match and (match[2] or "") == self.suffix and entry.is_file():
+                files.append((match[1], entry.stat().st_mtime))
+        return files
+
+    def collect_garbage(self, upload_ttl=UPLOAD_TTL, grace=PUBLISH_GRACE):
+        """Delete stored files no row refers to any more; returns how many.
+
+        That includes files without any StoredFile row, left by a publish()
+        whose transaction never committed. Files touched in the last
+        ``grace`` seconds stay, as they may be about to be recorded.
+        Uploads and staged copies untouched for ``upload_ttl`` seconds
+        are abandoned and go too.
+        """
+        with self.db.reader() as conn:
+            rows = dict(conn.execute("SELECT sha256, ref_count > 0 FROM StoredFile WHERE store = ?",
+                                     (self.name,)).fetchall())
+        cutoff = time.time() - grace
+        on_disk = self._stored_files()
+        doomed = [file_hash for file_hash, mtime in on_disk if not rows.get(file_hash) and mtime < cutoff]
+        # Unreferenced rows whose file is gone already are dropped as well
+        present = {file_hash for file_hash, _ in on_disk}
+        unrecorded = doomed + [file_hash for file_hash, used in rows.items() if not used and file_hash not in present]
+
+        with self.db.connection() as conn:
+            conn.execute("""
+                         DELETE FROM StoredFile
+                         WHERE store = ? AND ref_count <= 0 AND sha256 IN (SELECT value FROM json_each(?))
+                         """, (self.name, json.dumps(unrecorded)))
+            # Any row still there was referenced meanwhile; its file stays
+            kept = {row[0] for row in conn.execute("""
+                                                   SELECT sha256
+                                                   FROM StoredFile
+                                                   WHERE store = ? AND sha256 IN (SELECT value FROM json_each(?))
+                                                   """, (self.name, json.dumps(doomed)))}
+
+        removed = 0
+        for file_hash in doomed:
+            path = self.path_for(file_hash)
+            try:
+                # Referenced, or published again, since the scan
+                if file_hash in kept or os.stat(path).st_mtime >= cutoff:
+                    continue
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        stale = time.time() - upload_ttl
+        for directory, suffix in ((os.path.join(self.root, UPLOADS_DIR), ""), (self.root, ".part")):
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if entry.name.endswith(suffix) and entry.is_file() and entry.stat().st_mtime < stale:
+                    os.remove(entry.path)
+        return removed
@@ -0,0 +1,199 @@
+"""Grade analytics over whole gradebooks, computed on NumPy arrays.
+
+A Gradebook holds every enrolled student's latest score on every
+assignment of a set of courses; Gradebook.stats() derives per-course
+distributions and percentiles, per-assignment means and spreads, and each
+student's weighted final grade and at-risk flag, without a Python loop
+over students or submissions.
+
+NumPy is optional for the rest of the app: without it available() is
+False and the analytics are switched off.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Row kinds of controllers.analytics_c.GRADEBOOK_SQL
+ASSIGNMENT = 0
+ENROLLMENT = 1
+SUBMISSION = 2
+
+# Final grades below this are at risk, as are students who missed at
+# least AT_RISK_MISSING of the work already due
+PASSING_GRADE = 60.0
+AT_RISK_MISSING = 0.25
+PERCENTILES = (10, 25, 50, 75, 90)
+# Distributions count final grades in bins this wide; 100 goes in the last one
+BIN_WIDTH = 10
+MAX_GRADE = 100
+
+
+def available():
+    return np is not None
+
+
+def _group_percentiles(groups, values, n_groups, percentiles):
+    """``(n_groups, len(percentiles))`` percentiles of ``values`` within each group.
+
+    Interpolates linearly between the closest ranks like np.percentile;
+    a group without values gets NaN.
+    """
+    result = np.full((n_groups, len(percentiles)), np.nan)
+    if not values.size:
+        return result
+    order = np.lexsort((values, groups))
+    values = values[order]
+    count = np.bincount(groups, minlength=n_groups)
+    start = np.cumsum(count) - count
+    rank = (count[:, None] - 1) * (np.asarray(percentiles, dtype=np.float64) / 100)
+    below = np.floor(rank)
+    low = np.clip(start[:, None] + below.astype(np.int64), 0, values.size - 1)
+    high = np.clip(low + 1, 0, np.maximum(start + count - 1, 0)[:, None])
+    interpolated = values[low] + (values[high] - values[low]) * (rank - below)
+    present = count > 0
+    result[present] = interpolated[present]
+    return result
+
+
+class Gradebook:
+    """Enrolled students' latest scores on their courses' assignments, as flat arrays.
+
+    ``rows`` are GRADEBOOK_SQL rows; ``course_ids`` are the courses it was
+    read for, which all get stats even when empty. A cell is one
+    enrollment and one assignment of the same course, so memory grows
+    with the gradebooks themselves rather than students × assignments.
+    Enrollments are grouped by course, assignments by course in due order.
+    """
+
+    def __init__(self, rows, course_ids):
+        data = np.array(rows, dtype=np.float64).reshape(-1, 5)  # NULL becomes NaN
+        kind = data[:, 0]
+        assignments = data[kind == ASSIGNMENT]
+        enrollments = data[kind == ENROLLMENT]
+        submissions = data[kind == SUBMISSION]
+        self.course_ids = np.unique(np.asarray(list(course_ids), dtype=np.int64))
+
+        a_course = np.searchsorted(self.course_ids, assignments[:, 2])
+        order = np.lexsort((assignments[:, 1], assignments[:, 3], a_course))
+        self.assignment_ids = assignments[order, 1].astype(np.int64)
+        self.assignment_course = a_course[order]
+        self.due_at = assignments[order, 3]
+        self.weight = assignments[order, 4]
+        self.assignments_per_course = np.bincount(self.assignment_course, minlength=self.course_ids.size)
+
+        e_course = np.searchsorted(self.course_ids, enrollments[:, 2])
+        order = np.lexsort((enrollments[:, 1], e_course))
+        self.student_ids = enrollments[order, 1].astype(np.int64)
+        self.enrollment_course = e_course[order]
+
+        # Each enrollment's cells are its course's run of assignments
+        first = np.cumsum(self.assignments_per_course) - self.assignments_per_course
+        cells = self.assignments_per_course[self.enrollment_course]
+        self.cell_enrollment = np.repeat(np.arange(self.student_ids.size), cells)
+        offset = np.arange(self.cell_enrollment.size) - np.repeat(np.cumsum(cells) - cells, cells)
+        self.cell_assignment = np.repeat(first[self.enrollment_course], cells) + offset
+
+        self.score = np.full(self.cell_enrollment.size, np.nan)
+        self.submitted = np.zeros(self.cell_enrollment.size, dtype=bool)
+        if self.score.size and submissions.size:
+            # The latest submission per student and assignment counts, as in exports
+            stride = int(self.assignment_ids.max()) + 1
+            order = np.lexsort((submissions[:, 3], submissions[:, 2], submissions[:, 1]))
+            submissions = submissions[order]
+            keys = submissions[:, 1].astype(np.int64) * stride + submissions[:, 2].astype(np.int64)
+            latest = np.append(keys[1:] != keys[:-1], True)
+            keys, scores = keys[latest], submissions[latest, 4]
+
+            cell_keys = (self.student_ids[self.cell_enrollment] * stride
+                         + self.assignment_ids[self.cell_assignment])
+            by_key = np.argsort(cell_keys)
+            sorted_keys = cell_keys[by_key]
+            at = np.minimum(np.searchsorted(sorted_keys, keys), sorted_keys.size - 1)
+            found = sorted_keys[at] == keys  # submissions of students no longer enrolled drop out
+            cells = by_key[at[found]]
+            self.score[cells] = scores[found]
+            self.submitted[cells] = True
+
+    def stats(self, now, passing=PASSING_GRADE, at_risk_missing=AT_RISK_MISSING):
+        """Arrays of statistics, keyed ``"courses"``, ``"assignments"`` and
+        ``"enrollments"``, each aligned with the matching id array.
+
+        A final grade weighs every graded assignment by its weight and
+        counts work missing after its due time (epoch second ``now``) as
+        0; ungraded submissions and work not due yet are left out. NaN
+        marks a value with nothing to go on.
+        """
+        n_courses, n_assignments, n_enrollments = self.course_ids.size, self.assignment_ids.size, self.student_ids.size
+        graded = ~np.isnan(self.score)
+        past_due = self.due_at[self.cell_assignment] <= now
+        missing = past_due & ~self.submitted
+        weight = np.where(graded | missing, self.weight[self.cell_assignment], 0.0)
+        points = weight * np.where(graded, self.score, 0.0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            final = (np.bincount(self.cell_enrollment, points, n_enrollments)
+                     / np.bincount(self.cell_enrollment, weight, n_enrollments))
+            missed = np.bincount(self.cell_enrollment, missing, n_enrollments)
+            due = np.bincount(self.cell_enrollment, past_due, n_enrollments)
+            at_risk = (final < passing) | ((missed > 0) & (missed >= at_risk_missing * due))
+
+            assignment = self.cell_assignment[graded]
+            score = self.score[graded]
+            count = np.bincount(assignment, minlength=n_assignments)
+            mean = np.bincount(assignment, score, n_assignments) / count
+            deviation = score - mean[assignment]
+            std = np.sqrt(np.bincount(assignment, deviation * deviation, n_assignments) / count)
+        low = np.full(n_assignments, np.nan)
+        high = np.full(n_assignments, np.nan)
+        np.fmin.at(low, assignment, score)
+        np.fmax.at(high, assignment, score)
+
+        rated = ~np.isnan(final)
+        course = self.enrollment_course[rated]
+        grades = final[rated]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            course_mean = (np.bincount(course, grades, n_courses)
+                           / np.bincount(course, minlength=n_courses))
+        n_bins = MAX_GRADE // BIN_WIDTH
+        bins = np.minimum((grades // BIN_WIDTH).astype(np.int64), n_bins - 1)
+        distribution = np.bincount(course * n_bins + bins, minlength=n_courses * n_bins).reshape(n_courses, n_bins)
+
+        return {
+            "courses": {
+                "students": np.bincount(self.enrollment_course, minlength=n_courses),
+                "assignments": self.assignments_per_course,
+                "graded": np.bincount(self.enrollment_course[self.cell_enrollment[graded]], minlength=n_courses),
+                "mean": course_mean,
+                "percentiles": _group_percentiles(course, grades, n_courses, PERCENTILES),
+                "distribution": distribution,
+                "at_risk": np.bincount(self.enrollment_course, at_risk, n_courses).astype(np.int64),
+            },
+            "assignments": {
+                "graded": count,
+                "submitted": np.bincount(self.cell_assignment, self.submitted, n_assignments).astype(np.int64),
+                "missing": np.bincount(self.cell_assignment, missing, n_assignments).astype(np.int64),
+                "mean": mean,
+                "std": std,
+                "min": low,
+                "median": _group_percentiles(assignment, score, n_assignments, (50,))[:, 0],
+                "max": high,
+            },
+            "enrollments": {
+                "final": final,
+                "graded": np.bincount(self.cell_enrollment, graded, n_enrollments).astype(np.int64),
+                "missing": missed.astype(np.int64),
+                "due": due.astype(np.int64),
+                "at_risk": at_risk,
+            },
+        }
+
+
+def plain(value, digits=2):
+    """A NumPy scalar as a JSON-ready value: NaN becomes None, floats are rounded."""
+    if isinstance(value, (np.bool_, bool)):
+        return bool(value)
+    if isinstance(value, (np.integer, int)):
+        return int(value)
+    value = float(value)
+    return None if value != value else round(value, digits)
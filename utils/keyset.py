@@ -0,0 +1,43 @@
+PAGE_SIZE = 100
+
+
+class KeysetQuery:
+    """One SQL query read a page at a time with keyset pagination.
+
+    Pages are range seeks on ``(sort key, tiebreak)`` rather than OFFSET
+    scans, and sorting is done by the database. Every row carries its
+    sort key and tiebreak as two trailing columns; pass the last row's
+    ``row[-2:]`` as ``after`` to get the next page.
+
+    ``from_where`` is the FROM/JOIN/WHERE part of the query and must end in
+    a WHERE clause; its ``?`` placeholders are filled from ``params``.
+    ``sort_keys`` gives the ORDER BY expression for each column (None for
+    columns that cannot be sorted); keep them non-NULL, e.g. with COALESCE.
+    """
+
+    def __init__(self, columns, from_where, sort_keys, tiebreak):
+        self.columns = columns
+        self.from_where = from_where
+        self.sort_keys = sort_keys
+        self.tiebreak = tiebreak
+
+    @property
+    def sortable(self):
+        return [key is not None for key in self.sort_keys]
+
+    def sort_key(self, column):
+        if column is None or self.sort_keys[column] is None:
+            return self.tiebreak
+        return self.sort_keys[column]
+
+    def page(self, conn, params, after=None, sort_column=None, descending=False, limit=PAGE_SIZE):
+        sort_key = self.sort_key(sort_column)
+        direction, op = ("DESC", "<") if descending else ("ASC", ">")
+        sql = f"SELECT {', '.join(self.columns)}, {sort_key}, {self.tiebreak} {self.from_where}"
+        args = list(params)
+        if after is not None:
+            sql += f" AND ({sort_key}, {self.tiebreak}) {op} (?, ?)"
+            args.extend(after)
+        sql += f" ORDER BY {sort_key} {direction}, {self.tiebreak} {direction} LIMIT ?"
+        args.append(limit)
+        return conn.execute(sql, args).fetchall()
@@ -1,9 +1,146 @@
+import base64
 import hashlib
+import hmac
+import os
+import re
+
+SCRYPT = "scrypt"
+PBKDF2 = "pbkdf2_sha256"
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# Cost of new hashes; see benchmarks/passwords.py for what each setting
+# costs per login. Hashes made with other settings are upgraded on the
+# user's next successful login.
+DEFAULT_SCHEME = SCRYPT
+DEFAULT_PARAMS = {
+    SCRYPT: {"n": 2 ** 14, "r": 8, "p": 1},
+    PBKDF2: {"iterations": 600_000},
+}
+
+# Before hashing, passwords were stored as plaintext or as a bare SHA-256 digest
+_HEX_DIGEST_RE = re.compile(r"[0-9a-fA-F]{64}")
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _derive(scheme, password, salt, params):
+    secret = password.encode("utf-8")
+    if scheme == SCRYPT:
+        n, r, p = params["n"], params["r"], params["p"]
+        # scrypt needs ~128*n*r bytes; leave headroom over OpenSSL's 32 MB default
+        return hashlib.scrypt(secret, salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r * p + (1 << 20), dklen=KEY_BYTES)
+    if scheme == PBKDF2:
+        return hashlib.pbkdf2_hmac("sha256", secret, salt, params["iterations"], KEY_BYTES)
+    raise ValueError(f"unknown password scheme {scheme!r}")
+
+
+def _format_params(params):
+    return ",".join(f"{name}={value}" for name, value in sorted(params.items()))
+
+
+def _parse(hashed):
+    """``(scheme, params, salt, key)`` for an encoded hash, None for legacy values."""
+    parts = hashed.split("$") if hashed else ()
+    if len(parts) != 4 or parts[0] not in DEFAULT_PARAMS:
+        return None
+    scheme, params, salt, key = parts
+    try:
+        params = {name: int(value) for name, value in
+                  (item.split("=", 1) for item in params.split(","))}
+        return scheme, params, _unb64(salt), _unb64(key)
+    except ValueError:
+        return None
+
+
+def _verify_legacy(password, stored):
+    """Check a value stored before hashing, so the login can upgrade it.
+
+    A 64-hex-digit value is a bare SHA-256 digest and only the password
+    that hashes to it matches; comparing it as plaintext would let the
+    digest itself log in. Anything else is a plaintext password.
+    """
+    if _HEX_DIGEST_RE.fullmatch(stored):
+        candidate = hashlib.sha256(password.encode("utf-8")).hexdigest()
+        return hmac.compare_digest(candidate, stored.lower())
+    return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+
+
+class PasswordHasher:
+    """Salted KDF hashes stored as ``scheme$name=value,...$salt$key``.
+
+    Every hash records its own parameters, so raising the cost only
+    affects new hashes; ``needs_rehash`` tells the login path which stored
+    hashes are behind the current setting.
+    """
+
+    def __init__(self, scheme=DEFAULT_SCHEME, **params):
+        self.scheme = scheme
+        self.params = {**DEFAULT_PARAMS[scheme], **params}
+
+    def hash(self, password):
+        salt = os.urandom(SALT_BYTES)
+        key = _derive(self.scheme, password, salt, self.params)
+        return f"{self.scheme}${_format_params(self.params)}${_b64(salt)}${_b64(key)}"
+
+    def verify(self, password, hashed):
+        parsed = _parse(hashed)
+        if parsed is None:
+            return _verify_legacy(password, hashed or "")
+        scheme, params, salt, key = parsed
+        try:
+            candidate = _derive(scheme, password, salt, params)
+        except (KeyError, ValueError):
+            return False
+        return hmac.compare_digest(candidate, key)
+
+    def needs_rehash(self, hashed):
+        parsed = _parse(hashed)
+        return parsed is None or parsed[0] != self.scheme or parsed[1] != self.params
+
+
+default_hasher = PasswordHasher()
+
+# Verified against when a username does not exist, so unknown users cost
+# as much as a wrong password
+_DUMMY_HASH = None
+
+
+def configure(scheme=DEFAULT_SCHEME, **params):
+    """Switch the scheme or cost used for new hashes, e.g. ``configure(n=2 ** 15)``."""
+    global default_hasher, _DUMMY_HASH
+    default_hasher = PasswordHasher(scheme, **params)
+    _DUMMY_HASH = None
+    return default_hasher
+
 
 def hash_password(password: str) -> str:
-    """Hash password using SHA-256 (for simple use, not for production)."""
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+    """Hash password with the current scheme and cost."""
+    return default_hasher.hash(password)
+
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify a password against its hash."""
-    return hash_password(password) == hashed
\ No newline at end of file
+    """Verify a password against its stored hash in constant time."""
+    return default_hasher.verify(password, hashed)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """True when ``hashed`` was not made with the current scheme and cost."""
+    return default_hasher.needs_rehash(hashed)
+
+
+def burn_verify(password: str) -> bool:
+    """Spend one verification's worth of work, for lookups of unknown users."""
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = default_hasher.hash("")
+    default_hasher.verify(password, _DUMMY_HASH)
+    return False
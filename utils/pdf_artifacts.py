@@ -0,0 +1,277 @@
+"""Text and first-page thumbnails extracted once per stored PDF.
+
+Artifacts are cached on disk by content hash, so a file uploaded to
+several courses, or uploaded again, is only processed once.
+
+    python -m utils.pdf_artifacts [--workers N]
+
+processes every stored file that has no artifacts yet, e.g. uploads made
+before this pipeline existed.
+
+PDF parsing uses PyMuPDF (``fitz``) when installed, which gives both text
+and thumbnails; otherwise ``pypdf`` for text only. With neither, files are
+skipped and nothing is cached.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from controllers.search_c import SearchController
+from utils.db_helper import DBHelper
+from utils.file_store import FileStore, MATERIALS_STORE, ASSIGNMENTS_STORE
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+ARTIFACTS_DIR = "artifacts"
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+THUMBNAIL_WIDTH = 240
+# Fewer files than this are handled on a thread; more go to a process pool
+BACKLOG_THRESHOLD = 8
+
+
+def can_extract():
+    return fitz is not None or pypdf is not None
+
+
+def extract(path, thumbnail_width=THUMBNAIL_WIDTH):
+    """``(text, png_bytes)`` for the PDF at ``path``; png_bytes is None without
+    PyMuPDF or when ``thumbnail_width`` is None.
+
+    Module-level so process pool workers can run it.
+    """
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            text = "\n".join(page.get_text() for page in doc)
+            png = None
+            if doc.page_count and thumbnail_width:
+                page = doc[0]
+                zoom = thumbnail_width / page.rect.width
+                png = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False).tobytes("png")
+        return text, png
+    reader = pypdf.PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages), None
+
+
+class ArtifactCache:
+    """Size-bounded directory of ``<sha256>.txt`` / ``<sha256>.png`` files.
+
+    Reads refresh a file's mtime; when the total size passes ``max_bytes``
+    the least recently used artifacts are deleted first.
+    """
+
+    def __init__(self, root=ARTIFACTS_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None
+
+    def path_for(self, file_hash, ext):
+        return os.path.join(self.root, file_hash[:2], f"{file_hash}.{ext}")
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+            return path
+        except OSError:
+            return None
+
+    def has(self, file_hash):
+        return os.path.exists(self.path_for(file_hash, "txt"))
+
+    def text(self, file_hash):
+        path = self._touch(self.path_for(file_hash, "txt"))
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def thumbnail(self, file_hash):
+        """Path of the thumbnail PNG, or None."""
+        return self._touch(self.path_for(file_hash, "png"))
+
+    def put(self, file_hash, text, png=None):
+        # The .txt is written last; its presence marks the entry complete
+        added = 0
+        for ext, data in (("png", png), ("txt", text.encode("utf-8"))):
+            if data is None:
+                continue
+            path = self.path_for(file_hash, ext)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            added += len(data)
+        with self._lock:
+            if self._total is None:
+                self._total = self._scan_total()
+            else:
+                self._total += added
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith((".txt", ".png")):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield st.st_mtime, st.st_size, path
+
+    def _scan_total(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        # Down to 90% so a full cache does not rescan on every put
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total = total
+
+
+class PdfPipeline:
+    """Builds artifacts for stored PDFs in the background.
+
+    ``enqueue`` is safe to call from any thread and returns immediately;
+    results go to the ArtifactCache and the extracted text is indexed for
+    search (SearchController.index_document).
+    """
+
+    def __init__(self, db_path='database.db', cache=None, max_workers=None):
+        self.db = DBHelper(db_path)
+        self.cache = cache or ArtifactCache()
+        self.search = SearchController(db_path)
+        self.stores = {
+            MATERIALS_STORE: FileStore(MATERIALS_STORE, db_path=db_path),
+            ASSIGNMENTS_STORE: FileStore(ASSIGNMENTS_STORE, db_path=db_path),
+        }
+        self.max_workers = max_workers
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def enqueue(self, store, file_hash):
+        # Cached artifacts may come from the other store's copy, which
+        # leaves this store's document unindexed
+        if self.cache.has(file_hash):
+            if self.search.is_indexed(store, file_hash):
+                return None
+        elif not can_extract():
+            return None
+        with self._lock:
+            if (store, file_hash) in self._pending:
+                return None
+            self._pending.add((store, file_hash))
+        return self._thread.submit(self._process_one, store, file_hash)
+
+    def _process_one(self, store, file_hash):
+        try:
+            text = self.cache.text(file_hash)
+            if text is None:
+                path = self.stores[store].path_for(file_hash)
+                self._save(store, file_hash, *extract(path))
+            else:
+                self.search.index_document(store, file_hash, text)
+        except Exception as e:  # a corrupt upload must not stop the queue
+            print(f"PDF extraction failed for {file_hash}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard((store, file_hash))
+
+    def _save(self, store, file_hash, text, png):
+        self.cache.put(file_hash, text, png)
+        self.search.index_document(store, file_hash, text)
+
+    def missing(self):
+        """``(store, file_hash)`` of stored PDFs with no cached artifacts or no indexed text."""
+        with self.db.reader() as conn:
+            rows = conn.execute("""
+                SELECT f.store, f.sha256, d.sha256 IS NOT NULL
+                FROM StoredFile f
+                         LEFT JOIN DocumentText d ON d.store = f.store AND d.sha256 = f.sha256
+                WHERE f.store IN (?, ?)
+            """, (MATERIALS_STORE, ASSIGNMENTS_STORE)).fetchall()
+        return [(store, file_hash) for store, file_hash, indexed in rows
+                if not (indexed and self.cache.has(file_hash))]
+
+    def process_backlog(self, items=None):
+        """Process ``items`` (default: everything missing); returns how many succeeded.
+
+        Files whose artifacts are already cached are only indexed.
+        """
+        items = self.missing() if items is None else items
+        done, uncached = 0, []
+        for store, file_hash in items:
+            text = self.cache.text(file_hash)
+            if text is None:
+                uncached.append((store, file_hash))
+            else:
+                self.search.index_document(store, file_hash, text)
+                done += 1
+        if uncached and can_extract():
+            done += self._extract_all(uncached)
+        return done
+
+    def _extract_all(self, items):
+        paths = [self.stores[store].path_for(file_hash) for store, file_hash in items]
+        if len(items) < BACKLOG_THRESHOLD:
+            results = self._results(items, map(_extract_safely, paths))
+            return self._save_all(results)
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            results = self._results(items, pool.map(_extract_safely, paths, chunksize=4))
+            return self._save_all(results)
+
+    def _results(self, items, outputs):
+        for (store, file_hash), output in zip(items, outputs):
+            if output is not None:
+                yield store, file_hash, output
+
+    def _save_all(self, results):
+        done = 0
+        for store, file_hash, (text, png) in results:
+            self._save(store, file_hash, text, png)
+            done += 1
+        return done
+
+    def shutdown(self, wait=True):
+        self._thread.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def _extract_safely(path):
+    try:
+        return extract(path)
+    except Exception as e:
+        print(f"PDF extraction failed for {path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build text and thumbnails for stored PDFs.")
+    parser.add_argument("--db", default="database.db")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    if not can_extract():
+        raise SystemExit("Install PyMuPDF (or pypdf for text only) to extract PDFs.")
+    pipeline = PdfPipeline(args.db, max_workers=args.workers)
+    print(f"Processed {pipeline.process_backlog()} files.")
+    pipeline.shutdown()
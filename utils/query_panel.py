@@ -0,0 +1,107 @@
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPlainTextEdit, QPushButton, QCheckBox, QDoubleSpinBox, QLabel,
+                             QSplitter, QHeaderView)
+
+from utils.db_helper import query_stats, pool_report
+
+REFRESH_MS = 1000
+COLUMNS = [("Calls", "calls"), ("Total ms", "total_ms"), ("Mean ms", "mean_ms"),
+           ("Max ms", "max_ms"), ("Rows", "rows"), ("SQL", "sql")]
+
+
+class QueryStatsPanel(QWidget):
+    """Debug window over utils.db_helper.query_stats, refreshed every second.
+
+    Shows one row per normalized statement, the slow-query log with
+    each query's plan, and the connection pools' contention counters. Switching recording on here only affects
+    connections checked out afterwards.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setWindowTitle("SQL statistics")
+        self.resize(1000, 600)
+
+        self.enabled = QCheckBox("Record")
+        self.enabled.setChecked(query_stats.enabled)
+        self.enabled.toggled.connect(self.set_enabled)
+        self.slow_ms = QDoubleSpinBox()
+        self.slow_ms.setRange(0.0, 60000.0)
+        self.slow_ms.setSuffix(" ms")
+        self.slow_ms.setValue(query_stats.slow_ms)
+        self.slow_ms.valueChanged.connect(lambda value: setattr(query_stats, "slow_ms", value))
+        reset = QPushButton("Reset")
+        reset.clicked.connect(self.reset)
+        copy = QPushButton("Copy report")
+        copy.clicked.connect(self.copy_report)
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.enabled)
+        controls.addWidget(QLabel("Slow above"))
+        controls.addWidget(self.slow_ms)
+        controls.addStretch()
+        controls.addWidget(reset)
+        controls.addWidget(copy)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels([title for title, _ in COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(len(COLUMNS) - 1, QHeaderView.Stretch)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(1, Qt.DescendingOrder)
+        self.slow_log = QPlainTextEdit()
+        self.slow_log.setReadOnly(True)
+        self.pools = QLabel()
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.slow_log)
+        layout = QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(self.pools)
+        layout.addWidget(splitter)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_MS)
+        self.refresh()
+
+    def set_enabled(self, on):
+        if on:
+            query_stats.enable(self.slow_ms.value())
+        else:
+            query_stats.disable()
+
+    def reset(self):
+        query_stats.reset()
+        self.refresh()
+
+    def copy_report(self):
+        QApplication.clipboard().setText(query_stats.report())
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        self.pools.setText(pool_report())
+        rows = query_stats.stats()
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            for c, (_, field) in enumerate(COLUMNS):
+                item = QTableWidgetItem()
+                # Numbers go in as data so the columns sort numerically
+                item.setData(Qt.DisplayRole, row[field])
+                self.table.setItem(r, c, item)
+        self.table.setSortingEnabled(True)
+
+        lines = []
+        for entry in reversed(query_stats.slow_queries()):
+            lines.append(f"{entry['at']}  {entry['ms']} ms  [{entry['thread']}]  {entry['sql']}")
+            lines.append(f"    params: {entry['params']}")
+            lines.extend(f"    {step}" for step in entry["plan"])
+        self.slow_log.setPlainText("\n".join(lines))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+# The thread rechecks the clock at least this often, so a wall-clock jump
+# (suspend, NTP) delays an event by at most this much
+MAX_SLEEP = 60.0
+
+_CANCELLED = object()
+
+
+class Scheduler:
+    """Calls ``callback(key, payload)`` when each scheduled time comes, on one background thread.
+
+    Entries sit in a heap ordered by time, so schedule() and cancel() are
+    O(log n) and the next due entry is always at the top; the thread
+    sleeps on a condition until then or until the heap changes, so
+    nothing is polled. Times are epoch seconds, like Assignment.due_at.
+    Scheduling a key again replaces its entry; a time already past fires
+    at once.
+    """
+
+    def __init__(self, callback, name="scheduler", clock=time.time):
+        self.callback = callback
+        self.name = name
+        self.clock = clock
+        self._heap = []
+        self._entries = {}  # key -> [when, seq, key, payload]; payload is _CANCELLED once dropped
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def schedule(self, when, key, payload=None):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            self._drop(key)
+            entry = [when, next(self._seq), key, payload]
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            elif self._heap[0] is entry:
+                self._cond.notify()  # earlier than what the thread waits for
+
+    def cancel(self, key):
+        """Forget ``key``'s entry; returns whether there was one."""
+        with self._cond:
+            return self._drop(key)
+
+    def clear(self):
+        with self._cond:
+            for entry in self._entries.values():
+                entry[3] = _CANCELLED
+            self._entries.clear()
+            self._heap.clear()
+
+    def next_time(self):
+        """When the earliest entry is due, or None."""
+        with self._cond:
+            self._prune()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        # Left in the heap and skipped when it comes up; rebuilt once
+        # cancelled entries are the majority
+        entry[3] = _CANCELLED
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [e for e in self._heap if e[3] is not _CANCELLED]
+            heapq.heapify(self._heap)
+        return True
+
+    def _prune(self):
+        while self._heap and self._heap[0][3] is _CANCELLED:
+            heapq.heappop(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    self._prune()
+                    delay = self._heap[0][0] - self.clock() if self._heap else None
+                    if delay is not None and delay <= 0:
+                        _, _, key, payload = heapq.heappop(self._heap)
+                        del self._entries[key]
+                        break
+                    self._cond.wait(None if delay is None else min(delay, MAX_SLEEP))
+            try:
+                self.callback(key, payload)
+            except Exception:
+                traceback.print_exc()
+
+    def close(self):
+        """Drop every entry and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._entries.clear()
+            self._heap.clear()
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
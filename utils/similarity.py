@@ -0,0 +1,280 @@
+"""Near-duplicate submissions, found by MinHash and LSH over their PDF text.
+
+Each submission's text is cut into overlapping runs of SHINGLE_WORDS
+words, and a MinHash signature of NUM_PERM values sums up that set: two
+signatures agree in any one position with probability equal to the
+Jaccard similarity of the two sets. Signatures are split into BANDS
+bands; submissions that agree on a whole band become candidate pairs, so
+the work grows with the number of similar pairs rather than with every
+pair. Only candidates are compared on their full signatures.
+
+Signatures are cached in the TextSignature table by content hash, so a
+re-run only extracts and signs files it has not seen. Extraction and
+signing run in a process pool once more than POOL_THRESHOLD files wait.
+
+    python -m utils.similarity ASSIGNMENT_ID [--db PATH] [--threshold T] [--workers N]
+    python -m utils.similarity --all [--db PATH] [--workers N]
+
+``--all`` signs every stored submission that has no signature yet.
+Needs NumPy and a PDF text extractor (see utils.pdf_artifacts).
+"""
+import json
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.db_helper import DBHelper
+from utils.file_store import FileStore, SUBMISSIONS_STORE
+from utils.pdf_artifacts import can_extract, extract
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+# NUM_PERM // BANDS rows per band; with 32 bands of 4 a pair at similarity
+# 0.6 becomes a candidate 99% of the time, one at 0.2 about 5%
+BANDS = 32
+THRESHOLD = 0.6
+SEED = 1
+# Signatures made with other parameters are not comparable and not reused
+SCHEME = f"minhash-w{SHINGLE_WORDS}-p{NUM_PERM}-s{SEED}"
+# Shingles hashed at once, bounding the NUM_PERM x BLOCK matrix
+BLOCK = 8192
+# Fewer files than this are signed on the calling thread
+POOL_THRESHOLD = 8
+
+_EMPTY = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+_hasher = None  # per process, see sign_file
+
+
+def available():
+    return np is not None and can_extract()
+
+
+def shingles(text, words=SHINGLE_WORDS):
+    """The distinct 32-bit hashes of every run of ``words`` consecutive words in ``text``.
+
+    Case and punctuation are ignored; a shorter text is a single shingle.
+    """
+    tokens = _WORD_RE.findall(text.lower())
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    ids = np.fromiter((zlib.crc32(token.encode()) for token in tokens), dtype=np.uint64, count=len(tokens))
+    width = min(words, len(tokens))
+    count = len(tokens) - width + 1
+    # Polynomial hash of each window, wrapping at 64 bits, then folded to 32
+    hashes = np.zeros(count, dtype=np.uint64)
+    for i in range(width):
+        hashes = hashes * np.uint64(1_000_003) + ids[i:i + count]
+    return np.unique((hashes ^ (hashes >> np.uint64(32))) & np.uint64(0xFFFFFFFF))
+
+
+class MinHasher:
+    """NUM_PERM multiply-shift hash functions, ``(a * x + b) >> 32`` in 64-bit
+    arithmetic, the same in every process for a seed.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 1 << 64, num_perm, dtype=np.uint64, endpoint=False)[:, None] | np.uint64(1)
+        self.b = rng.integers(0, 1 << 64, num_perm, dtype=np.uint64, endpoint=False)[:, None]
+
+    def signature(self, hashes):
+        """The smallest value each hash function takes over ``hashes``, as uint32."""
+        signature = np.full(self.a.shape[0], _EMPTY, dtype=np.uint64)
+        for start in range(0, hashes.size, BLOCK):
+            # In place: a temporary per step costs more than the arithmetic
+            values = np.multiply(self.a, hashes[None, start:start + BLOCK])
+            values += self.b
+            values >>= np.uint64(32)
+            np.minimum(signature, values.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+
+def sign_file(path):
+    """``(shingle_count, signature_bytes)`` for the PDF at ``path``, or None if it cannot be read.
+
+    Module-level so process pool workers can run it.
+    """
+    global _hasher
+    try:
+        text, _ = extract(path, thumbnail_width=None)
+    except Exception as e:
+        print(f"Text extraction failed for {path}: {e}")
+        return None
+    if _hasher is None:
+        _hasher = MinHasher()
+    hashes = shingles(text)
+    return hashes.size, _hasher.signature(hashes).tobytes()
+
+
+def candidate_pairs(signatures, bands=BANDS):
+    """``(n, 2)`` row indices ``i < j`` of ``signatures`` that agree on at least one band."""
+    count, num_perm = signatures.shape
+    rows = num_perm // bands
+    # Odd multipliers mix a band's values into one key; a collision only
+    # adds a candidate that the full comparison then drops
+    mix = (np.arange(rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)) * np.uint64(0x9E3779B97F4A7C15)
+    codes = []
+    for band in range(bands):
+        keys = (signatures[:, band * rows:(band + 1) * rows] * mix).sum(axis=1, dtype=np.uint64)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        sizes = np.diff(np.r_[starts, count])
+        for start, size in zip(starts[sizes > 1], sizes[sizes > 1]):
+            members = np.sort(order[start:start + size])
+            i, j = np.triu_indices(size, 1)
+            codes.append(members[i] * count + members[j])
+    if not codes:
+        return np.empty((0, 2), dtype=np.int64)
+    codes = np.unique(np.concatenate(codes))
+    return np.stack([codes // count, codes % count], axis=1)
+
+
+def similar_pairs(signatures, threshold=THRESHOLD, bands=BANDS):
+    """``[(i, j, similarity)]`` for rows of ``signatures`` whose estimated
+    Jaccard similarity is at least ``threshold``, most similar first.
+    """
+    pairs = candidate_pairs(signatures, bands)
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    keep = np.flatnonzero(similarity >= threshold)
+    keep = keep[np.argsort(-similarity[keep], kind="stable")]
+    return [(int(pairs[k, 0]), int(pairs[k, 1]), float(similarity[k])) for k in keep]
+
+
+class SimilarityDetector:
+    """Compares the latest submissions to an assignment, see the module docstring."""
+
+    def __init__(self, db_path='database.db', store=None, max_workers=None):
+        self.db = DBHelper(db_path)
+        self.store = store or FileStore(SUBMISSIONS_STORE, db_path=db_path)
+        self.max_workers = max_workers
+
+    def _cached(self, hashes):
+        with self.db.reader() as conn:
+            rows = conn.execute("""
+                                SELECT sha256, shingles, signature
+                                FROM TextSignature
+                                WHERE scheme = ? AND sha256 IN (SELECT value FROM json_each(?))
+                                """, (SCHEME, json.dumps(list(hashes)))).fetchall()
+        return {file_hash: (shingles, signature) for file_hash, shingles, signature in rows}
+
+    def _sign(self, paths):
+        """``{key: (shingle_count, signature_bytes)}`` for ``{key: path}``; unreadable files are left out."""
+        keys = list(paths)
+        if len(keys) < POOL_THRESHOLD:
+            results = map(sign_file, paths.values())
+            return {key: result for key, result in zip(keys, results) if result is not None}
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            results = pool.map(sign_file, paths.values(), chunksize=8)
+            return {key: result for key, result in zip(keys, results) if result is not None}
+
+    def _save(self, signed):
+        with self.db.connection() as conn:
+            conn.executemany("""
+                             INSERT OR REPLACE INTO TextSignature (sha256, scheme, shingles, signature)
+                             VALUES (?, ?, ?, ?)
+                             """, [(file_hash, SCHEME, shingles, signature)
+                                   for file_hash, (shingles, signature) in signed.items()])
+
+    def signatures(self, submissions):
+        """``({submission_id: (shingle_count, signature_bytes)}, newly_signed)`` for
+        ``(submission_id, pdf_file, file_hash)`` rows.
+
+        Files already signed come from the cache. Rows from before the
+        file store have no hash, so they are signed again on every call.
+        """
+        cached = self._cached({file_hash for _, _, file_hash in submissions if file_hash})
+        paths = {}
+        for submission_id, pdf_file, file_hash in submissions:
+            if not file_hash:
+                paths[submission_id] = self.store.resolve(pdf_file)
+            elif file_hash not in cached:
+                paths[file_hash] = self.store.path_for(file_hash)
+        signed = self._sign(paths)
+        self._save({key: value for key, value in signed.items() if isinstance(key, str)})
+        cached.update(signed)
+        result = {}
+        for submission_id, _, file_hash in submissions:
+            value = cached.get(file_hash or submission_id)
+            if value is not None:
+                result[submission_id] = value
+        return result, len(signed)
+
+    def find(self, assignment_id, threshold=THRESHOLD):
+        """Pairs of students whose latest submissions to ``assignment_id`` are
+        at least ``threshold`` similar, most similar first, with counts of
+        what was compared.
+        """
+        with self.db.reader() as conn:
+            rows = conn.execute("""
+                                SELECT s.student_id, s.submission_id, u.username, s.pdf_file, s.file_hash
+                                FROM Submission s
+                                         JOIN Student st ON st.student_id = s.student_id
+                                         JOIN User u ON u.user_id = st.user_id
+                                WHERE s.assignment_id = ?
+                                ORDER BY s.submission_id
+                                """, (assignment_id,)).fetchall()
+        latest = list({row[0]: row[1:] for row in rows}.values())
+        signed, new = self.signatures([(submission_id, pdf_file, file_hash)
+                                       for submission_id, _, pdf_file, file_hash in latest])
+        # A file without text (a scan, say) has nothing to compare
+        compared = [row for row in latest if signed.get(row[0], (0,))[0] > 0]
+        pairs = []
+        if len(compared) > 1:
+            matrix = np.stack([np.frombuffer(signed[row[0]][1], dtype=np.uint32) for row in compared])
+            for i, j, similarity in similar_pairs(matrix, threshold):
+                a, b = compared[i], compared[j]
+                pairs.append({"similarity": round(similarity, 3),
+                              "identical": bool(a[3]) and a[3] == b[3],
+                              "a": {"submission_id": a[0], "username": a[1], "pdf_file": a[2]},
+                              "b": {"submission_id": b[0], "username": b[1], "pdf_file": b[2]}})
+        return {"assignment_id": assignment_id, "threshold": threshold, "submissions": len(latest),
+                "compared": len(compared), "unreadable": len(latest) - len(signed), "signed": new,
+                "pairs": pairs}
+
+    def sign_all(self):
+        """Sign every stored submission that has no signature yet; returns how many were signed."""
+        with self.db.reader() as conn:
+            hashes = [row[0] for row in conn.execute("""
+                                                     SELECT f.sha256
+                                                     FROM StoredFile f
+                                                     WHERE f.store = ? AND NOT EXISTS (
+                                                         SELECT 1 FROM TextSignature t
+                                                         WHERE t.sha256 = f.sha256 AND t.scheme = ?)
+                                                     """, (self.store.name, SCHEME))]
+        signed = self._sign({file_hash: self.store.path_for(file_hash) for file_hash in hashes})
+        self._save(signed)
+        return len(signed)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Find near-duplicate submissions to an assignment.")
+    parser.add_argument("assignment_id", type=int, nargs="?")
+    parser.add_argument("--all", action="store_true", help="sign every stored submission instead")
+    parser.add_argument("--db", default="database.db")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    if np is None:
+        raise SystemExit("Install numpy to compare submissions.")
+    if not can_extract():
+        raise SystemExit("Install PyMuPDF (or pypdf) to extract submission text.")
+    detector = SimilarityDetector(args.db, max_workers=args.workers)
+    if args.all:
+        print(f"Signed {detector.sign_all()} files.")
+    elif args.assignment_id is None:
+        parser.error("give an assignment id or --all")
+    else:
+        report = detector.find(args.assignment_id, args.threshold)
+        print(f"{report['compared']} of {report['submissions']} submissions compared, "
+              f"{report['signed']} newly signed, {report['unreadable']} unreadable.")
+        for pair in report["pairs"]:
+            print(f"{pair['similarity']:.0%}  {pair['a']['username']} ({pair['a']['pdf_file']})"
+                  f"  ~  {pair['b']['username']} ({pair['b']['pdf_file']})")
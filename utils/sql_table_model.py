@@ -0,0 +1,219 @@
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor
+
+from utils.keyset import PAGE_SIZE
+
+DIRTY_BACKGROUND = QColor("#F6E3A1")
+
+
+class KeysetTableModel(QAbstractTableModel):
+    """Read-only table fetched a page at a time as the view scrolls.
+
+    ``fetch(params, after, sort_column, descending, limit)`` returns one
+    page in keyset order (see utils.keyset.KeysetQuery), with the sort key
+    and tiebreak as the two trailing columns of every row; it may query a
+    local database or a remote service. Views pull further pages through
+    canFetchMore/fetchMore, and sorting is left to ``fetch``.
+    ``sortable`` flags which columns can be sorted.
+
+    Cells in ``editable`` columns can be edited; ``validate`` turns the
+    typed text into the stored value or raises ValueError to refuse it.
+    Edits are kept by row id (the tiebreak column) until saved or
+    discarded, so they survive paging, re-sorting and refreshes, and are
+    highlighted until then.
+    """
+
+    dirtyChanged = pyqtSignal(int)  # number of edited cells
+
+    def __init__(self, headers, fetch, sortable=None, sort_column=None, descending=False,
+                 tasks=None, page_size=PAGE_SIZE, editable=(), validate=None, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.fetch = fetch
+        self.sortable = sortable or [True] * len(headers)
+        self.editable = set(editable)
+        self.validate = validate
+        self.sort_column = sort_column
+        self.descending = descending
+        self.tasks = tasks
+        self.page_size = page_size
+        self._params = None
+        self._rows = []
+        self._exhausted = True
+        self._fetching = False
+        self._generation = 0
+        self._edits = {}  # (row id, column) -> (value, value when first edited)
+
+    def query_page(self, params, after=None, sort=None):
+        """Rows after the ``(sort key, tiebreak)`` pair ``after``; safe off the GUI thread."""
+        sort_column, descending = sort or (self.sort_column, self.descending)
+        return self.fetch(params, after, sort_column, descending, self.page_size)
+
+    def set_rows(self, params, rows):
+        """Show the first page for ``params``, e.g. one fetched by a worker.
+
+        Edits are dropped when ``params`` change.
+        """
+        if tuple(params) != self._params and self._edits:
+            self._edits.clear()
+            self.dirtyChanged.emit(0)
+        self.beginResetModel()
+        self._generation += 1
+        self._params = tuple(params)
+        self._rows = list(rows)
+        self._exhausted = len(rows) < self.page_size
+        self._fetching = False
+        self.endResetModel()
+
+    def clear(self):
+        self.set_rows((), [])
+        self._params = None
+
+    def refresh(self):
+        if self._params is None:
+            return
+        params, generation = self._params, self._generation
+        sort = (self.sort_column, self.descending)
+
+        def apply(rows):
+            if generation == self._generation:
+                self.set_rows(params, rows)
+
+        self._run(lambda: self.query_page(params, sort=sort), apply)
+
+    def _run(self, fn, on_result):
+        if self.tasks is None:
+            on_result(fn())
+        else:
+            self.tasks.submit(fn, on_result=on_result, on_error=self._failed)
+
+    @property
+    def params(self):
+        return self._params
+
+    def edits(self):
+        """``(row id, column, value, original value)`` for every edited cell."""
+        return [(row_id, column, value, original)
+                for (row_id, column), (value, original) in self._edits.items()]
+
+    def clear_edits(self):
+        if self._edits:
+            self._edits.clear()
+            self._changed_all()
+            self.dirtyChanged.emit(0)
+
+    def saved_edits(self, saved):
+        """Drop the edits ``saved`` ((row id, column) -> value) has stored.
+
+        A cell edited again since then keeps its edit, now against the
+        stored value.
+        """
+        for key, value in saved.items():
+            if key in self._edits:
+                if self._edits[key][0] == value:
+                    del self._edits[key]
+                else:
+                    self._edits[key] = (self._edits[key][0], value)
+        self._changed_all()
+        self.dirtyChanged.emit(len(self._edits))
+
+    def rebase(self, column, current):
+        """Take ``current`` (row id -> value) as the originals of those edits.
+
+        Used after a save was refused because the rows changed meanwhile:
+        the edits stay, and saving again overwrites the newer values.
+        """
+        for row_id, value in current.items():
+            key = (row_id, column)
+            if key in self._edits:
+                self._edits[key] = (self._edits[key][0], value)
+
+    def _changed_all(self):
+        if self._rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._rows) - 1, len(self.headers) - 1))
+
+    def _failed(self, error):
+        print(f"Database error: {error}")
+        self._fetching = False
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            row = self._rows[index.row()]
+            edit = self._edits.get((row[-1], index.column())) if self._edits else None
+            value = row[index.column()] if edit is None else edit[0]
+            return "" if value is None else str(value)
+        if role == Qt.BackgroundRole and self._edits \
+                and (self._rows[index.row()][-1], index.column()) in self._edits:
+            return QBrush(DIRTY_BACKGROUND)
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() in self.editable:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or index.column() not in self.editable:
+            return False
+        try:
+            value = self.validate(value) if self.validate else value
+        except ValueError:
+            return False
+        row = self._rows[index.row()]
+        key = (row[-1], index.column())
+        original = self._edits[key][1] if key in self._edits else row[index.column()]
+        if value == original:
+            self._edits.pop(key, None)
+        else:
+            self._edits[key] = (value, original)
+        self.dataChanged.emit(index, index)
+        self.dirtyChanged.emit(len(self._edits))
+        return True
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._params is not None \
+            and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._fetching = True
+        params, generation = self._params, self._generation
+        after = tuple(self._rows[-1][-2:])
+        sort = (self.sort_column, self.descending)
+        self._run(lambda: self.query_page(params, after, sort),
+                  lambda rows: self._append(generation, rows))
+
+    def _append(self, generation, rows):
+        if generation != self._generation:
+            return  # the table was reloaded or re-sorted meanwhile
+        self._fetching = False
+        self._exhausted = len(rows) < self.page_size
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if not self.sortable[column]:
+            return
+        self.sort_column = column
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
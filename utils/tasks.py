@@ -0,0 +1,121 @@
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+DEFAULT_WORKERS = 4
+
+
+class Task:
+    """Handle for work submitted to a TaskRunner."""
+
+    def __init__(self, fn, args, kwargs, key=None, channel=None):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.channel = channel
+        self.future = None
+        self.callbacks = []  # (on_result, on_error) pairs, grows when coalesced
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Drop the result; a task that has not started yet never runs."""
+        self._cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class TaskRunner(QObject):
+    """Runs blocking work on a thread pool and delivers results on the GUI thread.
+
+    ``channel`` names a stream of loads where only the newest matters:
+    submitting to it cancels the previous task on that channel. ``key``
+    identifies a request; submitting a key that is already in flight joins
+    the running task instead of starting another one. Exceptions of the
+    ``expected_errors`` types are handed to ``on_error`` without printing
+    a traceback.
+    """
+
+    finished = pyqtSignal(object, object, object)  # task, result, error
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, expected_errors=(), parent=None):
+        super().__init__(parent)
+        self.expected_errors = expected_errors
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="learnup-task")
+        self._inflight = {}
+        self._latest = {}
+        # Emitted from worker threads, so the slot runs queued on the GUI thread
+        self.finished.connect(self._deliver)
+
+    def submit(self, fn, *args, on_result=None, on_error=None, key=None, channel=None, **kwargs):
+        if key is not None and key in self._inflight:
+            task = self._inflight[key]
+            if not task.cancelled:
+                task.callbacks.append((on_result, on_error))
+                if channel is not None:
+                    self._latest[channel] = task
+                return task
+
+        if channel is not None:
+            previous = self._latest.get(channel)
+            if previous is not None:
+                self._cancel(previous)
+
+        task = Task(fn, args, kwargs, key=key, channel=channel)
+        task.callbacks.append((on_result, on_error))
+        if key is not None:
+            self._inflight[key] = task
+        if channel is not None:
+            self._latest[channel] = task
+        task.future = self._executor.submit(self._run, task)
+        return task
+
+    def _cancel(self, task):
+        task.cancel()
+        if task.future is not None and task.future.cancelled():
+            # Never started, so _deliver will not clean it up
+            self._forget(task)
+
+    def _run(self, task):
+        if task.cancelled:
+            self.finished.emit(task, None, None)
+            return
+        try:
+            result = task.fn(*task.args, **task.kwargs)
+        except Exception as e:
+            if not isinstance(e, self.expected_errors):
+                traceback.print_exc()
+            self.finished.emit(task, None, e)
+        else:
+            self.finished.emit(task, result, None)
+
+    def _forget(self, task):
+        if task.key is not None and self._inflight.get(task.key) is task:
+            del self._inflight[task.key]
+        if task.channel is not None and self._latest.get(task.channel) is task:
+            del self._latest[task.channel]
+
+    def _deliver(self, task, result, error):
+        self._forget(task)
+        if task.cancelled:
+            return
+        for on_result, on_error in task.callbacks:
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+            elif on_result is not None:
+                on_result(result)
+
+    def cancel_all(self):
+        for task in list(self._inflight.values()) + list(self._latest.values()):
+            self._cancel(task)
+
+    def shutdown(self, wait=True):
+        self.cancel_all()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
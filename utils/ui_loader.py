@@ -0,0 +1,96 @@
+import importlib
+import io
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from PyQt5 import QtWidgets, uic
+from PyQt5.QtGui import QPixmap
+
+UI_DIR = "ui"
+COMPILED_DIR = os.path.join(UI_DIR, "compiled")
+COMPILED_PACKAGE = "ui.compiled"
+
+# Set to False to always parse the .ui files (used by the startup benchmark)
+use_compiled = True
+
+_pixmaps = {}
+
+
+def pixmap(path):
+    """Decode an image once and share it between every widget that shows it."""
+    cached = _pixmaps.get(path)
+    if cached is None:
+        cached = _pixmaps[path] = QPixmap(path)
+    return cached
+
+
+def _compiled_module(name):
+    ui_path = os.path.join(UI_DIR, name + ".ui")
+    py_path = os.path.join(COMPILED_DIR, name + ".py")
+    # A compiled page older than its .ui file is stale; fall back to loadUi
+    if not os.path.exists(py_path) or os.path.getmtime(py_path) < os.path.getmtime(ui_path):
+        return None
+    try:
+        return importlib.import_module(f"{COMPILED_PACKAGE}.{name}")
+    except ImportError:
+        return None
+
+
+def load_page(name):
+    """Build the widget for ``ui/<name>.ui``, preferring its precompiled module."""
+    module = _compiled_module(name) if use_compiled else None
+    if module is None:
+        return uic.loadUi(os.path.join(UI_DIR, name + ".ui"))
+    base = getattr(QtWidgets, module.BASE_CLASS)
+    page_class = type(module.UI_CLASS.__name__[3:], (base, module.UI_CLASS), {})
+    page = page_class()
+    page.setupUi(page)
+    return page
+
+
+def _rebase_pixmaps(source, ui_path):
+    # pyuic writes pixmap paths as they appear in the .ui file, relative to
+    # ui/; rewrite them relative to the project root and route them through
+    # the shared cache.
+    def repl(match):
+        path = os.path.normpath(os.path.join(os.path.dirname(ui_path), match.group(1)))
+        return f'pixmap("{path.replace(os.sep, "/")}")'
+    return re.sub(r'QtGui\.QPixmap\("([^"]+)"\)', repl, source)
+
+
+def compile_pages():
+    """Precompile every ui/*.ui into ui/compiled/<name>.py; returns the names."""
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    init_path = os.path.join(COMPILED_DIR, "__init__.py")
+    if not os.path.exists(init_path):
+        open(init_path, "w").close()
+
+    names = []
+    for filename in sorted(os.listdir(UI_DIR)):
+        if not filename.endswith(".ui"):
+            continue
+        name = filename[:-3]
+        ui_path = os.path.join(UI_DIR, filename)
+        root = ET.parse(ui_path).getroot()
+        base_class = root.find("widget").get("class")
+        ui_class = "Ui_" + root.find("class").text
+
+        buf = io.StringIO()
+        with open(ui_path, encoding="utf-8") as f:
+            uic.compileUi(f, buf)
+        source = _rebase_pixmaps(buf.getvalue(), ui_path)
+        source = source.replace(
+            "from PyQt5 import QtCore, QtGui, QtWidgets\n",
+            "from PyQt5 import QtCore, QtGui, QtWidgets\nfrom utils.ui_loader import pixmap\n", 1)
+        source += f"\n\nBASE_CLASS = {base_class!r}\nUI_CLASS = {ui_class}\n"
+
+        with open(os.path.join(COMPILED_DIR, name + ".py"), "w", encoding="utf-8") as f:
+            f.write(source)
+        names.append(name)
+    return names
+
+
+if __name__ == "__main__":
+    compiled = compile_pages()
+    print(f"Compiled {len(compiled)} pages into {COMPILED_DIR}: {', '.join(compiled)}")